@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Downloader Benchmark
+Jalankan download_tiles_batch, download_tiles_async dan download_merge_tiles terhadap
+mock tile server lokal dan laporkan tiles/s, latency p50/p99, CPU dan peak RSS.
+Hasil ditulis ke JSON dan bisa dibandingkan dengan baseline untuk menangkap regresi.
+
+Contoh:
+    python benchmarks/bench_download.py --tiles 2000 --output bench_download.json
+    python benchmarks/bench_download.py --error-rate 0.02 --rate-limit-rate 0.01 \\
+        --baseline bench_download_v1.json --tolerance 10
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+# Fix Windows terminal encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from mock_tile_server import MockTileServer, add_server_arguments
+
+# ============= KONFIGURASI =============
+DOWNLOADERS = ('batch', 'async', 'merge')
+DOWNLOADER_MODULES = {
+    'batch': 'download_tiles_batch',
+    'async': 'download_tiles_async',
+    'merge': 'download_merge_tiles',
+}
+DEFAULT_TILES = 1000
+DEFAULT_REPEAT = 1
+DEFAULT_TOLERANCE = 10.0  # Persen
+BENCH_ZOOM = 21
+BENCH_VARIANT = 2
+BENCH_ORIGIN = (1728675, 1051362)  # Pojok AOI sintetis (sama dengan contoh README)
+WORKER_TIMEOUT = 3600
+
+# Metrics yang dibandingkan dengan baseline: (key, True = lebih besar lebih baik)
+REGRESSION_METRICS = (
+    ('tiles_per_s', True),
+    ('latency_p99_ms', False),
+    ('cpu_s_per_1k_tiles', False),
+    ('peak_rss_mb', False),
+)
+
+
+def percentile(values, fraction):
+    """Percentile dengan interpolasi linear (values tidak harus terurut)"""
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return values[lower]
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def median(values):
+    return percentile([v for v in values if v is not None], 0.5)
+
+
+def benchmark_aoi(tiles):
+    """AOI persegi dengan >= tiles tiles"""
+    side = max(1, math.ceil(math.sqrt(tiles)))
+    x_start, y_start = BENCH_ORIGIN
+    return {'x_start': x_start, 'x_end': x_start + side - 1, 'y_start': y_start, 'y_end': y_start + side - 1}
+
+
+def process_usage():
+    """(cpu user+sys detik, peak RSS MB) proses ini"""
+    if HAS_RESOURCE:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        peak = usage.ru_maxrss / (1024 * 1024) if sys.platform == 'darwin' else usage.ru_maxrss / 1024
+        return usage.ru_utime + usage.ru_stime, peak
+    if HAS_PSUTIL:
+        process = psutil.Process()
+        times = process.cpu_times()
+        memory = process.memory_info()
+        return times.user + times.system, getattr(memory, 'peak_wset', memory.rss) / (1024 * 1024)
+    return time.process_time(), None
+
+
+# ============= WORKER (subprocess per downloader) =============
+
+def run_downloader(name, aoi, concurrency):
+    """Jalankan downloader di cwd (workdir sementara). Module sudah di-patch ke mock server"""
+    import importlib
+    from concurrent.futures import ThreadPoolExecutor
+
+    module = importlib.import_module(DOWNLOADER_MODULES[name])
+
+    if name == 'batch':
+        batches = module.calculate_batches(aoi['x_start'], aoi['x_end'], aoi['y_start'], aoi['y_end'])
+        progress = {'total_batches': len(batches), 'completed_batches': [], 'batch_details': {},
+                    'tiles_downloaded': 0, 'tiles_failed': 0, 'start_time': datetime.now().isoformat()}
+        with ThreadPoolExecutor(max_workers=concurrency or module.MAX_WORKERS) as executor:
+            for batch in batches:
+                module.download_batch(batch, BENCH_ZOOM, BENCH_VARIANT, progress, {}, executor)
+
+    elif name == 'async':
+        import asyncio
+        batches = module.calculate_batches(aoi['x_start'], aoi['x_end'], aoi['y_start'], aoi['y_end'])
+        progress = {'total_batches': len(batches), 'completed_batches': [], 'batch_details': {},
+                    'tiles_downloaded': 0, 'tiles_failed': 0, 'start_time': datetime.now().isoformat()}
+
+        async def download_all():
+            for batch in batches:
+                await module.download_batch(batch, BENCH_ZOOM, BENCH_VARIANT, progress, {},
+                                            concurrency or module.MAX_CONCURRENT)
+
+        asyncio.run(download_all())
+
+    else:
+        if concurrency:
+            module.MAX_WORKERS = concurrency
+        module.download_all_tiles(aoi['x_start'], aoi['x_end'], aoi['y_start'], aoi['y_end'],
+                                  BENCH_ZOOM, BENCH_VARIANT, Path("tiles"))
+
+
+def worker_main(args):
+    """Subprocess: patch BASE_URL ke mock server, download, tulis hasil ke JSON"""
+    import importlib
+    import pipeline_metrics
+
+    module = importlib.import_module(DOWNLOADER_MODULES[args.worker])
+    module.BASE_URL = args.url_template
+
+    # Latency per request diambil dari instrumentasi downloader sendiri (REQUEST_LATENCY),
+    # sample mentah disimpan untuk percentile yang presisi (bukan bucket histogram)
+    latencies = []
+    observe = pipeline_metrics.REQUEST_LATENCY.observe
+
+    def record_latency(value, **labels):
+        latencies.append(value)
+        observe(value, **labels)
+
+    pipeline_metrics.REQUEST_LATENCY.observe = record_latency
+
+    aoi = json.loads(args.aoi)
+    cpu_start, _ = process_usage()
+    start_time = time.perf_counter()
+    run_downloader(args.worker, aoi, args.concurrency)
+    wall = time.perf_counter() - start_time
+    cpu_end, peak_rss = process_usage()
+
+    tiles = list(Path("tiles").rglob("*.jpg"))
+    result = {
+        'wall_s': wall,
+        'cpu_s': cpu_end - cpu_start,
+        'peak_rss_mb': peak_rss,
+        'tiles_ok': len(tiles),
+        'bytes': sum(tile.stat().st_size for tile in tiles),
+        'latencies_s': latencies,
+    }
+    with open(args.result_file, 'w') as f:
+        json.dump(result, f)
+    return 0
+
+
+# ============= RUNNER =============
+
+def run_once(name, server, aoi, concurrency, keep_output=False):
+    """Satu run downloader di subprocess. Returns dict hasil mentah"""
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench_{name}_"))
+    result_file = workdir / "result.json"
+    log_file = workdir / "worker.log"
+
+    cmd = [sys.executable, str(Path(__file__).resolve()), '--worker', name,
+           '--url-template', server.url_template, '--aoi', json.dumps(aoi), '--result-file', str(result_file)]
+    if concurrency:
+        cmd.extend(['--concurrency', str(concurrency)])
+
+    env = os.environ.copy()
+    env['PYTHONIOENCODING'] = 'utf-8'
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(REPO_DIR), str(BENCH_DIR), env.get('PYTHONPATH')]))
+
+    server.reset_stats()
+    try:
+        with open(log_file, 'w', encoding='utf-8') as log:
+            returncode = subprocess.run(cmd, cwd=workdir, stdin=subprocess.DEVNULL, stdout=log,
+                                        stderr=subprocess.STDOUT, env=env, timeout=WORKER_TIMEOUT).returncode
+        if returncode != 0 or not result_file.exists():
+            with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
+                tail = f.read()[-2000:]
+            raise RuntimeError(f"Worker {name} gagal (exit {returncode}):\n{tail}")
+        with open(result_file, 'r') as f:
+            raw = json.load(f)
+    finally:
+        if not keep_output:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    raw['server'] = server.stats()
+    return raw
+
+
+def summarize(raw, tiles_requested):
+    """Hasil mentah satu run -> metrics yang dilaporkan"""
+    latencies_ms = [value * 1000 for value in raw['latencies_s']]
+    wall = raw['wall_s']
+    return {
+        'tiles_requested': tiles_requested,
+        'tiles_ok': raw['tiles_ok'],
+        'tiles_failed': tiles_requested - raw['tiles_ok'],
+        'wall_s': round(wall, 3),
+        'tiles_per_s': round(raw['tiles_ok'] / wall, 2) if wall > 0 else None,
+        'mb_per_s': round(raw['bytes'] / wall / (1024 * 1024), 2) if wall > 0 else None,
+        'latency_p50_ms': round(percentile(latencies_ms, 0.50), 2) if latencies_ms else None,
+        'latency_p90_ms': round(percentile(latencies_ms, 0.90), 2) if latencies_ms else None,
+        'latency_p99_ms': round(percentile(latencies_ms, 0.99), 2) if latencies_ms else None,
+        'latency_max_ms': round(max(latencies_ms), 2) if latencies_ms else None,
+        'requests': raw['server']['requests'],
+        'status_counts': raw['server']['status_counts'],
+        'cpu_s': round(raw['cpu_s'], 3),
+        'cpu_percent': round(raw['cpu_s'] / wall * 100, 1) if wall > 0 else None,
+        'cpu_s_per_1k_tiles': round(raw['cpu_s'] / raw['tiles_ok'] * 1000, 3) if raw['tiles_ok'] else None,
+        'peak_rss_mb': round(raw['peak_rss_mb'], 1) if raw['peak_rss_mb'] is not None else None,
+    }
+
+
+def aggregate(runs):
+    """Median per metric dari beberapa run (angka), runs disimpan lengkap"""
+    summary = {}
+    for key, value in runs[0].items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            summary[key] = median([run[key] for run in runs])
+        else:
+            summary[key] = value
+    summary['runs'] = runs
+    return summary
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """List regresi (downloader, metric, baseline, sekarang, selisih %) melebihi tolerance"""
+    regressions = []
+    for name, current in results['downloaders'].items():
+        previous = baseline.get('downloaders', {}).get(name)
+        if not previous:
+            continue
+        for key, higher_is_better in REGRESSION_METRICS:
+            old, new = previous.get(key), current.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append((name, key, old, new, change))
+    return regressions
+
+
+def print_table(results):
+    print(f"\n{'Downloader':<10} {'Tiles/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'CPU %':>7} "
+          f"{'CPU s/1k':>9} {'RSS MB':>8} {'Gagal':>6}  Status")
+    print("-" * 90)
+    for name, summary in results['downloaders'].items():
+        def fmt(key, spec):
+            value = summary.get(key)
+            return format(value, spec) if value is not None else '-'
+        statuses = ' '.join(f"{code}:{count}" for code, count in summary['status_counts'].items())
+        print(f"{name:<10} {fmt('tiles_per_s', '9.1f')} {fmt('latency_p50_ms', '8.1f')} "
+              f"{fmt('latency_p99_ms', '8.1f')} {fmt('cpu_percent', '7.1f')} {fmt('cpu_s_per_1k_tiles', '9.2f')} "
+              f"{fmt('peak_rss_mb', '8.0f')} {summary['tiles_failed']:>6.0f}  {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark downloader terhadap mock tile server lokal')
+    parser.add_argument('--downloaders', default=','.join(DOWNLOADERS),
+                        help=f'Downloader yang di-benchmark, dipisah koma (default: {",".join(DOWNLOADERS)})')
+    parser.add_argument('--tiles', type=int, default=DEFAULT_TILES,
+                        help=f'Jumlah tiles per run, dibulatkan ke persegi (default: {DEFAULT_TILES})')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='Override workers/concurrent semua downloader (default: default masing-masing)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f'Jumlah run per downloader, hasil = median (default: {DEFAULT_REPEAT})')
+    parser.add_argument('--output', '-o', help='Tulis hasil ke file JSON')
+    parser.add_argument('--baseline', help='Hasil JSON sebelumnya untuk deteksi regresi')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Regresi maksimal dalam persen sebelum exit 1 (default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--keep-output', action='store_true', help='Jangan hapus workdir sementara')
+    add_server_arguments(parser)
+
+    # Argumen internal untuk subprocess worker
+    parser.add_argument('--worker', choices=DOWNLOADERS, help=argparse.SUPPRESS)
+    parser.add_argument('--url-template', help=argparse.SUPPRESS)
+    parser.add_argument('--aoi', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker_main(args)
+
+    downloaders = [name.strip() for name in args.downloaders.split(',') if name.strip()]
+    unknown = [name for name in downloaders if name not in DOWNLOADERS]
+    if unknown:
+        print(f"❌ Downloader tidak dikenal: {', '.join(unknown)} (pilih: {', '.join(DOWNLOADERS)})")
+        return 1
+
+    print("=" * 60)
+    print("   Downloader Benchmark (mock tile server)")
+    print("=" * 60)
+    print()
+
+    try:
+        server = MockTileServer(port=0, latency=args.latency, error_rate=args.error_rate,
+                                rate_limit_rate=args.rate_limit_rate, payload_size=args.payload_size,
+                                seed=args.seed, placeholder_rate=args.placeholder_rate).start()
+    except (ValueError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    aoi = benchmark_aoi(args.tiles)
+    tiles_requested = (aoi['x_end'] - aoi['x_start'] + 1) * (aoi['y_end'] - aoi['y_start'] + 1)
+    print(f"🛰️  Mock server: {server.url_template}")
+    print(f"   Latency {args.latency} | 503 {args.error_rate:.1%} | 429 {args.rate_limit_rate:.1%} | "
+          f"payload {args.payload_size:,} bytes")
+    print(f"📦 {tiles_requested:,} tiles x {args.repeat} run per downloader\n")
+
+    results = {
+        'benchmark': 'download',
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'git_commit': git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'server': server.config(),
+        'tiles': tiles_requested,
+        'concurrency': args.concurrency,
+        'repeat': args.repeat,
+        'downloaders': {},
+    }
+
+    try:
+        for name in downloaders:
+            runs = []
+            for i in range(args.repeat):
+                print(f"▶️  {name} run {i + 1}/{args.repeat}...", end='', flush=True)
+                try:
+                    raw = run_once(name, server, aoi, args.concurrency, args.keep_output)
+                except (RuntimeError, subprocess.TimeoutExpired) as e:
+                    print(f"\n❌ {e}")
+                    return 1
+                runs.append(summarize(raw, tiles_requested))
+                print(f" {runs[-1]['tiles_per_s']} tiles/s")
+            results['downloaders'][name] = aggregate(runs)
+    finally:
+        server.stop()
+
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Hasil: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('server') != results['server'] or baseline.get('tiles') != results['tiles']:
+            print("⚠️  Konfigurasi baseline berbeda (server/tiles) - perbandingan kurang valid")
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ REGRESI vs {args.baseline} (tolerance {args.tolerance:.0f}%):")
+            for name, key, old, new, change in regressions:
+                print(f"   {name}.{key}: {old} → {new} ({change:+.1f}%)")
+            return 1
+        print(f"\n✅ Tidak ada regresi vs {args.baseline} (tolerance {args.tolerance:.0f}%)")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caching Proxy Benchmark
+Beberapa harvester dengan AOI yang overlap menembak tile_proxy.py yang berada di depan
+mock tile server. Dilaporkan request client vs request upstream, cache hit, coalescing,
+dan jumlah request upstream duplikat (tile yang sama lebih dari sekali) - harus 0.
+
+Contoh:
+    python benchmarks/bench_proxy.py --harvesters 4 --tiles 400 --overlap 0.5
+    python benchmarks/bench_proxy.py --rate 200 --latency fixed:20
+"""
+
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Fix Windows terminal encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from mock_tile_server import MockTileServer, add_server_arguments
+from tile_proxy import TileProxy
+
+# ============= KONFIGURASI =============
+DEFAULT_HARVESTERS = 4
+DEFAULT_TILES = 400  # Tiles per harvester
+DEFAULT_OVERLAP = 0.5  # Fraksi AOI yang sama dengan harvester sebelumnya
+DEFAULT_CONCURRENCY = 32  # Request bersamaan per harvester
+DEFAULT_RATE = 0.0  # Tanpa rate budget, supaya yang diukur coalescing + cache
+BENCH_ZOOM = 18
+BENCH_VARIANT = 2
+BENCH_X = 200000
+BENCH_Y = 120000
+PROXY_PATH = "/wms/?d={x}/{y}/{z}/{variant}"
+
+
+def harvester_tiles(index, tiles, overlap):
+    """Tiles AOI persegi harvester ke-index, digeser (1 - overlap) lebar AOI per harvester"""
+    side = max(1, int(math.sqrt(tiles)))
+    shift = int(round(side * (1 - overlap))) * index
+    return [(BENCH_X + shift + i, BENCH_Y + j) for j in range(side) for i in range(side)]
+
+
+def run_harvester(base_url, tiles, concurrency):
+    """Download semua tiles lewat proxy. Returns (ok, gagal)"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+
+    def fetch(tile):
+        x, y = tile
+        url = base_url + PROXY_PATH.format(x=x, y=y, z=BENCH_ZOOM, variant=BENCH_VARIANT)
+        for _ in range(3):
+            try:
+                response = session.get(url, timeout=30)
+            except requests.RequestException:
+                continue
+            if response.status_code == 200:
+                return True
+            time.sleep(float(response.headers.get('Retry-After', 0.2)))
+        return False
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, tiles))
+    return sum(results), len(results) - sum(results)
+
+
+def run_round(proxy, harvesters, concurrency):
+    """Semua harvester bersamaan. Returns (wall_s, ok, gagal)"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(harvesters)) as executor:
+        results = list(executor.map(lambda tiles: run_harvester(proxy.base_url, tiles, concurrency), harvesters))
+    return time.perf_counter() - start, sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tile_proxy.py terhadap mock tile server')
+    parser.add_argument('--harvesters', type=int, default=DEFAULT_HARVESTERS,
+                        help=f'Jumlah harvester bersamaan (default: {DEFAULT_HARVESTERS})')
+    parser.add_argument('--tiles', type=int, default=DEFAULT_TILES,
+                        help=f'Tiles per harvester (default: {DEFAULT_TILES})')
+    parser.add_argument('--overlap', type=float, default=DEFAULT_OVERLAP,
+                        help=f'Fraksi AOI yang overlap antar harvester (default: {DEFAULT_OVERLAP})')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Request bersamaan per harvester (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help='Rate budget upstream proxy, request/detik (default: 0 = tanpa batas)')
+    parser.add_argument('--output', help='Simpan hasil ke JSON')
+    add_server_arguments(parser)
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("   Caching Proxy Benchmark (mock tile server)")
+    print("=" * 60)
+    print()
+
+    cache_dir = Path(tempfile.mkdtemp(prefix="bench_proxy_"))
+    try:
+        upstream = MockTileServer(port=0, latency=args.latency, error_rate=args.error_rate,
+                                  rate_limit_rate=args.rate_limit_rate, payload_size=args.payload_size,
+                                  seed=args.seed, placeholder_rate=args.placeholder_rate).start()
+    except (ValueError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+    proxy = TileProxy(port=0, upstream=f"http://{upstream.host}:{upstream.port}", cache_dir=cache_dir,
+                      rate=args.rate).start()
+
+    harvesters = [harvester_tiles(i, args.tiles, args.overlap) for i in range(args.harvesters)]
+    client_requests = sum(len(tiles) for tiles in harvesters)
+    unique_tiles = len(set(tile for tiles in harvesters for tile in tiles))
+    print(f"🛰️  Mock upstream: {upstream.url_template}")
+    print(f"🔀 Proxy: {proxy.base_url} (rate {args.rate or 'tanpa batas'})")
+    print(f"📦 {args.harvesters} harvester x {len(harvesters[0]):,} tiles, overlap {args.overlap:.0%} "
+          f"→ {client_requests:,} request, {unique_tiles:,} tiles unik\n")
+
+    results = {'harvesters': args.harvesters, 'tiles_per_harvester': len(harvesters[0]),
+               'overlap': args.overlap, 'client_requests': client_requests, 'unique_tiles': unique_tiles,
+               'server': upstream.config(), 'rounds': {}}
+    try:
+        for name in ('cold', 'warm'):
+            wall, ok, failed = run_round(proxy, harvesters, args.concurrency)
+            stats = proxy.stats()
+            upstream_stats = upstream.stats()
+            with upstream.lock:
+                duplicates = sum(max(0, attempts - 1) for attempts in upstream.attempts.values())
+            results['rounds'][name] = {
+                'wall_s': round(wall, 3),
+                'ok': ok,
+                'failed': failed,
+                'proxy': stats['requests'],
+                'upstream_requests': upstream_stats['requests'],
+                'upstream_duplicates': duplicates,
+            }
+            print(f"▶️  {name}: {wall:.2f}s | {ok:,} ok, {failed} gagal | upstream {upstream_stats['requests']:,} "
+                  f"(duplikat {duplicates}) | proxy {stats['requests']}")
+    finally:
+        proxy.stop()
+        upstream.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Hasil: {args.output}")
+
+    # Retry 503/429 dan placeholder (tidak di-cache) ke upstream adalah request ulang yang sah,
+    # bukan duplikat dari harvester lain
+    duplicates = results['rounds']['warm']['upstream_duplicates']
+    if duplicates and not (args.error_rate or args.rate_limit_rate or args.placeholder_rate):
+        print(f"\n❌ {duplicates} request upstream duplikat")
+        return 1
+    print(f"\n✅ Upstream {results['rounds']['warm']['upstream_requests']:,} request untuk "
+          f"{client_requests * 2:,} request client")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stage Benchmark
+Ukur stage mahal setelah download - georeference, merge (create_vrt/merge_to_geotiff)
+dan konversi ECW/JP2 - pada grid tiles JPEG sintetis (1, 10, 100 batches, ...).
+Setiap stage dijalankan dalam beberapa mode (subprocess vs in-process, compressed vs
+tidak, sequential vs parallel) dan dibandingkan dalam satu tabel: wall time, CPU time,
+peak RSS dan bytes yang ditulis ke disk.
+
+Contoh:
+    python benchmarks/bench_stages.py --batches 1,10 --output bench_stages.json
+    python benchmarks/bench_stages.py --batches 100 --batch-size 20 --stages merge
+    python benchmarks/bench_stages.py --batches 10 --gdal-profiles tuned,legacy,lowmem
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# Fix Windows terminal encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+try:
+    from PIL import Image, ImageFilter
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from bench_download import git_commit
+from gdal_env import PROFILE_ENV_VAR, apply_gdal_config, gdal_command, variants as gdal_variants
+
+# ============= KONFIGURASI =============
+FIXTURES_DIR = Path("bench_fixtures")
+DEFAULT_BATCHES = "1,10"
+DEFAULT_BATCH_SIZE = 50  # 50x50 tiles per batch, sama dengan downloader
+TILE_SIZE = 256
+TILE_VARIANTS = 32  # Jumlah gambar unik; tiles lain memakai ulang bytes-nya
+JPEG_QUALITY = 85
+BENCH_ZOOM = 21
+BENCH_ORIGIN = (1728675, 1051362)
+WAVELET_RATIO = 10
+WORKER_TIMEOUT = 6 * 3600
+
+STAGES = ('georeference', 'merge', 'convert')
+GDAL_STAGES = {'georeference': 'georeference', 'merge': 'translate', 'convert': 'encode'}  # Profil gdal_env.py
+
+# (stage, mode): (kebutuhan, deskripsi)
+CASES = {
+    ('georeference', 'subprocess-seq'): ('cli', 'gdal_translate per tile, 1 thread'),
+    ('georeference', 'subprocess-parallel'): ('cli', 'georeference_batches() - 1 work queue, MAX_WORKERS threads'),
+    ('georeference', 'inprocess-seq'): ('osgeo', 'gdal.Translate per tile, 1 thread'),
+    ('georeference', 'inprocess-parallel'): ('osgeo', 'gdal.Translate per tile, MAX_WORKERS threads'),
+    ('merge', 'flat'): ('cli', 'create_vrt + merge_to_geotiff, uncompressed'),
+    ('merge', 'flat-lzw'): ('cli', 'create_vrt + merge_to_geotiff, LZW'),
+    ('merge', 'parallel'): ('cli', 'process_batches_parallel, uncompressed'),
+    ('merge', 'parallel-lzw'): ('cli', 'process_batches_parallel, LZW'),
+    ('merge', 'inprocess'): ('osgeo', 'gdal.BuildVRT + gdal.Translate, uncompressed'),
+    ('merge', 'passthrough'): (None, 'JPEG passthrough dari tiles asli (EPSG:3857)'),
+    ('convert', 'jp2-subprocess'): ('cli', 'gdal_translate -of JP2OpenJPEG per file'),
+    ('convert', 'jp2-seq'): ('osgeo', 'batch_convert(workers=1)'),
+    ('convert', 'jp2-parallel'): ('osgeo', 'batch_convert(workers=CPU)'),
+}
+
+
+def has_gdal_cli():
+    return shutil.which(gdal_command('gdal_translate')) is not None
+
+
+def has_osgeo():
+    try:
+        from osgeo import gdal  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def case_available(requirement):
+    """None jika bisa dijalankan, atau alasan skip"""
+    if requirement == 'cli' and not has_gdal_cli():
+        return "gdal_translate tidak ditemukan"
+    if requirement == 'osgeo' and not has_osgeo():
+        return "GDAL Python bindings (osgeo) tidak tersedia"
+    return None
+
+
+def usage_snapshot():
+    """(cpu detik proses + children, peak RSS MB terbesar dari proses/children)"""
+    if HAS_RESOURCE:
+        scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        self_usage = resource.getrusage(resource.RUSAGE_SELF)
+        child_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = self_usage.ru_utime + self_usage.ru_stime + child_usage.ru_utime + child_usage.ru_stime
+        return cpu, max(self_usage.ru_maxrss, child_usage.ru_maxrss) / scale
+    if HAS_PSUTIL:
+        process = psutil.Process()
+        times = process.cpu_times()
+        memory = process.memory_info()
+        cpu = times.user + times.system + times.children_user + times.children_system
+        return cpu, getattr(memory, 'peak_wset', memory.rss) / (1024 * 1024)
+    return time.process_time(), None
+
+
+def directory_bytes(path):
+    return sum(f.stat().st_size for f in Path(path).rglob('*') if f.is_file())
+
+
+# ============= FIXTURES =============
+
+def make_tile_variants(seed=0):
+    """TILE_VARIANTS JPEG bytes dengan tekstur mirip citra (noise warna yang di-upscale)"""
+    rng = random.Random(seed)
+    variants = []
+    for _ in range(TILE_VARIANTS):
+        small = TILE_SIZE // 8
+        img = Image.new('RGB', (small, small))
+        base = [rng.randrange(60, 200) for _ in range(3)]
+        img.putdata([tuple(min(255, max(0, c + rng.randrange(-50, 50))) for c in base)
+                     for _ in range(small * small)])
+        img = img.resize((TILE_SIZE, TILE_SIZE), Image.BICUBIC).filter(ImageFilter.DETAIL)
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=JPEG_QUALITY)
+        variants.append(buffer.getvalue())
+    return variants
+
+
+def fixture_layout(num_batches, batch_size):
+    """List batch: (batch_num, x_start, y_start) - batches disusun mendekati persegi"""
+    columns = math.ceil(math.sqrt(num_batches))
+    x_origin, y_origin = BENCH_ORIGIN
+    return [
+        (i + 1, x_origin + (i % columns) * batch_size, y_origin + (i // columns) * batch_size)
+        for i in range(num_batches)
+    ]
+
+
+def generate_tiles(fixture, num_batches, batch_size):
+    """tiles/tiles_batch_NNN/tile_{z}_{x}_{y}.jpg seperti output downloader. Returns jumlah tiles"""
+    tiles_dir = fixture / "tiles"
+    marker = tiles_dir / ".complete"
+    total = num_batches * batch_size * batch_size
+    if marker.exists():
+        return total
+
+    print(f"🧩 Generate {total:,} tiles sintetis ({num_batches} batches x {batch_size}x{batch_size})...")
+    variants = make_tile_variants()
+    for batch_num, x_start, y_start in fixture_layout(num_batches, batch_size):
+        batch_dir = tiles_dir / f"tiles_batch_{batch_num:03d}"
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        for x in range(x_start, x_start + batch_size):
+            for y in range(y_start, y_start + batch_size):
+                data = variants[hash((x, y)) % TILE_VARIANTS]
+                (batch_dir / f"tile_{BENCH_ZOOM}_{x}_{y}.jpg").write_bytes(data)
+    marker.touch()
+    return total
+
+
+def prepare_georeferenced(fixture):
+    """Input stage merge: georeferenced/ (dibuat sekali dengan mode tercepat yang tersedia)"""
+    georef_dir = fixture / "georeferenced"
+    if (georef_dir / ".complete").exists():
+        return True
+    mode = 'inprocess-parallel' if has_osgeo() else 'subprocess-parallel' if has_gdal_cli() else None
+    if mode is None:
+        return False
+    print(f"🧩 Menyiapkan fixture georeferenced ({mode})...")
+    run_georeference(mode, fixture, georef_dir)
+    # Mode inprocess tidak menulis marker per batch - merge butuh marker untuk batch yang siap
+    for batch_dir in georef_dir.glob("georeferenced_batch_*"):
+        (batch_dir / ".complete").touch()
+    (georef_dir / ".complete").touch()
+    return True
+
+
+def prepare_merged_batches(fixture):
+    """Input stage convert: merged_batches/merged_batch_NNN.tif"""
+    merged_dir = fixture / "merged_batches"
+    if (merged_dir / ".complete").exists():
+        return True
+    if not has_gdal_cli() or not prepare_georeferenced(fixture):
+        return False
+    print("🧩 Menyiapkan fixture merged_batches...")
+    run_merge('parallel', fixture, merged_dir)
+    (merged_dir / ".complete").touch()
+    return True
+
+
+# ============= STAGES =============
+
+def georeference_inprocess(tile_file, output_path, x, y, zoom):
+    """Padanan georeference_tile() dengan gdal.Translate di dalam proses"""
+    from osgeo import gdal
+    import georeference_batch as georef
+
+    gdal.UseExceptions()
+    min_lon, min_lat, max_lon, max_lat = georef.get_tile_bounds(x, y, zoom)
+    gdal.Translate(str(output_path), str(tile_file), format='GTiff', outputSRS='EPSG:4326',
+                   outputBounds=[min_lon, max_lat, max_lon, min_lat])
+
+
+def run_georeference(mode, fixture, output_dir):
+    import georeference_batch as georef
+
+    georef.TILES_DIR = fixture / "tiles"
+    georef.GEOREF_DIR = output_dir
+    georef.PROGRESS_FILE = output_dir / "georeference_progress.json"
+    batches = georef.list_available_batches()
+
+    if mode == 'subprocess-parallel':
+        georef.georeference_batches(batches, georef.load_progress())
+        return
+
+    jobs = []
+    for batch in batches:
+        batch_output = output_dir / f"georeferenced_batch_{batch['batch_num']:03d}"
+        batch_output.mkdir(parents=True, exist_ok=True)
+        for tile_file in sorted(batch['path'].glob("tile_*.jpg")):
+            _, zoom, x, y = tile_file.stem.split('_')
+            jobs.append((tile_file, batch_output / f"{tile_file.stem}.tif", int(x), int(y), int(zoom)))
+
+    if mode == 'subprocess-seq':
+        for job in jobs:
+            georef.georeference_tile(*job)
+    elif mode == 'inprocess-seq':
+        for job in jobs:
+            georeference_inprocess(*job)
+    else:
+        with ThreadPoolExecutor(max_workers=georef.MAX_WORKERS) as executor:
+            list(executor.map(lambda job: georeference_inprocess(*job), jobs))
+
+
+def run_merge(mode, fixture, output_dir):
+    import merge_geotiff as merge
+
+    merge.GEOREF_DIR = fixture / "georeferenced"
+    merge.TILES_DIR = fixture / "tiles"
+    merge.MERGED_DIR = output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if mode == 'passthrough':
+        if not merge.merge_passthrough(verbose=False):
+            raise RuntimeError("merge_passthrough gagal")
+        return
+
+    batches = merge.find_georeferenced_batches()
+    compress = mode.endswith('-lzw')
+
+    if mode in ('flat', 'flat-lzw'):
+        vrt_file = output_dir / "mosaic.vrt"
+        if not merge.create_vrt(batches, vrt_file, verbose=False):
+            raise RuntimeError("create_vrt gagal")
+        if not merge.merge_to_geotiff(vrt_file, output_dir / "merged_map.tif", verbose=False, compress=compress):
+            raise RuntimeError("merge_to_geotiff gagal")
+    elif mode in ('parallel', 'parallel-lzw'):
+        results = merge.process_batches_parallel(batches, output_dir, compress=compress)
+        failed = [r for r in results if not r['success']]
+        if failed:
+            raise RuntimeError(f"{len(failed)} batch gagal: {failed[0]['error']}")
+    else:
+        from osgeo import gdal
+        gdal.UseExceptions()
+        vrt_file = output_dir / "mosaic.vrt"
+        tiles = [path for batch in batches for path in batch['tiles'].iter_paths()]
+        gdal.BuildVRT(str(vrt_file), tiles, resolution='highest')
+        gdal.Translate(str(output_dir / "merged_map.tif"), str(vrt_file),
+                       creationOptions=merge.build_creation_options(False)[1::2])
+
+
+def run_convert(mode, fixture, output_dir):
+    import geotiff_to_ecw as convert
+
+    input_dir = fixture / "merged_batches"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if mode == 'jp2-subprocess':
+        options = convert.build_creation_options('JP2', WAVELET_RATIO)
+        for input_file in sorted(input_dir.glob("merged_batch_*.tif")):
+            cmd = ['gdal_translate', '-of', 'JP2OpenJPEG']
+            for option in options:
+                cmd.extend(['-co', option])
+            cmd.extend([str(input_file), str(output_dir / f"{input_file.stem}.jp2")])
+            if subprocess.run(cmd, capture_output=True).returncode != 0:
+                raise RuntimeError(f"gdal_translate gagal untuk {input_file.name}")
+    else:
+        workers = 1 if mode == 'jp2-seq' else None
+        failed = convert.batch_convert(str(input_dir), str(output_dir), 'merged_batch_*.tif', workers=workers,
+                                       force=True, output_format='JP2', compression_ratio=WAVELET_RATIO)
+        if failed:
+            raise RuntimeError(f"{failed} file gagal dikonversi")
+
+
+STAGE_RUNNERS = {'georeference': run_georeference, 'merge': run_merge, 'convert': run_convert}
+
+
+def worker_main(args):
+    """Subprocess: jalankan satu (stage, mode) di cwd, tulis hasil ke JSON"""
+    stage, mode = args.worker.split(':')
+    fixture = Path(args.fixture).resolve()
+    output_dir = Path("out").resolve()
+
+    if has_osgeo():  # Case in-process memakai profil GDAL yang sama dengan subprocess
+        from osgeo import gdal
+        apply_gdal_config(gdal, GDAL_STAGES[stage])
+
+    cpu_start, _ = usage_snapshot()
+    start_time = time.perf_counter()
+    STAGE_RUNNERS[stage](mode, fixture, output_dir)
+    wall = time.perf_counter() - start_time
+    cpu_end, peak_rss = usage_snapshot()
+
+    result = {
+        'wall_s': wall,
+        'cpu_s': cpu_end - cpu_start,
+        'peak_rss_mb': peak_rss,
+        'disk_bytes': directory_bytes(output_dir),
+    }
+    with open(args.result_file, 'w') as f:
+        json.dump(result, f)
+    return 0
+
+
+# ============= RUNNER =============
+
+def run_case(stage, mode, fixture, tiles, keep_output=False, gdal_profile=None):
+    """Satu case di subprocess terpisah (RSS/CPU tidak tercampur antar case)
+
+    gdal_profile: Variant gdal_env.py untuk semua command/config GDAL di case ini
+    """
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench_{stage}_{mode}_"))
+    result_file = workdir / "result.json"
+    log_file = workdir / "worker.log"
+
+    cmd = [sys.executable, str(Path(__file__).resolve()), '--worker', f"{stage}:{mode}",
+           '--fixture', str(fixture.resolve()), '--result-file', str(result_file)]
+    env = os.environ.copy()
+    env['PYTHONIOENCODING'] = 'utf-8'
+    if gdal_profile:
+        env[PROFILE_ENV_VAR] = gdal_profile
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(REPO_DIR), str(BENCH_DIR), env.get('PYTHONPATH')]))
+
+    try:
+        with open(log_file, 'w', encoding='utf-8') as log:
+            returncode = subprocess.run(cmd, cwd=workdir, stdin=subprocess.DEVNULL, stdout=log,
+                                        stderr=subprocess.STDOUT, env=env, timeout=WORKER_TIMEOUT).returncode
+        if returncode != 0 or not result_file.exists():
+            with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
+                tail = f.read().strip().splitlines()[-1:] or ['(tanpa output)']
+            return {'status': 'failed', 'error': f"exit {returncode}: {tail[0]}"}
+        with open(result_file, 'r') as f:
+            raw = json.load(f)
+    finally:
+        if not keep_output:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    wall = raw['wall_s']
+    return {
+        'status': 'ok',
+        'wall_s': round(wall, 3),
+        'cpu_s': round(raw['cpu_s'], 3),
+        'cpu_percent': round(raw['cpu_s'] / wall * 100, 1) if wall > 0 else None,
+        'peak_rss_mb': round(raw['peak_rss_mb'], 1) if raw['peak_rss_mb'] is not None else None,
+        'disk_mb': round(raw['disk_bytes'] / (1024 * 1024), 2),
+        'tiles_per_s': round(tiles / wall, 1) if wall > 0 else None,
+    }
+
+
+def print_table(num_batches, tiles, rows):
+    print(f"\n📊 {num_batches} batches ({tiles:,} tiles)")
+    print(f"{'Stage':<13} {'Mode':<28} {'Wall s':>9} {'CPU s':>9} {'CPU %':>7} {'RSS MB':>8} "
+          f"{'Disk MB':>9} {'Tiles/s':>9}")
+    print("-" * 98)
+    for (stage, mode), result in rows:
+        if result['status'] != 'ok':
+            print(f"{stage:<13} {mode:<28} {result['status']}: {result.get('error') or result.get('reason')}")
+            continue
+
+        def fmt(key, spec):
+            value = result.get(key)
+            return format(value, spec) if value is not None else '-'
+        print(f"{stage:<13} {mode:<28} {fmt('wall_s', '9.2f')} {fmt('cpu_s', '9.2f')} {fmt('cpu_percent', '7.0f')} "
+              f"{fmt('peak_rss_mb', '8.0f')} {fmt('disk_mb', '9.1f')} {fmt('tiles_per_s', '9.1f')}")
+
+
+def print_fastest_profiles(rows):
+    """Variant profil GDAL tercepat per (stage, mode) - kandidat default di gdal_profiles.json"""
+    fastest = {}
+    for (stage, label), result in rows:
+        if result['status'] != 'ok':
+            continue
+        key = (stage, label.split('@')[0])
+        if key not in fastest or result['wall_s'] < fastest[key][1]:
+            fastest[key] = (result['gdal_profile'], result['wall_s'])
+    if fastest:
+        print("\n🏆 Profil GDAL tercepat:")
+        for (stage, mode), (profile, wall) in fastest.items():
+            print(f"   {stage}:{mode:<20} {profile} ({wall:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark georeference/merge/convert pada tiles sintetis')
+    parser.add_argument('--batches', default=DEFAULT_BATCHES,
+                        help=f'Ukuran grid dalam jumlah batch, dipisah koma (default: {DEFAULT_BATCHES})')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Tiles per sisi batch (default: {DEFAULT_BATCH_SIZE} = 2,500 tiles/batch)')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f'Stage yang di-benchmark (default: {",".join(STAGES)})')
+    parser.add_argument('--modes', help='Batasi ke mode tertentu, dipisah koma (default: semua)')
+    parser.add_argument('--fixtures-dir', default=str(FIXTURES_DIR),
+                        help=f'Folder cache fixture tiles (default: {FIXTURES_DIR})')
+    parser.add_argument('--output', '-o', help='Tulis hasil ke file JSON')
+    parser.add_argument('--keep-output', action='store_true', help='Jangan hapus workdir sementara')
+    parser.add_argument('--list', action='store_true', help='Tampilkan semua case dan kebutuhannya')
+    parser.add_argument('--gdal-profiles',
+                        help='Jalankan setiap case per variant profil GDAL, dipisah koma (e.g. tuned,legacy,lowmem)')
+
+    # Argumen internal untuk subprocess worker
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--fixture', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker_main(args)
+
+    if args.list:
+        for (stage, mode), (requirement, description) in CASES.items():
+            reason = case_available(requirement)
+            status = "✅" if reason is None else f"⏭️  {reason}"
+            print(f"{stage:<13} {mode:<20} {description:<48} {status}")
+        return 0
+
+    if not HAS_PIL:
+        print("❌ Fixture tiles butuh Pillow: pip install pillow")
+        return 1
+
+    try:
+        grid_sizes = [int(value) for value in args.batches.split(',')]
+    except ValueError:
+        print("❌ --batches harus angka dipisah koma, e.g. 1,10,100")
+        return 1
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        print(f"❌ Stage tidak dikenal: {', '.join(unknown)} (pilih: {', '.join(STAGES)})")
+        return 1
+    modes = {mode.strip() for mode in args.modes.split(',')} if args.modes else None
+    profiles = [name.strip() for name in args.gdal_profiles.split(',')] if args.gdal_profiles else [None]
+    unknown = [name for name in profiles if name and name not in gdal_variants()]
+    if unknown:
+        print(f"❌ Profil GDAL tidak dikenal: {', '.join(unknown)} (pilih: {', '.join(gdal_variants())})")
+        return 1
+
+    print("=" * 60)
+    print("   Stage Benchmark (tiles sintetis)")
+    print("=" * 60)
+    print()
+
+    results = {
+        'benchmark': 'stages',
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'git_commit': git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'batch_size': args.batch_size,
+        'grids': {},
+    }
+
+    fixtures_dir = Path(args.fixtures_dir)
+    for num_batches in grid_sizes:
+        fixture = fixtures_dir / f"grid_{num_batches}x{args.batch_size}"
+        tiles = generate_tiles(fixture, num_batches, args.batch_size)
+
+        rows = []
+        for (stage, mode), (requirement, description) in CASES.items():
+            if stage not in stages or (modes and mode not in modes):
+                continue
+
+            reason = case_available(requirement)
+            if reason is None and requirement and stage == 'merge' and not prepare_georeferenced(fixture):
+                reason = "fixture georeferenced tidak bisa dibuat (GDAL tidak tersedia)"
+            if reason is None and stage == 'convert' and not prepare_merged_batches(fixture):
+                reason = "fixture merged_batches tidak bisa dibuat (GDAL tidak tersedia)"
+
+            for profile in profiles:
+                label = f"{mode}@{profile}" if profile else mode
+                if reason:
+                    result = {'status': 'skipped', 'reason': reason}
+                else:
+                    print(f"▶️  [{num_batches} batches] {stage}:{label}...", flush=True)
+                    result = run_case(stage, mode, fixture, tiles, args.keep_output, profile)
+                result['description'] = description
+                if profile:
+                    result['gdal_profile'] = profile
+                rows.append(((stage, label), result))
+
+        print_table(num_batches, tiles, rows)
+        if args.gdal_profiles:
+            print_fastest_profiles(rows)
+        results['grids'][str(num_batches)] = {
+            'tiles': tiles,
+            'cases': {f"{stage}:{mode}": result for (stage, mode), result in rows},
+        }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Hasil: {args.output}")
+
+    failed = [case for grid in results['grids'].values() for case, result in grid['cases'].items()
+              if result['status'] == 'failed']
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Merge Resume Check
+Resume/watch run dengan sebagian batch yang sudah di-merge: batch yang output-nya current
+tidak boleh didaftarkan ke MergeScheduler (pending tidak pernah diambil acquire() dan
+memperkecil jatah threads/cache job yang benar-benar jalan). Tidak butuh GDAL - tiles
+dan merged_batch_NNN.tif hanya file dummy di folder sementara.
+
+Contoh:
+    python benchmarks/check_merge_resume.py
+    python benchmarks/check_merge_resume.py --batches 20 --merged 15
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+# Fix Windows terminal encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(REPO_DIR))
+
+# ============= KONFIGURASI =============
+DEFAULT_BATCHES = 6
+DEFAULT_MERGED = 4  # Batch yang sudah di-merge sebelum resume
+TILES_PER_BATCH = 9
+BENCH_ZOOM = 18
+
+
+def build_fixture(batches, merged):
+    """Batch georeferenced (marker .complete) + merged_batch_NNN.tif current untuk batch 1..merged"""
+    import merge_geotiff
+
+    for batch_num in range(1, batches + 1):
+        batch_dir = Path("georeferenced") / f"georeferenced_batch_{batch_num:03d}"
+        batch_dir.mkdir(parents=True)
+        for i in range(TILES_PER_BATCH):
+            (batch_dir / f"tile_{BENCH_ZOOM}_{batch_num * 100 + i}_{batch_num}.tif").write_bytes(b'tif')
+        (batch_dir / ".complete").touch()
+
+    Path("merged").mkdir()
+    for batch_num in range(1, merged + 1):
+        output_tif = Path("merged") / f"merged_batch_{batch_num:03d}.tif"
+        output_tif.write_bytes(b'merged')
+        merge_geotiff.record_batch_output(merge_geotiff.check_batch_ready(batch_num), output_tif,
+                                          merge_geotiff.batch_output_options())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cek MergeScheduler pada resume dengan batch yang sudah di-merge')
+    parser.add_argument('--batches', type=int, default=DEFAULT_BATCHES,
+                        help=f'Jumlah batch georeferenced (default: {DEFAULT_BATCHES})')
+    parser.add_argument('--merged', type=int, default=DEFAULT_MERGED,
+                        help=f'Batch yang sudah di-merge sebelum resume (default: {DEFAULT_MERGED})')
+
+    args = parser.parse_args()
+    merged = min(args.merged, args.batches)
+
+    workdir = Path(tempfile.mkdtemp(prefix="check_merge_resume_"))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import merge_geotiff
+
+        build_fixture(args.batches, merged)
+        scheduler = merge_geotiff.MergeScheduler(thread_budget=8, memory_budget_mb=4096)
+        registered = merge_geotiff.register_batches(scheduler, range(1, args.batches + 1),
+                                                    merge_geotiff.batch_output_options())
+
+        # Batch current dilewati tanpa acquire(), batch lain mengambil jatahnya
+        for batch_num in range(1, merged + 1):
+            result = merge_geotiff.merge_single_batch(batch_num, scheduler=scheduler)
+            if result[2] != "Up-to-date (skipped)":
+                print(f"❌ Batch {batch_num} seharusnya up-to-date: {result}")
+                return 1
+        for batch_num in range(merged + 1, args.batches + 1):
+            allocation = scheduler.acquire(TILES_PER_BATCH)
+            scheduler.release(*allocation)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    expected = args.batches - merged
+    print(f"📦 {args.batches} batch, {merged} sudah di-merge → {registered} didaftarkan "
+          f"(pending setelah semua job: {scheduler.pending_jobs} jobs, {scheduler.pending_tiles} tiles)")
+    if registered != expected or scheduler.pending_jobs or scheduler.pending_tiles:
+        print(f"❌ Seharusnya {expected} didaftarkan dan pending kembali ke 0")
+        return 1
+    print("✅ Pending scheduler hanya berisi batch yang benar-benar di-merge")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mock Tile Server
+Server tiles lokal dengan format URL yang sama dengan BPN (/wms/?d={x}/{y}/{z}/{variant})
+untuk benchmark downloader tanpa membebani server asli. Latency, error 503, rate limit
+429, placeholder image dengan HTTP 200 dan ukuran payload bisa diatur, dan hasilnya
+reproducible (seed per tile + attempt).
+
+Contoh:
+    python benchmarks/mock_tile_server.py --port 8765 --latency lognormal:40:0.5 --error-rate 0.01
+"""
+
+import io
+import sys
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Fix Windows terminal encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# ============= KONFIGURASI =============
+DEFAULT_PORT = 8765
+DEFAULT_LATENCY = "lognormal:40:0.5"  # Median 40 ms, sigma 0.5
+DEFAULT_PAYLOAD_SIZE = 20 * 1024  # Rata-rata tile JPEG BPN zoom 21 ~ 15-25 KB
+DEFAULT_SEED = 42
+RETRY_AFTER = 1  # Header Retry-After untuk response 429 (detik)
+REQUEST_BACKLOG = 1024  # listen() backlog - default 5 terlalu kecil untuk 500 koneksi async
+TILE_SIZE = 256
+URL_TEMPLATE = "http://{host}:{port}/wms/?d={{x}}/{{y}}/{{z}}/{{variant}}"
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal', 'exponential')
+
+
+def parse_latency(spec):
+    """Parse spesifikasi latency (milidetik) menjadi (distribusi, params)
+
+    fixed:MS | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA | exponential:MEAN
+    """
+    name, *params = spec.split(':')
+    if name not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"Distribusi latency tidak dikenal: {name} (pilih: {', '.join(LATENCY_DISTRIBUTIONS)})")
+    try:
+        params = [float(p) for p in params]
+    except ValueError:
+        raise ValueError(f"Parameter latency harus angka: {spec}")
+    expected = {'fixed': 1, 'uniform': 2, 'lognormal': 2, 'exponential': 1}[name]
+    if len(params) != expected:
+        raise ValueError(f"Latency {name} butuh {expected} parameter: {spec}")
+    return name, params
+
+
+def sample_latency(rng, latency):
+    """Satu sample latency dalam detik"""
+    name, params = latency
+    if name == 'fixed':
+        value = params[0]
+    elif name == 'uniform':
+        value = rng.uniform(params[0], params[1])
+    elif name == 'lognormal':
+        value = rng.lognormvariate(math.log(max(params[0], 0.001)), params[1])
+    else:
+        value = rng.expovariate(1 / params[0]) if params[0] > 0 else 0
+    return max(0.0, value) / 1000
+
+
+def build_placeholder():
+    """Placeholder "server sibuk": JPEG putih polos yang kecil, dikirim dengan HTTP 200"""
+    if not HAS_PIL:
+        return b'\xff\xd8\xff\xd9'
+    buffer = io.BytesIO()
+    Image.new('RGB', (TILE_SIZE, TILE_SIZE), (255, 255, 255)).save(buffer, 'JPEG', quality=75)
+    return buffer.getvalue()
+
+
+def build_payload(size):
+    """Tile JPEG valid dengan ukuran persis size bytes (di-pad dengan COM segments)
+
+    Tanpa Pillow: SOI + random bytes + EOI (cukup untuk downloader, bukan untuk georeference)
+    """
+    rng = random.Random(size)
+    if HAS_PIL:
+        # Noise 64x64 yang di-upscale: tekstur mirip citra, bukan noise murni yang tidak terkompresi
+        small = TILE_SIZE // 4
+        img = Image.new('RGB', (small, small))
+        img.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(small * small)])
+        img = img.resize((TILE_SIZE, TILE_SIZE), Image.BILINEAR)
+        buffer = io.BytesIO()
+        quality = 90
+        img.save(buffer, 'JPEG', quality=quality)
+        # Turunkan quality sampai JPEG dasar muat di ukuran target
+        while buffer.tell() > size and quality > 5:
+            quality -= 10
+            buffer = io.BytesIO()
+            img.save(buffer, 'JPEG', quality=quality)
+        jpeg = buffer.getvalue()
+    else:
+        jpeg = b'\xff\xd8\xff\xd9'
+
+    padding = size - len(jpeg)
+    if padding < 4:
+        return jpeg  # Segment terkecil 4 byte
+
+    # COM segment: FF FE + length (2 byte, termasuk dirinya sendiri) + data, max 65535
+    segments = []
+    while padding > 0:
+        segment_size = min(padding, 65535 + 2)
+        if padding - segment_size in (1, 2, 3):
+            segment_size -= 4  # Sisa harus muat satu segment minimal (4 byte)
+        data_size = max(segment_size - 4, 0)
+        segments.append(b'\xff\xfe' + (data_size + 2).to_bytes(2, 'big') + bytes(rng.randrange(256) for _ in range(data_size)))
+        padding -= data_size + 4
+    return jpeg[:2] + b''.join(segments) + jpeg[2:]
+
+
+class MockTileServer:
+    """Server tiles lokal di background thread
+
+    Args:
+        host, port: Alamat listen (port 0 = port bebas)
+        latency: Spesifikasi latency (lihat parse_latency)
+        error_rate: Fraksi request yang dijawab 503
+        rate_limit_rate: Fraksi request yang dijawab 429 + Retry-After
+        placeholder_rate: Fraksi request yang dijawab placeholder image dengan HTTP 200
+        payload_size: Ukuran tile (bytes)
+        seed: Seed - tile + attempt yang sama selalu dapat latency/status yang sama
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, latency=DEFAULT_LATENCY, error_rate=0.0,
+                 rate_limit_rate=0.0, payload_size=DEFAULT_PAYLOAD_SIZE, seed=DEFAULT_SEED,
+                 placeholder_rate=0.0):
+        self.host = host
+        self.port = port
+        self.latency = parse_latency(latency)
+        self.latency_spec = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.placeholder_rate = placeholder_rate
+        self.payload_size = payload_size
+        self.seed = seed
+        self.payload = build_payload(payload_size)
+        self.placeholder = build_placeholder()
+        self.lock = threading.Lock()
+        self.attempts = {}
+        self.status_counts = {}
+        self.bytes_sent = 0
+        self.server = None
+
+    def config(self):
+        """Konfigurasi server untuk disimpan bersama hasil benchmark"""
+        return {
+            'latency': self.latency_spec,
+            'error_rate': self.error_rate,
+            'rate_limit_rate': self.rate_limit_rate,
+            'placeholder_rate': self.placeholder_rate,
+            'payload_size': self.payload_size,
+            'seed': self.seed,
+        }
+
+    @property
+    def url_template(self):
+        return URL_TEMPLATE.format(host=self.host, port=self.port)
+
+    def reset_stats(self):
+        with self.lock:
+            self.attempts = {}
+            self.status_counts = {}
+            self.bytes_sent = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': sum(self.status_counts.values()),
+                'status_counts': {str(code): count for code, count in sorted(self.status_counts.items())},
+                'bytes_sent': self.bytes_sent,
+            }
+
+    def plan_response(self, tile):
+        """(status, delay detik) untuk request berikutnya ke tile ini (status 'placeholder' = 200 + placeholder)"""
+        with self.lock:
+            attempt = self.attempts.get(tile, 0)
+            self.attempts[tile] = attempt + 1
+
+        digest = hashlib.blake2b(f"{self.seed}/{tile}/{attempt}".encode(), digest_size=8).digest()
+        rng = random.Random(int.from_bytes(digest, 'big'))
+        delay = sample_latency(rng, self.latency)
+        roll = rng.random()
+        if roll < self.rate_limit_rate:
+            return 429, delay
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 503, delay
+        if roll < self.rate_limit_rate + self.error_rate + self.placeholder_rate:
+            return 'placeholder', delay
+        return 200, delay
+
+    def record(self, status, size):
+        with self.lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            self.bytes_sent += size
+
+    def make_handler(self):
+        mock = self
+
+        class TileHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive untuk connection pooling downloader
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                tile = parse_qs(url.query).get('d', [None])[0]
+                if url.path.rstrip('/') != '/wms' or not tile:
+                    self.reply(404, b'')
+                    return
+
+                status, delay = mock.plan_response(tile)
+                time.sleep(delay)
+                if status == 200:
+                    self.reply(200, mock.payload, content_type='image/jpeg')
+                elif status == 'placeholder':
+                    self.reply(200, mock.placeholder, content_type='image/jpeg')
+                elif status == 429:
+                    self.reply(429, b'Too Many Requests', headers={'Retry-After': str(RETRY_AFTER)})
+                else:
+                    self.reply(503, b'Service Unavailable')
+
+            def reply(self, status, body, content_type='text/plain', headers=None):
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', content_type)
+                    self.send_header('Content-Length', str(len(body)))
+                    for key, value in (headers or {}).items():
+                        self.send_header(key, value)
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    return  # Client timeout/cancel
+                mock.record(status, len(body))
+
+            def log_message(self, format, *args):
+                pass
+
+        return TileHandler
+
+    def start(self):
+        """Start server di daemon thread. Returns self"""
+        server_class = type('MockHTTPServer', (ThreadingHTTPServer,), {'request_queue_size': REQUEST_BACKLOG})
+        self.server = server_class((self.host, self.port), self.make_handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True, name='mock-tile-server').start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def add_server_arguments(parser):
+    """Argumen konfigurasi mock server (dipakai juga oleh bench_download.py)"""
+    parser.add_argument('--latency', default=DEFAULT_LATENCY,
+                        help=f'Distribusi latency ms: fixed:MS, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA, '
+                             f'exponential:MEAN (default: {DEFAULT_LATENCY})')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraksi response 503 (default: 0)')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraksi response 429 (default: 0)')
+    parser.add_argument('--placeholder-rate', type=float, default=0.0,
+                        help='Fraksi response placeholder image dengan HTTP 200 (default: 0)')
+    parser.add_argument('--payload-size', type=int, default=DEFAULT_PAYLOAD_SIZE,
+                        help=f'Ukuran tile dalam bytes (default: {DEFAULT_PAYLOAD_SIZE})')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f'Seed (default: {DEFAULT_SEED})')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Tile Server untuk benchmark downloader')
+    parser.add_argument('--host', default='127.0.0.1', help='Host (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    add_server_arguments(parser)
+
+    args = parser.parse_args()
+
+    try:
+        server = MockTileServer(args.host, args.port, args.latency, args.error_rate,
+                                args.rate_limit_rate, args.payload_size, args.seed,
+                                args.placeholder_rate).start()
+    except (ValueError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"🛰️  Mock tile server: {server.url_template}")
+    print(f"   Latency {args.latency} | 503 {args.error_rate:.1%} | 429 {args.rate_limit_rate:.1%} | "
+          f"payload {args.payload_size:,} bytes")
+    print("   Ctrl+C untuk berhenti")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n📊 {server.stats()}")
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Build Dependencies
+Fingerprint input yang dipakai untuk membuat setiap output (seperti make), supaya
+--incremental hanya membangun ulang output yang input-nya berubah:
+
+- georeferenced_batch_NNN/.deps.json: tile_z_x_y.tif -> fingerprint tile .jpg
+- merged/.deps.json: merged_batch_NNN.tif -> digest semua .tif batch (nama, mtime, size)
+
+Fingerprint = [mtime_ns, size] (+ BLAKE2b isi file jika content_hash). Output tanpa
+catatan (dibuat sebelum ada manifest) dianggap current jika mtime-nya >= input.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+# ============= KONFIGURASI =============
+DEPS_FILE = ".deps.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_hash(path):
+    """BLAKE2b (hex, 16 bytes) isi file"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(path, content_hash=False):
+    """[mtime_ns, size] (+ hash isi) file, None jika file tidak ada"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    fp = [st.st_mtime_ns, st.st_size]
+    if content_hash:
+        fp.append(file_hash(path))
+    return fp
+
+
+def same_input(recorded, fp):
+    """True jika fingerprint input sama dengan yang dicatat
+
+    Dengan hash: mtime boleh berbeda (tile di-download ulang dengan isi sama) asal
+    size dan hash sama.
+    """
+    if recorded is None or fp is None:
+        return False
+    if len(recorded) > 2 and len(fp) > 2:
+        return recorded[1:] == fp[1:]
+    return recorded[:2] == fp[:2]
+
+
+def catalog_digest(catalog):
+    """Digest semua file katalog (nama, mtime_ns, size) - berubah jika ada file baru/berubah/hilang"""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(catalog.iter_paths()):
+        st = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{st.st_mtime_ns}:{st.st_size}\n".encode())
+    return digest.hexdigest()
+
+
+class DepsManifest:
+    """Manifest output -> fingerprint input di satu folder output (aman dipakai banyak thread)
+
+    Args:
+        directory: Folder output (manifest di directory/.deps.json)
+    """
+
+    def __init__(self, directory):
+        self.path = Path(directory) / DEPS_FILE
+        self.lock = threading.Lock()
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}  # Manifest rusak = tidak ada catatan, fallback mtime
+
+    def is_current(self, output, fp, input_mtime=None):
+        """True jika output ada dan dibangun dari input dengan fingerprint fp
+
+        Args:
+            output: Path output
+            fp: Fingerprint/digest input saat ini
+            input_mtime: mtime input (detik, atau callable) untuk output tanpa catatan
+        """
+        output = Path(output)
+        try:
+            output_mtime = output.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        with self.lock:
+            recorded = self.entries.get(output.name)
+        if recorded is not None:
+            return recorded == fp if isinstance(fp, str) else same_input(recorded, fp)
+        if callable(input_mtime):
+            input_mtime = input_mtime()
+        elif input_mtime is None and isinstance(fp, list):
+            input_mtime = fp[0] / 1e9
+        return input_mtime is not None and output_mtime >= input_mtime
+
+    def record(self, output, fp):
+        with self.lock:
+            self.entries[Path(output).name] = fp
+
+    def forget(self, output):
+        with self.lock:
+            self.entries.pop(Path(output).name, None)
+
+    def save(self):
+        """Tulis manifest atomic (tmp + rename)"""
+        with self.lock:
+            tmp = self.path.with_name(DEPS_FILE + ".tmp")
+            tmp.write_text(json.dumps(self.entries, separators=(',', ':')), encoding='utf-8')
+            os.replace(tmp, self.path)
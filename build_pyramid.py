@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-Zoom Pyramid Builder
+Bangun zoom level yang lebih rendah dari tiles zoom maksimal yang sudah didownload
+(2x2 downsampling lokal), tanpa request ulang ke server BPN
+"""
+
+import sys
+import json
+import random
+import argparse
+from queue import Queue
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# Fix Windows terminal encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+# Progress bar
+try:
+    from tqdm import tqdm
+    HAS_TQDM = True
+except ImportError:
+    HAS_TQDM = False
+
+try:
+    from PIL import Image, ImageChops, ImageStat
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+from tile_grid import sort_by_curve
+
+# ============= KONFIGURASI =============
+TILES_DIR = Path("tiles")
+PYRAMID_DIR = TILES_DIR / "pyramid"
+PROGRESS_FILE = TILES_DIR / "progress.json"
+TILE_SIZE = 256
+JPEG_QUALITY = 90
+FILL_COLOR = (255, 255, 255)  # Warna untuk child tile yang tidak ada (edge AOI)
+VERIFY_SAMPLES = 8  # Jumlah parent tile yang dibandingkan dengan server per zoom
+VERIFY_THRESHOLD = 8.0  # Mean absolute difference (0-255) maksimal agar dianggap sama
+
+
+def pyramid_tile_path(zoom, x, y):
+    """Path tile hasil downsampling untuk zoom tertentu"""
+    return PYRAMID_DIR / f"zoom_{zoom}" / f"tile_{zoom}_{x}_{y}.jpg"
+
+
+def index_source_tiles(zoom):
+    """Index semua tiles zoom tertentu yang sudah didownload
+
+    Returns:
+        dict (x, y) -> Path
+    """
+    index = {}
+    for tile_file in TILES_DIR.glob(f"tiles_batch_*/tile_{zoom}_*.jpg"):
+        parts = tile_file.stem.split('_')
+        if len(parts) >= 4:
+            index[(int(parts[2]), int(parts[3]))] = tile_file
+    return index
+
+
+def index_pyramid_tiles(zoom):
+    """Index tiles hasil downsampling yang sudah ada untuk zoom tertentu"""
+    index = {}
+    for tile_file in (PYRAMID_DIR / f"zoom_{zoom}").glob(f"tile_{zoom}_*.jpg"):
+        parts = tile_file.stem.split('_')
+        if len(parts) >= 4:
+            index[(int(parts[2]), int(parts[3]))] = tile_file
+    return index
+
+
+def parent_tiles(child_index):
+    """Kelompokkan child tiles ke parent tile (x // 2, y // 2)
+
+    Returns:
+        dict (px, py) -> [child path atau None] urutan kiri-atas, kanan-atas, kiri-bawah, kanan-bawah
+    """
+    parents = {}
+    for (x, y), path in child_index.items():
+        children = parents.setdefault((x // 2, y // 2), [None, None, None, None])
+        children[(y % 2) * 2 + (x % 2)] = path
+    return parents
+
+
+def downsample_tile(task):
+    """Gabungkan 4 child tiles (2x2) lalu downsample ke 1 parent tile
+
+    Args:
+        task: (output_path, children) - children list 4 path/None
+
+    Returns:
+        (output_path, status, error)
+    """
+    output_path, children = task
+    try:
+        mosaic = Image.new('RGB', (TILE_SIZE * 2, TILE_SIZE * 2), FILL_COLOR)
+        for i, child in enumerate(children):
+            if child is None:
+                continue
+            with Image.open(child) as img:
+                img = img.convert('RGB')
+                if img.size != (TILE_SIZE, TILE_SIZE):
+                    img = img.resize((TILE_SIZE, TILE_SIZE), Image.BILINEAR)
+                mosaic.paste(img, ((i % 2) * TILE_SIZE, (i // 2) * TILE_SIZE))
+
+        # reduce(2) = rata-rata blok 2x2 yang tepat, lebih cepat dari resize()
+        parent = mosaic.reduce(2)
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output_path.with_suffix('.tmp')
+        parent.save(tmp_path, 'JPEG', quality=JPEG_QUALITY)
+        tmp_path.replace(output_path)
+        return (output_path, 'success', None)
+    except Exception as e:
+        return (output_path, 'failed', str(e))
+
+
+def download_tiles(targets, zoom, variant, max_workers=20):
+    """Download tiles dari server dengan retry queue milik pyramid sendiri
+
+    Retry diproses per ronde sampai queue kosong (download_tile berhenti memasukkan tile ke
+    queue setelah RETRY_ATTEMPTS), tanpa menyentuh retry_queue global downloader.
+
+    Args:
+        targets: list (x, y, output_path)
+
+    Returns:
+        list hasil akhir download_tile
+    """
+    import download_tiles_batch as downloader
+
+    retries = Queue()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(downloader.download_tile, x, y, zoom, variant, output_path, queue=retries)
+                   for x, y, output_path in targets]
+        results = [r for r in (f.result() for f in futures) if r['status'] != 'retry_queued']
+        results.extend(downloader.process_retry_queue(executor, zoom, variant, None, None, queue=retries))
+    return results
+
+
+def fetch_tiles(tiles, zoom, variant, max_workers=20):
+    """Download tiles langsung dari server ke pyramid dir
+
+    Args:
+        tiles: list (x, y)
+
+    Returns:
+        jumlah tile yang berhasil didownload
+    """
+    if not tiles:
+        return 0
+
+    targets = []
+    for x, y in tiles:
+        output_path = pyramid_tile_path(zoom, x, y)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        targets.append((x, y, output_path))
+    download_tiles(targets, zoom, variant, max_workers)
+
+    return sum(1 for x, y in tiles if pyramid_tile_path(zoom, x, y).exists())
+
+
+def verify_level(zoom, parents, variant, samples=VERIFY_SAMPLES):
+    """Bandingkan beberapa parent tile hasil downsampling dengan rendering server
+
+    Returns:
+        Mean absolute difference (0-255), atau None jika tidak bisa diverifikasi
+    """
+    complete = [xy for xy, children in parents.items() if all(children)]
+    if not complete:
+        return None
+
+    verify_dir = PYRAMID_DIR / "_verify"
+    verify_dir.mkdir(parents=True, exist_ok=True)
+
+    sample = random.sample(complete, min(samples, len(complete)))
+    results = download_tiles([(x, y, verify_dir / f"tile_{zoom}_{x}_{y}.jpg") for x, y in sample], zoom, variant)
+    downloaded = {(r['x'], r['y']) for r in results if r['status'] in ('success', 'skipped')}
+
+    diffs = []
+    for x, y in sample:
+        server_path = verify_dir / f"tile_{zoom}_{x}_{y}.jpg"
+        derived_path = verify_dir / f"derived_{zoom}_{x}_{y}.jpg"
+
+        if (x, y) not in downloaded:
+            continue
+        if downsample_tile((derived_path, parents[(x, y)]))[1] != 'success':
+            continue
+
+        with Image.open(server_path) as server_img, Image.open(derived_path) as derived_img:
+            diff = ImageChops.difference(server_img.convert('RGB'), derived_img.convert('RGB'))
+            diffs.append(sum(ImageStat.Stat(diff).mean) / 3)
+
+        server_path.unlink()
+        derived_path.unlink()
+
+    return sum(diffs) / len(diffs) if diffs else None
+
+
+def build_level(zoom, child_index, variant, edge_policy='fetch', verify=False, max_workers=None):
+    """Bangun satu zoom level dari child tiles (zoom + 1)
+
+    Args:
+        zoom: Zoom level yang dibangun
+        child_index: dict (x, y) -> Path tiles zoom + 1
+        variant: Variant BPN (untuk fetch dari server)
+        edge_policy: 'fetch' = parent dengan child tidak lengkap didownload dari server,
+                     'fill' = child yang kosong diisi FILL_COLOR
+        verify: Bandingkan sample dengan server, fetch seluruh level jika berbeda
+
+    Returns:
+        dict statistik level
+    """
+    parents = parent_tiles(child_index)
+    existing = index_pyramid_tiles(zoom)
+
+    stats = {'zoom': zoom, 'tiles': len(parents), 'built': 0, 'fetched': 0, 'skipped': 0, 'failed': 0}
+
+    if verify:
+        diff = verify_level(zoom, parents, variant)
+        if diff is not None:
+            print(f"   Zoom {zoom}: selisih rata-rata vs server = {diff:.1f}")
+        if diff is not None and diff > VERIFY_THRESHOLD:
+            print(f"   ⚠️  Rendering server berbeda di zoom {zoom}, download level ini dari server")
+            to_fetch = [xy for xy in parents if xy not in existing]
+            stats['fetched'] = fetch_tiles(to_fetch, zoom, variant)
+            stats['skipped'] = len(parents) - len(to_fetch)
+            stats['failed'] = len(to_fetch) - stats['fetched']
+            return stats
+
+    to_build = []
+    to_fetch = []
+    for (x, y), children in sort_by_curve(parents.items(), key=lambda item: item[0]):
+        if (x, y) in existing:
+            stats['skipped'] += 1
+        elif edge_policy == 'fetch' and not all(children):
+            to_fetch.append((x, y))
+        else:
+            to_build.append((pyramid_tile_path(zoom, x, y), children))
+
+    pbar = tqdm(total=len(to_build), desc=f"Zoom {zoom}", unit="tiles") if HAS_TQDM and to_build else None
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # chunksize besar: task kecil, overhead IPC per task dominan
+        for _, status, error in executor.map(downsample_tile, to_build, chunksize=64):
+            if status == 'success':
+                stats['built'] += 1
+            else:
+                stats['failed'] += 1
+            if pbar:
+                pbar.update(1)
+
+    if pbar:
+        pbar.close()
+
+    if to_fetch:
+        fetched = fetch_tiles(to_fetch, zoom, variant)
+        stats['fetched'] += fetched
+        stats['failed'] += len(to_fetch) - fetched
+
+    return stats
+
+
+def build_pyramid(max_zoom, min_zoom, variant, edge_policy='fetch', verify=False, max_workers=None):
+    """Bangun semua zoom level dari max_zoom - 1 sampai min_zoom
+
+    Returns:
+        list statistik per zoom level
+    """
+    if not HAS_PIL:
+        print("❌ Pyramid mode butuh Pillow: pip install pillow")
+        return []
+
+    child_index = index_source_tiles(max_zoom)
+    if not child_index:
+        print(f"❌ Tidak ada tiles zoom {max_zoom} di {TILES_DIR}")
+        return []
+
+    print(f"🔺 Building pyramid zoom {max_zoom - 1} → {min_zoom} dari {len(child_index):,} tiles zoom {max_zoom}")
+
+    all_stats = []
+    for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+        stats = build_level(zoom, child_index, variant, edge_policy, verify, max_workers)
+        all_stats.append(stats)
+        print(f"✅ Zoom {zoom}: {stats['built']} built | {stats['fetched']} fetched | "
+              f"{stats['skipped']} skipped | {stats['failed']} failed")
+
+        child_index = index_pyramid_tiles(zoom)
+        if not child_index:
+            break
+
+    requests_saved = sum(s['built'] for s in all_stats)
+    print(f"\n📉 Request ke server yang dihemat: {requests_saved:,}")
+    print(f"📁 Pyramid tiles: {PYRAMID_DIR.absolute()}/")
+    return all_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-Zoom Pyramid Builder')
+    parser.add_argument('--min-zoom', type=int, required=True, help='Zoom level terendah yang dibangun')
+    parser.add_argument('--max-zoom', type=int, help='Zoom sumber (default: dari tiles/progress.json)')
+    parser.add_argument('--variant', type=int, help='Variant BPN (default: dari tiles/progress.json)')
+    parser.add_argument('--edge-policy', choices=['fetch', 'fill'], default='fetch',
+                        help='Parent tile dengan child tidak lengkap: fetch dari server atau fill (default: fetch)')
+    parser.add_argument('--verify', action='store_true',
+                        help='Bandingkan sample dengan server; download level dari server jika rendering berbeda')
+    parser.add_argument('--workers', type=int, default=None, help='Jumlah proses (default: CPU count)')
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("   Multi-Zoom Pyramid Builder")
+    print("=" * 60)
+    print()
+
+    config = {}
+    if PROGRESS_FILE.exists():
+        with open(PROGRESS_FILE, 'r') as f:
+            config = json.load(f).get('config', {})
+
+    max_zoom = args.max_zoom if args.max_zoom is not None else config.get('zoom')
+    variant = args.variant if args.variant is not None else config.get('variant', 2)
+
+    if max_zoom is None:
+        print("❌ Zoom sumber tidak diketahui, gunakan --max-zoom")
+        return 1
+    if args.min_zoom >= max_zoom:
+        print(f"❌ --min-zoom harus < zoom sumber ({max_zoom})")
+        return 1
+
+    stats = build_pyramid(max_zoom, args.min_zoom, variant, args.edge_policy, args.verify, args.workers)
+    return 0 if stats and not any(s['failed'] for s in stats) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,9 +7,14 @@ Gunakan ini jika proses merge terputus setelah georeferencing selesai
 
 import sys
 import os
+import argparse
 from pathlib import Path
 import subprocess
 
+from gdal_env import gdal_command, gdal_env
+from pipeline_profile import add_profile_arguments, setup_profile
+from tile_grid import tile_range_bounds
+
 # Fix Windows terminal encoding untuk support emoji
 if sys.platform == 'win32':
     try:
@@ -17,28 +22,6 @@ if sys.platform == 'win32':
     except:
         pass
 
-# Setup GDAL environment variables untuk subprocess
-def setup_gdal_env():
-    """Setup environment variables untuk GDAL commands"""
-    env = os.environ.copy()
-
-    # Set GDAL paths
-    gdal_path = r"C:\Program Files\GDAL"
-    proj_lib_path = r"C:\Program Files\GDAL\projlib"
-    gdal_data_path = r"C:\Program Files\GDAL\gdal-data"
-
-    # Add GDAL to PATH if not already there
-    if gdal_path not in env.get('PATH', ''):
-        env['PATH'] = gdal_path + os.pathsep + env.get('PATH', '')
-
-    # Set PROJ_LIB
-    env['PROJ_LIB'] = proj_lib_path
-
-    # Set GDAL_DATA
-    env['GDAL_DATA'] = gdal_data_path
-
-    return env
-
 
 def get_unique_filename(base_dir: Path, base_name: str, extension: str = ".tif") -> Path:
     """
@@ -73,23 +56,6 @@ MERGED_DIR = Path("merged")
 OUTPUT_GEOTIFF = "merged_map.tif"
 
 
-def tile_to_lat_lon(x: int, y: int, zoom: int):
-    """Konversi tile coordinates ke lat/lon"""
-    import math
-    n = 2.0 ** zoom
-    lon = x / n * 360.0 - 180.0
-    lat_rad = math.atan(math.sinh(math.pi * (1 - 2 * y / n)))
-    lat = math.degrees(lat_rad)
-    return lat, lon
-
-
-def get_tile_bounds(x: int, y: int, zoom: int):
-    """Mendapatkan bounding box dari tile"""
-    lat_top, lon_left = tile_to_lat_lon(x, y, zoom)
-    lat_bottom, lon_right = tile_to_lat_lon(x + 1, y + 1, zoom)
-    return lon_left, lat_bottom, lon_right, lat_top
-
-
 def create_vrt_from_georef(georef_dir: Path, output_vrt: Path):
     """Buat VRT dari tiles yang sudah di-georeference"""
     # Cari semua file .tif di folder georeferenced
@@ -146,8 +112,7 @@ def create_vrt_from_georef(georef_dir: Path, output_vrt: Path):
     y_start, y_end = min(y_coords), max(y_coords)
 
     # Calculate bounding box
-    min_lon, min_lat, _, _ = get_tile_bounds(x_start, y_end, zoom)
-    _, _, max_lon, max_lat = get_tile_bounds(x_end, y_start, zoom)
+    min_lon, min_lat, max_lon, max_lat = tile_range_bounds(x_start, x_end, y_start, y_end, zoom)
 
     print(f"\n📍 Bounding Box:")
     print(f"   Min: {min_lat:.6f}, {min_lon:.6f}")
@@ -156,7 +121,7 @@ def create_vrt_from_georef(georef_dir: Path, output_vrt: Path):
 
     # Buat VRT
     vrt_cmd = [
-        'gdalbuildvrt',
+        gdal_command('gdalbuildvrt'),
         '-resolution', 'highest',
         '-te', str(min_lon), str(min_lat), str(max_lon), str(max_lat),
         '-a_srs', 'EPSG:4326',
@@ -166,7 +131,7 @@ def create_vrt_from_georef(georef_dir: Path, output_vrt: Path):
 
     try:
         print("🔨 Membuat VRT file...")
-        result = subprocess.run(vrt_cmd, capture_output=True, text=True, env=setup_gdal_env())
+        result = subprocess.run(vrt_cmd, capture_output=True, text=True, env=gdal_env('translate'))
 
         if result.returncode == 0:
             print(f"✓ VRT file berhasil dibuat: {output_vrt}\n")
@@ -191,7 +156,7 @@ def merge_to_geotiff(vrt_file: Path, output_tif: Path):
         return False
 
     translate_cmd = [
-        'gdal_translate',
+        gdal_command('gdal_translate'),
         '-of', 'GTiff',
         '-co', 'COMPRESS=LZW',
         '-co', 'TILED=YES',
@@ -204,7 +169,7 @@ def merge_to_geotiff(vrt_file: Path, output_tif: Path):
         print(f"🔨 Merging tiles ke GeoTIFF...")
         print(f"   Output: {output_tif}\n")
 
-        result = subprocess.run(translate_cmd, capture_output=True, text=True, env=setup_gdal_env())
+        result = subprocess.run(translate_cmd, capture_output=True, text=True, env=gdal_env('translate'))
 
         if result.returncode == 0:
             file_size_mb = output_tif.stat().st_size / (1024 * 1024)
@@ -222,6 +187,11 @@ def merge_to_geotiff(vrt_file: Path, output_tif: Path):
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Lanjutkan merge dari georeferenced tiles yang sudah ada')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    setup_profile(args, 'continue_merge')
+
     print("=" * 60)
     print("   Continue Merge - GeoTIFF Creator")
     print("=" * 60)
@@ -4,14 +4,18 @@
 Script untuk download tiles dari petadasar.atrbpn.go.id dan merge menjadi GeoTIFF
 """
 
-import os
 import sys
+import time
+import argparse
 import requests
 from pathlib import Path
 import subprocess
-import math
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Tuple
+
+from gdal_env import gdal_command, gdal_env
+from job_spec import JobSpecError, job_to_config, load_job_spec
+from pipeline_metrics import BYTES, HTTP_RESPONSES, REQUEST_LATENCY, TILES
+from tile_grid import get_tile_bounds, iter_batch_tiles, tile_range_bounds
 
 # Fix Windows terminal encoding untuk support emoji
 if sys.platform == 'win32':
@@ -20,28 +24,6 @@ if sys.platform == 'win32':
     except:
         pass
 
-# Setup GDAL environment variables untuk subprocess
-def setup_gdal_env():
-    """Setup environment variables untuk GDAL commands"""
-    env = os.environ.copy()
-
-    # Set GDAL paths
-    gdal_path = r"C:\Program Files\GDAL"
-    proj_lib_path = r"C:\Program Files\GDAL\projlib"
-    gdal_data_path = r"C:\Program Files\GDAL\gdal-data"
-
-    # Add GDAL to PATH if not already there
-    if gdal_path not in env.get('PATH', ''):
-        env['PATH'] = gdal_path + os.pathsep + env.get('PATH', '')
-
-    # Set PROJ_LIB
-    env['PROJ_LIB'] = proj_lib_path
-
-    # Set GDAL_DATA
-    env['GDAL_DATA'] = gdal_data_path
-
-    return env
-
 
 def get_unique_filename(base_dir: Path, base_name: str, extension: str = ".tif") -> Path:
     """
@@ -101,29 +83,6 @@ HEADERS = {
 
 # ============= FUNGSI UTILITAS =============
 
-def tile_to_lat_lon(x: int, y: int, zoom: int) -> Tuple[float, float]:
-    """
-    Konversi tile coordinates (x, y, zoom) ke latitude/longitude
-    Menggunakan Web Mercator projection
-    """
-    n = 2.0 ** zoom
-    lon_deg = x / n * 360.0 - 180.0
-    lat_rad = math.atan(math.sinh(math.pi * (1 - 2 * y / n)))
-    lat_deg = math.degrees(lat_rad)
-    return lat_deg, lon_deg
-
-
-def get_tile_bounds(x: int, y: int, zoom: int) -> Tuple[float, float, float, float]:
-    """
-    Mendapatkan bounding box (minLat, minLon, maxLat, maxLon) dari tile
-    """
-    lat_top, lon_left = tile_to_lat_lon(x, y, zoom)
-    lat_bottom, lon_right = tile_to_lat_lon(x + 1, y + 1, zoom)
-    
-    # Return: minLon, minLat, maxLon, maxLat (format GDAL)
-    return lon_left, lat_bottom, lon_right, lat_top
-
-
 def download_tile(x: int, y: int, zoom: int, variant: int, output_path: Path) -> bool:
     """
     Download satu tile dan simpan ke file
@@ -131,20 +90,28 @@ def download_tile(x: int, y: int, zoom: int, variant: int, output_path: Path) ->
     """
     url = BASE_URL.format(x=x, y=y, z=zoom, variant=variant)
     
+    start_time = time.perf_counter()
     try:
         response = requests.get(url, headers=HEADERS, timeout=30)
+        REQUEST_LATENCY.observe(time.perf_counter() - start_time, downloader='merge')
+        HTTP_RESPONSES.inc(downloader='merge', code=str(response.status_code))
         
         if response.status_code == 200:
             # Simpan file
             with open(output_path, 'wb') as f:
                 f.write(response.content)
+            TILES.inc(stage='download', status='success')
+            BYTES.inc(len(response.content), stage='download')
             return True
         else:
             print(f"❌ Error downloading {x}/{y}: Status {response.status_code}")
+            TILES.inc(stage='download', status='failed')
             return False
             
     except Exception as e:
         print(f"❌ Error downloading {x}/{y}: {str(e)}")
+        HTTP_RESPONSES.inc(downloader='merge', code='error')
+        TILES.inc(stage='download', status='failed')
         return False
 
 
@@ -157,13 +124,13 @@ def download_all_tiles(x_start: int, x_end: int, y_start: int, y_end: int,
     # Buat direktori output
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Buat list semua tiles yang perlu didownload
+    # Buat list semua tiles yang perlu didownload (urutan Hilbert curve)
     tiles_to_download = []
-    for x in range(x_start, x_end + 1):
-        for y in range(y_start, y_end + 1):
-            filename = f"tile_{zoom}_{x}_{y}.jpg"
-            output_path = output_dir / filename
-            tiles_to_download.append((x, y, output_path))
+    area = {'x_start': x_start, 'x_end': x_end, 'y_start': y_start, 'y_end': y_end}
+    for x, y in iter_batch_tiles(area):
+        filename = f"tile_{zoom}_{x}_{y}.jpg"
+        output_path = output_dir / filename
+        tiles_to_download.append((x, y, output_path))
     
     total_tiles = len(tiles_to_download)
     print(f"📥 Mulai download {total_tiles} tiles...")
@@ -219,6 +186,7 @@ def add_georeference_to_tiles(tile_paths: list, zoom: int) -> list:
 
     georeferenced_tiles = []
     failed = 0
+    env = gdal_env('georeference')
 
     for i, tile_path in enumerate(tile_paths, 1):
         # Parse tile coordinates from filename: tile_20_865069_525622.jpg
@@ -235,7 +203,7 @@ def add_georeference_to_tiles(tile_paths: list, zoom: int) -> list:
 
             # Use gdal_translate to add georeference
             cmd = [
-                'gdal_translate',
+                gdal_command('gdal_translate'),
                 '-of', 'GTiff',
                 '-a_srs', 'EPSG:4326',
                 '-a_ullr', str(min_lon), str(max_lat), str(max_lon), str(min_lat),
@@ -244,7 +212,7 @@ def add_georeference_to_tiles(tile_paths: list, zoom: int) -> list:
             ]
 
             try:
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30, env=setup_gdal_env())
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30, env=env)
                 if result.returncode == 0:
                     georeferenced_tiles.append(georef_path)
                     if i % 50 == 0 or i == len(tile_paths):
@@ -274,8 +242,7 @@ def create_vrt_with_georef(tile_paths: list, x_start: int, y_start: int,
     y_tiles = y_end - y_start + 1
 
     # Get bounding box for entire tile set
-    min_lon, min_lat, _, _ = get_tile_bounds(x_start, y_end, zoom)
-    _, _, max_lon, max_lat = get_tile_bounds(x_end, y_start, zoom)
+    min_lon, min_lat, max_lon, max_lat = tile_range_bounds(x_start, x_end, y_start, y_end, zoom)
     
     print(f"📍 Bounding Box:")
     print(f"   Min: {min_lat:.6f}, {min_lon:.6f}")
@@ -283,7 +250,7 @@ def create_vrt_with_georef(tile_paths: list, x_start: int, y_start: int,
     
     # Buat VRT file dengan gdalbuildvrt
     vrt_cmd = [
-        'gdalbuildvrt',
+        gdal_command('gdalbuildvrt'),
         '-resolution', 'highest',
         '-te', str(min_lon), str(min_lat), str(max_lon), str(max_lat),  # target extent
         '-a_srs', 'EPSG:4326',  # WGS84
@@ -295,7 +262,7 @@ def create_vrt_with_georef(tile_paths: list, x_start: int, y_start: int,
     
     try:
         print(f"🔨 Membuat VRT file...")
-        result = subprocess.run(vrt_cmd, capture_output=True, text=True, env=setup_gdal_env())
+        result = subprocess.run(vrt_cmd, capture_output=True, text=True, env=gdal_env('translate'))
 
         if result.returncode == 0:
             print(f"✓ VRT file berhasil dibuat: {output_vrt}\n")
@@ -325,7 +292,7 @@ def merge_to_geotiff(vrt_file: Path, output_tif: Path) -> bool:
     
     # Gunakan gdal_translate untuk konversi VRT ke GeoTIFF
     translate_cmd = [
-        'gdal_translate',
+        gdal_command('gdal_translate'),
         '-of', 'GTiff',
         '-co', 'COMPRESS=LZW',  # Kompresi untuk ukuran file lebih kecil
         '-co', 'TILED=YES',     # Tiled TIFF untuk performa lebih baik
@@ -337,7 +304,7 @@ def merge_to_geotiff(vrt_file: Path, output_tif: Path) -> bool:
     try:
         print(f"🔨 Merging tiles ke GeoTIFF...")
         print(f"   Output: {output_tif}")
-        result = subprocess.run(translate_cmd, capture_output=True, text=True, env=setup_gdal_env())
+        result = subprocess.run(translate_cmd, capture_output=True, text=True, env=gdal_env('translate'))
 
         if result.returncode == 0:
             # Get file size
@@ -475,17 +442,40 @@ def get_user_input() -> dict:
     }
 
 
+def get_job_input(job_file: str) -> dict:
+    """
+    Ambil koordinat tiles dari job spec (mode headless, tanpa input())
+    Returns dict dengan format yang sama dengan get_user_input()
+    """
+    try:
+        job = load_job_spec(job_file)
+    except JobSpecError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    global MAX_WORKERS
+    if job['concurrency']:
+        MAX_WORKERS = job['concurrency']
+
+    print(f"📄 Job spec: {job['name']}\n")
+    return job_to_config(job)
+
+
 def main():
     """
     Main function
     """
+    parser = argparse.ArgumentParser(description='BPN Tile Downloader & GeoTIFF Merger')
+    parser.add_argument('--job', help='Job spec (JSON) untuk mode headless tanpa input()')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("   BPN Tile Downloader & GeoTIFF Merger")
     print("=" * 60)
     print()
 
-    # Get user input
-    config = get_user_input()
+    # Get user input (atau job spec untuk mode headless)
+    config = get_job_input(args.job) if args.job else get_user_input()
 
     # 1. Download tiles
     downloaded_files = download_all_tiles(
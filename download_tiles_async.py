@@ -18,6 +18,14 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
 
+from job_spec import JobSpecError, job_to_config, load_job_spec, progress_matches_job
+from pipeline_metrics import (BATCHES, BYTES, HTTP_RESPONSES, QUEUE_DEPTH, REQUEST_LATENCY, RETRIES, TILES,
+                              add_metrics_arguments, setup_metrics)
+from pipeline_profile import add_profile_arguments, instrument_asyncio, setup_profile
+from tile_catalog import BatchPlan, TileCatalog
+from tile_classifier import TILE_BLANK, TILE_OK, TileClassifier, tile_done, write_blank_marker
+from tile_grid import CURVE_ORDERS, DEFAULT_CURVE, LEGACY_CURVE
+
 # Fix Windows terminal encoding
 if sys.platform == 'win32':
     try:
@@ -38,6 +46,7 @@ BATCH_SIZE = 50  # 50x50 tiles per batch
 MAX_CONCURRENT = 500  # Concurrent downloads (bisa sampai 1000 untuk koneksi cepat)
 RETRY_ATTEMPTS = 3
 RETRY_DELAY = 0.5  # Shorter delay for async
+DEFERRED_DELAY = 5  # Placeholder/error image: download ulang setelah semua tile batch selesai
 CHUNK_SIZE = 16384  # 16KB chunks
 PROGRESS_DETAIL_LIMIT = 20
 TIMEOUT_CONNECT = 10
@@ -54,6 +63,9 @@ TILES_DIR = Path("tiles")
 PROGRESS_FILE = TILES_DIR / "progress_async.json"
 FAILED_FILE = TILES_DIR / "failed_tiles_async.json"
 
+# Deteksi placeholder/error image yang dikirim dengan HTTP 200
+classifier = TileClassifier()
+
 
 def format_time(seconds):
     """Format seconds to human readable time"""
@@ -76,37 +88,17 @@ def format_size(bytes_size):
     return f"{bytes_size:.2f} TB"
 
 
-def calculate_batches(x_start, x_end, y_start, y_end, batch_size=BATCH_SIZE):
-    """Calculate all batches needed"""
-    batches = []
-    batch_num = 1
-
-    x_range = x_end - x_start + 1
-    y_range = y_end - y_start + 1
-
-    x_batches = (x_range + batch_size - 1) // batch_size
-    y_batches = (y_range + batch_size - 1) // batch_size
+def calculate_batches(x_start, x_end, y_start, y_end, batch_size=BATCH_SIZE, order=DEFAULT_CURVE):
+    """Calculate all batches needed
 
-    for y_batch_idx in range(y_batches):
-        for x_batch_idx in range(x_batches):
-            batch_x_start = x_start + (x_batch_idx * batch_size)
-            batch_x_end = min(batch_x_start + batch_size - 1, x_end)
+    Batch dinomori sepanjang space-filling curve (default Hilbert) supaya
+    batch yang nomornya berdekatan juga berdekatan secara spasial.
+    Gunakan order='row-major' untuk progress file lama.
 
-            batch_y_start = y_start + (y_batch_idx * batch_size)
-            batch_y_end = min(batch_y_start + batch_size - 1, y_end)
-
-            batch_info = {
-                'batch_num': batch_num,
-                'x_start': batch_x_start,
-                'x_end': batch_x_end,
-                'y_start': batch_y_start,
-                'y_end': batch_y_end,
-                'tiles_count': (batch_x_end - batch_x_start + 1) * (batch_y_end - batch_y_start + 1)
-            }
-            batches.append(batch_info)
-            batch_num += 1
-
-    return batches
+    Returns:
+        BatchPlan - batch_info dihitung saat diiterasi, plan.get(N) langsung tanpa scan
+    """
+    return BatchPlan(x_start, x_end, y_start, y_end, batch_size, order)
 
 
 def load_progress():
@@ -154,46 +146,77 @@ def save_failed_tiles(failed_data):
         json.dump(failed_data, f, indent=2)
 
 
-async def download_tile(session, semaphore, x, y, zoom, variant, output_path, retry=0):
+async def download_tile(session, semaphore, x, y, zoom, variant, output_path, retry=0, uniform_seen=None):
     """Async download single tile with streaming"""
     url = BASE_URL.format(x=x, y=y, z=zoom, variant=variant)
+    uniform_seen = uniform_seen if uniform_seen is not None else []
 
-    # Skip if exists
-    if output_path.exists():
+    # Skip if exists (atau sudah ditandai blank)
+    if tile_done(output_path):
+        TILES.inc(stage='download', status='skipped')
         return {'status': 'skipped', 'x': x, 'y': y}
 
     async with semaphore:
+        start_time = time.perf_counter()
         try:
             timeout = aiohttp.ClientTimeout(connect=TIMEOUT_CONNECT, total=TIMEOUT_READ)
             async with session.get(url, timeout=timeout) as response:
+                HTTP_RESPONSES.inc(downloader='async', code=str(response.status))
                 if response.status == 200:
-                    # Stream to file
-                    total_size = 0
-                    async with aiofiles.open(output_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
-                            await f.write(chunk)
-                            total_size += len(chunk)
+                    # Tile ~20 KB: kumpulkan di memory dulu supaya bisa diklasifikasi sebelum ditulis
+                    data = b''.join([chunk async for chunk in response.content.iter_chunked(CHUNK_SIZE)])
+                    REQUEST_LATENCY.observe(time.perf_counter() - start_time, downloader='async')
+                    BYTES.inc(len(data), stage='download')
+
+                    verdict, reason = classifier.classify(data, response.headers.get('Content-Type'), uniform_seen)
+                    if verdict == TILE_BLANK:
+                        write_blank_marker(output_path, reason)
+                        TILES.inc(stage='download', status='blank')
+                        return {'status': 'blank', 'x': x, 'y': y}
+                    if verdict != TILE_OK:
+                        # Placeholder/error image: jangan disimpan, download_batch mengulang belakangan
+                        if retry < RETRY_ATTEMPTS:
+                            TILES.inc(stage='download', status='suspect')
+                            return {'status': 'deferred', 'x': x, 'y': y, 'path': output_path,
+                                    'retry': retry + 1, 'uniform_seen': uniform_seen, 'error': reason}
+                        TILES.inc(stage='download', status='failed')
+                        return {'status': 'failed', 'x': x, 'y': y, 'error': reason, 'retries': retry}
 
-                    return {'status': 'success', 'x': x, 'y': y, 'size': total_size}
+                    async with aiofiles.open(output_path, 'wb') as f:
+                        await f.write(data)
+                    TILES.inc(stage='download', status='success')
+                    return {'status': 'success', 'x': x, 'y': y, 'size': len(data)}
                 else:
+                    REQUEST_LATENCY.observe(time.perf_counter() - start_time, downloader='async')
                     error_msg = f"HTTP {response.status}"
                     if retry < RETRY_ATTEMPTS:
+                        RETRIES.inc(downloader='async')
                         await asyncio.sleep(RETRY_DELAY * (retry + 1))
-                        return await download_tile(session, semaphore, x, y, zoom, variant, output_path, retry + 1)
+                        return await download_tile(session, semaphore, x, y, zoom, variant, output_path, retry + 1,
+                                                   uniform_seen)
+                    TILES.inc(stage='download', status='failed')
                     return {'status': 'failed', 'x': x, 'y': y, 'error': error_msg, 'retries': retry}
 
         except asyncio.TimeoutError:
             error_msg = "Timeout"
+            HTTP_RESPONSES.inc(downloader='async', code='timeout')
             if retry < RETRY_ATTEMPTS:
+                RETRIES.inc(downloader='async')
                 await asyncio.sleep(RETRY_DELAY * (retry + 1))
-                return await download_tile(session, semaphore, x, y, zoom, variant, output_path, retry + 1)
+                return await download_tile(session, semaphore, x, y, zoom, variant, output_path, retry + 1,
+                                           uniform_seen)
+            TILES.inc(stage='download', status='failed')
             return {'status': 'failed', 'x': x, 'y': y, 'error': error_msg, 'retries': retry}
 
         except Exception as e:
             error_msg = str(e)
+            HTTP_RESPONSES.inc(downloader='async', code='error')
             if retry < RETRY_ATTEMPTS:
+                RETRIES.inc(downloader='async')
                 await asyncio.sleep(RETRY_DELAY * (retry + 1))
-                return await download_tile(session, semaphore, x, y, zoom, variant, output_path, retry + 1)
+                return await download_tile(session, semaphore, x, y, zoom, variant, output_path, retry + 1,
+                                           uniform_seen)
+            TILES.inc(stage='download', status='failed')
             return {'status': 'failed', 'x': x, 'y': y, 'error': error_msg, 'retries': retry}
 
 
@@ -203,18 +226,13 @@ async def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_
     batch_dir = TILES_DIR / f"tiles_batch_{batch_num:03d}"
     batch_dir.mkdir(parents=True, exist_ok=True)
 
-    # Generate tiles list
-    tiles_to_download = []
-    for x in range(batch_info['x_start'], batch_info['x_end'] + 1):
-        for y in range(batch_info['y_start'], batch_info['y_end'] + 1):
-            filename = f"tile_{zoom}_{x}_{y}.jpg"
-            output_path = batch_dir / filename
-            tiles_to_download.append((x, y, output_path))
-
-    total_tiles = len(tiles_to_download)
+    # Generate tiles list (Hilbert order untuk locality)
+    tiles = TileCatalog.from_batch(batch_info, zoom, batch_dir, '.jpg')
+    total_tiles = len(tiles)
     success_count = 0
     failed_count = 0
     skipped_count = 0
+    blank_count = 0
     total_size = 0
     failed_list = []
 
@@ -231,10 +249,11 @@ async def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_
     )
 
     async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
-        # Create tasks
+        # Create tasks (Task, bukan coroutine, supaya bisa dicek done()/cancel() saat cleanup)
         tasks = [
-            download_tile(session, semaphore, x, y, zoom, variant, path)
-            for x, y, path in tiles_to_download
+            asyncio.create_task(download_tile(session, semaphore, int(tiles.x[i]), int(tiles.y[i]),
+                                              zoom, variant, Path(tiles.path(i))))
+            for i in range(total_tiles)
         ]
 
         # Progress bar
@@ -245,44 +264,69 @@ async def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_
         try:
             # Execute all tasks with gather for better cancellation handling
             results = await asyncio.gather(*tasks, return_exceptions=True)
+            deferred_round = 0
+
+            while True:
+                deferred = []
+
+                # Process results
+                for result in results:
+                    # Handle cancellation
+                    if isinstance(result, asyncio.CancelledError):
+                        if HAS_TQDM:
+                            pbar.update(1)
+                        continue
+
+                    # Handle other exceptions
+                    if isinstance(result, Exception):
+                        failed_count += 1
+                        if HAS_TQDM:
+                            pbar.update(1)
+                        continue
+
+                    # Handle normal results
+                    if result['status'] == 'deferred':
+                        deferred.append(result)
+                        continue
+                    if result['status'] == 'success':
+                        success_count += 1
+                        total_size += result.get('size', 0)
+                    elif result['status'] == 'skipped':
+                        skipped_count += 1
+                    elif result['status'] == 'blank':
+                        blank_count += 1
+                    elif result['status'] == 'failed':
+                        failed_count += 1
+                        failed_list.append({
+                            'x': result['x'],
+                            'y': result['y'],
+                            'error': result['error'],
+                            'retries': result['retries']
+                        })
 
-            # Process results
-            for result in results:
-                # Handle cancellation
-                if isinstance(result, asyncio.CancelledError):
-                    if HAS_TQDM:
-                        pbar.update(1)
-                    continue
-
-                # Handle other exceptions
-                if isinstance(result, Exception):
-                    failed_count += 1
                     if HAS_TQDM:
                         pbar.update(1)
-                    continue
-
-                # Handle normal results
-                if result['status'] == 'success':
-                    success_count += 1
-                    total_size += result.get('size', 0)
-                elif result['status'] == 'skipped':
-                    skipped_count += 1
-                elif result['status'] == 'failed':
-                    failed_count += 1
-                    failed_list.append({
-                        'x': result['x'],
-                        'y': result['y'],
-                        'error': result['error'],
-                        'retries': result['retries']
-                    })
-
-                if HAS_TQDM:
-                    pbar.update(1)
-                    pbar.set_postfix({
-                        'OK': success_count,
-                        'Skip': skipped_count,
-                        'Fail': failed_count
-                    })
+                        pbar.set_postfix({
+                            'OK': success_count,
+                            'Skip': skipped_count,
+                            'Fail': failed_count
+                        })
+
+                if not deferred:
+                    break
+
+                # Placeholder/error image: tunggu server pulih, lalu download ulang tiles tersebut saja
+                deferred_round += 1
+                delay = DEFERRED_DELAY * deferred_round
+                print(f"\n  ⏳ {len(deferred)} placeholder/error image ({deferred[0]['error']}), "
+                      f"download ulang dalam {delay}s...")
+                await asyncio.sleep(delay)
+                tasks = [
+                    asyncio.create_task(download_tile(session, semaphore, r['x'], r['y'], zoom, variant,
+                                                      r['path'], r['retry'], r['uniform_seen']))
+                    for r in deferred
+                ]
+                results = await asyncio.gather(*tasks, return_exceptions=True)
 
         except KeyboardInterrupt:
             # Cancel all pending tasks
@@ -320,6 +364,7 @@ async def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_
         'tiles': total_tiles,
         'success': success_count,
         'skipped': skipped_count,
+        'blank': blank_count,
         'failed': failed_count,
         'time_seconds': elapsed_time,
         'size_bytes': total_size
@@ -335,6 +380,8 @@ async def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_
     total_batches = progress_data['total_batches']
     avg_time_per_batch = (time.time() - datetime.fromisoformat(progress_data['start_time']).timestamp()) / completed_batches
     remaining_batches = total_batches - completed_batches
+    BATCHES.inc(stage='download', result='failed' if failed_count else 'completed')
+    QUEUE_DEPTH.set(remaining_batches, queue='download_batches')
     eta_seconds = remaining_batches * avg_time_per_batch
     progress_data['estimated_completion'] = (datetime.now() + timedelta(seconds=eta_seconds)).strftime("%Y-%m-%d %H:%M:%S")
     progress_data['avg_time_per_batch'] = avg_time_per_batch
@@ -343,7 +390,7 @@ async def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_
 
     # Print summary
     print(f"\n✅ Batch {batch_num}/{total_batches} selesai!")
-    print(f"   Sukses: {success_count} | Skipped: {skipped_count} | Gagal: {failed_count}")
+    print(f"   Sukses: {success_count} | Skipped: {skipped_count} | Blank: {blank_count} | Gagal: {failed_count}")
     print(f"   Waktu: {format_time(elapsed_time)} | Size: {format_size(total_size)}")
     print(f"   Speed: {total_tiles/elapsed_time:.1f} tiles/s")
     print(f"   Progress: {completed_batches}/{total_batches} batches ({completed_batches*100//total_batches}%)")
@@ -355,10 +402,12 @@ async def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_
 
 async def main_async(progress, failed_tiles, config, batches, args, concurrent_limit):
     """Main async download loop with proper task cleanup"""
+    instrument_asyncio()
     try:
+        completed = set(progress['completed_batches'])
         for batch in batches:
             # Skip completed batches
-            if batch['batch_num'] in progress['completed_batches']:
+            if batch['batch_num'] in completed:
                 continue
 
             progress['current_batch'] = batch['batch_num']
@@ -415,23 +464,67 @@ async def main_async(progress, failed_tiles, config, batches, args, concurrent_l
         raise
 
 
+def build_pyramid_after_download(config, min_zoom):
+    """Bangun zoom level lebih rendah dari tiles yang sudah didownload"""
+    from build_pyramid import build_pyramid
+
+    if min_zoom >= config['zoom']:
+        print(f"⚠️  --pyramid-min-zoom harus < zoom download ({config['zoom']}), pyramid dilewati")
+        return
+
+    print()
+    build_pyramid(config['zoom'], min_zoom, config['variant'])
+    print()
+
+
 def main():
     parser = argparse.ArgumentParser(description='BPN Async Tile Downloader (High Performance)')
     parser.add_argument('--resume', action='store_true', help='Resume dari progress terakhir')
     parser.add_argument('--concurrent', type=int, default=MAX_CONCURRENT, help=f'Max concurrent downloads (default: {MAX_CONCURRENT})')
+    parser.add_argument('--batch-order', choices=CURVE_ORDERS, default=DEFAULT_CURVE,
+                        help=f'Urutan penomoran batch untuk download baru (default: {DEFAULT_CURVE}); '
+                             f'tiles di dalam batch selalu {DEFAULT_CURVE}')
+    parser.add_argument('--job', help='Job spec (JSON) untuk mode headless tanpa input()')
+    parser.add_argument('--pyramid-min-zoom', type=int, default=None,
+                        help='Setelah download, bangun zoom lebih rendah secara lokal (2x2 downsampling) sampai zoom ini')
+    parser.add_argument('--base-url', help='Template URL tiles, misalnya tile_proxy.py: '
+                                           '"http://127.0.0.1:8766/wms/?d={x}/{y}/{z}/{variant}"')
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser, asyncio_mode=True)
 
     args = parser.parse_args()
 
+    if args.base_url:
+        global BASE_URL
+        BASE_URL = args.base_url
+
+    # Headless job spec
+    job = None
+    if args.job:
+        try:
+            job = load_job_spec(args.job)
+        except JobSpecError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        args.batch_order = job['batch_order']
+        if args.pyramid_min_zoom is None:
+            args.pyramid_min_zoom = job['pyramid_min_zoom']
+        if job['concurrency']:
+            args.concurrent = job['concurrency']
+
     print("=" * 60)
     print("   BPN Async Tile Downloader (TURBO MODE)")
     print("=" * 60)
     print()
 
+    setup_metrics(args, 'download')
+    setup_profile(args, 'download')
+
     # Check for resume
     progress = load_progress()
     failed_tiles = load_failed_tiles()
 
-    if args.resume and progress:
+    if (args.resume and progress) or (job and progress_matches_job(progress, job)):
         print("📂 Melanjutkan download dari progress terakhir...")
         config = progress['config']
         x_start = config['x_start']
@@ -446,19 +539,30 @@ def main():
         print()
 
     else:
-        # Get user input
-        print("📌 Input koordinat tiles:")
-        print()
-
-        x_start = int(input("X Start: "))
-        x_end = int(input("X End: "))
-        y_start = int(input("Y Start: "))
-        y_end = int(input("Y End: "))
-        zoom = int(input("Zoom Level: "))
-        variant = int(input("Variant (default 2): ") or "2")
+        if job:
+            # Koordinat dari job spec
+            print(f"📄 Job spec: {job['name']}")
+            job_config = job_to_config(job)
+            x_start = job_config['x_start']
+            x_end = job_config['x_end']
+            y_start = job_config['y_start']
+            y_end = job_config['y_end']
+            zoom = job_config['zoom']
+            variant = job_config['variant']
+        else:
+            # Get user input
+            print("📌 Input koordinat tiles:")
+            print()
+
+            x_start = int(input("X Start: "))
+            x_end = int(input("X End: "))
+            y_start = int(input("Y Start: "))
+            y_end = int(input("Y End: "))
+            zoom = int(input("Zoom Level: "))
+            variant = int(input("Variant (default 2): ") or "2")
 
         # Calculate batches
-        batches = calculate_batches(x_start, x_end, y_start, y_end)
+        batches = calculate_batches(x_start, x_end, y_start, y_end, order=args.batch_order)
         total_tiles = (x_end - x_start + 1) * (y_end - y_start + 1)
 
         print("\n" + "=" * 60)
@@ -469,14 +573,15 @@ def main():
         print(f"  Zoom: {zoom} | Variant: {variant}")
         print(f"  Total tiles: {total_tiles:,}")
         print(f"  Batch size: {BATCH_SIZE}x{BATCH_SIZE} = {BATCH_SIZE*BATCH_SIZE:,} tiles/batch")
-        print(f"  Total batches: {len(batches)}")
+        print(f"  Total batches: {len(batches)} (urutan: {args.batch_order})")
         print(f"  Max concurrent: {args.concurrent}")
         print("=" * 60)
 
-        confirm = input("\n✅ Lanjutkan download? (y/n): ").strip().lower()
-        if confirm not in ['y', 'yes']:
-            print("❌ Download dibatalkan")
-            return
+        if not job:
+            confirm = input("\n✅ Lanjutkan download? (y/n): ").strip().lower()
+            if confirm not in ['y', 'yes']:
+                print("❌ Download dibatalkan")
+                return
 
         print()
 
@@ -498,6 +603,7 @@ def main():
                 'zoom': zoom,
                 'variant': variant,
                 'batch_size': BATCH_SIZE,
+                'batch_order': args.batch_order,
                 'max_concurrent': args.concurrent
             },
             'batch_details': {}
@@ -510,7 +616,8 @@ def main():
         config['x_start'],
         config['x_end'],
         config['y_start'],
-        config['y_end']
+        config['y_end'],
+        order=config.get('batch_order', LEGACY_CURVE)
     )
 
     # Use concurrent limit from args or config
@@ -526,6 +633,10 @@ def main():
 
     asyncio.run(main_async(progress, failed_tiles, config, batches, args, concurrent_limit))
 
+    # Pyramid hanya dibangun jika semua batch sudah selesai
+    if args.pyramid_min_zoom is not None and len(progress['completed_batches']) >= progress['total_batches']:
+        build_pyramid_after_download(config, args.pyramid_min_zoom)
+
 
 if __name__ == "__main__":
     main()
@@ -20,6 +20,14 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Tuple, List, Dict
 from queue import Queue
 
+from job_spec import JobSpecError, job_to_config, load_job_spec, progress_matches_job
+from pipeline_metrics import (BATCHES, BYTES, HTTP_RESPONSES, QUEUE_DEPTH, REQUEST_LATENCY, RETRIES, TILES,
+                              add_metrics_arguments, setup_metrics)
+from pipeline_profile import add_profile_arguments, setup_profile
+from tile_catalog import BatchPlan, TileCatalog
+from tile_classifier import TILE_BLANK, TILE_OK, TileClassifier, tile_done, write_blank_marker
+from tile_grid import CURVE_ORDERS, DEFAULT_CURVE, LEGACY_CURVE
+
 # Fix Windows terminal encoding
 if sys.platform == 'win32':
     try:
@@ -41,6 +49,7 @@ MAX_WORKERS = 20  # Parallel downloads (optimized from 10)
 CONNECTION_POOL_SIZE = 30  # Connection pool size for session
 RETRY_ATTEMPTS = 3  # Retry per tile
 RETRY_DELAY = 1  # Reduced from 2 seconds
+DEFERRED_DELAY = 5  # Placeholder/error image: download ulang belakangan (server sedang overload)
 CHUNK_SIZE = 16384  # 16KB chunks for streaming
 PROGRESS_DETAIL_LIMIT = 20  # Keep only last 20 batches in detail
 BASE_URL = "https://petadasar.atrbpn.go.id/wms/?d={x}/{y}/{z}/{variant}"
@@ -61,6 +70,9 @@ thread_local = threading.local()
 # Global retry queue
 retry_queue = Queue()
 
+# Deteksi placeholder/error image yang dikirim dengan HTTP 200
+classifier = TileClassifier()
+
 
 def get_session():
     """Get or create thread-local session with connection pooling"""
@@ -112,38 +124,17 @@ def format_size(bytes_size):
     return f"{bytes_size:.2f} TB"
 
 
-def calculate_batches(x_start, x_end, y_start, y_end, batch_size=BATCH_SIZE):
-    """Calculate all batches needed for the coordinate range"""
-    batches = []
-    batch_num = 1
-
-    x_range = x_end - x_start + 1
-    y_range = y_end - y_start + 1
-
-    # Calculate number of batches in each direction
-    x_batches = (x_range + batch_size - 1) // batch_size
-    y_batches = (y_range + batch_size - 1) // batch_size
-
-    for y_batch_idx in range(y_batches):
-        for x_batch_idx in range(x_batches):
-            batch_x_start = x_start + (x_batch_idx * batch_size)
-            batch_x_end = min(batch_x_start + batch_size - 1, x_end)
+def calculate_batches(x_start, x_end, y_start, y_end, batch_size=BATCH_SIZE, order=DEFAULT_CURVE):
+    """Calculate all batches needed for the coordinate range
 
-            batch_y_start = y_start + (y_batch_idx * batch_size)
-            batch_y_end = min(batch_y_start + batch_size - 1, y_end)
+    Batch dinomori sepanjang space-filling curve (default Hilbert) supaya
+    batch yang nomornya berdekatan juga berdekatan secara spasial.
+    Gunakan order='row-major' untuk progress file lama.
 
-            batch_info = {
-                'batch_num': batch_num,
-                'x_start': batch_x_start,
-                'x_end': batch_x_end,
-                'y_start': batch_y_start,
-                'y_end': batch_y_end,
-                'tiles_count': (batch_x_end - batch_x_start + 1) * (batch_y_end - batch_y_start + 1)
-            }
-            batches.append(batch_info)
-            batch_num += 1
-
-    return batches
+    Returns:
+        BatchPlan - batch_info dihitung saat diiterasi, plan.get(N) langsung tanpa scan
+    """
+    return BatchPlan(x_start, x_end, y_start, y_end, batch_size, order)
 
 
 def load_progress():
@@ -192,95 +183,138 @@ def save_failed_tiles(failed_data):
         json.dump(failed_data, f, indent=2)
 
 
-def process_retry_queue(executor, zoom, variant, batch_dir, progress_data):
-    """Process tiles in retry queue with delayed retries"""
-    retry_items = []
+def process_retry_queue(executor, zoom, variant, batch_dir, progress_data, queue=None):
+    """Process tiles in retry queue with delayed retries
 
-    # Collect all items from queue
-    while not retry_queue.empty():
-        retry_items.append(retry_queue.get())
+    Retry bisa masuk queue lagi (placeholder yang masih dikirim server), jadi diproses per
+    ronde sampai queue kosong. Delay dihitung dari awal ronde, bukan dijumlahkan per tile.
+    Tile yang sudah RETRY_ATTEMPTS kali tidak masuk queue lagi, jadi loop selalu berhenti.
+    queue: Queue retry (default: retry_queue global downloader)
 
-    if not retry_items:
-        return
+    Returns:
+        List hasil akhir download_tile (status success/blank/skipped/failed)
+    """
+    queue = queue if queue is not None else retry_queue
+    results = []
 
-    if HAS_TQDM:
-        print(f"  Processing {len(retry_items)} retries...")
+    while not queue.empty():
+        retry_items = []
 
-    # Sort by delay to process in order
-    retry_items.sort(key=lambda x: x['delay'])
+        # Collect all items from queue
+        while not queue.empty():
+            retry_items.append(queue.get())
+        QUEUE_DEPTH.set(0, queue='download_retry')
 
-    success_count = 0
-    failed_count = 0
+        if HAS_TQDM:
+            print(f"  Processing {len(retry_items)} retries...")
 
-    for item in retry_items:
-        # Wait before retry (non-blocking)
-        time.sleep(item['delay'])
+        # Sort by delay to process in order
+        retry_items.sort(key=lambda x: x['delay'])
 
-        # Submit retry to executor
-        future = executor.submit(
-            download_tile,
-            item['x'], item['y'], item['zoom'], item['variant'],
-            item['output_path'], item['retry']
-        )
+        round_start = time.time()
+        futures = []
+        for item in retry_items:
+            # Wait until this item's delay has passed since the start of the round
+            time.sleep(max(0, round_start + item['delay'] - time.time()))
 
-        result = future.result()
+            # Submit retry to executor
+            futures.append(executor.submit(
+                download_tile,
+                item['x'], item['y'], item['zoom'], item['variant'],
+                item['output_path'], item['retry'], item.get('uniform_seen'), queue
+            ))
 
-        if result['status'] == 'success':
-            success_count += 1
-        elif result['status'] == 'failed':
-            failed_count += 1
+        results.extend(r for r in (f.result() for f in futures) if r['status'] != 'retry_queued')
 
+    success_count = sum(1 for r in results if r['status'] == 'success')
+    failed_count = sum(1 for r in results if r['status'] == 'failed')
     if HAS_TQDM and (success_count > 0 or failed_count > 0):
         print(f"  Retry results: {success_count} success, {failed_count} failed")
+    return results
+
 
+def download_tile(x, y, zoom, variant, output_path, retry=0, uniform_seen=None, queue=None):
+    """Download single tile with streaming I/O and session pooling
 
-def download_tile(x, y, zoom, variant, output_path, retry=0):
-    """Download single tile with streaming I/O and session pooling"""
+    Retry masuk ke queue (default: retry_queue global downloader)
+    """
+    queue = queue if queue is not None else retry_queue
     url = BASE_URL.format(x=x, y=y, z=zoom, variant=variant)
+    uniform_seen = uniform_seen if uniform_seen is not None else []
 
-    # Skip if already exists
-    if output_path.exists():
+    # Skip if already exists (atau sudah ditandai blank)
+    if tile_done(output_path):
+        TILES.inc(stage='download', status='skipped')
         return {'status': 'skipped', 'x': x, 'y': y, 'path': output_path}
 
+    start_time = time.perf_counter()
     try:
         # Use thread-local session for connection pooling
         session = get_session()
 
         # Stream download to reduce memory usage
         response = session.get(url, timeout=(10, 30), stream=True)
+        HTTP_RESPONSES.inc(downloader='batch', code=str(response.status_code))
 
         if response.status_code == 200:
-            # Write in chunks to minimize memory footprint
-            total_size = 0
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
-                    if chunk:
-                        f.write(chunk)
-                        total_size += len(chunk)
+            # Tile ~20 KB: kumpulkan di memory dulu supaya bisa diklasifikasi sebelum ditulis
+            data = b''.join(chunk for chunk in response.iter_content(chunk_size=CHUNK_SIZE) if chunk)
+            REQUEST_LATENCY.observe(time.perf_counter() - start_time, downloader='batch')
+            BYTES.inc(len(data), stage='download')
+
+            verdict, reason = classifier.classify(data, response.headers.get('Content-Type'), uniform_seen)
+            if verdict == TILE_BLANK:
+                write_blank_marker(output_path, reason)
+                TILES.inc(stage='download', status='blank')
+                return {'status': 'blank', 'x': x, 'y': y, 'path': output_path}
+            if verdict != TILE_OK:
+                # Placeholder/error image: jangan disimpan, download ulang setelah server pulih
+                if retry < RETRY_ATTEMPTS:
+                    queue.put({
+                        'x': x, 'y': y, 'zoom': zoom, 'variant': variant,
+                        'output_path': output_path, 'retry': retry + 1,
+                        'uniform_seen': uniform_seen, 'delay': DEFERRED_DELAY * (retry + 1)
+                    })
+                    TILES.inc(stage='download', status='suspect')
+                    QUEUE_DEPTH.set(queue.qsize(), queue='download_retry')
+                    return {'status': 'retry_queued', 'x': x, 'y': y}
+                TILES.inc(stage='download', status='failed')
+                return {'status': 'failed', 'x': x, 'y': y, 'error': reason, 'retries': retry}
 
-            return {'status': 'success', 'x': x, 'y': y, 'path': output_path, 'size': total_size}
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            TILES.inc(stage='download', status='success')
+            return {'status': 'success', 'x': x, 'y': y, 'path': output_path, 'size': len(data)}
         else:
+            REQUEST_LATENCY.observe(time.perf_counter() - start_time, downloader='batch')
             error_msg = f"HTTP {response.status_code}"
             # Non-blocking retry: Add to retry queue instead of recursive call
             if retry < RETRY_ATTEMPTS:
-                retry_queue.put({
+                queue.put({
                     'x': x, 'y': y, 'zoom': zoom, 'variant': variant,
                     'output_path': output_path, 'retry': retry + 1,
-                    'delay': RETRY_DELAY * (retry + 1)
+                    'uniform_seen': uniform_seen, 'delay': RETRY_DELAY * (retry + 1)
                 })
+                RETRIES.inc(downloader='batch')
+                QUEUE_DEPTH.set(queue.qsize(), queue='download_retry')
                 return {'status': 'retry_queued', 'x': x, 'y': y}
+            TILES.inc(stage='download', status='failed')
             return {'status': 'failed', 'x': x, 'y': y, 'error': error_msg, 'retries': retry}
 
     except Exception as e:
         error_msg = str(e)
+        HTTP_RESPONSES.inc(downloader='batch', code='error')
         # Non-blocking retry: Add to retry queue
         if retry < RETRY_ATTEMPTS:
-            retry_queue.put({
+            queue.put({
                 'x': x, 'y': y, 'zoom': zoom, 'variant': variant,
                 'output_path': output_path, 'retry': retry + 1,
-                'delay': RETRY_DELAY * (retry + 1)
+                'uniform_seen': uniform_seen, 'delay': RETRY_DELAY * (retry + 1)
             })
+            RETRIES.inc(downloader='batch')
+            QUEUE_DEPTH.set(queue.qsize(), queue='download_retry')
             return {'status': 'retry_queued', 'x': x, 'y': y}
+        TILES.inc(stage='download', status='failed')
         return {'status': 'failed', 'x': x, 'y': y, 'error': error_msg, 'retries': retry}
 
 
@@ -290,18 +324,13 @@ def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_data,
     batch_dir = TILES_DIR / f"tiles_batch_{batch_num:03d}"
     batch_dir.mkdir(parents=True, exist_ok=True)
 
-    # Generate list of tiles to download
-    tiles_to_download = []
-    for x in range(batch_info['x_start'], batch_info['x_end'] + 1):
-        for y in range(batch_info['y_start'], batch_info['y_end'] + 1):
-            filename = f"tile_{zoom}_{x}_{y}.jpg"
-            output_path = batch_dir / filename
-            tiles_to_download.append((x, y, output_path))
-
-    total_tiles = len(tiles_to_download)
+    # Generate list of tiles to download (Hilbert order untuk locality)
+    tiles = TileCatalog.from_batch(batch_info, zoom, batch_dir, '.jpg')
+    total_tiles = len(tiles)
     success_count = 0
     failed_count = 0
     skipped_count = 0
+    blank_count = 0
     retry_queued_count = 0
     total_size = 0
     failed_list = []
@@ -314,18 +343,19 @@ def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_data,
 
     # Download using shared thread pool executor
     futures = {
-        executor.submit(download_tile, x, y, zoom, variant, path): (x, y)
-        for x, y, path in tiles_to_download
+        executor.submit(download_tile, int(tiles.x[i]), int(tiles.y[i]), zoom, variant, Path(tiles.path(i))): i
+        for i in range(total_tiles)
     }
 
-    for future in as_completed(futures):
-        result = future.result()
-
+    def count_result(result):
+        nonlocal success_count, failed_count, skipped_count, blank_count, retry_queued_count, total_size
         if result['status'] == 'success':
             success_count += 1
             total_size += result.get('size', 0)
         elif result['status'] == 'skipped':
             skipped_count += 1
+        elif result['status'] == 'blank':
+            blank_count += 1
         elif result['status'] == 'retry_queued':
             retry_queued_count += 1
         elif result['status'] == 'failed':
@@ -337,6 +367,9 @@ def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_data,
                 'retries': result['retries']
             })
 
+    for future in as_completed(futures):
+        count_result(future.result())
+
         if HAS_TQDM:
             pbar.update(1)
             pbar.set_postfix({
@@ -349,9 +382,10 @@ def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_data,
     if HAS_TQDM:
         pbar.close()
 
-    # Process retry queue for this batch
+    # Process retry queue for this batch (termasuk placeholder yang ditunda)
     if retry_queued_count > 0:
-        process_retry_queue(executor, zoom, variant, batch_dir, progress_data)
+        for result in process_retry_queue(executor, zoom, variant, batch_dir, progress_data):
+            count_result(result)
 
     elapsed_time = time.time() - start_time
 
@@ -367,6 +401,7 @@ def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_data,
         'tiles': total_tiles,
         'success': success_count,
         'skipped': skipped_count,
+        'blank': blank_count,
         'failed': failed_count,
         'time_seconds': elapsed_time,
         'size_bytes': total_size
@@ -382,6 +417,8 @@ def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_data,
     total_batches = progress_data['total_batches']
     avg_time_per_batch = (time.time() - datetime.fromisoformat(progress_data['start_time']).timestamp()) / completed_batches
     remaining_batches = total_batches - completed_batches
+    BATCHES.inc(stage='download', result='failed' if failed_count else 'completed')
+    QUEUE_DEPTH.set(remaining_batches, queue='download_batches')
     eta_seconds = remaining_batches * avg_time_per_batch
     progress_data['estimated_completion'] = (datetime.now() + timedelta(seconds=eta_seconds)).strftime("%Y-%m-%d %H:%M:%S")
     progress_data['avg_time_per_batch'] = avg_time_per_batch
@@ -390,7 +427,7 @@ def download_batch(batch_info, zoom, variant, progress_data, failed_tiles_data,
 
     # Print summary
     print(f"\n✅ Batch {batch_num}/{total_batches} selesai!")
-    print(f"   Sukses: {success_count} | Skipped: {skipped_count} | Gagal: {failed_count}")
+    print(f"   Sukses: {success_count} | Skipped: {skipped_count} | Blank: {blank_count} | Gagal: {failed_count}")
     print(f"   Waktu: {format_time(elapsed_time)} | Size: {format_size(total_size)}")
     print(f"   Progress: {completed_batches}/{total_batches} batches ({completed_batches*100//total_batches}%)")
     print(f"   ETA: {format_time(eta_seconds)} (selesai ~{progress_data['estimated_completion'].split()[1]})")
@@ -436,15 +473,60 @@ def show_status():
                   f"({format_time(batch['time_seconds'])})")
 
 
+def build_pyramid_after_download(config, min_zoom):
+    """Bangun zoom level lebih rendah dari tiles yang sudah didownload"""
+    from build_pyramid import build_pyramid
+
+    if min_zoom >= config['zoom']:
+        print(f"⚠️  --pyramid-min-zoom harus < zoom download ({config['zoom']}), pyramid dilewati")
+        return
+
+    print()
+    build_pyramid(config['zoom'], min_zoom, config['variant'])
+    print()
+
+
 def main():
     parser = argparse.ArgumentParser(description='BPN Tile Batch Downloader')
     parser.add_argument('--resume', action='store_true', help='Resume dari progress terakhir')
     parser.add_argument('--retry-failed', action='store_true', help='Retry semua failed tiles')
     parser.add_argument('--batch', type=int, help='Download batch tertentu')
     parser.add_argument('--status', action='store_true', help='Tampilkan status tanpa download')
+    parser.add_argument('--batch-order', choices=CURVE_ORDERS, default=DEFAULT_CURVE,
+                        help=f'Urutan penomoran batch untuk download baru (default: {DEFAULT_CURVE}); '
+                             f'tiles di dalam batch selalu {DEFAULT_CURVE}')
+    parser.add_argument('--job', help='Job spec (JSON) untuk mode headless tanpa input()')
+    parser.add_argument('--pyramid-min-zoom', type=int, default=None,
+                        help='Setelah download, bangun zoom lebih rendah secara lokal (2x2 downsampling) sampai zoom ini')
+    parser.add_argument('--workers', type=int, default=None, help=f'Jumlah download threads (default: {MAX_WORKERS})')
+    parser.add_argument('--base-url', help='Template URL tiles, misalnya tile_proxy.py: '
+                                           '"http://127.0.0.1:8766/wms/?d={x}/{y}/{z}/{variant}"')
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
 
+    if args.base_url:
+        global BASE_URL
+        BASE_URL = args.base_url
+
+    # Headless job spec
+    job = None
+    max_workers = MAX_WORKERS
+    if args.job:
+        try:
+            job = load_job_spec(args.job)
+        except JobSpecError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        args.batch_order = job['batch_order']
+        if args.pyramid_min_zoom is None:
+            args.pyramid_min_zoom = job['pyramid_min_zoom']
+        if job['concurrency']:
+            max_workers = job['concurrency']
+    if args.workers:
+        max_workers = args.workers
+
     # Show status
     if args.status:
         show_status()
@@ -455,11 +537,14 @@ def main():
     print("=" * 60)
     print()
 
+    setup_metrics(args, 'download')
+    setup_profile(args, 'download')
+
     # Check for resume
     progress = load_progress()
     failed_tiles = load_failed_tiles()
 
-    if args.resume and progress:
+    if (args.resume and progress) or (job and progress_matches_job(progress, job)):
         print("📂 Melanjutkan download dari progress terakhir...")
         config = progress['config']
         x_start = config['x_start']
@@ -474,19 +559,30 @@ def main():
         print()
 
     else:
-        # Get user input
-        print("📌 Input koordinat tiles:")
-        print()
+        if job:
+            # Koordinat dari job spec
+            print(f"📄 Job spec: {job['name']}")
+            job_config = job_to_config(job)
+            x_start = job_config['x_start']
+            x_end = job_config['x_end']
+            y_start = job_config['y_start']
+            y_end = job_config['y_end']
+            zoom = job_config['zoom']
+            variant = job_config['variant']
+        else:
+            # Get user input
+            print("📌 Input koordinat tiles:")
+            print()
 
-        x_start = int(input("X Start: "))
-        x_end = int(input("X End: "))
-        y_start = int(input("Y Start: "))
-        y_end = int(input("Y End: "))
-        zoom = int(input("Zoom Level: "))
-        variant = int(input("Variant (default 2): ") or "2")
+            x_start = int(input("X Start: "))
+            x_end = int(input("X End: "))
+            y_start = int(input("Y Start: "))
+            y_end = int(input("Y End: "))
+            zoom = int(input("Zoom Level: "))
+            variant = int(input("Variant (default 2): ") or "2")
 
         # Calculate batches
-        batches = calculate_batches(x_start, x_end, y_start, y_end)
+        batches = calculate_batches(x_start, x_end, y_start, y_end, order=args.batch_order)
         total_tiles = (x_end - x_start + 1) * (y_end - y_start + 1)
 
         print("\n" + "=" * 60)
@@ -497,13 +593,14 @@ def main():
         print(f"  Zoom: {zoom} | Variant: {variant}")
         print(f"  Total tiles: {total_tiles:,}")
         print(f"  Batch size: {BATCH_SIZE}x{BATCH_SIZE} = {BATCH_SIZE*BATCH_SIZE:,} tiles/batch")
-        print(f"  Total batches: {len(batches)}")
+        print(f"  Total batches: {len(batches)} (urutan: {args.batch_order})")
         print("=" * 60)
 
-        confirm = input("\n✅ Lanjutkan download? (y/n): ").strip().lower()
-        if confirm not in ['y', 'yes']:
-            print("❌ Download dibatalkan")
-            return
+        if not job:
+            confirm = input("\n✅ Lanjutkan download? (y/n): ").strip().lower()
+            if confirm not in ['y', 'yes']:
+                print("❌ Download dibatalkan")
+                return
 
         print()
 
@@ -524,7 +621,8 @@ def main():
                 'y_end': y_end,
                 'zoom': zoom,
                 'variant': variant,
-                'batch_size': BATCH_SIZE
+                'batch_size': BATCH_SIZE,
+                'batch_order': args.batch_order
             },
             'batch_details': {}
         }
@@ -536,17 +634,18 @@ def main():
         config['x_start'],
         config['x_end'],
         config['y_start'],
-        config['y_end']
+        config['y_end'],
+        order=config.get('batch_order', LEGACY_CURVE)
     )
 
     # Create persistent thread pool executor
-    print(f"🚀 Initializing {MAX_WORKERS} worker threads with connection pooling...")
-    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    print(f"🚀 Initializing {max_workers} worker threads with connection pooling...")
+    executor = ThreadPoolExecutor(max_workers=max_workers)
 
     try:
         # Download specific batch
         if args.batch:
-            batch_to_download = next((b for b in batches if b['batch_num'] == args.batch), None)
+            batch_to_download = batches.get(args.batch)
             if batch_to_download:
                 print(f"📥 Downloading batch {args.batch}...")
                 download_batch(batch_to_download, config['zoom'], config['variant'], progress, failed_tiles, executor)
@@ -555,9 +654,10 @@ def main():
             return
 
         # Download all batches
+        completed = set(progress['completed_batches'])
         for batch in batches:
             # Skip completed batches
-            if batch['batch_num'] in progress['completed_batches']:
+            if batch['batch_num'] in completed:
                 continue
 
             progress['current_batch'] = batch['batch_num']
@@ -579,6 +679,10 @@ def main():
             print(f"   Retry dengan: python {__file__} --retry-failed")
         print()
 
+        # Pyramid hanya dibangun jika semua batch sudah selesai
+        if args.pyramid_min_zoom is not None and len(progress['completed_batches']) >= progress['total_batches']:
+            build_pyramid_after_download(config, args.pyramid_min_zoom)
+
     except KeyboardInterrupt:
         print("\n\n⏸️  Download di-pause")
         print(f"   Progress tersimpan di: {PROGRESS_FILE}")
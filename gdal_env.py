@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GDAL Environment Profiles
+Environment/config GDAL per stage, dihitung sekali per proses lalu di-cache:
+
+- georeference: satu tile kecil per gdal_translate, banyak proses paralel
+- translate: gdalbuildvrt/gdal_translate/gdalwarp di atas VRT besar (ribuan - ratusan ribu tiles)
+- overview: gdaladdo
+- encode: ECW/JP2 di dalam proses (osgeo, geotiff_to_ecw.py)
+
+Path GDAL terdeteksi otomatis (Windows: C:\\Program Files\\GDAL, Linux/macOS: prefix
+gdal_translate di PATH, conda, /usr, /usr/local). Nilai 'auto' dihitung dari RAM dan
+batas open files. Variant bisa di-benchmark (benchmarks/bench_stages.py --gdal-profiles)
+dan yang tercepat di mesin ini dipasang sebagai default di gdal_profiles.json:
+
+    {"default": "bigcache",
+     "variants": {"bigcache": {"translate": {"GDAL_CACHEMAX": "4096"}}}}
+
+Variant juga bisa dipilih per run dengan env SIPUKAT_GDAL_PROFILE=legacy.
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from functools import lru_cache
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+# ============= KONFIGURASI =============
+WINDOWS_GDAL_DIR = Path(r"C:\Program Files\GDAL")
+UNIX_PREFIXES = ("/usr/local", "/usr", "/opt/homebrew", "/opt/local")
+PROFILES_FILE = Path(__file__).resolve().parent / "gdal_profiles.json"
+PROFILE_ENV_VAR = "SIPUKAT_GDAL_PROFILE"
+DEFAULT_VARIANT = "tuned"
+
+CACHE_FRACTION = 0.25  # GDAL_CACHEMAX 'auto' = 25% RAM available...
+CACHE_MIN_MB = 512  # ...minimal 512 MB
+CACHE_MAX_MB = 4096  # ...maksimal 4 GB
+SWATH_FRACTION = 0.5  # GDAL_SWATH_SIZE 'auto' = setengah cache (default GDAL 1/4): lebih sedikit pass baca sumber
+
+DATASET_POOL_MIN = 100  # Default GDAL
+DATASET_POOL_MAX = 1000  # GDAL mengabaikan nilai di atas 1000 (kembali ke 100)
+OPEN_FILES_TARGET = 8192  # Soft limit open files dinaikkan sampai sini (maks hard limit)
+OPEN_FILES_RESERVED = 128  # File descriptor untuk selain dataset pool (log, pipe, output)
+
+STAGES = ('georeference', 'translate', 'overview', 'encode')
+
+# Profil per stage. 'auto' dihitung sekali per proses (lihat stage_options)
+STAGE_PROFILES = {
+    'georeference': {
+        'GDAL_NUM_THREADS': '1',  # Paralelisme dari jumlah worker, bukan thread per proses
+        'GDAL_CACHEMAX': '64',  # Satu tile 256x256: cache besar hanya membuang waktu alokasi
+        'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',  # Tanpa listing folder 2,500 tiles per open
+        'GDAL_PAM_ENABLED': 'NO',
+    },
+    'translate': {
+        'GDAL_NUM_THREADS': 'ALL_CPUS',
+        'GDAL_CACHEMAX': 'auto',  # Swath tetap default (1/4 cache): jatah MergeScheduler tidak terlampaui
+        'GDAL_MAX_DATASET_POOL_SIZE': 'auto',  # Sumber VRT tetap terbuka, tidak buka-tutup per block
+        'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+        'VRT_SHARED_SOURCE': '0',
+        'GDAL_TIFF_INTERNAL_MASK': 'YES',
+        'GDAL_PAM_ENABLED': 'NO',
+    },
+    'overview': {
+        'GDAL_NUM_THREADS': 'ALL_CPUS',
+        'GDAL_CACHEMAX': 'auto',
+        'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+        'GDAL_TIFF_OVR_BLOCKSIZE': '512',
+        'GDAL_PAM_ENABLED': 'NO',
+    },
+    'encode': {
+        'GDAL_NUM_THREADS': 'ALL_CPUS',
+        'GDAL_CACHEMAX': 'auto',
+        'GDAL_SWATH_SIZE': 'auto',
+        'GDAL_MAX_DATASET_POOL_SIZE': 'auto',  # Input bisa mosaic VRT langsung
+        'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+        'GDAL_PAM_ENABLED': 'NO',
+    },
+}
+
+# Variant bawaan: override per stage di atas STAGE_PROFILES (None = hapus key)
+BUILTIN_VARIANTS = {
+    'tuned': {},
+    # Perilaku setup_gdal_env lama: semua stage sama, tanpa dataset pool/readdir/swath
+    'legacy': {stage: {'GDAL_NUM_THREADS': 'ALL_CPUS', 'GDAL_CACHEMAX': 'auto', 'GDAL_SWATH_SIZE': None,
+                       'GDAL_MAX_DATASET_POOL_SIZE': None, 'GDAL_DISABLE_READDIR_ON_OPEN': None,
+                       'GDAL_TIFF_OVR_BLOCKSIZE': None}
+               for stage in STAGES},
+    # Mesin dengan RAM kecil / banyak job bersamaan
+    'lowmem': {stage: {'GDAL_CACHEMAX': str(CACHE_MIN_MB // 2), 'GDAL_SWATH_SIZE': None}
+               for stage in ('translate', 'overview', 'encode')},
+}
+
+
+@lru_cache(maxsize=None)
+def detect_gdal_paths():
+    """(bin_dir, gdal_data, proj_data) - None untuk yang tidak ditemukan/tidak perlu di-set"""
+    if sys.platform == 'win32':
+        if not WINDOWS_GDAL_DIR.exists():
+            return None, None, None
+        candidates = [(WINDOWS_GDAL_DIR, WINDOWS_GDAL_DIR / "gdal-data", WINDOWS_GDAL_DIR / "projlib")]
+    else:
+        prefixes = []
+        if os.environ.get('CONDA_PREFIX'):
+            prefixes.append(Path(os.environ['CONDA_PREFIX']))
+        executable = shutil.which('gdal_translate')
+        if executable:
+            prefixes.append(Path(executable).resolve().parent.parent)
+        prefixes.extend(Path(prefix) for prefix in UNIX_PREFIXES)
+        candidates = [(None, prefix / "share" / "gdal", prefix / "share" / "proj") for prefix in prefixes]
+
+    bin_dir = gdal_data = proj_data = None
+    for candidate_bin, candidate_data, candidate_proj in candidates:
+        bin_dir = bin_dir or candidate_bin
+        if gdal_data is None and candidate_data.is_dir():
+            gdal_data = candidate_data
+        if proj_data is None and (candidate_proj / "proj.db").exists():
+            proj_data = candidate_proj
+    return bin_dir, gdal_data, proj_data
+
+
+def gdal_command(name):
+    """Nama command GDAL (full path di Windows jika ada)"""
+    if sys.platform == 'win32':
+        gdal_path = WINDOWS_GDAL_DIR / f"{name}.exe"
+        if gdal_path.exists():
+            return str(gdal_path)
+    return name
+
+
+@lru_cache(maxsize=None)
+def gdal_version():
+    """Versi GDAL command line sebagai tuple (3, 8, 4), None jika tidak terdeteksi"""
+    try:
+        result = subprocess.run([gdal_command('gdal_translate'), '--version'], capture_output=True, text=True,
+                                env=base_env(), timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r'GDAL (\d+)\.(\d+)(?:\.(\d+))?', result.stdout)
+    if not match:
+        return None
+    return tuple(int(part or 0) for part in match.groups())
+
+
+@lru_cache(maxsize=None)
+def auto_cache_mb():
+    """GDAL_CACHEMAX 'auto': 25% RAM available (512 MB - 4 GB), psutil di-query sekali"""
+    if not HAS_PSUTIL:
+        return CACHE_MIN_MB
+    try:
+        available_mb = psutil.virtual_memory().available / (1024 * 1024)
+    except Exception:
+        return CACHE_MIN_MB
+    return max(CACHE_MIN_MB, min(CACHE_MAX_MB, int(available_mb * CACHE_FRACTION)))
+
+
+@lru_cache(maxsize=None)
+def open_file_limit():
+    """Soft limit open files, dinaikkan ke OPEN_FILES_TARGET (diwarisi subprocess GDAL)"""
+    if not HAS_RESOURCE:
+        return 512  # Batas default C runtime Windows
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = OPEN_FILES_TARGET if hard == resource.RLIM_INFINITY else min(OPEN_FILES_TARGET, hard)
+    if soft != resource.RLIM_INFINITY and soft < target:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        except (ValueError, OSError):
+            pass
+    return soft if soft != resource.RLIM_INFINITY else OPEN_FILES_TARGET
+
+
+def dataset_pool_size(sources=None):
+    """GDAL_MAX_DATASET_POOL_SIZE 'auto' dari batas open files (dan jumlah sumber VRT jika diketahui)"""
+    size = min(DATASET_POOL_MAX, max(DATASET_POOL_MIN, open_file_limit() - OPEN_FILES_RESERVED))
+    if sources:
+        size = min(size, max(DATASET_POOL_MIN, sources))
+    return size
+
+
+@lru_cache(maxsize=None)
+def load_profiles_file(path=PROFILES_FILE):
+    """{'default': nama, 'variants': {...}} dari gdal_profiles.json (kosong jika tidak ada)"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  {path} tidak bisa dibaca ({e}), profil GDAL bawaan dipakai")
+        return {}
+
+
+def variants():
+    """Semua variant: bawaan + dari gdal_profiles.json"""
+    return {**BUILTIN_VARIANTS, **load_profiles_file().get('variants', {})}
+
+
+@lru_cache(maxsize=None)
+def known_variant(name):
+    """name jika variant dikenal, selain itu DEFAULT_VARIANT (peringatan sekali per nama)"""
+    if name not in variants():
+        print(f"⚠️  Profil GDAL '{name}' tidak dikenal, memakai '{DEFAULT_VARIANT}'")
+        return DEFAULT_VARIANT
+    return name
+
+
+def active_variant():
+    """Variant aktif: env SIPUKAT_GDAL_PROFILE > default di gdal_profiles.json > 'tuned'
+
+    Dibaca ulang setiap panggilan, jadi mengganti env di proses yang sama (misalnya
+    bench_stages --gdal-profiles) langsung berlaku untuk gdal_env() berikutnya.
+    """
+    return known_variant(os.environ.get(PROFILE_ENV_VAR) or load_profiles_file().get('default') or DEFAULT_VARIANT)
+
+
+def stage_options(stage, variant=None):
+    """Config GDAL (dict str -> str) untuk stage, nilai 'auto' sudah dihitung
+
+    Variant (default: active_variant()) bagian dari cache key, bukan dibekukan saat
+    panggilan pertama.
+    """
+    return _stage_options(stage, variant or active_variant())
+
+
+@lru_cache(maxsize=None)
+def _stage_options(stage, variant):
+    if stage not in STAGE_PROFILES:
+        raise ValueError(f"Stage GDAL tidak dikenal: {stage} (pilih: {', '.join(STAGES)})")
+    options = dict(STAGE_PROFILES[stage])
+    for key, value in variants().get(variant, {}).get(stage, {}).items():
+        if value is None:
+            options.pop(key, None)
+        else:
+            options[key] = str(value)
+
+    cache_mb = auto_cache_mb() if options.get('GDAL_CACHEMAX') == 'auto' else None
+    if cache_mb:
+        options['GDAL_CACHEMAX'] = str(cache_mb)
+    if options.get('GDAL_SWATH_SIZE') == 'auto':
+        swath_mb = int((cache_mb or int(options.get('GDAL_CACHEMAX', CACHE_MIN_MB))) * SWATH_FRACTION)
+        options['GDAL_SWATH_SIZE'] = str(swath_mb * 1024 * 1024)
+    if options.get('GDAL_MAX_DATASET_POOL_SIZE') == 'auto':
+        options['GDAL_MAX_DATASET_POOL_SIZE'] = str(dataset_pool_size())
+    return options
+
+
+@lru_cache(maxsize=None)
+def base_env():
+    """os.environ + path GDAL (dihitung sekali)"""
+    env = os.environ.copy()
+    bin_dir, gdal_data, proj_data = detect_gdal_paths()
+    if bin_dir and str(bin_dir) not in env.get('PATH', ''):
+        env['PATH'] = str(bin_dir) + os.pathsep + env.get('PATH', '')
+    if gdal_data and not env.get('GDAL_DATA'):
+        env['GDAL_DATA'] = str(gdal_data)
+    if proj_data and not (env.get('PROJ_LIB') or env.get('PROJ_DATA')):
+        env['PROJ_LIB'] = str(proj_data)  # PROJ < 9.1
+        env['PROJ_DATA'] = str(proj_data)
+    return env
+
+
+def gdal_env(stage, num_threads=None, cache_mb=None, sources=None):
+    """Environment subprocess GDAL untuk stage (salinan, aman diubah)
+
+    Args:
+        stage: 'georeference', 'translate', 'overview' atau 'encode'
+        num_threads: Override GDAL_NUM_THREADS (jatah MergeScheduler)
+        cache_mb: Override GDAL_CACHEMAX dalam MB (jatah MergeScheduler)
+        sources: Jumlah file sumber VRT - dataset pool tidak lebih besar dari ini
+    """
+    env = dict(base_env())
+    env.update(stage_options(stage))
+    if num_threads:
+        env['GDAL_NUM_THREADS'] = str(num_threads)
+    if cache_mb:
+        env['GDAL_CACHEMAX'] = str(int(cache_mb))
+        if 'GDAL_SWATH_SIZE' in env:
+            env['GDAL_SWATH_SIZE'] = str(int(cache_mb * SWATH_FRACTION) * 1024 * 1024)
+    if sources and 'GDAL_MAX_DATASET_POOL_SIZE' in env:
+        env['GDAL_MAX_DATASET_POOL_SIZE'] = str(dataset_pool_size(sources))
+    return env
+
+
+def apply_gdal_config(gdal, stage):
+    """Pasang profil stage ke GDAL di dalam proses (osgeo) - dipanggil sebelum membuka dataset"""
+    for key, value in stage_options(stage).items():
+        if key == 'GDAL_CACHEMAX':
+            gdal.SetCacheMax(int(value) * 1024 * 1024)
+        else:
+            gdal.SetConfigOption(key, value)
+    _, gdal_data, proj_data = detect_gdal_paths()
+    if gdal_data and not os.environ.get('GDAL_DATA'):
+        gdal.SetConfigOption('GDAL_DATA', str(gdal_data))
+    if proj_data and not (os.environ.get('PROJ_LIB') or os.environ.get('PROJ_DATA')):
+        gdal.SetConfigOption('PROJ_DATA', str(proj_data))
+
+
+def describe(stage, variant=None):
+    """Satu baris ringkasan profil untuk log"""
+    options = stage_options(stage, variant)
+    return f"{variant or active_variant()}/{stage}: " + ' '.join(f"{k}={v}" for k, v in sorted(options.items()))
+
+
+if __name__ == '__main__':
+    bin_dir, gdal_data, proj_data = detect_gdal_paths()
+    version = gdal_version()
+    print(f"🔍 GDAL {'.'.join(map(str, version)) if version else '-'} | bin: {bin_dir or '(PATH)'} | "
+          f"GDAL_DATA: {gdal_data or '-'} | PROJ: {proj_data or '-'}")
+    print(f"📂 Open files: {open_file_limit()} | Dataset pool: {dataset_pool_size()}")
+    print(f"📋 Variant: {', '.join(variants())} (aktif: {active_variant()})\n")
+    for name in (sys.argv[1:] or [active_variant()]):
+        for stage in STAGES:
+            print(describe(stage, name))
+        print()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GDAL Progress Reporting
+Interface progress bersama untuk semua operasi GDAL (gdal_translate, gdalbuildvrt,
+gdalwarp, gdaladdo, gdal.Translate): persen, MB/s, pixels/s dan ETA ke console
+dan ke log JSONL yang bisa dibaca mesin
+"""
+
+import os
+import re
+import json
+import time
+import threading
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+# ============= KONFIGURASI =============
+PROGRESS_LOG = Path("gdal_progress.jsonl")
+PROGRESS_LOG_MAX_BYTES = 10 * 1024 * 1024  # Log dirotasi ke gdal_progress.jsonl.1 setelah 10 MB
+PROGRESS_STEP = 10  # Console/log setiap 10%
+PROGRESS_INTERVAL = 30  # ...atau setiap 30 detik untuk operasi yang lambat
+
+# Output -progress GDAL: "0...10...20...30...40...50...60...70...80...90...100 - done."
+PROGRESS_PATTERN = re.compile(r'(\d{1,3})\.\.\.')
+
+_log_lock = threading.Lock()
+
+
+def vrt_size(vrt_file):
+    """(width, height, bands) dari header VRT tanpa membuka GDAL, None jika tidak terbaca"""
+    try:
+        with open(vrt_file, 'r', encoding='utf-8', errors='ignore') as f:
+            header = f.read(4096)
+        width = int(re.search(r'rasterXSize="(\d+)"', header).group(1))
+        height = int(re.search(r'rasterYSize="(\d+)"', header).group(1))
+        with open(vrt_file, 'r', encoding='utf-8', errors='ignore') as f:
+            bands = sum(line.count('<VRTRasterBand') for line in f)
+        return width, height, bands or 1
+    except (OSError, AttributeError, ValueError):
+        return None
+
+
+def rotate_log(log_file, max_bytes=PROGRESS_LOG_MAX_BYTES):
+    """Pindahkan log ke <log>.1 (menimpa rotasi sebelumnya) jika lebih dari max_bytes
+
+    Log ditulis append oleh setiap run, jadi tanpa rotasi tumbuh terus di folder kerja.
+    """
+    try:
+        if os.path.getsize(log_file) > max_bytes:
+            os.replace(log_file, f"{log_file}.1")
+    except OSError:
+        pass  # Belum ada log, atau dirotasi proses lain
+
+
+class ProgressReporter:
+    """Hitung dan laporkan progress satu operasi GDAL
+
+    Args:
+        stage: Nama stage (merge, buildvrt, convert, ...)
+        label: Nama item (file output, batch)
+        total_pixels: Jumlah pixel yang diproses (untuk pixels/s)
+        total_bytes: Jumlah byte data uncompressed (untuk MB/s)
+        console: Cetak progress ke console
+        log_file: Log JSONL (None = tidak ditulis)
+    """
+
+    def __init__(self, stage, label, total_pixels=None, total_bytes=None, console=True, log_file=PROGRESS_LOG):
+        self.stage = stage
+        self.label = str(label)
+        self.total_pixels = total_pixels
+        self.total_bytes = total_bytes
+        self.console = console
+        self.log_file = log_file
+        self.start_time = time.time()
+        self.fraction = 0.0
+        self.last_report = (0.0, self.start_time)
+
+    def stats(self):
+        """Snapshot progress: persen, elapsed, MB/s, pixels/s, ETA"""
+        elapsed = time.time() - self.start_time
+        stats = {
+            'stage': self.stage,
+            'label': self.label,
+            'percent': round(self.fraction * 100, 1),
+            'elapsed_s': round(elapsed, 2),
+            'eta_s': round(elapsed / self.fraction - elapsed, 1) if 0 < self.fraction < 1 else None,
+        }
+        if elapsed > 0 and self.total_bytes:
+            stats['mb_per_s'] = round(self.total_bytes * self.fraction / elapsed / (1024 * 1024), 2)
+        if elapsed > 0 and self.total_pixels:
+            stats['pixels_per_s'] = round(self.total_pixels * self.fraction / elapsed)
+        return stats
+
+    def format(self, stats):
+        line = f"   [{self.stage}] {self.label}: {stats['percent']:5.1f}% | {stats['elapsed_s']:.1f}s"
+        if 'mb_per_s' in stats:
+            line += f" | {stats['mb_per_s']:.1f} MB/s"
+        if 'pixels_per_s' in stats:
+            line += f" | {stats['pixels_per_s'] / 1e6:.1f} Mpx/s"
+        if stats['eta_s'] is not None:
+            line += f" | ETA {stats['eta_s']:.0f}s"
+        return line
+
+    def write_log(self, record):
+        if self.log_file is None:
+            return
+        record = {'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **record}
+        with _log_lock:
+            rotate_log(self.log_file)
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def update(self, fraction):
+        """Update progress (0.0-1.0). Laporan dicetak setiap PROGRESS_STEP% atau PROGRESS_INTERVAL detik"""
+        self.fraction = max(self.fraction, min(1.0, fraction))
+        percent = self.fraction * 100
+        last_percent, last_time = self.last_report
+        now = time.time()
+        if percent - last_percent < PROGRESS_STEP and now - last_time < PROGRESS_INTERVAL:
+            return
+        if self.fraction >= 1.0:
+            return  # Laporan 100% dari finish()
+
+        self.last_report = (percent, now)
+        stats = self.stats()
+        if self.console:
+            print(self.format(stats), flush=True)
+        self.write_log({'event': 'progress', **stats})
+
+    def finish(self, success=True, **extra):
+        """Laporan akhir. Returns dict statistik"""
+        if success:
+            self.fraction = 1.0
+        stats = self.stats()
+        stats.update(extra)
+        stats['success'] = success
+        if self.console:
+            print(self.format(stats) + ("" if success else " | GAGAL"), flush=True)
+        self.write_log({'event': 'done', **stats})
+        return stats
+
+    def gdal_callback(self):
+        """Callback untuk osgeo (gdal.TranslateOptions(callback=...))"""
+        def callback(complete, message, user_data):
+            self.update(complete)
+            return 1
+        return callback
+
+
+def run_gdal_command(cmd, reporter=None, env=None):
+    """Jalankan command GDAL dan parse output -progress ke reporter
+
+    Output progress GDAL tidak diakhiri newline sampai selesai, jadi stdout dibaca
+    per chunk, bukan per baris.
+
+    Returns:
+        (returncode, output) - output = semua stdout/stderr (untuk pesan error)
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env, shell=False)
+
+    output = []
+    text = ''
+    while True:
+        chunk = process.stdout.read1(4096)
+        if not chunk:
+            break
+        output.append(chunk)
+        text += chunk.decode('utf-8', errors='replace')
+
+        if reporter:
+            percents = [int(p) for p in PROGRESS_PATTERN.findall(text) if int(p) <= 100]
+            if percents:
+                reporter.update(max(percents) / 100)
+            # Cukup simpan ekor teks untuk chunk berikutnya
+            text = text[-32:]
+
+    process.wait()
+    return process.returncode, b''.join(output).decode('utf-8', errors='replace')
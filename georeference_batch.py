@@ -8,13 +8,21 @@ Menambahkan georeference ke tiles dalam batches
 import os
 import sys
 import json
+import time
 import argparse
 import subprocess
-import math
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 
+from build_deps import DepsManifest, fingerprint
+from gdal_env import gdal_command, gdal_env
+from job_spec import JobSpecError, load_job_spec
+from pipeline_metrics import BATCHES, GEOREF_LATENCY, QUEUE_DEPTH, TILES, add_metrics_arguments, setup_metrics
+from pipeline_profile import add_profile_arguments, setup_profile
+from tile_catalog import TileCatalog
+from tile_grid import get_tile_bounds, tiles_bounds
+
 # Fix Windows terminal encoding
 if sys.platform == 'win32':
     try:
@@ -33,59 +41,34 @@ except ImportError:
 TILES_DIR = Path("tiles")
 GEOREF_DIR = Path("georeferenced")
 PROGRESS_FILE = GEOREF_DIR / "georeference_progress.json"
-MAX_WORKERS = 4  # CPU intensive, don't use too many
-
-
-def setup_gdal_env():
-    """Setup environment variables untuk GDAL commands"""
-    env = os.environ.copy()
-
-    # Set GDAL paths
-    gdal_path = r"C:\Program Files\GDAL"
-    proj_lib_path = r"C:\Program Files\GDAL\projlib"
-    gdal_data_path = r"C:\Program Files\GDAL\gdal-data"
-
-    # Add GDAL to PATH if not already there
-    if gdal_path not in env.get('PATH', ''):
-        env['PATH'] = gdal_path + os.pathsep + env.get('PATH', '')
+MAX_WORKERS = os.cpu_count() or 4  # 1 gdal_translate subprocess per worker
+QUEUE_PER_WORKER = 4  # Tiles yang di-submit di depan per worker (bukan semua tiles sekaligus)
+PROGRESS_SAVE_INTERVAL = 10  # Detik minimal antar penulisan progress JSON
+COMPLETE_MARKER = ".complete"  # Di folder output batch: semua tiles selesai, siap di-merge
+INCOMPLETE_MARKER = ".incomplete"  # Di folder output batch: sedang diproses, belum boleh di-merge
 
-    # Set PROJ_LIB
-    env['PROJ_LIB'] = proj_lib_path
 
-    # Set GDAL_DATA
-    env['GDAL_DATA'] = gdal_data_path
+# Environment gdal_translate dihitung sekali, bukan per tile (variant GDAL dibaca saat import)
+GEOREF_ENV = gdal_env('georeference')
 
-    return env
 
+def georeference_tile(tile_path: Path, output_path: Path, x: int, y: int, zoom: int, bounds=None):
+    """Add georeference to single tile
 
-def tile_to_lat_lon(x: int, y: int, zoom: int):
-    """Convert tile coordinates to lat/lon"""
-    n = 2.0 ** zoom
-    lon = x / n * 360.0 - 180.0
-    lat_rad = math.atan(math.sinh(math.pi * (1 - 2 * y / n)))
-    lat = math.degrees(lat_rad)
-    return lat, lon
-
-
-def get_tile_bounds(x: int, y: int, zoom: int):
-    """Get bounding box dari tile"""
-    lat_top, lon_left = tile_to_lat_lon(x, y, zoom)
-    lat_bottom, lon_right = tile_to_lat_lon(x + 1, y + 1, zoom)
-    return lon_left, lat_bottom, lon_right, lat_top
-
-
-def georeference_tile(tile_path: Path, output_path: Path, x: int, y: int, zoom: int):
-    """Add georeference to single tile"""
+    bounds (min_lon, min_lat, max_lon, max_lat) bisa diberikan dari tiles_bounds() per batch;
+    tanpa bounds dihitung dari x, y, zoom.
+    """
     # Skip if already exists
     if output_path.exists():
+        TILES.inc(stage='georeference', status='skipped')
         return {'status': 'skipped', 'tile': tile_path.name}
 
     # Get bounds for this tile
-    min_lon, min_lat, max_lon, max_lat = get_tile_bounds(x, y, zoom)
+    min_lon, min_lat, max_lon, max_lat = bounds if bounds is not None else get_tile_bounds(x, y, zoom)
 
     # Use gdal_translate to add georeference
     cmd = [
-        'gdal_translate',
+        gdal_command('gdal_translate'),
         '-of', 'GTiff',
         '-a_srs', 'EPSG:4326',
         '-a_ullr', str(min_lon), str(max_lat), str(max_lon), str(min_lat),
@@ -94,12 +77,16 @@ def georeference_tile(tile_path: Path, output_path: Path, x: int, y: int, zoom:
     ]
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30, env=setup_gdal_env())
+        with GEOREF_LATENCY.time():
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30, env=GEOREF_ENV)
         if result.returncode == 0:
+            TILES.inc(stage='georeference', status='success')
             return {'status': 'success', 'tile': tile_path.name}
         else:
+            TILES.inc(stage='georeference', status='failed')
             return {'status': 'failed', 'tile': tile_path.name, 'error': result.stderr}
     except Exception as e:
+        TILES.inc(stage='georeference', status='failed')
         return {'status': 'failed', 'tile': tile_path.name, 'error': str(e)}
 
 
@@ -117,7 +104,7 @@ def list_available_batches(count_tiles=False):
         if batch_dir.is_dir():
             batch_num = int(batch_dir.name.split('_')[-1])
             # Only count tiles if explicitly requested (e.g., for --list mode)
-            tile_count = len(list(batch_dir.glob("*.jpg"))) if count_tiles else None
+            tile_count = get_batch_tile_count(batch_dir) if count_tiles else None
             batches.append({
                 'batch_num': batch_num,
                 'path': batch_dir,
@@ -136,7 +123,7 @@ def get_batch_tile_count(batch_path):
     Returns:
         Number of tiles in the batch
     """
-    return len(list(batch_path.glob("*.jpg")))
+    return len(TileCatalog.scan(batch_path, '.jpg'))
 
 
 def load_progress():
@@ -159,102 +146,230 @@ def save_progress(progress_data):
         json.dump(progress_data, f, indent=2)
 
 
-def georeference_batch(batch_info, progress_data):
-    """Georeference all tiles in a batch"""
-    batch_num = batch_info['batch_num']
-    batch_dir = batch_info['path']
-    output_dir = GEOREF_DIR / f"georeferenced_batch_{batch_num:03d}"
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Get all tiles in batch
-    tile_files = sorted(batch_dir.glob("tile_*.jpg"))
-
-    if not tile_files:
-        print(f"❌ Batch {batch_num}: Tidak ada tiles ditemukan")
-        return
-
-    print(f"\n🌍 Processing Batch {batch_num} ({len(tile_files)} tiles)...")
-
-    success_count = 0
-    failed_count = 0
-    skipped_count = 0
-    failed_list = []
-
-    import time
-    start_time = time.time()
-
-    # Progress bar
-    if HAS_TQDM:
-        pbar = tqdm(total=len(tile_files), desc=f"Batch {batch_num}", unit="tiles")
-
-    # Process with thread pool
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = []
-
-        for tile_file in tile_files:
-            # Parse coordinates from filename: tile_21_1728675_1051362.jpg
-            parts = tile_file.stem.split('_')
-            if len(parts) >= 4:
-                zoom = int(parts[1])
-                x = int(parts[2])
-                y = int(parts[3])
-
-                output_path = output_dir / f"{tile_file.stem}.tif"
-
-                future = executor.submit(georeference_tile, tile_file, output_path, x, y, zoom)
-                futures.append(future)
-
-        for future in as_completed(futures):
-            result = future.result()
-
-            if result['status'] == 'success':
-                success_count += 1
-            elif result['status'] == 'skipped':
-                skipped_count += 1
-            elif result['status'] == 'failed':
-                failed_count += 1
-                failed_list.append({
-                    'tile': result['tile'],
-                    'error': result.get('error', 'Unknown error')
-                })
-
-            if HAS_TQDM:
-                pbar.update(1)
-                pbar.set_postfix({
-                    'OK': success_count,
-                    'Skip': skipped_count,
-                    'Fail': failed_count
-                })
-
+class BatchTracker:
+    """Counter per batch di work queue global - batch selesai saat tile terakhirnya selesai"""
+
+    def __init__(self, batch_num, output_dir, total, manifest=None):
+        self.batch_num = batch_num
+        self.output_dir = output_dir
+        self.total = total
+        self.manifest = manifest or DepsManifest(output_dir)
+        self.inputs = {}  # Nama tile .jpg -> fingerprint saat di-submit
+        self.remaining = total
+        self.success = 0
+        self.skipped = 0
+        self.failed = 0
+        self.failed_list = []
+        self.start_time = time.time()
+
+    def record(self, result):
+        """Catat hasil satu tile. Returns True jika ini tile terakhir batch"""
+        fp = self.inputs.pop(result['tile'], None)
+        if result['status'] == 'success':
+            self.success += 1
+            self.manifest.record(Path(result['tile']).with_suffix('.tif'), fp)
+        elif result['status'] == 'skipped':
+            self.skipped += 1
+        elif result['status'] == 'failed':
+            self.failed += 1
+            self.failed_list.append({
+                'tile': result['tile'],
+                'error': result.get('error', 'Unknown error')
+            })
+        self.remaining -= 1
+        return self.remaining == 0
+
+    def stats(self):
+        return {
+            'status': 'completed',
+            'tiles': self.total,
+            'success': self.success,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'time_seconds': time.time() - self.start_time,
+            'failed_tiles': self.failed_list
+        }
+
+
+def finish_batch(tracker, progress_data):
+    """Batch selesai: progress + marker .complete (merge-ready) langsung, tanpa menunggu batch lain"""
+    batch_stats = tracker.stats()
+    progress_data['batch_details'][str(tracker.batch_num)] = batch_stats
+    if tracker.batch_num not in progress_data['completed_batches']:
+        progress_data['completed_batches'].append(tracker.batch_num)
+
+    # Marker ditulis atomic (rename), merge_geotiff.py --watch tidak pernah melihat marker setengah jadi
+    marker = tracker.output_dir / COMPLETE_MARKER
+    tmp = marker.with_name(COMPLETE_MARKER + ".tmp")
+    with open(tmp, 'w') as f:
+        json.dump({k: v for k, v in batch_stats.items() if k != 'failed_tiles'}, f)
+    os.replace(tmp, marker)
+    (tracker.output_dir / INCOMPLETE_MARKER).unlink(missing_ok=True)
+    tracker.manifest.save()
+    BATCHES.inc(stage='georeference', result='failed' if tracker.failed else 'completed')
+
+    message = (f"✅ Batch {tracker.batch_num} selesai! Sukses: {tracker.success} | Skipped: {tracker.skipped} | "
+               f"Gagal: {tracker.failed} | {batch_stats['time_seconds']:.1f}s")
+    if tracker.failed_list:
+        message += f"\n   ⚠️  {len(tracker.failed_list)} tiles gagal di-georeference"
     if HAS_TQDM:
-        pbar.close()
+        tqdm.write(message)
+    else:
+        print(message)
 
-    elapsed_time = time.time() - start_time
 
-    # Save progress
-    batch_stats = {
-        'status': 'completed',
-        'tiles': len(tile_files),
-        'success': success_count,
-        'skipped': skipped_count,
-        'failed': failed_count,
-        'time_seconds': elapsed_time,
-        'failed_tiles': failed_list if failed_list else []
-    }
+def prepare_incremental(tiles, output_dir, manifest, content_hash=False):
+    """Hapus output yang stale (tile berubah sejak di-georeference) dan output yatim
 
-    progress_data['batch_details'][str(batch_num)] = batch_stats
-    if batch_num not in progress_data['completed_batches']:
-        progress_data['completed_batches'].append(batch_num)
+    Returns:
+        (jumlah stale, jumlah yatim)
+    """
+    stale = 0
+    names = set()
+    for i in range(len(tiles)):
+        tile_file = tiles.path(i)
+        output_path = output_dir / f"{Path(tile_file).stem}.tif"
+        names.add(output_path.name)
+        fp = fingerprint(tile_file, content_hash)
+        if manifest.is_current(output_path, fp):
+            manifest.record(output_path, fp)
+        else:
+            output_path.unlink(missing_ok=True)
+            stale += 1
+
+    # Tile yang sudah dihapus/ditandai blank: output lama jangan ikut di-merge
+    orphans = 0
+    for output_path in TileCatalog.scan(output_dir, '.tif').iter_paths():
+        if os.path.basename(output_path) not in names:
+            os.unlink(output_path)
+            manifest.forget(output_path)
+            orphans += 1
+    return stale, orphans
+
+
+def iter_batch_tiles(batches, trackers, pbar=None, incremental=False, content_hash=False, up_to_date=None):
+    """Generator (tracker, tile_file, output_path, x, y, zoom, bounds) dari semua batch berurutan
+
+    Katalog batch di-scan saat batch tersebut mulai diumpankan, jadi worker sudah jalan
+    sebelum semua folder selesai di-scan. Bounds semua tiles batch dihitung sekali dengan
+    tiles_bounds() (satu zoom per folder batch, sama dengan TileCatalog.bounds()). Dengan incremental, output yang tile-nya
+    berubah dihapus dulu (dibuat ulang), dan batch yang seluruhnya up-to-date dilewati
+    tanpa menyentuh marker (nomornya ditambahkan ke up_to_date).
+    """
+    for batch_info in batches:
+        batch_num = batch_info['batch_num']
+        output_dir = GEOREF_DIR / f"georeferenced_batch_{batch_num:03d}"
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Get all tiles in batch - urut sepanjang Hilbert curve, sama dengan urutan download
+        tiles = TileCatalog.scan(batch_info['path'], '.jpg').sorted_by_curve()
+        if not len(tiles):
+            print(f"❌ Batch {batch_num}: Tidak ada tiles ditemukan")
+            continue
+
+        manifest = DepsManifest(output_dir)
+        if incremental:
+            stale, orphans = prepare_incremental(tiles, output_dir, manifest, content_hash)
+            if not stale and not orphans and (output_dir / COMPLETE_MARKER).exists():
+                manifest.save()
+                if up_to_date is not None:
+                    up_to_date.append(batch_num)
+                continue
+            message = f"🔄 Batch {batch_num}: {stale} tiles stale, {orphans} output yatim dihapus"
+            if HAS_TQDM:
+                tqdm.write(message)
+            else:
+                print(message)
+
+        # Belum merge-ready sampai semua tiles selesai (juga saat batch diproses ulang)
+        (output_dir / INCOMPLETE_MARKER).touch()
+        marker = output_dir / COMPLETE_MARKER
+        if marker.exists():
+            marker.unlink()
+
+        tracker = BatchTracker(batch_num, output_dir, len(tiles), manifest)
+        trackers[batch_num] = tracker
+        if pbar is not None:
+            pbar.total += len(tiles)
+            pbar.refresh()
+
+        bounds = tiles_bounds(tiles.x, tiles.y, tiles.zoom)
+        for i in range(len(tiles)):
+            tile_file = Path(tiles.path(i))
+            tracker.inputs[tile_file.name] = fingerprint(tile_file, content_hash)
+            yield (tracker, tile_file, output_dir / f"{tile_file.stem}.tif",
+                   int(tiles.x[i]), int(tiles.y[i]), int(tiles.z[i]), tuple(bounds[i]))
+
+
+def georeference_batches(batches, progress_data, max_workers=MAX_WORKERS, incremental=False, content_hash=False):
+    """Georeference tiles dari semua batch dengan satu pool worker yang persistent
+
+    Tiles diumpankan terus-menerus lintas batch (tidak ada pool yang idle di ekor setiap
+    batch). Setiap batch punya counter sendiri dan ditandai selesai + merge-ready begitu
+    tile terakhirnya selesai. Progress JSON ditulis paling sering setiap
+    PROGRESS_SAVE_INTERVAL detik, dan sekali lagi di akhir.
 
-    save_progress(progress_data)
+    Args:
+        incremental: Buat ulang output yang tile-nya berubah (fingerprint di .deps.json),
+            lewati batch yang seluruhnya up-to-date
+        content_hash: Fingerprint memakai hash isi tile, bukan hanya mtime/size
 
-    # Print summary
-    print(f"✅ Batch {batch_num} selesai!")
-    print(f"   Sukses: {success_count} | Skipped: {skipped_count} | Gagal: {failed_count}")
-    print(f"   Output: {output_dir}")
+    Returns:
+        dict batch_num -> BatchTracker (batch yang dilewati tidak termasuk)
+    """
+    trackers = {}
+    up_to_date = []
+    pbar = tqdm(total=0, desc="Georeference", unit="tiles") if HAS_TQDM else None
+    work = iter_batch_tiles(batches, trackers, pbar, incremental, content_hash, up_to_date)
+    window = max_workers * QUEUE_PER_WORKER
+    remaining_batches = len(batches)
+    last_save = time.time()
+    QUEUE_DEPTH.set(remaining_batches, queue='georeference_batches')
 
-    if failed_list:
-        print(f"   ⚠️  {len(failed_list)} tiles gagal di-georeference")
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {}
+
+            def submit_next():
+                item = next(work, None)
+                if item is None:
+                    return False
+                tracker, tile_file, output_path, x, y, zoom, bounds = item
+                pending[executor.submit(georeference_tile, tile_file, output_path, x, y, zoom, bounds)] = tracker
+                return True
+
+            while len(pending) < window and submit_next():
+                pass
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tracker = pending.pop(future)
+                    if tracker.record(future.result()):
+                        finish_batch(tracker, progress_data)
+                        remaining_batches -= 1
+                        QUEUE_DEPTH.set(remaining_batches - len(up_to_date), queue='georeference_batches')
+                        if time.time() - last_save >= PROGRESS_SAVE_INTERVAL:
+                            save_progress(progress_data)
+                            last_save = time.time()
+                    if pbar is not None:
+                        pbar.update(1)
+                while len(pending) < window and submit_next():
+                    pass
+    finally:
+        if pbar is not None:
+            pbar.close()
+        save_progress(progress_data)
+        QUEUE_DEPTH.set(0, queue='georeference_batches')
+
+    if up_to_date:
+        print(f"✅ {len(up_to_date)} batch sudah up-to-date, dilewati")
+    return trackers
+
+
+def georeference_batch(batch_info, progress_data, max_workers=MAX_WORKERS):
+    """Georeference all tiles in a batch"""
+    return georeference_batches([batch_info], progress_data, max_workers)
 
 
 def main():
@@ -263,14 +378,36 @@ def main():
     parser.add_argument('--batch-range', help='Process batch range (e.g., 1-10)')
     parser.add_argument('--all', action='store_true', help='Process semua batch')
     parser.add_argument('--list', action='store_true', help='List available batches')
+    parser.add_argument('--job', help='Job spec (JSON): process semua batch tanpa prompt interaktif')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'Jumlah worker gdal_translate untuk semua batch (default: {MAX_WORKERS})')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Hanya georeference ulang tiles yang berubah sejak run terakhir (dan hapus output yatim)')
+    parser.add_argument('--content-hash', action='store_true',
+                        help='Incremental: bandingkan hash isi tile, bukan hanya mtime/size')
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
 
+    # Headless job spec: sama dengan --all (workdir job hanya berisi tiles job tersebut)
+    if args.job:
+        try:
+            job = load_job_spec(args.job)
+        except JobSpecError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"📄 Job spec: {job['name']}")
+        args.all = True
+
     print("=" * 60)
     print("   Batch Georeferencer")
     print("=" * 60)
     print()
 
+    setup_metrics(args, 'georeference')
+    setup_profile(args, 'georeference')
+
     # List available batches (fast mode - no tile counting)
     print("🔍 Scanning batches...", end='', flush=True)
     available_batches = list_available_batches(count_tiles=False)
@@ -294,6 +431,7 @@ def main():
 
     # Load progress
     progress = load_progress()
+    batches_by_num = {b['batch_num']: b for b in available_batches}
 
     # Determine which batches to process
     batches_to_process = []
@@ -303,7 +441,7 @@ def main():
         print(f"📥 Processing ALL {len(batches_to_process)} batches...")
 
     elif args.batch:
-        batch = next((b for b in available_batches if b['batch_num'] == args.batch), None)
+        batch = batches_by_num.get(args.batch)
         if batch:
             batches_to_process = [batch]
             print(f"📥 Processing Batch {args.batch}...")
@@ -366,7 +504,7 @@ def main():
         else:
             try:
                 batch_num = int(choice)
-                batch = next((b for b in available_batches if b['batch_num'] == batch_num), None)
+                batch = batches_by_num.get(batch_num)
                 if batch:
                     batches_to_process = [batch]
                 else:
@@ -380,20 +518,20 @@ def main():
         print("❌ Tidak ada batch untuk diproses")
         return
 
-    # Process batches
+    # Process batches - satu work queue untuk semua batch
     try:
-        for i, batch in enumerate(batches_to_process, 1):
-            print(f"\n{'='*60}")
-            print(f"Progress: {i}/{len(batches_to_process)} batches")
-            print(f"{'='*60}")
-
-            georeference_batch(batch, progress)
+        start_time = time.time()
+        print(f"\n🌍 Processing {len(batches_to_process)} batches dengan {args.workers} workers...")
+        trackers = georeference_batches(batches_to_process, progress, args.workers,
+                                        incremental=args.incremental, content_hash=args.content_hash)
 
         # Final summary
         print("\n" + "=" * 60)
         print("✅ GEOREFERENCE SELESAI!")
         print("=" * 60)
-        print(f"Total batches processed: {len(batches_to_process)}")
+        print(f"Total batches processed: {len(trackers)}")
+        print(f"Total tiles: {sum(t.total for t in trackers.values()):,} "
+              f"({time.time() - start_time:.1f}s)")
         print(f"Output directory: {GEOREF_DIR.absolute()}/")
         print()
 
@@ -10,9 +10,37 @@ Requirements:
 
 import os
 import sys
+import time
 import argparse
+import multiprocessing
 from pathlib import Path
-from osgeo import gdal, osr
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gdal_env import apply_gdal_config
+from gdal_progress import ProgressReporter
+from pipeline_metrics import BATCHES, BYTES, CONVERT_DURATION, QUEUE_DEPTH, add_metrics_arguments, setup_metrics
+from pipeline_profile import add_profile_arguments, setup_profile
+
+# GDAL Python bindings - opsional supaya build_creation_options bisa dipakai
+# merge_geotiff.py (gdal_translate command line) tanpa osgeo
+try:
+    from osgeo import gdal, osr
+    HAS_GDAL = True
+except ImportError:
+    HAS_GDAL = False
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+# Peak RSS (Linux/macOS)
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
 
 # Import untuk GUI file selection
 try:
@@ -25,6 +53,22 @@ except ImportError:
 # Default folder untuk file selection
 DEFAULT_FOLDER = r"D:\Ayah\sipukat\merged"
 
+# Format output: ECW butuh ERDAS ECW SDK, JP2 (OpenJPEG) tersedia di hampir semua build GDAL
+OUTPUT_FORMATS = {
+    'ECW': {'driver': 'ECW', 'extension': '.ecw'},
+    'JP2': {'driver': 'JP2OpenJPEG', 'extension': '.jp2'},
+}
+
+# Budget untuk parallel batch conversion (dibagi rata ke semua worker)
+MEMORY_BUDGET_FRACTION = 0.5  # Total GDAL cache semua worker = 50% RAM available
+DEFAULT_WORKER_CACHE_MB = 512  # Jika psutil tidak tersedia
+
+# Windowed encoding: JP2 di-encode per tile (BLOCKXSIZE x BLOCKYSIZE), sumber dibaca
+# per window GDAL_SWATH_SIZE dengan block cache terbatas - memory tidak tergantung ukuran mosaic
+JP2_BLOCK_SIZE = 1024  # Tile JPEG2000 (random access spasial)
+JP2_CODEBLOCK_SIZE = 64  # Codeblock (unit entropy coding)
+JP2_PROGRESSION = 'RPCL'  # Resolution-first: decode overview cepat tanpa baca full resolution
+
 
 def select_file_gui(initial_dir=None, multiple=False):
     """
@@ -52,7 +96,7 @@ def select_file_gui(initial_dir=None, multiple=False):
         initial_dir = os.path.expanduser("~")
 
     filetypes = [
-        ('GeoTIFF files', '*.tif *.tiff'),
+        ('GeoTIFF / VRT files', '*.tif *.tiff *.vrt'),
         ('All files', '*.*')
     ]
 
@@ -95,7 +139,7 @@ def select_file_console(folder_path, multiple=False):
 
     # Cari semua file TIFF di folder
     tiff_files = []
-    for ext in ['*.tif', '*.tiff', '*.TIF', '*.TIFF']:
+    for ext in ['*.tif', '*.tiff', '*.TIF', '*.TIFF', '*.vrt']:
         tiff_files.extend(Path(folder_path).glob(ext))
 
     tiff_files = sorted(tiff_files)
@@ -192,33 +236,111 @@ def select_files_interactive(folder_path=None, multiple=False, use_gui=True):
     return select_file_console(folder_path, multiple)
 
 
-def check_ecw_support():
+def check_ecw_support(output_format='ECW'):
     """
-    Cek apakah GDAL mendukung format ECW
-    Check if GDAL supports ECW format
+    Cek apakah GDAL mendukung format output (ECW atau JP2)
+    Check if GDAL supports the output format
     """
-    driver = gdal.GetDriverByName('ECW')
+    driver = gdal.GetDriverByName(OUTPUT_FORMATS[output_format]['driver'])
+    if driver is None and output_format == 'JP2':
+        print("ERROR: Driver JP2OpenJPEG tidak tersedia dalam instalasi GDAL Anda.")
+        return False
     if driver is None:
         print("ERROR: Driver ECW tidak tersedia dalam instalasi GDAL Anda.")
         print("ECW driver requires ERDAS ECW/JP2 SDK.")
         print("\nAlternatif format yang bisa digunakan:")
-        print("- JPEG2000 (.jp2) - kompresi tinggi, open source")
+        print("- JPEG2000 (.jp2) - kompresi tinggi, open source (--format JP2)")
         print("- GeoTIFF dengan kompresi (.tif) - JPEG, LZW, atau DEFLATE")
         return False
     return True
 
 
+def build_creation_options(output_format='ECW', compression_ratio=10, compression_type='JPEG2000',
+                           num_threads=None, block_size=JP2_BLOCK_SIZE, codeblock_size=JP2_CODEBLOCK_SIZE,
+                           resolutions=None):
+    """
+    Creation options untuk driver ECW atau JP2OpenJPEG
+
+    Parameters:
+    -----------
+    output_format : str
+        'ECW' atau 'JP2'
+    compression_ratio : int
+        Rasio kompresi target (10 = 10:1)
+    compression_type : str
+        Tipe kompresi ECW (tidak dipakai untuk JP2)
+    num_threads : int, optional
+        Jumlah thread encoder JP2 (default: ALL_CPUS)
+    block_size : int
+        Ukuran tile JP2 (pixels) - unit encoding dan random access
+    codeblock_size : int
+        Ukuran codeblock JP2 (pixels, pangkat 2, maks 64x64 untuk 4096 area)
+    resolutions : int, optional
+        Jumlah resolution level JP2 (default: otomatis dari ukuran tile)
+
+    Returns:
+    --------
+    list : Creation options
+    """
+    if output_format == 'JP2':
+        # QUALITY = persentase ukuran terhadap data uncompressed (10:1 = 10)
+        options = [
+            f'QUALITY={100.0 / compression_ratio:g}',
+            'REVERSIBLE=NO',
+            'YCC=YES',
+            f'NUM_THREADS={num_threads or "ALL_CPUS"}',
+            f'BLOCKXSIZE={block_size}',
+            f'BLOCKYSIZE={block_size}',
+            f'CODEBLOCK_WIDTH={codeblock_size}',
+            f'CODEBLOCK_HEIGHT={codeblock_size}',
+            f'PROGRESSION={JP2_PROGRESSION}',
+            'PLT=YES',  # Packet length markers: partial decode tanpa scan seluruh codestream
+        ]
+        if resolutions:
+            options.append(f'RESOLUTIONS={resolutions}')
+        return options
+
+    creation_options = [
+        f'TARGET={compression_ratio}',  # Rasio kompresi
+        f'ECW_FORMAT_VERSION=3',         # Versi ECW (2 atau 3)
+    ]
+
+    # Tambahan options
+    if compression_type:
+        creation_options.append(f'ECW_ENCODE_KEY={compression_type}')
+
+    return creation_options
+
+
+def peak_rss_mb():
+    """Peak resident memory process ini (MB), None jika tidak bisa diukur"""
+    if HAS_RESOURCE:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux: KB, macOS: bytes
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    if HAS_PSUTIL:
+        memory = psutil.Process().memory_info()
+        return getattr(memory, 'peak_wset', memory.rss) / (1024 * 1024)
+    return None
+
+
 def convert_geotiff_to_ecw(input_file, output_file=None, compression_ratio=10,
-                           compression_type='JPEG2000', resampling='AVERAGE'):
+                           compression_type='JPEG2000', resampling='AVERAGE',
+                           output_format='ECW', num_threads=None, verbose=True,
+                           cache_mb=None, window_mb=None, block_size=JP2_BLOCK_SIZE,
+                           codeblock_size=JP2_CODEBLOCK_SIZE, resolutions=None):
     """
-    Konversi file GeoTIFF ke ECW
+    Konversi file GeoTIFF ke ECW (atau JPEG2000)
+
+    Input juga bisa mosaic VRT (merged/mosaic.vrt): tiles dibaca dan di-encode dalam
+    satu pass, tanpa menulis GeoTIFF besar di antaranya.
 
     Parameters:
     -----------
     input_file : str
-        Path ke file GeoTIFF input
+        Path ke file GeoTIFF atau VRT input
     output_file : str, optional
-        Path ke file ECW output (default: sama dengan input dengan ekstensi .ecw)
+        Path ke file output (default: sama dengan input dengan ekstensi .ecw/.jp2)
     compression_ratio : int
         Rasio kompresi (1-100, default: 10)
         Nilai lebih tinggi = kompresi lebih besar = ukuran file lebih kecil
@@ -226,11 +348,24 @@ def convert_geotiff_to_ecw(input_file, output_file=None, compression_ratio=10,
         Tipe kompresi: 'JPEG2000' atau 'YUV' (default: 'JPEG2000')
     resampling : str
         Metode resampling: 'NEAREST', 'AVERAGE', 'BILINEAR', 'CUBIC' (default: 'AVERAGE')
+    output_format : str
+        'ECW' (ERDAS ECW SDK) atau 'JP2' (OpenJPEG)
+    num_threads : int, optional
+        Jumlah thread encoder (default: ALL_CPUS)
+    verbose : bool
+        Jika False, hanya error yang ditampilkan (untuk parallel batch)
+    cache_mb : int, optional
+        Batas GDAL block cache (MB) - untuk mosaic yang lebih besar dari RAM
+    window_mb : int, optional
+        Ukuran window baca sumber (GDAL_SWATH_SIZE, MB)
+    block_size, codeblock_size, resolutions :
+        Tile, codeblock dan resolution level JP2 (lihat build_creation_options)
 
     Returns:
     --------
     bool : True jika berhasil, False jika gagal
     """
+    log = print if verbose else (lambda *args, **kwargs: None)
 
     # Validasi input file
     if not os.path.exists(input_file):
@@ -239,21 +374,22 @@ def convert_geotiff_to_ecw(input_file, output_file=None, compression_ratio=10,
 
     # Set output file jika tidak ditentukan
     if output_file is None:
-        output_file = os.path.splitext(input_file)[0] + '.ecw'
-
-    print(f"\n{'='*60}")
-    print(f"Konversi GeoTIFF ke ECW")
-    print(f"{'='*60}")
-    print(f"Input  : {input_file}")
-    print(f"Output : {output_file}")
-    print(f"Rasio kompresi: {compression_ratio}:1")
-    print(f"Tipe kompresi : {compression_type}")
-    print(f"Resampling    : {resampling}")
-    print(f"{'='*60}\n")
+        output_file = os.path.splitext(input_file)[0] + OUTPUT_FORMATS[output_format]['extension']
+
+    log(f"\n{'='*60}")
+    log(f"Konversi GeoTIFF ke {output_format}")
+    log(f"{'='*60}")
+    log(f"Input  : {input_file}")
+    log(f"Output : {output_file}")
+    log(f"Rasio kompresi: {compression_ratio}:1")
+    if output_format == 'ECW':
+        log(f"Tipe kompresi : {compression_type}")
+    log(f"Resampling    : {resampling}")
+    log(f"{'='*60}\n")
 
     try:
         # Buka dataset input
-        print("Membuka file input...")
+        log("Membuka file input...")
         src_ds = gdal.Open(input_file, gdal.GA_ReadOnly)
         if src_ds is None:
             print(f"ERROR: Tidak dapat membuka file: {input_file}")
@@ -266,34 +402,49 @@ def convert_geotiff_to_ecw(input_file, output_file=None, compression_ratio=10,
         projection = src_ds.GetProjection()
         geotransform = src_ds.GetGeoTransform()
 
-        print(f"Dimensi: {cols} x {rows} pixels, {bands} bands")
-        print(f"Proyeksi: {projection[:50]}..." if len(projection) > 50 else f"Proyeksi: {projection}")
+        # VRT hanya berisi referensi: bandingkan dengan ukuran data uncompressed
+        pixel_bytes = gdal.GetDataTypeSize(src_ds.GetRasterBand(1).DataType) // 8
+        if input_file.lower().endswith('.vrt'):
+            input_size = cols * rows * bands * pixel_bytes / (1024 * 1024)  # MB
+        else:
+            input_size = os.path.getsize(input_file) / (1024 * 1024)  # MB
 
-        # Set options untuk ECW
-        creation_options = [
-            f'TARGET={compression_ratio}',  # Rasio kompresi
-            f'ECW_FORMAT_VERSION=3',         # Versi ECW (2 atau 3)
-        ]
+        log(f"Dimensi: {cols} x {rows} pixels, {bands} bands")
+        log(f"Proyeksi: {projection[:50]}..." if len(projection) > 50 else f"Proyeksi: {projection}")
+
+        # Set options untuk ECW/JP2
+        creation_options = build_creation_options(output_format, compression_ratio, compression_type,
+                                                  num_threads, block_size, codeblock_size, resolutions)
 
-        # Tambahan options
-        if compression_type:
-            creation_options.append(f'ECW_ENCODE_KEY={compression_type}')
+        # Memory terbatas: block cache dan window baca tidak tergantung ukuran mosaic
+        if cache_mb:
+            gdal.SetCacheMax(cache_mb * 1024 * 1024)
+        if window_mb:
+            gdal.SetConfigOption('GDAL_SWATH_SIZE', str(window_mb * 1024 * 1024))
 
-        print(f"\nMemulai konversi...")
-        print(f"Creation options: {creation_options}")
+        log(f"\nMemulai konversi...")
+        log(f"Creation options: {creation_options}")
+        log(f"GDAL cache: {gdal.GetCacheMax() // (1024 * 1024)} MB"
+            + (f" | Window: {window_mb} MB" if window_mb else ""))
 
-        # Translate ke ECW
+        # Progress (persen, MB/s, px/s, ETA): console jika verbose, selalu ke log JSONL
+        reporter = ProgressReporter('convert', os.path.basename(output_file), total_pixels=cols * rows,
+                                    total_bytes=cols * rows * bands * pixel_bytes, console=verbose)
+
+        # Translate ke ECW/JP2
         translate_options = gdal.TranslateOptions(
-            format='ECW',
+            format=OUTPUT_FORMATS[output_format]['driver'],
             creationOptions=creation_options,
-            resampleAlg=resampling
+            resampleAlg=resampling,
+            callback=reporter.gdal_callback()
         )
 
         # Lakukan konversi
         dst_ds = gdal.Translate(output_file, src_ds, options=translate_options)
 
         if dst_ds is None:
-            print("ERROR: Konversi gagal!")
+            reporter.finish(False)
+            print(f"ERROR: Konversi gagal: {input_file}")
             return False
 
         # Tutup dataset
@@ -302,31 +453,77 @@ def convert_geotiff_to_ecw(input_file, output_file=None, compression_ratio=10,
 
         # Cek hasil
         if os.path.exists(output_file):
-            input_size = os.path.getsize(input_file) / (1024 * 1024)  # MB
             output_size = os.path.getsize(output_file) / (1024 * 1024)  # MB
             compression_achieved = (1 - output_size / input_size) * 100
 
-            print(f"\n{'='*60}")
-            print("KONVERSI BERHASIL!")
-            print(f"{'='*60}")
-            print(f"Ukuran input  : {input_size:.2f} MB")
-            print(f"Ukuran output : {output_size:.2f} MB")
-            print(f"Kompresi      : {compression_achieved:.1f}%")
-            print(f"File output   : {output_file}")
-            print(f"{'='*60}\n")
+            log(f"\n{'='*60}")
+            log("KONVERSI BERHASIL!")
+            log(f"{'='*60}")
+            log(f"Ukuran input  : {input_size:.2f} MB")
+            log(f"Ukuran output : {output_size:.2f} MB")
+            log(f"Kompresi      : {compression_achieved:.1f}%")
+            peak_mb = peak_rss_mb()
+            reporter.finish(True, output_mb=round(output_size, 2), peak_rss_mb=peak_mb)
+            if peak_mb is not None:
+                log(f"Peak RSS      : {peak_mb:.0f} MB")
+            log(f"File output   : {output_file}")
+            log(f"{'='*60}\n")
             return True
         else:
-            print("ERROR: File output tidak ditemukan setelah konversi")
+            print(f"ERROR: File output tidak ditemukan setelah konversi: {output_file}")
             return False
 
     except Exception as e:
-        print(f"ERROR: Terjadi kesalahan saat konversi: {str(e)}")
+        print(f"ERROR: Terjadi kesalahan saat konversi {input_file}: {str(e)}")
         return False
 
 
-def batch_convert(input_dir, output_dir=None, pattern="*.tif", **kwargs):
+def worker_budget(workers):
+    """
+    Hitung jatah thread dan GDAL cache (MB) per worker
+
+    Total thread = jumlah CPU, total cache = MEMORY_BUDGET_FRACTION dari RAM available,
+    dibagi rata ke semua worker supaya N worker tidak masing-masing memakai semua core/RAM.
+    """
+    threads = max(1, multiprocessing.cpu_count() // workers)
+    if HAS_PSUTIL:
+        available_mb = psutil.virtual_memory().available / (1024 * 1024)
+        cache_mb = max(64, int(available_mb * MEMORY_BUDGET_FRACTION / workers))
+    else:
+        cache_mb = DEFAULT_WORKER_CACHE_MB
+    return threads, cache_mb
+
+
+def init_worker(cache_mb, num_threads):
+    """Initializer process pool: profil 'encode', lalu batasi GDAL cache dan thread per worker"""
+    apply_gdal_config(gdal, 'encode')
+    gdal.SetCacheMax(cache_mb * 1024 * 1024)
+    gdal.SetConfigOption('GDAL_NUM_THREADS', str(num_threads))
+
+
+def convert_worker(task):
+    """
+    Konversi satu file di worker process
+
+    Returns:
+    --------
+    tuple : (input_file, output_file, success, elapsed_seconds, peak_rss_mb)
+    """
+    input_file, output_file, kwargs = task
+    start_time = time.time()
+    success = convert_geotiff_to_ecw(input_file, output_file, verbose=False, **kwargs)
+    return input_file, output_file, success, time.time() - start_time, peak_rss_mb()
+
+
+def is_up_to_date(input_file, output_file):
+    """True jika output sudah ada dan lebih baru dari input"""
+    return (os.path.exists(output_file) and
+            os.path.getmtime(output_file) >= os.path.getmtime(input_file))
+
+
+def batch_convert(input_dir, output_dir=None, pattern="*.tif", workers=None, force=False, **kwargs):
     """
-    Konversi batch multiple GeoTIFF files ke ECW
+    Konversi batch multiple GeoTIFF files ke ECW/JP2 secara parallel
 
     Parameters:
     -----------
@@ -336,8 +533,16 @@ def batch_convert(input_dir, output_dir=None, pattern="*.tif", **kwargs):
         Directory output (default: sama dengan input_dir)
     pattern : str
         Pattern file untuk diproses (default: "*.tif")
+    workers : int, optional
+        Jumlah worker process (default: min(jumlah file, CPU count)), 1 = berurutan
+    force : bool
+        Konversi ulang walaupun output sudah lebih baru dari input
     **kwargs : dict
         Parameter tambahan untuk convert_geotiff_to_ecw
+
+    Returns:
+    --------
+    int : Jumlah file yang gagal
     """
 
     if output_dir is None:
@@ -352,32 +557,74 @@ def batch_convert(input_dir, output_dir=None, pattern="*.tif", **kwargs):
 
     if not files:
         print(f"Tidak ada file yang ditemukan dengan pattern: {pattern}")
-        return
-
-    print(f"\nDitemukan {len(files)} file untuk dikonversi")
+        return 0
+
+    extension = OUTPUT_FORMATS[kwargs.get('output_format', 'ECW')]['extension']
+    tasks = []
+    skipped_count = 0
+    for input_file in files:
+        output_file = os.path.join(output_dir, input_file.stem + extension)
+        if not force and is_up_to_date(str(input_file), output_file):
+            skipped_count += 1
+            continue
+        tasks.append((str(input_file), output_file, kwargs))
+
+    # File terbesar dulu supaya file kecil mengisi worker di akhir
+    tasks.sort(key=lambda task: os.path.getsize(task[0]), reverse=True)
+
+    if workers is None:
+        workers = min(len(tasks), multiprocessing.cpu_count()) or 1
+    num_threads, cache_mb = worker_budget(workers)
+
+    print(f"\nDitemukan {len(files)} file: {len(tasks)} dikonversi, {skipped_count} sudah up-to-date")
+    print(f"Worker: {workers} process | {num_threads} thread + {cache_mb} MB GDAL cache per worker")
     print(f"{'='*60}\n")
 
     success_count = 0
     failed_count = 0
+    peak_mb = 0
+    start_time = time.time()
+    output_format = kwargs.get('output_format', 'ECW')
+    QUEUE_DEPTH.set(len(tasks), queue='convert_files')
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(cache_mb, num_threads)) as executor:
+        futures = [
+            executor.submit(convert_worker, (input_file, output_file, {**task_kwargs, 'num_threads': num_threads}))
+            for input_file, output_file, task_kwargs in tasks
+        ]
 
-    for i, input_file in enumerate(files, 1):
-        print(f"\n[{i}/{len(files)}] Processing: {input_file.name}")
-
-        output_file = os.path.join(output_dir, input_file.stem + '.ecw')
-
-        if convert_geotiff_to_ecw(str(input_file), output_file, **kwargs):
-            success_count += 1
-        else:
-            failed_count += 1
+        for i, future in enumerate(as_completed(futures), 1):
+            input_file, output_file, success, elapsed, worker_peak_mb = future.result()
+            peak_mb = max(peak_mb, worker_peak_mb or 0)
+            # Metrics di-update di parent: worker process punya registry sendiri
+            QUEUE_DEPTH.set(len(tasks) - i, queue='convert_files')
+            BATCHES.inc(stage='convert', result='completed' if success else 'failed')
+            if success:
+                CONVERT_DURATION.observe(elapsed, format=output_format)
+                BYTES.inc(os.path.getsize(output_file), stage='convert')
+                success_count += 1
+                output_size = os.path.getsize(output_file) / (1024 * 1024)
+                print(f"[{i}/{len(tasks)}] OK    {os.path.basename(input_file)} -> "
+                      f"{os.path.basename(output_file)} ({output_size:.2f} MB, {elapsed:.1f}s)")
+            else:
+                failed_count += 1
+                print(f"[{i}/{len(tasks)}] GAGAL {os.path.basename(input_file)}")
 
     print(f"\n{'='*60}")
     print("BATCH CONVERSION SELESAI")
     print(f"{'='*60}")
     print(f"Berhasil: {success_count}")
     print(f"Gagal   : {failed_count}")
+    print(f"Dilewati: {skipped_count} (sudah up-to-date)")
     print(f"Total   : {len(files)}")
+    print(f"Waktu   : {time.time() - start_time:.1f} detik")
+    if peak_mb:
+        print(f"Peak RSS: {peak_mb:.0f} MB per worker (x{workers} worker)")
     print(f"{'='*60}\n")
 
+    return failed_count
+
 
 def main():
     """Main function"""
@@ -402,6 +649,9 @@ Contoh penggunaan:
   # Konversi single file
   python geotiff_to_ecw.py input.tif
 
+  # Langsung dari mosaic VRT (tanpa GeoTIFF besar di antaranya)
+  python geotiff_to_ecw.py merged/mosaic.vrt -o merged/merged_map.ecw
+
   # Konversi dengan output file spesifik
   python geotiff_to_ecw.py input.tif -o output.ecw
 
@@ -413,6 +663,9 @@ Contoh penggunaan:
 
   # Batch convert dengan pattern spesifik
   python geotiff_to_ecw.py -d ./data -p "*.tif" -c 15
+
+  # Batch convert parallel ke JPEG2000 (tanpa ECW SDK), 4 worker
+  python geotiff_to_ecw.py -d ./merged -p "merged_batch_*.tif" --format JP2 -w 4
         """
     )
 
@@ -427,12 +680,30 @@ Contoh penggunaan:
                        help='Disable GUI, gunakan console selection')
 
     # Argument untuk single file atau batch
-    parser.add_argument('input', nargs='?', help='File GeoTIFF input')
+    parser.add_argument('input', nargs='?', help='File GeoTIFF atau mosaic VRT input')
     parser.add_argument('-o', '--output', help='File ECW output')
     parser.add_argument('-d', '--directory', help='Directory input untuk batch conversion')
     parser.add_argument('-od', '--output-directory', help='Directory output untuk batch conversion')
     parser.add_argument('-p', '--pattern', default='*.tif',
                        help='Pattern file untuk batch conversion (default: *.tif)')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                       help='Worker process untuk batch conversion (default: CPU count, 1 = berurutan)')
+    parser.add_argument('--force', action='store_true',
+                       help='Batch: konversi ulang walaupun output sudah up-to-date')
+    parser.add_argument('--format', default='ECW', choices=list(OUTPUT_FORMATS),
+                       help='Format output: ECW (ERDAS ECW SDK) atau JP2 (OpenJPEG) (default: ECW)')
+
+    # Windowed encoding untuk mosaic yang lebih besar dari RAM
+    parser.add_argument('--cache-mb', type=int, default=None,
+                       help='Batas GDAL block cache (MB) selama encoding')
+    parser.add_argument('--window-mb', type=int, default=None,
+                       help='Ukuran window baca sumber (GDAL_SWATH_SIZE, MB)')
+    parser.add_argument('--block-size', type=int, default=JP2_BLOCK_SIZE,
+                       help=f'JP2: ukuran tile (default: {JP2_BLOCK_SIZE})')
+    parser.add_argument('--codeblock', type=int, default=JP2_CODEBLOCK_SIZE,
+                       help=f'JP2: ukuran codeblock (default: {JP2_CODEBLOCK_SIZE})')
+    parser.add_argument('--resolutions', type=int, default=None,
+                       help='JP2: jumlah resolution level (default: otomatis)')
 
     # Parameter konversi
     parser.add_argument('-c', '--compression', type=int, default=10,
@@ -443,22 +714,41 @@ Contoh penggunaan:
     parser.add_argument('-r', '--resampling', default='AVERAGE',
                        choices=['NEAREST', 'AVERAGE', 'BILINEAR', 'CUBIC'],
                        help='Metode resampling (default: AVERAGE)')
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
 
-    # Cek dukungan ECW
-    print("Mengecek dukungan ECW dalam GDAL...")
-    if not check_ecw_support():
-        print("\nMenggunakan alternatif: konversi ke JPEG2000 (.jp2)")
-        print("Untuk menggunakan script ini dengan format JP2, ubah output extension ke .jp2")
+    if not HAS_GDAL:
+        print("ERROR: GDAL Python bindings (osgeo) tidak ditemukan.")
+        print("Install GDAL untuk Python: pip install gdal (atau conda install gdal)")
+        return 1
+
+    # Cek dukungan ECW/JP2
+    print(f"Mengecek dukungan {args.format} dalam GDAL...")
+    if not check_ecw_support(args.format):
+        if args.format == 'ECW':
+            print("\nGunakan alternatif JPEG2000: --format JP2")
         return 1
 
+    extension = OUTPUT_FORMATS[args.format]['extension']
+    setup_metrics(args, 'convert')
+    setup_profile(args, 'convert')
+    apply_gdal_config(gdal, 'encode')  # --cache-mb/--window-mb tetap menang (dipasang per konversi)
+
     # Konversi kwargs
     kwargs = {
         'compression_ratio': args.compression,
         'compression_type': args.type,
-        'resampling': args.resampling
+        'resampling': args.resampling,
+        'output_format': args.format,
+        'window_mb': args.window_mb,
+        'block_size': args.block_size,
+        'codeblock_size': args.codeblock,
+        'resolutions': args.resolutions
     }
+    if args.cache_mb:
+        kwargs['cache_mb'] = args.cache_mb
 
     # Mode Interaktif
     if args.interactive:
@@ -523,9 +813,9 @@ Contoh penggunaan:
             if output_dir:
                 os.makedirs(output_dir, exist_ok=True)
                 output_file = os.path.join(output_dir,
-                                          os.path.splitext(os.path.basename(input_file))[0] + '.ecw')
+                                          os.path.splitext(os.path.basename(input_file))[0] + extension)
             else:
-                output_file = os.path.splitext(input_file)[0] + '.ecw'
+                output_file = os.path.splitext(input_file)[0] + extension
 
             if convert_geotiff_to_ecw(input_file, output_file, **kwargs):
                 success_count += 1
@@ -545,19 +835,24 @@ Contoh penggunaan:
 
     # Batch mode
     if args.directory:
-        batch_convert(
+        failed_count = batch_convert(
             args.directory,
             args.output_directory,
             args.pattern,
+            workers=args.workers,
+            force=args.force,
             **kwargs
         )
+        return 0 if failed_count == 0 else 1
     # Single file mode
     elif args.input:
-        success = convert_geotiff_to_ecw(
-            args.input,
-            args.output,
-            **kwargs
-        )
+        with CONVERT_DURATION.time(format=args.format):
+            success = convert_geotiff_to_ecw(
+                args.input,
+                args.output,
+                **kwargs
+            )
+        BATCHES.inc(stage='convert', result='completed' if success else 'failed')
         return 0 if success else 1
     else:
         parser.print_help()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Job Spec Loader
+Baca job spec (JSON) supaya semua script bisa jalan headless tanpa input()
+
+Contoh job spec:
+{
+    "name": "kecamatan_a_z21",
+    "workdir": "jobs/kecamatan_a_z21",
+    "aoi": {"x_start": 1728675, "x_end": 1729154, "y_start": 1051362, "y_end": 1052034},
+    "zoom": 21,
+    "variant": 2,
+    "downloader": "batch",
+    "concurrency": 20,
+    "pyramid_min_zoom": 16,
+    "stages": ["download", "georeference", "merge"],
+    "merge": {"mode": "parallel", "compress": false, "workers": null},
+    "output_format": "GTiff"
+}
+"""
+
+import json
+from pathlib import Path
+
+from tile_grid import CURVE_ORDERS, DEFAULT_CURVE
+
+# ============= KONFIGURASI =============
+STAGES = ('download', 'georeference', 'merge', 'convert')
+DOWNLOADERS = ('batch', 'async')
+MERGE_MODES = ('parallel', 'single-file', 'sequential')
+OUTPUT_FORMATS = ('GTiff', 'COG', 'ECW', 'JP2')
+
+DEFAULT_SPEC = {
+    'variant': 2,
+    'downloader': 'batch',
+    'concurrency': None,  # None = default dari masing-masing downloader
+    'batch_order': DEFAULT_CURVE,
+    'pyramid_min_zoom': None,  # Bangun zoom lebih rendah secara lokal setelah download
+    'stages': ['download', 'georeference', 'merge'],
+    'merge': {'mode': 'parallel', 'compress': False, 'workers': None,
+              'thread_budget': None, 'memory_budget_mb': None},
+    'output_format': 'GTiff',
+}
+
+
+class JobSpecError(ValueError):
+    """Job spec tidak valid"""
+
+
+def load_job_spec(spec_path):
+    """Load dan validasi job spec dari file JSON
+
+    Args:
+        spec_path: Path ke file job spec
+
+    Returns:
+        dict job spec lengkap dengan default values
+    """
+    spec_path = Path(spec_path)
+    try:
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise JobSpecError(f"Tidak bisa membaca job spec {spec_path}: {e}")
+
+    spec = dict(DEFAULT_SPEC)
+    spec.update(raw)
+    spec['merge'] = {**DEFAULT_SPEC['merge'], **raw.get('merge', {})}
+    spec.setdefault('name', spec_path.stem)
+    # workdir relatif dihitung dari folder job spec
+    workdir = Path(spec.get('workdir') or spec['name'])
+    if not workdir.is_absolute():
+        workdir = spec_path.absolute().parent / workdir
+    spec['workdir'] = str(workdir)
+    spec['spec_file'] = str(spec_path.absolute())
+
+    validate_job_spec(spec)
+    return spec
+
+
+def validate_job_spec(spec):
+    """Raise JobSpecError jika ada field yang tidak valid"""
+    aoi = spec.get('aoi')
+    if not isinstance(aoi, dict):
+        raise JobSpecError("Field 'aoi' wajib diisi (x_start, x_end, y_start, y_end)")
+
+    for key in ('x_start', 'x_end', 'y_start', 'y_end'):
+        if not isinstance(aoi.get(key), int):
+            raise JobSpecError(f"aoi.{key} harus berupa integer")
+    if aoi['x_end'] < aoi['x_start']:
+        raise JobSpecError("aoi.x_end harus >= aoi.x_start")
+    if aoi['y_end'] < aoi['y_start']:
+        raise JobSpecError("aoi.y_end harus >= aoi.y_start")
+
+    if not isinstance(spec.get('zoom'), int) or not 0 <= spec['zoom'] <= 22:
+        raise JobSpecError("Field 'zoom' harus integer 0-22")
+    if not isinstance(spec['variant'], int):
+        raise JobSpecError("Field 'variant' harus integer")
+    if spec['concurrency'] is not None and (not isinstance(spec['concurrency'], int) or spec['concurrency'] < 1):
+        raise JobSpecError("Field 'concurrency' harus integer >= 1")
+
+    pyramid_min_zoom = spec['pyramid_min_zoom']
+    if pyramid_min_zoom is not None and (not isinstance(pyramid_min_zoom, int) or not 0 <= pyramid_min_zoom < spec['zoom']):
+        raise JobSpecError("Field 'pyramid_min_zoom' harus integer 0 sampai zoom - 1")
+
+    if spec['downloader'] not in DOWNLOADERS:
+        raise JobSpecError(f"downloader harus salah satu dari: {', '.join(DOWNLOADERS)}")
+    if spec['batch_order'] not in CURVE_ORDERS:
+        raise JobSpecError(f"batch_order harus salah satu dari: {', '.join(CURVE_ORDERS)}")
+    if spec['merge']['mode'] not in MERGE_MODES:
+        raise JobSpecError(f"merge.mode harus salah satu dari: {', '.join(MERGE_MODES)}")
+    for key in ('workers', 'thread_budget', 'memory_budget_mb'):
+        value = spec['merge'][key]
+        if value is not None and (not isinstance(value, int) or value < 1):
+            raise JobSpecError(f"merge.{key} harus integer >= 1")
+    if spec['output_format'] not in OUTPUT_FORMATS:
+        raise JobSpecError(f"output_format harus salah satu dari: {', '.join(OUTPUT_FORMATS)}")
+
+    unknown = [stage for stage in spec['stages'] if stage not in STAGES]
+    if unknown:
+        raise JobSpecError(f"Stage tidak dikenal: {', '.join(unknown)}")
+
+
+def job_to_config(spec):
+    """Konversi job spec ke config dict yang dipakai downloader"""
+    aoi = spec['aoi']
+    return {
+        'x_start': aoi['x_start'],
+        'x_end': aoi['x_end'],
+        'y_start': aoi['y_start'],
+        'y_end': aoi['y_end'],
+        'zoom': spec['zoom'],
+        'variant': spec['variant'],
+    }
+
+
+def progress_matches_job(progress, spec):
+    """True jika progress file yang ada berasal dari job spec yang sama"""
+    if not progress or 'config' not in progress:
+        return False
+    config = progress['config']
+    return all(config.get(key) == value for key, value in job_to_config(spec).items())
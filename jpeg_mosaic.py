@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JPEG Passthrough Mosaic
+Tulis GeoTIFF tiled (256x256, COMPRESS=JPEG, EPSG:3857) dengan menyalin bitstream
+JPEG setiap tile BPN langsung ke slot tile TIFF yang sesuai - tanpa decode/encode.
+
+Tiles XYZ adalah grid Web Mercator, jadi satu tile sumber = tepat satu tile TIFF
+dan merge menjadi byte copy sekuensial. DQT/DHT yang sama di semua tiles disimpan
+sekali di tag JPEGTables. Hanya tiles yang header-nya tidak kompatibel (ukuran,
+progressive, grayscale, subsampling berbeda, bukan JPEG) yang di-decode dan
+di-encode ulang (butuh Pillow).
+
+Slot tanpa tile sumber menunjuk ke satu tile nodata (hitam) yang ditulis sekali, jadi
+output terbaca oleh libtiff/Pillow juga, bukan hanya GDAL. Tanpa Pillow tile nodata
+tidak bisa di-encode dan slot kosong ditulis sparse (hanya terbaca GDAL).
+
+Contoh:
+    python jpeg_mosaic.py tiles merged/passthrough.tif
+"""
+
+import io
+import os
+import sys
+import time
+import struct
+import argparse
+from array import array
+from pathlib import Path
+
+from gdal_progress import ProgressReporter
+from tile_catalog import TileCatalog
+from tile_grid import TILE_SIZE, geotransform_3857
+
+# Fix Windows terminal encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# ============= KONFIGURASI =============
+REENCODE_QUALITY = 90  # Quality untuk tiles yang harus di-encode ulang
+PROGRESS_EVERY = 1000  # Update progress setiap N tiles
+NODATA_COLOR = (0, 0, 0)  # Isi slot tanpa tile sumber (sama dengan tile sparse yang dibaca GDAL)
+
+# JPEG markers
+SOI, EOI, SOS, DQT, DHT, DRI, COM, APP14 = 0xD8, 0xD9, 0xDA, 0xDB, 0xC4, 0xDD, 0xFE, 0xEE
+PASSTHROUGH_SOF = (0xC0, 0xC1)  # Baseline / extended sequential Huffman (didukung libtiff)
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Subsampling luma (h, v) -> parameter subsampling Pillow untuk encode ulang
+SUBSAMPLING_PIL = {(1, 1): 0, (2, 1): 1, (2, 2): 2}
+
+# TIFF tags/types
+TIFF_SHORT, TIFF_LONG, TIFF_RATIONAL, TIFF_UNDEFINED, TIFF_DOUBLE, TIFF_LONG8 = 3, 4, 5, 7, 12, 16
+TYPE_FORMATS = {TIFF_SHORT: 'H', TIFF_LONG: 'I', TIFF_UNDEFINED: 'B', TIFF_DOUBLE: 'd', TIFF_LONG8: 'Q'}
+COMPRESSION_JPEG = 7
+PHOTOMETRIC_YCBCR = 6
+
+
+def parse_jpeg(data):
+    """Header JPEG: segments, SOF, ukuran, sampling. None jika bukan JPEG yang valid
+
+    Returns:
+        dict sof, width, height, components, sampling (list (h, v) per komponen),
+        adobe_transform, segments (list (marker, start, end)) dan scan (offset SOS)
+    """
+    if data[:2] != b'\xff\xd8':
+        return None
+    info = {'sof': None, 'adobe_transform': None, 'segments': [], 'scan': None}
+    pos = 2
+    size = len(data)
+    while pos + 4 <= size:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Fill byte
+            pos += 1
+            continue
+        length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+        end = pos + 2 + length
+        if end > size:
+            return None
+        if marker == SOS:
+            info['scan'] = pos
+            break
+        info['segments'].append((marker, pos, end))
+        if marker in SOF_MARKERS:
+            precision, height, width, count = struct.unpack('>BHHB', data[pos + 4:pos + 10])
+            components = [data[pos + 10 + 3 * i:pos + 13 + 3 * i] for i in range(count)]
+            info.update(sof=marker, precision=precision, width=width, height=height, components=count,
+                        component_ids=[c[0] for c in components],
+                        sampling=[(c[1] >> 4, c[1] & 0x0F) for c in components])
+        elif marker == APP14 and data[pos + 4:pos + 9] == b'Adobe' and length >= 12:
+            info['adobe_transform'] = data[pos + 15]
+        pos = end
+    if info['sof'] is None or info['scan'] is None:
+        return None
+    return info
+
+
+def luma_sampling(info):
+    """Subsampling (h, v) jika tile YCbCr 3 komponen dengan chroma 1x1, selain itu None"""
+    if info['components'] != 3 or info['component_ids'] == [ord('R'), ord('G'), ord('B')]:
+        return None
+    if info['adobe_transform'] == 0:  # Adobe: komponen RGB, bukan YCbCr
+        return None
+    if info['sampling'][1] != (1, 1) or info['sampling'][2] != (1, 1):
+        return None
+    return info['sampling'][0]
+
+
+def is_passthrough(info, subsampling):
+    """True jika bitstream tile bisa disalin apa adanya ke TIFF dengan subsampling ini"""
+    return (info is not None and info['sof'] in PASSTHROUGH_SOF and info['precision'] == 8
+            and info['width'] == TILE_SIZE and info['height'] == TILE_SIZE
+            and luma_sampling(info) == subsampling)
+
+
+def split_tables(data, info):
+    """Pisahkan DQT/DHT dari stream
+
+    APPn dan COM dibuang (metadata, tidak dibaca decoder TIFF).
+
+    Returns:
+        (tables, stream) - tables = bytes semua segment DQT/DHT, stream = SOI + segment
+        lain + scan data tanpa tables (abbreviated)
+    """
+    tables = []
+    parts = [b'\xff\xd8']
+    for marker, start, end in info['segments']:
+        if marker in (DQT, DHT):
+            tables.append(data[start:end])
+        elif not (0xE0 <= marker <= 0xEF or marker == COM):
+            parts.append(data[start:end])
+    parts.append(data[info['scan']:])
+    return b''.join(tables), b''.join(parts)
+
+
+def encode_tile(img, subsampling, quality=REENCODE_QUALITY, qtables=None):
+    """Encode image RGB 256x256 ke JPEG baseline YCbCr
+
+    qtables: Quantization tables (Image.quantization) - supaya DQT sama dengan JPEGTables
+    """
+    buffer = io.BytesIO()
+    if qtables:
+        img.save(buffer, 'JPEG', qtables=qtables, subsampling=SUBSAMPLING_PIL[subsampling])
+    else:
+        img.save(buffer, 'JPEG', quality=quality, subsampling=SUBSAMPLING_PIL[subsampling])
+    return buffer.getvalue()
+
+
+def reencode_tile(data, subsampling, quality=REENCODE_QUALITY, qtables=None):
+    """Decode tile (format apa pun yang dibaca Pillow) dan encode ke JPEG baseline 256x256 YCbCr"""
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert('RGB')
+        if img.size != (TILE_SIZE, TILE_SIZE):
+            img = img.resize((TILE_SIZE, TILE_SIZE), Image.BILINEAR)
+        return encode_tile(img, subsampling, quality, qtables)
+
+
+def nodata_tile(subsampling, quality=REENCODE_QUALITY, qtables=None):
+    """JPEG tile NODATA_COLOR untuk slot tanpa tile sumber (None tanpa Pillow)"""
+    if not HAS_PIL:
+        return None
+    return encode_tile(Image.new('RGB', (TILE_SIZE, TILE_SIZE), NODATA_COLOR), subsampling, quality, qtables)
+
+
+def _ifd_entry(tag, value_type, values):
+    """(tag, type, count, payload bytes)"""
+    if value_type == TIFF_RATIONAL:
+        payload = b''.join(struct.pack('<II', num, den) for num, den in values)
+        return tag, value_type, len(values), payload
+    if value_type == TIFF_UNDEFINED:
+        return tag, value_type, len(values), bytes(values)
+    if isinstance(values, array):
+        if sys.byteorder == 'big':
+            values = array(values.typecode, values)
+            values.byteswap()
+        return tag, value_type, len(values), values.tobytes()
+    return tag, value_type, len(values), struct.pack(f'<{len(values)}{TYPE_FORMATS[value_type]}', *values)
+
+
+class JpegTiffWriter:
+    """BigTIFF tiled JPEG, tiles ditulis sekuensial, IFD ditulis di akhir
+
+    Args:
+        path: File output
+        tiles_across, tiles_down: Ukuran grid tiles
+        geotransform: GDAL geotransform EPSG:3857 (pojok kiri atas grid)
+        subsampling: YCbCr subsampling luma (h, v) semua tiles
+    """
+
+    def __init__(self, path, tiles_across, tiles_down, geotransform, subsampling):
+        self.path = Path(path)
+        self.tiles_across = tiles_across
+        self.tiles_down = tiles_down
+        self.geotransform = geotransform
+        self.subsampling = subsampling
+        count = tiles_across * tiles_down
+        self.offsets = array('Q', bytes(8 * count))  # 0 = slot belum ditulis
+        self.byte_counts = array('I', bytes(4 * count))
+        self.file = open(self.path, 'wb')
+        # Header BigTIFF: II, 43, offset size 8, offset IFD pertama (di-patch saat close)
+        self.file.write(b'II' + struct.pack('<HHHQ', 43, 8, 0, 0))
+
+    def write_tile(self, col, row, stream):
+        index = row * self.tiles_across + col
+        self.offsets[index] = self.file.tell()
+        self.byte_counts[index] = len(stream)
+        self.file.write(stream)
+
+    def empty_slots(self):
+        return self.offsets.count(0)
+
+    def fill_empty(self, stream):
+        """Tulis stream sekali dan arahkan semua slot yang belum ditulis ke sana. Returns jumlah slot"""
+        offset = self.file.tell()
+        self.file.write(stream)
+        filled = 0
+        for index, value in enumerate(self.offsets):
+            if value == 0:
+                self.offsets[index] = offset
+                self.byte_counts[index] = len(stream)
+                filled += 1
+        return filled
+
+    def close(self, jpeg_tables=None):
+        """Tulis IFD (+ JPEGTables jika ada) dan tutup file"""
+        origin_x, resolution, _, origin_y, _, _ = self.geotransform
+        entries = [
+            _ifd_entry(256, TIFF_LONG, [self.tiles_across * TILE_SIZE]),
+            _ifd_entry(257, TIFF_LONG, [self.tiles_down * TILE_SIZE]),
+            _ifd_entry(258, TIFF_SHORT, [8, 8, 8]),
+            _ifd_entry(259, TIFF_SHORT, [COMPRESSION_JPEG]),
+            _ifd_entry(262, TIFF_SHORT, [PHOTOMETRIC_YCBCR]),
+            _ifd_entry(277, TIFF_SHORT, [3]),
+            _ifd_entry(284, TIFF_SHORT, [1]),
+            _ifd_entry(322, TIFF_LONG, [TILE_SIZE]),
+            _ifd_entry(323, TIFF_LONG, [TILE_SIZE]),
+            _ifd_entry(324, TIFF_LONG8, self.offsets),
+            _ifd_entry(325, TIFF_LONG, self.byte_counts),
+        ]
+        if jpeg_tables:
+            entries.append(_ifd_entry(347, TIFF_UNDEFINED, jpeg_tables))
+        entries += [
+            _ifd_entry(530, TIFF_SHORT, list(self.subsampling)),
+            _ifd_entry(532, TIFF_RATIONAL, [(0, 1), (255, 1), (128, 1), (255, 1), (128, 1), (255, 1)]),
+            _ifd_entry(33550, TIFF_DOUBLE, [resolution, resolution, 0.0]),
+            _ifd_entry(33922, TIFF_DOUBLE, [0.0, 0.0, 0.0, origin_x, origin_y, 0.0]),
+            # GeoKeys: ProjectedCS, PixelIsArea, EPSG:3857
+            _ifd_entry(34735, TIFF_SHORT, [1, 1, 0, 3, 1024, 0, 1, 1, 1025, 0, 1, 1, 3072, 0, 1, 3857]),
+        ]
+
+        # Nilai yang tidak muat 8 byte ditulis sebelum IFD (word aligned)
+        values = {}
+        for tag, _, _, payload in entries:
+            if len(payload) > 8:
+                if self.file.tell() % 2:
+                    self.file.write(b'\0')
+                values[tag] = self.file.tell()
+                self.file.write(payload)
+
+        if self.file.tell() % 2:
+            self.file.write(b'\0')
+        ifd_offset = self.file.tell()
+        ifd = [struct.pack('<Q', len(entries))]
+        for tag, value_type, count, payload in entries:
+            field = struct.pack('<Q', values[tag]) if tag in values else payload.ljust(8, b'\0')
+            ifd.append(struct.pack('<HHQ', tag, value_type, count) + field)
+        ifd.append(struct.pack('<Q', 0))
+        self.file.write(b''.join(ifd))
+
+        self.file.seek(8)
+        self.file.write(struct.pack('<Q', ifd_offset))
+        self.file.close()
+
+
+def find_tile_batches(tiles_dir, batch_filter=None):
+    """Katalog semua tiles JPEG di tiles_dir/tiles_batch_* (opsional hanya batch_filter)"""
+    catalogs = []
+    for batch_dir in sorted(Path(tiles_dir).glob("tiles_batch_*")):
+        if batch_dir.is_dir() and (not batch_filter or int(batch_dir.name.split('_')[-1]) in batch_filter):
+            catalogs.append(TileCatalog.scan(batch_dir, '.jpg'))
+    return TileCatalog.concat(catalogs)
+
+
+class TablesMismatch(Exception):
+    """Tile dengan DQT/DHT berbeda dari JPEGTables yang tidak bisa disamakan"""
+
+
+def detect_reference(tiles, sample_size=64):
+    """Tile referensi dari sample: subsampling mayoritas + tables tile pertama dengan subsampling itu
+
+    Returns:
+        (subsampling, tables, qtables) - tables/qtables None jika tidak ada tile yang kompatibel
+    """
+    samples = {}
+    step = max(1, len(tiles) // sample_size)
+    for i in range(0, len(tiles), step):
+        try:
+            with open(tiles.path(i), 'rb') as f:
+                data = f.read()
+        except OSError:
+            continue
+        info = parse_jpeg(data)
+        sampling = luma_sampling(info) if info and info['sof'] in PASSTHROUGH_SOF else None
+        if sampling in SUBSAMPLING_PIL and is_passthrough(info, sampling):
+            samples.setdefault(sampling, []).append(data)
+    if not samples:
+        return (2, 2), None, None
+
+    subsampling = max(samples, key=lambda sampling: len(samples[sampling]))
+    data = samples[subsampling][0]
+    tables = split_tables(data, parse_jpeg(data))[0]
+    qtables = None
+    if HAS_PIL:
+        with Image.open(io.BytesIO(data)) as img:
+            qtables = img.quantization
+    return subsampling, tables, qtables
+
+
+def write_mosaic(tiles, output_path, subsampling, shared, qtables, quality, verbose):
+    """Satu pass tulis mosaic. shared = JPEGTables (None = tables inline di setiap tile)
+
+    Tile yang tables-nya berbeda dari shared di-encode ulang dengan quantization
+    referensi; jika tetap berbeda, TablesMismatch (libtiff memakai ulang tables
+    terakhir yang dibaca, jadi tables inline merusak tiles abbreviated lain). Tile
+    nodata untuk slot kosong mengikuti aturan yang sama.
+    """
+    x_start, x_end, y_start, y_end = tiles.extent()
+    writer = JpegTiffWriter(output_path, x_end - x_start + 1, y_end - y_start + 1,
+                            geotransform_3857(x_start, y_start, tiles.zoom), subsampling)
+    reporter = ProgressReporter('passthrough', Path(output_path).name, console=verbose)
+    stats = {'tiles': len(tiles), 'copied': 0, 'reencoded': 0, 'failed': 0, 'nodata': 0, 'bytes': 0,
+             'subsampling': f"{subsampling[0]}x{subsampling[1]}", 'shared_tables': shared is not None}
+    start_time = time.time()
+    success = False
+
+    try:
+        for i in range(len(tiles)):
+            path = tiles.path(i)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError as e:
+                stats['failed'] += 1
+                if verbose:
+                    print(f"   ⚠️  {os.path.basename(path)}: {e}")
+                continue
+            stats['bytes'] += len(data)
+
+            info = parse_jpeg(data)
+            reencoded = False
+            if not is_passthrough(info, subsampling) or (shared and split_tables(data, info)[0] != shared):
+                if not HAS_PIL:
+                    if is_passthrough(info, subsampling):  # Hanya tables yang berbeda
+                        raise TablesMismatch(path)
+                    stats['failed'] += 1
+                    continue
+                try:
+                    data = reencode_tile(data, subsampling, quality, qtables if shared else None)
+                except Exception as e:
+                    stats['failed'] += 1
+                    if verbose:
+                        print(f"   ⚠️  {os.path.basename(path)}: tidak bisa di-decode ({e})")
+                    continue
+                info = parse_jpeg(data)
+                reencoded = True
+
+            tables, stream = split_tables(data, info)
+            if shared is None:
+                stream = data[:2] + tables + stream[2:]
+            elif tables != shared:
+                raise TablesMismatch(path)
+
+            stats['reencoded' if reencoded else 'copied'] += 1
+            writer.write_tile(int(tiles.x[i]) - x_start, int(tiles.y[i]) - y_start, stream)
+            if i % PROGRESS_EVERY == 0:
+                reporter.update(i / len(tiles))
+
+        if writer.empty_slots():
+            data = nodata_tile(subsampling, quality, qtables if shared else None)
+            if data is None:
+                if verbose:
+                    print(f"   ⚠️  {writer.empty_slots():,} slot tanpa tile ditulis sparse (Pillow tidak terinstall) "
+                          "- output hanya terbaca GDAL")
+            else:
+                tables, stream = split_tables(data, parse_jpeg(data))
+                if shared is None:
+                    stream = data[:2] + tables + stream[2:]
+                elif tables != shared:
+                    raise TablesMismatch('tile nodata')
+                stats['nodata'] = writer.fill_empty(stream)
+        success = True
+    finally:
+        writer.close(b'\xff\xd8' + shared + b'\xff\xd9' if shared else None)
+        if not success:
+            reporter.finish(False)
+
+    elapsed = time.time() - start_time
+    stats['elapsed_s'] = round(elapsed, 2)
+    stats['mb_per_s'] = round(stats['bytes'] / elapsed / (1024 * 1024), 1) if elapsed > 0 else None
+    reporter.finish(stats['failed'] == 0, **stats)
+    return stats
+
+
+def build_passthrough_mosaic(tiles, output_path, shared_tables=True, quality=REENCODE_QUALITY, verbose=True):
+    """Tulis mosaic JPEG-in-TIFF dari katalog tiles JPEG
+
+    Args:
+        tiles: TileCatalog tiles .jpg (satu zoom)
+        output_path: File GeoTIFF output
+        shared_tables: Simpan DQT/DHT bersama di JPEGTables (tiles lebih kecil)
+        quality: Quality JPEG untuk tiles yang di-encode ulang (tanpa shared tables)
+
+    Returns:
+        dict tiles, copied, reencoded, failed, nodata, bytes, elapsed_s, mb_per_s, subsampling, shared_tables
+    """
+    if not len(tiles):
+        raise ValueError("Katalog tiles kosong")
+    if min(tiles.z) != max(tiles.z):
+        raise ValueError("Tiles berisi lebih dari satu zoom level")
+    tiles = tiles.sorted_by_curve('row-major')  # Offset tiles naik sesuai urutan baris
+
+    subsampling, tables, qtables = detect_reference(tiles)
+    shared = tables if shared_tables else None
+    if shared:
+        try:
+            return write_mosaic(tiles, output_path, subsampling, shared, qtables, quality, verbose)
+        except TablesMismatch as e:
+            if verbose:
+                print(f"   ⚠️  Tables JPEG tidak seragam ({os.path.basename(str(e))}) - tulis ulang dengan tables per tile")
+    return write_mosaic(tiles, output_path, subsampling, None, None, quality, verbose)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JPEG passthrough mosaic (tiles JPEG -> GeoTIFF tanpa re-encode)')
+    parser.add_argument('tiles_dir', nargs='?', default='tiles', help='Folder berisi tiles_batch_* (default: tiles)')
+    parser.add_argument('output', nargs='?', default='merged/merged_passthrough.tif', help='GeoTIFF output')
+    parser.add_argument('--no-shared-tables', action='store_true', help='Simpan DQT/DHT di setiap tile')
+    parser.add_argument('--quality', type=int, default=REENCODE_QUALITY,
+                        help=f'Quality untuk tiles yang di-encode ulang (default: {REENCODE_QUALITY})')
+
+    args = parser.parse_args()
+
+    tiles = find_tile_batches(args.tiles_dir)
+    if not len(tiles):
+        print(f"❌ Tidak ada tiles di {args.tiles_dir}/tiles_batch_*")
+        return 1
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"📦 {len(tiles):,} tiles → {args.output}")
+    stats = build_passthrough_mosaic(tiles, args.output, not args.no_shared_tables, args.quality)
+    print(f"✅ Disalin: {stats['copied']:,} | Encode ulang: {stats['reencoded']:,} | Gagal: {stats['failed']:,} "
+          f"| Nodata: {stats['nodata']:,} | {stats['mb_per_s']} MB/s")
+    return 0 if stats['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,15 +8,26 @@ Merge semua georeferenced batches menjadi single GeoTIFF
 import os
 import sys
 import argparse
-import subprocess
 import math
 import multiprocessing
 import time
 import signal
 import json
+import threading
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from build_deps import DepsManifest, catalog_digest, fingerprint
+from gdal_env import gdal_command, gdal_env, gdal_version
+from gdal_progress import ProgressReporter, run_gdal_command, vrt_size
+from geotiff_to_ecw import OUTPUT_FORMATS as WAVELET_FORMATS, build_creation_options as wavelet_creation_options
+from job_spec import JobSpecError, load_job_spec
+from jpeg_mosaic import build_passthrough_mosaic, find_tile_batches
+from pipeline_metrics import BATCHES, BYTES, MERGE_DURATION, QUEUE_DEPTH, add_metrics_arguments, setup_metrics
+from pipeline_profile import add_profile_arguments, setup_profile
+from tile_catalog import TileCatalog
+from tile_grid import row_lat, tile_range_bounds
 
 try:
     import psutil
@@ -33,66 +44,45 @@ if sys.platform == 'win32':
 
 # ============= KONFIGURASI =============
 GEOREF_DIR = Path("georeferenced")
+GEOREF_PROGRESS_FILE = GEOREF_DIR / "georeference_progress.json"
+GEOREF_COMPLETE_MARKER = ".complete"  # Ditulis georeference_batch.py saat tile terakhir batch selesai
+GEOREF_INCOMPLETE_MARKER = ".incomplete"  # Batch sedang di-georeference
+TILES_DIR = Path("tiles")  # Tiles JPEG asli (untuk --passthrough)
 MERGED_DIR = Path("merged")
 OUTPUT_GEOTIFF = "merged_map.tif"
 WATCH_PROGRESS_FILE = MERGED_DIR / "watch_mode_progress.json"
+OUTPUT_FORMATS = ('GTiff', 'COG', 'ECW', 'JP2')  # COG = Cloud-Optimized GeoTIFF dengan internal overviews
+OUTPUT_EXTENSIONS = {'GTiff': '.tif', 'COG': '.tif', 'ECW': '.ecw', 'JP2': '.jp2'}
+DEFAULT_WAVELET_RATIO = 10  # Rasio kompresi target ECW/JP2
+OVERVIEW_RESAMPLING = ('NEAREST', 'AVERAGE', 'BILINEAR', 'CUBIC', 'LANCZOS', 'MODE')
+DEFAULT_BLOCK_SIZE = 512
+
+# Compression codecs untuk output merge
+# JPEG/WEBP lossy (cocok untuk tiles BPN yang memang JPEG), sisanya lossless
+CODECS = ('NONE', 'LZW', 'DEFLATE', 'ZSTD', 'JPEG', 'WEBP', 'LERC')
+DEFAULT_CODEC = 'LZW'  # Codec untuk --compress tanpa argumen (kompatibel dengan versi lama)
+DEFAULT_QUALITY = 85  # JPEG/WEBP quality
+DEFAULT_LEVEL = None  # DEFLATE/ZSTD level (None = default GDAL)
+BENCHMARK_DIR = MERGED_DIR / "codec_benchmark"
+
+# Resource budget untuk parallel merge (dibagi ke semua gdal_translate yang jalan bersamaan)
+MEMORY_BUDGET_FRACTION = 0.5  # Total GDAL_CACHEMAX semua merge = 50% RAM available
+DEFAULT_MEMORY_BUDGET_MB = 2048  # Jika psutil tidak tersedia
+CACHE_MB_PER_TILE = 0.25  # Tile 256x256 RGB ~ 192 KB + overhead block cache
+MIN_JOB_CACHE_MB = 128
+MAX_JOB_CACHE_MB = 4096
+
+# Incremental mosaic: merged_map.tif full-extent yang di-update in place
+TILE_SIZE = 256
+TILES_PROGRESS_FILE = TILES_DIR / "progress.json"
+INCREMENTAL_STATE_FILE = MERGED_DIR / "incremental_state.json"
+OVERVIEW_MIN_SIZE = 256  # Overview terakhir <= 256 px
+PARTIAL_REFRESH_MIN_GDAL = (3, 8)  # gdaladdo --partial-refresh-from-projwin
 
 # Global flag for graceful shutdown
 SHUTDOWN_REQUESTED = False
 
 
-def setup_gdal_env():
-    """Setup environment variables untuk GDAL commands dengan optimasi performance"""
-    env = os.environ.copy()
-
-    # Set GDAL paths
-    gdal_path = r"C:\Program Files\GDAL"
-    proj_lib_path = r"C:\Program Files\GDAL\projlib"
-    gdal_data_path = r"C:\Program Files\GDAL\gdal-data"
-
-    # Add GDAL to PATH if not already there
-    if gdal_path not in env.get('PATH', ''):
-        env['PATH'] = gdal_path + os.pathsep + env.get('PATH', '')
-
-    # Set PROJ_LIB
-    env['PROJ_LIB'] = proj_lib_path
-
-    # Set GDAL_DATA
-    env['GDAL_DATA'] = gdal_data_path
-
-    # ===== PERFORMANCE OPTIMIZATIONS =====
-    # Multi-threading: Use all available CPU cores
-    env['GDAL_NUM_THREADS'] = 'ALL_CPUS'
-
-    # Cache optimization: Dynamic cache sizing based on available RAM
-    # Default is 5%, we use 25% for maximum performance
-    if HAS_PSUTIL:
-        try:
-            # Get available memory and set cache to 25% of it
-            available_ram_mb = psutil.virtual_memory().available / (1024 * 1024)
-            cache_size_mb = int(available_ram_mb * 0.25)
-            # Cap at 4GB to avoid excessive memory usage
-            cache_size_mb = min(cache_size_mb, 4096)
-            # Minimum 512MB
-            cache_size_mb = max(cache_size_mb, 512)
-            env['GDAL_CACHEMAX'] = str(cache_size_mb)
-        except:
-            env['GDAL_CACHEMAX'] = '512'  # Fallback to 512MB
-    else:
-        env['GDAL_CACHEMAX'] = '512'  # 512MB if psutil not available
-
-    # Disable PAM (Persistent Auxiliary Metadata) for faster processing
-    env['GDAL_PAM_ENABLED'] = 'NO'
-
-    # Optimize VRT reading
-    env['VRT_SHARED_SOURCE'] = '0'
-
-    # TIFF optimization
-    env['GDAL_TIFF_INTERNAL_MASK'] = 'YES'
-
-    return env
-
-
 def get_unique_filename(base_dir: Path, base_name: str, extension: str = ".tif") -> Path:
     """Generate unique filename dengan increment number"""
     # Cek apakah file base sudah ada
@@ -117,20 +107,32 @@ def get_unique_filename(base_dir: Path, base_name: str, extension: str = ".tif")
             raise ValueError("Terlalu banyak file! Maksimal 9999 file.")
 
 
-def tile_to_lat_lon(x: int, y: int, zoom: int):
-    """Convert tile coordinates to lat/lon"""
-    n = 2.0 ** zoom
-    lon = x / n * 360.0 - 180.0
-    lat_rad = math.atan(math.sinh(math.pi * (1 - 2 * y / n)))
-    lat = math.degrees(lat_rad)
-    return lat, lon
+def georeferenced_batches_completed():
+    """Nomor batch completed di georeference_progress.json (output lama tanpa marker)"""
+    progress_file = GEOREF_DIR / GEOREF_PROGRESS_FILE.name
+    if not progress_file.exists():
+        return set()
+    try:
+        with open(progress_file, 'r') as f:
+            return set(json.load(f).get('completed_batches', []))
+    except (OSError, ValueError):
+        return set()
+
 
+def georeference_complete(batch_dir, batch_num, completed=None):
+    """True jika semua tiles batch sudah di-georeference (bukan batch yang sedang diproses)
 
-def get_tile_bounds(x: int, y: int, zoom: int):
-    """Get bounding box dari tile"""
-    lat_top, lon_left = tile_to_lat_lon(x, y, zoom)
-    lat_bottom, lon_right = tile_to_lat_lon(x + 1, y + 1, zoom)
-    return lon_left, lat_bottom, lon_right, lat_top
+    georeference_batch.py menulis marker .incomplete saat batch mulai dan menggantinya
+    dengan .complete saat tile terakhir selesai. Output lama tanpa marker memakai
+    completed_batches di progress JSON.
+    """
+    if (batch_dir / GEOREF_COMPLETE_MARKER).exists():
+        return True
+    if (batch_dir / GEOREF_INCOMPLETE_MARKER).exists():
+        return False
+    if completed is None:
+        completed = georeferenced_batches_completed()
+    return batch_num in completed
 
 
 def check_batch_ready(batch_num):
@@ -140,7 +142,7 @@ def check_batch_ready(batch_num):
         batch_num: Batch number to check
 
     Returns:
-        dict with 'ready' (bool), 'path' (Path), 'tiles_count' (int), 'tiles' (list)
+        dict with 'ready' (bool), 'path' (Path), 'tiles_count' (int), 'tiles' (TileCatalog)
         or None if not ready
     """
     batch_dir = GEOREF_DIR / f"georeferenced_batch_{batch_num:03d}"
@@ -148,26 +150,31 @@ def check_batch_ready(batch_num):
     if not batch_dir.exists() or not batch_dir.is_dir():
         return None
 
-    tile_files = list(batch_dir.glob("tile_*.tif"))
+    if not georeference_complete(batch_dir, batch_num):
+        return None
+
+    tiles = TileCatalog.scan(batch_dir, '.tif')
 
-    if not tile_files:
+    if not len(tiles):
         return None
 
     return {
         'ready': True,
         'batch_num': batch_num,
         'path': batch_dir,
-        'tiles_count': len(tile_files),
-        'tiles': tile_files
+        'tiles_count': len(tiles),
+        'tiles': tiles
     }
 
 
 def find_georeferenced_batches(batch_filter=None):
-    """Find all georeferenced batches"""
+    """Find all georeferenced batches (hanya yang sudah selesai di-georeference)"""
     if not GEOREF_DIR.exists():
         return []
 
+    completed = georeferenced_batches_completed()
     batches = []
+    incomplete = []
     for batch_dir in sorted(GEOREF_DIR.glob("georeferenced_batch_*")):
         if batch_dir.is_dir():
             batch_num = int(batch_dir.name.split('_')[-1])
@@ -176,80 +183,46 @@ def find_georeferenced_batches(batch_filter=None):
             if batch_filter and batch_num not in batch_filter:
                 continue
 
-            tile_files = list(batch_dir.glob("tile_*.tif"))
-            if tile_files:
+            if not georeference_complete(batch_dir, batch_num, completed):
+                incomplete.append(batch_num)
+                continue
+
+            tiles = TileCatalog.scan(batch_dir, '.tif')
+            if len(tiles):
                 batches.append({
                     'batch_num': batch_num,
                     'path': batch_dir,
-                    'tiles_count': len(tile_files),
-                    'tiles': tile_files
+                    'tiles_count': len(tiles),
+                    'tiles': tiles
                 })
 
+    if incomplete:
+        print(f"⏳ {len(incomplete)} batch belum selesai di-georeference, dilewati: "
+              f"{', '.join(str(n) for n in incomplete[:10])}{' ...' if len(incomplete) > 10 else ''}")
     return batches
 
 
-def parse_tile_info(tile_file):
-    """Parse tile information from filename - used for parallel processing"""
-    parts = tile_file.stem.split('_')
-    if len(parts) >= 4:
-        z = int(parts[1])
-        x = int(parts[2])
-        y = int(parts[3])
-        return tile_file, z, x, y
-    return tile_file, None, None, None
-
-
 def create_vrt(batches, output_vrt: Path, verbose=True):
-    """Create VRT from all batches with parallel metadata extraction"""
+    """Create VRT from all batches (koordinat dari katalog tiles, tanpa parsing per Path)"""
     if verbose:
         print(f"🔨 Membuat VRT dari {len(batches)} batches...")
 
-    # Collect all tiles from all batches first
-    all_tile_files = []
-    for batch in batches:
-        all_tile_files.extend(batch['tiles'])
+    # Gabungkan katalog semua batches (array z/x/y - path baru dibuat saat menulis tile list)
+    tiles = TileCatalog.concat([batch['tiles'] for batch in batches])
 
-    if not all_tile_files:
+    if not len(tiles):
         if verbose:
             print("❌ Tidak ada tiles ditemukan!")
         return False
 
+    zoom = tiles.zoom
     if verbose:
-        print(f"   Total tiles: {len(all_tile_files):,}")
-        print(f"   Parsing metadata...", end='', flush=True)
-
-    # Parse tile metadata in parallel for speed
-    all_tiles = []
-    x_coords = []
-    y_coords = []
-    zoom = None
-
-    # Use ThreadPoolExecutor for parallel metadata parsing
-    max_workers = min(8, multiprocessing.cpu_count())  # Limit to 8 threads for I/O
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        results = list(executor.map(parse_tile_info, all_tile_files))
-
-    # Collect parsed results
-    for tile_file, z, x, y in results:
-        all_tiles.append(tile_file)
-        if x is not None and y is not None:
-            x_coords.append(x)
-            y_coords.append(y)
-            if zoom is None and z is not None:
-                zoom = z
-
-    if verbose:
-        print(f" Done!")
-
-    if verbose:
+        print(f"   Total tiles: {len(tiles):,}")
         print(f"   Zoom: {zoom}")
 
-    # Calculate overall bounds
-    x_start, x_end = min(x_coords), max(x_coords)
-    y_start, y_end = min(y_coords), max(y_coords)
-
-    min_lon, min_lat, _, _ = get_tile_bounds(x_start, y_end, zoom)
-    _, _, max_lon, max_lat = get_tile_bounds(x_end, y_start, zoom)
+    # Urutkan sepanjang Hilbert curve supaya sama dengan urutan download/georeference
+    tiles = tiles.sorted_by_curve()
+    min_lon, min_lat, max_lon, max_lat = tiles.bounds()
 
     if verbose:
         print(f"   Bounding Box:")
@@ -258,25 +231,15 @@ def create_vrt(batches, output_vrt: Path, verbose=True):
 
     # Write tile list to file (to avoid Windows command line length limit)
     tile_list_file = output_vrt.parent / f"tile_list_{output_vrt.stem}.txt"
-    with open(tile_list_file, 'w') as f:
-        # Batch write - convert all paths at once and join with newlines
-        tile_paths = [str(tile).replace('\\', '/') for tile in all_tiles]
-        f.write('\n'.join(tile_paths) + '\n')
+    tiles.write_list(tile_list_file)
 
     if verbose:
         print(f"   Tile list: {tile_list_file}")
-        print(f"\n⚙️  Running GDAL BuildVRT...", end='', flush=True)
-
-    # Build VRT command
-    # Use full path on Windows for better compatibility
-    gdalbuildvrt_cmd = 'gdalbuildvrt'
-    if sys.platform == 'win32':
-        gdalbuildvrt_path = r"C:\Program Files\GDAL\gdalbuildvrt.exe"
-        if Path(gdalbuildvrt_path).exists():
-            gdalbuildvrt_cmd = gdalbuildvrt_path
+        print(f"\n⚙️  Running GDAL BuildVRT...", flush=True)
 
+    # Build VRT command (full path on Windows for better compatibility)
     vrt_cmd = [
-        gdalbuildvrt_cmd,
+        gdal_command('gdalbuildvrt'),
         '-resolution', 'highest',  # Fastest - no metadata averaging needed
         '-te', str(min_lon), str(min_lat), str(max_lon), str(max_lat),
         '-a_srs', 'EPSG:4326',
@@ -285,23 +248,19 @@ def create_vrt(batches, output_vrt: Path, verbose=True):
     ]
 
     try:
-        import time
-        start_time = time.time()
-
-        result = subprocess.run(vrt_cmd, capture_output=True, text=True, env=setup_gdal_env(), shell=False)
-
-        elapsed = time.time() - start_time
+        # Progress + durasi: console jika verbose, selalu ke log JSONL
+        reporter = ProgressReporter('buildvrt', output_vrt.name, console=verbose)
+        returncode, output = run_gdal_command(vrt_cmd, reporter, env=gdal_env('translate'))
+        reporter.finish(returncode == 0, tiles=len(tiles))
 
-        if result.returncode == 0:
+        if returncode == 0:
             if verbose:
-                print(f" Done! ({elapsed:.2f}s)")
                 print(f"✅ VRT berhasil dibuat: {output_vrt}\n")
             return True
         else:
             if verbose:
-                print(f" Failed!")
                 print(f"❌ Error membuat VRT:")
-                print(result.stderr)
+                print(output)
             return False
 
     except FileNotFoundError as e:
@@ -315,104 +274,291 @@ def create_vrt(batches, output_vrt: Path, verbose=True):
         return False
 
 
-def merge_to_geotiff(vrt_file: Path, output_tif: Path, verbose=True, compress=False):
+def resolve_codec(compress):
+    """Normalisasi nilai compress (bool lama atau nama codec) ke nama codec"""
+    if compress is True:
+        return DEFAULT_CODEC
+    if not compress:
+        return 'NONE'
+    codec = str(compress).upper()
+    if codec not in CODECS:
+        raise ValueError(f"Codec tidak dikenal: {compress} (pilih: {', '.join(CODECS)})")
+    return codec
+
+
+def codec_creation_options(compress, output_format='GTiff', quality=DEFAULT_QUALITY, level=DEFAULT_LEVEL,
+                           predictor=None):
+    """Creation options untuk codec, termasuk quality/level/predictor
+
+    - JPEG: PHOTOMETRIC=YCBCR (GTiff) - 2-3x lebih kecil dari JPEG RGB
+    - DEFLATE/ZSTD/LZW: PREDICTOR=2 (horizontal differencing) untuk imagery 8-bit jika
+      codec dipilih eksplisit atau predictor=True. --compress lama tanpa nilai
+      (compress=True) tetap COMPRESS=LZW saja, sama dengan output versi lama
+    - LERC: MAX_Z_ERROR=0 (lossless)
+    """
+    codec = resolve_codec(compress)
+    options = [f'COMPRESS={codec}']
+    if predictor is None:
+        predictor = compress is not True
+
+    if codec == 'JPEG':
+        options.append(f'QUALITY={quality}' if output_format == 'COG' else f'JPEG_QUALITY={quality}')
+        if output_format == 'GTiff':
+            # Driver COG otomatis memakai YCbCr untuk JPEG 3-band
+            options.append('PHOTOMETRIC=YCBCR')
+    elif codec == 'WEBP':
+        options.append(f'QUALITY={quality}' if output_format == 'COG' else f'WEBP_LEVEL={quality}')
+    elif codec in ('DEFLATE', 'ZSTD', 'LZW'):
+        # Driver COG memakai PREDICTOR=YES untuk horizontal differencing
+        if predictor:
+            options.append('PREDICTOR=YES' if output_format == 'COG' else 'PREDICTOR=2')
+        if level is not None and codec == 'DEFLATE':
+            options.append(f'LEVEL={level}' if output_format == 'COG' else f'ZLEVEL={level}')
+        elif level is not None and codec == 'ZSTD':
+            options.append(f'LEVEL={level}' if output_format == 'COG' else f'ZSTD_LEVEL={level}')
+    elif codec == 'LERC':
+        options.append('MAX_Z_ERROR=0')
+
+    return options
+
+
+def build_creation_options(compress=False, output_format='GTiff', block_size=DEFAULT_BLOCK_SIZE,
+                           overview_resampling='AVERAGE', quality=DEFAULT_QUALITY, level=DEFAULT_LEVEL,
+                           num_threads=None, predictor=None):
+    """Creation options (-co) untuk gdal_translate
+
+    GTiff: tiled BigTIFF tanpa overviews.
+    COG: driver COG membangun internal overviews langsung dari mosaic
+    (multi-threaded, tanpa pass gdaladdo terpisah).
+    num_threads: Jumlah thread encoder (None = ALL_CPUS)
+    predictor: Paksa PREDICTOR untuk LZW/DEFLATE/ZSTD (None = lihat codec_creation_options)
+    """
+    codec_options = codec_creation_options(compress, output_format, quality, level, predictor)
+    threads = str(num_threads) if num_threads else 'ALL_CPUS'
+
+    if output_format == 'COG':
+        options = [
+            *codec_options,
+            f'BLOCKSIZE={block_size}',
+            'BIGTIFF=YES',
+            f'NUM_THREADS={threads}',
+            'OVERVIEWS=AUTO',
+            f'RESAMPLING={overview_resampling}',
+        ]
+    else:
+        options = [
+            *codec_options,
+            'TILED=YES',                     # Tiled output for better performance
+            f'BLOCKXSIZE={block_size}',      # Optimized block size
+            f'BLOCKYSIZE={block_size}',      # Optimized block size
+            'BIGTIFF=YES',                   # Always use BigTIFF for safety
+            f'NUM_THREADS={threads}',        # Multi-threaded processing
+        ]
+
+    args = []
+    for option in options:
+        args.extend(['-co', option])
+    return args
+
+
+def vrt_source_count(vrt_file: Path):
+    """Jumlah file sumber VRT dari tile list create_vrt (None jika tidak ada)"""
+    file_list = vrt_file.parent / f"tile_list_{vrt_file.stem}.txt"
+    if not file_list.exists():
+        return None
+    with open(file_list, 'rb') as f:
+        return sum(1 for _ in f)
+
+
+def merge_to_geotiff(vrt_file: Path, output_tif: Path, verbose=True, compress=False,
+                     output_format='GTiff', block_size=DEFAULT_BLOCK_SIZE, overview_resampling='AVERAGE',
+                     quality=DEFAULT_QUALITY, level=DEFAULT_LEVEL, num_threads=None, cache_mb=None,
+                     compression_ratio=DEFAULT_WAVELET_RATIO, predictor=None):
     """Convert VRT ke GeoTIFF
 
     Args:
         vrt_file: Input VRT file
         output_tif: Output GeoTIFF file
         verbose: Show progress
-        compress: Use LZW compression (slower but smaller file, keeps CPU busy)
+        compress: Nama codec (lihat CODECS), True = LZW, False = tanpa kompresi
+        output_format: 'GTiff', 'COG' (Cloud-Optimized GeoTIFF dengan internal overviews),
+                       'ECW' atau 'JP2' (di-encode langsung dari VRT, tanpa GeoTIFF di antaranya)
+        block_size: Ukuran block/tile internal (pixels)
+        overview_resampling: Resampling untuk overviews (COG only)
+        quality: Quality JPEG/WEBP (1-100)
+        level: Compression level DEFLATE/ZSTD
+        num_threads: Jatah thread untuk job ini (None = ALL_CPUS)
+        cache_mb: Jatah GDAL_CACHEMAX untuk job ini (None = profil GDAL 'translate')
+        compression_ratio: Rasio kompresi target ECW/JP2
+        predictor: Paksa PREDICTOR untuk LZW/DEFLATE/ZSTD (None = hanya untuk codec eksplisit)
     """
     if not vrt_file.exists():
         if verbose:
             print(f"❌ VRT file tidak ditemukan: {vrt_file}")
         return False
 
-    if verbose:
+    if verbose and output_format in WAVELET_FORMATS:
+        print(f"🔨 Encoding {output_format} langsung dari VRT...")
+        print(f"   Output: {output_tif}")
+        print(f"   Rasio kompresi: {compression_ratio}:1")
+        print()
+    elif verbose:
         print(f"🔨 Merging ke GeoTIFF...")
         print(f"   Output: {output_tif}")
-        if compress:
-            print(f"   Compression: LZW (slower but smaller, max CPU usage)")
-        else:
+        codec = resolve_codec(compress)
+        if codec == 'NONE':
             print(f"   Compression: None (fastest)")
+        elif codec in ('JPEG', 'WEBP'):
+            print(f"   Compression: {codec} (lossy, quality {quality})")
+        else:
+            print(f"   Compression: {codec}" + (f" (level {level})" if level is not None else ""))
+        print(f"   Format: {output_format} | Block: {block_size}x{block_size}")
+        if output_format == 'COG':
+            print(f"   Overviews: internal, resampling {overview_resampling}")
         print()
 
-    # Use full path on Windows for better compatibility
-    gdal_translate_cmd = 'gdal_translate'
-    if sys.platform == 'win32':
-        gdal_translate_path = r"C:\Program Files\GDAL\gdal_translate.exe"
-        if Path(gdal_translate_path).exists():
-            gdal_translate_cmd = gdal_translate_path
-
     # ===== OPTIMIZED FOR SPEED OR SIZE =====
     # COMPRESS=NONE: 10-20x faster than LZW (larger file but much faster)
     # COMPRESS=LZW: Slower but 80% smaller file, keeps CPU at 100%
+    # COMPRESS=JPEG + YCBCR: paling kecil untuk imagery yang sumbernya JPEG
     # NUM_THREADS=ALL_CPUS: Use all CPU cores
     # BLOCKXSIZE/BLOCKYSIZE: Optimized for tile processing
     # BIGTIFF=YES: Always use BigTIFF for multi-batch processing
+    # COG: OVERVIEWS=AUTO dibangun dalam gdal_translate yang sama
+    # ECW/JP2: streaming satu pass dari VRT, tidak ada BigTIFF uncompressed di antaranya
+    if output_format in WAVELET_FORMATS:
+        creation_args = []
+        for option in wavelet_creation_options(output_format, compression_ratio, num_threads=num_threads):
+            creation_args.extend(['-co', option])
+        driver = WAVELET_FORMATS[output_format]['driver']
+    else:
+        creation_args = build_creation_options(compress, output_format, block_size, overview_resampling,
+                                               quality, level, num_threads, predictor)
+        driver = output_format
+
     translate_cmd = [
-        gdal_translate_cmd,
-        '-of', 'GTiff',
-        '-co', 'COMPRESS=LZW' if compress else 'COMPRESS=NONE',
-        '-co', 'TILED=YES',              # Tiled output for better performance
-        '-co', 'BLOCKXSIZE=512',         # Optimized block size
-        '-co', 'BLOCKYSIZE=512',         # Optimized block size
-        '-co', 'BIGTIFF=YES',            # Always use BigTIFF for safety
-        '-co', 'NUM_THREADS=ALL_CPUS',   # Multi-threaded processing
+        gdal_command('gdal_translate'),  # Full path on Windows for better compatibility
+        '-of', driver,
+        *creation_args,
         str(vrt_file),
         str(output_tif)
     ]
 
-    try:
-        # Run subprocess with/without verbose output
-        if verbose:
-            # Show progress with subprocess
-            process = subprocess.Popen(
-                translate_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                env=setup_gdal_env(),
-                shell=False
-            )
-
-            # Print output in real-time
-            for line in process.stdout:
-                if line.strip():
-                    print(f"   {line.strip()}")
-
-            process.wait()
-        else:
-            # Silent mode for parallel processing
-            process = subprocess.run(
-                translate_cmd,
-                capture_output=True,
-                text=True,
-                env=setup_gdal_env(),
-                shell=False
-            )
+    # Progress (persen, MB/s, px/s, ETA): console jika verbose, selalu ke log JSONL
+    size = vrt_size(vrt_file)
+    total_pixels = size[0] * size[1] if size else None
+    reporter = ProgressReporter('merge', output_tif.name, total_pixels=total_pixels,
+                                total_bytes=total_pixels * size[2] if size else None, console=verbose)
 
-        returncode = process.returncode if verbose else process.returncode
+    try:
+        env = gdal_env('translate', num_threads, cache_mb, sources=vrt_source_count(vrt_file))
+        returncode, output = run_gdal_command(translate_cmd, reporter, env=env)
+        reporter.finish(returncode == 0, threads=num_threads, cache_mb=cache_mb)
 
         if returncode == 0:
             if verbose:
                 file_size_mb = output_tif.stat().st_size / (1024 * 1024)
-                print(f"\n✅ GeoTIFF berhasil dibuat!")
+                print(f"\n✅ {'GeoTIFF' if output_format not in WAVELET_FORMATS else output_format} berhasil dibuat!")
                 print(f"   File: {output_tif}")
                 print(f"   Size: {file_size_mb:.2f} MB")
             return True
         else:
             if verbose:
                 print(f"❌ Error membuat GeoTIFF")
+                print(f"   {output.strip()}")
             return False
 
     except Exception as e:
+        reporter.finish(False, error=str(e))
         if verbose:
             print(f"❌ Error: {str(e)}")
         return False
 
 
+def default_memory_budget_mb():
+    """Total GDAL cache untuk semua merge bersamaan (MEMORY_BUDGET_FRACTION dari RAM available)"""
+    if HAS_PSUTIL:
+        try:
+            available_ram_mb = psutil.virtual_memory().available / (1024 * 1024)
+            return max(MIN_JOB_CACHE_MB, int(available_ram_mb * MEMORY_BUDGET_FRACTION))
+        except:
+            pass
+    return DEFAULT_MEMORY_BUDGET_MB
+
+
+class MergeScheduler:
+    """Bagi budget CPU threads dan GDAL cache ke merge yang jalan bersamaan
+
+    Tanpa scheduler, N proses masing-masing memakai NUM_THREADS=ALL_CPUS dan cache 25% RAM
+    (N x cores threads, N x 25% RAM). Dengan scheduler, total thread dan cache semua
+    gdal_translate tidak melebihi budget. Jatah setiap job sebanding jumlah tiles-nya,
+    dan dihitung dari sisa budget saat job dimulai - budget yang dilepas job yang
+    selesai langsung dipakai job berikutnya.
+    """
+
+    def __init__(self, thread_budget=None, memory_budget_mb=None):
+        self.thread_budget = thread_budget or multiprocessing.cpu_count()
+        self.memory_budget_mb = memory_budget_mb or default_memory_budget_mb()
+        self.free_threads = self.thread_budget
+        self.free_memory_mb = self.memory_budget_mb
+        self.running = 0
+        self.pending_jobs = 0
+        self.pending_tiles = 0
+        self.condition = threading.Condition()
+
+    def max_concurrent(self, max_workers=None):
+        """Jumlah merge bersamaan: minimal 1 thread dan MIN_JOB_CACHE_MB per job"""
+        limit = max(1, min(self.thread_budget, self.memory_budget_mb // MIN_JOB_CACHE_MB))
+        return min(limit, max_workers) if max_workers else limit
+
+    def register(self, tiles_counts):
+        """Daftarkan jobs yang akan dijalankan (untuk menghitung jatah relatif)"""
+        with self.condition:
+            self.pending_jobs += len(tiles_counts)
+            self.pending_tiles += sum(tiles_counts)
+
+    def _allocation(self, tiles_count):
+        """(threads, cache_mb) untuk job dengan tiles_count, atau None jika budget belum cukup"""
+        min_cache_mb = min(MIN_JOB_CACHE_MB, self.memory_budget_mb)
+        if self.free_threads < 1 or self.free_memory_mb < min_cache_mb:
+            return None
+
+        # Sisa budget dibagi ke job yang bisa mulai sekarang, dibobot jumlah tiles
+        pending_jobs = max(self.pending_jobs, 1)
+        pending_tiles = max(self.pending_tiles, tiles_count, 1)
+        slots = max(1, min(pending_jobs, self.max_concurrent() - self.running))
+        share = min(1.0, tiles_count * pending_jobs / (pending_tiles * slots))
+
+        threads = max(1, min(self.free_threads, int(self.free_threads * share)))
+        wanted_cache_mb = min(MAX_JOB_CACHE_MB, max(min_cache_mb, int(tiles_count * CACHE_MB_PER_TILE)))
+        cache_mb = max(min_cache_mb, min(wanted_cache_mb, int(self.free_memory_mb * share)))
+        return threads, cache_mb
+
+    def acquire(self, tiles_count):
+        """Tunggu sampai budget tersedia. Returns (threads, cache_mb)"""
+        with self.condition:
+            while True:
+                allocation = self._allocation(tiles_count)
+                if allocation:
+                    break
+                self.condition.wait()
+
+            threads, cache_mb = allocation
+            self.free_threads -= threads
+            self.free_memory_mb -= cache_mb
+            self.running += 1
+            self.pending_jobs = max(0, self.pending_jobs - 1)
+            self.pending_tiles = max(0, self.pending_tiles - tiles_count)
+        return threads, cache_mb
+
+    def release(self, threads, cache_mb):
+        with self.condition:
+            self.free_threads += threads
+            self.free_memory_mb += cache_mb
+            self.running -= 1
+            self.condition.notify_all()
+
+
 def process_single_batch(batch_info):
     """
     Process single batch ke GeoTIFF - untuk parallel processing
@@ -421,18 +567,28 @@ def process_single_batch(batch_info):
     batch = batch_info['batch']
     batch_num = batch['batch_num']
     output_dir = batch_info['output_dir']
+    compress = batch_info.get('compress', False)
+    merge_options = batch_info.get('merge_options') or {}
+    scheduler = batch_info.get('scheduler')
+
+    # Tunggu jatah threads/cache dari scheduler
+    threads, cache_mb = scheduler.acquire(batch['tiles_count']) if scheduler else (None, None)
+    start_time = time.time()
 
     try:
         # Create VRT untuk single batch
         vrt_file = output_dir / f"batch_{batch_num:03d}.vrt"
         output_tif = output_dir / f"merged_batch_{batch_num:03d}.tif"
+        batch_digest(batch)  # Fingerprint input sebelum merge, bukan sesudahnya
+        options = batch_output_options(compress, merge_options)
 
         # Create VRT (silent mode)
         if not create_vrt([batch], vrt_file, verbose=False):
             return (False, batch_num, None, "Failed to create VRT")
 
         # Merge to GeoTIFF (silent mode)
-        if not merge_to_geotiff(vrt_file, output_tif, verbose=False):
+        if not merge_to_geotiff(vrt_file, output_tif, verbose=False, compress=compress,
+                                num_threads=threads, cache_mb=cache_mb, **merge_options):
             return (False, batch_num, None, "Failed to merge to GeoTIFF")
 
         # Clean up VRT and tile list
@@ -443,35 +599,51 @@ def process_single_batch(batch_info):
         if tile_list.exists():
             tile_list.unlink()
 
+        record_batch_output(batch, output_tif, options)
+        MERGE_DURATION.observe(time.time() - start_time, mode='parallel')
+        BYTES.inc(output_tif.stat().st_size, stage='merge')
         return (True, batch_num, output_tif, None)
 
     except Exception as e:
         return (False, batch_num, None, str(e))
 
+    finally:
+        if scheduler:
+            scheduler.release(threads, cache_mb)
 
-def process_batches_parallel(batches, output_dir, max_workers=None):
+
+def process_batches_parallel(batches, output_dir, max_workers=None, compress=False, merge_options=None,
+                             thread_budget=None, memory_budget_mb=None):
     """
     Process multiple batches in parallel
-    max_workers: Number of parallel processes (default: CPU count for I/O-bound tasks)
+    max_workers: Batas merge bersamaan (default: dihitung MergeScheduler dari budget)
+    merge_options: output_format/block_size/overview_resampling untuk merge_to_geotiff
+    thread_budget: Total thread GDAL untuk semua merge (default: CPU count)
+    memory_budget_mb: Total GDAL_CACHEMAX untuk semua merge (default: 50% RAM available)
     """
-    if max_workers is None:
-        # Use all CPU cores for I/O-bound tasks (merge is I/O heavy)
-        # GDAL already uses threading internally, so we maximize parallelism at batch level
-        max_workers = multiprocessing.cpu_count()
+    scheduler = MergeScheduler(thread_budget, memory_budget_mb)
+    max_workers = scheduler.max_concurrent(max_workers)
+
+    print(f"🚀 Processing {len(batches)} batches in parallel (max {max_workers} workers)...")
+    print(f"   Budget: {scheduler.thread_budget} threads | {scheduler.memory_budget_mb:,} MB GDAL cache\n")
 
-    print(f"🚀 Processing {len(batches)} batches in parallel (max {max_workers} workers)...\n")
+    # Batch terbesar dulu: job kecil di akhir mengisi budget yang tersisa
+    batches = sorted(batches, key=lambda batch: batch['tiles_count'], reverse=True)
+    scheduler.register([batch['tiles_count'] for batch in batches])
 
     # Prepare batch info
     batch_infos = [
-        {'batch': batch, 'output_dir': output_dir}
+        {'batch': batch, 'output_dir': output_dir, 'compress': compress, 'merge_options': merge_options,
+         'scheduler': scheduler}
         for batch in batches
     ]
 
     results = []
     completed = 0
 
-    # Process in parallel
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+    # Process in parallel - worker threads hanya menunggu subprocess gdal_translate,
+    # jumlah thread encoder dibatasi scheduler
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
         # Submit all tasks
         futures = {
             executor.submit(process_single_batch, info): info['batch']['batch_num']
@@ -492,6 +664,7 @@ def process_batches_parallel(batches, output_dir, max_workers=None):
                     'error': error
                 })
 
+                BATCHES.inc(stage='merge', result='completed' if success else 'failed')
                 if success:
                     file_size_mb = output_file.stat().st_size / (1024 * 1024)
                     print(f"✅ [{completed}/{len(batches)}] Batch {b_num:03d} selesai - {file_size_mb:.2f} MB")
@@ -499,6 +672,7 @@ def process_batches_parallel(batches, output_dir, max_workers=None):
                     print(f"❌ [{completed}/{len(batches)}] Batch {b_num:03d} gagal: {error}")
 
             except Exception as e:
+                BATCHES.inc(stage='merge', result='failed')
                 print(f"❌ [{completed}/{len(batches)}] Batch {batch_num:03d} error: {str(e)}")
                 results.append({
                     'batch_num': batch_num,
@@ -511,12 +685,374 @@ def process_batches_parallel(batches, output_dir, max_workers=None):
     return results
 
 
-def merge_single_batch(batch_num, compress=False):
+_deps_lock = threading.Lock()
+_deps_manifests = {}
+
+
+def merge_deps(output_dir=MERGED_DIR):
+    """DepsManifest bersama (per folder output): merged_batch_NNN.tif -> digest tiles batch"""
+    with _deps_lock:
+        key = str(output_dir)
+        if key not in _deps_manifests:
+            _deps_manifests[key] = DepsManifest(output_dir)
+        return _deps_manifests[key]
+
+
+def batch_digest(batch):
+    """Digest tiles batch (nama, mtime, size), di-cache di dict batch"""
+    if 'digest' not in batch:
+        batch['digest'] = catalog_digest(batch['tiles'])
+    return batch['digest']
+
+
+def batch_output_options(compress=False, merge_options=None):
+    """Format + creation options output per batch (tanpa NUM_THREADS yang berbeda per job)"""
+    merge_options = merge_options or {}
+    output_format = merge_options.get('output_format', 'GTiff')
+    args = build_creation_options(compress, output_format, merge_options.get('block_size', DEFAULT_BLOCK_SIZE),
+                                  merge_options.get('overview_resampling', 'AVERAGE'),
+                                  merge_options.get('quality', DEFAULT_QUALITY),
+                                  merge_options.get('level', DEFAULT_LEVEL),
+                                  predictor=merge_options.get('predictor'))
+    return ' '.join([output_format] + [option for option in args[1::2] if not option.startswith('NUM_THREADS=')])
+
+
+def record_batch_output(batch, output_tif, options):
+    """Catat digest tiles + creation options yang dipakai membuat output batch"""
+    deps = merge_deps(output_tif.parent)
+    deps.record(output_tif, f"{batch_digest(batch)}|{options}")
+    deps.save()
+
+
+def batch_output_current(batch, options, output_dir=MERGED_DIR):
+    """True jika merged_batch_NNN.tif sudah ada dan dibuat dari tiles batch yang sama dengan options ini
+
+    Tile yang di-georeference ulang, ditambah atau dihapus mengubah digest batch; codec,
+    format atau block size lain mengubah options. Output tanpa catatan di .deps.json
+    (codec tidak diketahui) tidak dianggap current.
+    """
+    output_tif = output_dir / f"merged_batch_{batch['batch_num']:03d}.tif"
+    if not output_tif.exists():
+        return False
+    return merge_deps(output_dir).is_current(output_tif, f"{batch_digest(batch)}|{options}")
+
+
+def create_batch_outputs_vrt(batch_outputs, output_vrt: Path, tiles=None):
+    """VRT di atas merged_batch_NNN.tif (georeference sudah ada di setiap file)
+
+    tiles: TileCatalog tiles georeferenced batch lain yang masuk VRT langsung (tanpa
+    output per batch di antaranya)
+    """
+    file_list = output_vrt.parent / f"tile_list_{output_vrt.stem}.txt"
+    with open(file_list, 'w') as f:
+        for path in batch_outputs:
+            f.write(str(path).replace('\\', '/') + '\n')
+        for path in (tiles.iter_paths() if tiles is not None else ()):
+            f.write(path.replace('\\', '/') + '\n')
+
+    vrt_cmd = [
+        gdal_command('gdalbuildvrt'),
+        '-resolution', 'highest',
+        '-input_file_list', str(file_list),
+        str(output_vrt)
+    ]
+
+    success, error = run_gdal(vrt_cmd, label=output_vrt.name)
+    if not success:
+        print(f"❌ Error membuat VRT: {error}")
+    return success
+
+
+def merge_hierarchical(batches, output_tif: Path, compress=False, merge_options=None):
+    """Single-file merge yang memakai ulang output per batch
+
+    merged_batch_NNN.tif (hasil --parallel/--watch) dipakai jika dibuat dari tiles yang
+    sama dengan creation options yang sama (format, codec, block size - dicatat di
+    .deps.json). Tiles batch lain masuk mosaic VRT langsung, tanpa output per batch di
+    antaranya, lalu satu gdal_translate ke output_tif. Setiap output yang dipakai ulang
+    sudah berupa GeoTIFF tiled, jadi VRT membaca beberapa file besar menggantikan puluhan
+    ribu tile kecil. Tanpa output yang bisa dipakai ulang, sama dengan --flat.
+
+    Returns:
+        (success, vrt_file)
+    """
+    merge_options = merge_options or {}
+
+    options = batch_output_options(compress, merge_options)
+    batches = sorted(batches, key=lambda batch: batch['batch_num'])
+    reused = [batch for batch in batches if batch_output_current(batch, options)]
+    direct = [batch for batch in batches if not batch_output_current(batch, options)]
+    print(f"🧱 Hierarchical merge: {len(reused)} batch output dipakai ulang, "
+          f"{len(direct)} batch langsung dari tiles\n")
+
+    if not reused:
+        vrt_file = MERGED_DIR / "mosaic.vrt"
+        if not create_vrt(batches, vrt_file):
+            return False, None
+    else:
+        batch_outputs = [MERGED_DIR / f"merged_batch_{batch['batch_num']:03d}.tif" for batch in reused]
+        tiles = TileCatalog.concat([batch['tiles'] for batch in direct]).sorted_by_curve() if direct else None
+        vrt_file = MERGED_DIR / "mosaic_batches.vrt"
+
+        print(f"🔨 Membuat VRT dari {len(batch_outputs)} batch outputs"
+              + (f" + {len(tiles):,} tiles..." if tiles is not None else "..."))
+        if not create_batch_outputs_vrt(batch_outputs, vrt_file, tiles):
+            return False, None
+        print(f"✅ VRT berhasil dibuat: {vrt_file}\n")
+
+    return merge_to_geotiff(vrt_file, output_tif, compress=compress, **merge_options), vrt_file
+
+
+def mosaic_grid(config):
+    """Ukuran pixel dan bounds mosaic full-extent dari grid download (progress.json)
+
+    Lebar pixel tiles EPSG:4326 seragam, tinggi (derajat) berbeda per baris tile -
+    dipakai resolusi tertinggi (baris terjauh dari ekuator) seperti gdalbuildvrt -resolution highest.
+
+    Returns:
+        dict width, height, bounds (min_lon, min_lat, max_lon, max_lat)
+    """
+    zoom = config['zoom']
+    min_lon, min_lat, max_lon, max_lat = tile_range_bounds(
+        config['x_start'], config['x_end'], config['y_start'], config['y_end'], zoom)
+
+    # Baris terpendek (derajat) selalu baris tepi yang terjauh dari ekuator
+    tile_heights = [row_lat(y, zoom) - row_lat(y + 1, zoom) for y in (config['y_start'], config['y_end'])]
+    pixel_height = min(tile_heights) / TILE_SIZE
+
+    return {
+        'width': (config['x_end'] - config['x_start'] + 1) * TILE_SIZE,
+        'height': math.ceil((max_lat - min_lat) / pixel_height),
+        'bounds': (min_lon, min_lat, max_lon, max_lat),
+    }
+
+
+def overview_levels(width, height):
+    """Faktor overview 2, 4, 8, ... sampai sisi terpanjang <= OVERVIEW_MIN_SIZE"""
+    levels = []
+    factor = 2
+    while max(width, height) / factor >= OVERVIEW_MIN_SIZE:
+        levels.append(factor)
+        factor *= 2
+    return levels or [2]
+
+
+def run_gdal(cmd, env=None, label=None, console=False, stage='translate'):
+    """Jalankan command GDAL dengan progress ke log JSONL. Returns (success, output)
+
+    env: Environment subprocess (default: profil GDAL untuk stage)
+    """
+    reporter = ProgressReporter(Path(cmd[0]).stem, label or Path(cmd[-1]).name, console=console)
+    try:
+        returncode, output = run_gdal_command(cmd, reporter, env=env or gdal_env(stage))
+    except FileNotFoundError as e:
+        reporter.finish(False, error=str(e))
+        return False, f"GDAL tidak ditemukan: {e}"
+    reporter.finish(returncode == 0)
+    return returncode == 0, output.strip()
+
+
+def create_empty_mosaic(output_tif: Path, grid, compress=False, block_size=DEFAULT_BLOCK_SIZE,
+                        quality=DEFAULT_QUALITY, level=DEFAULT_LEVEL, predictor=None):
+    """Pre-allocate mosaic full-extent (sparse: block kosong tidak ditulis ke disk)"""
+    min_lon, min_lat, max_lon, max_lat = grid['bounds']
+    create_options = [
+        *codec_creation_options(compress, 'GTiff', quality, level, predictor),
+        'TILED=YES',
+        f'BLOCKXSIZE={block_size}',
+        f'BLOCKYSIZE={block_size}',
+        'BIGTIFF=YES',
+        'SPARSE_OK=TRUE',
+    ]
+    cmd = [
+        gdal_command('gdal_create'),
+        '-of', 'GTiff',
+        '-outsize', str(grid['width']), str(grid['height']),
+        '-bands', '3',
+        '-ot', 'Byte',
+        '-a_srs', 'EPSG:4326',
+        '-a_ullr', str(min_lon), str(max_lat), str(max_lon), str(min_lat),
+    ]
+    for option in create_options:
+        cmd.extend(['-co', option])
+    cmd.append(str(output_tif))
+    return run_gdal(cmd)
+
+
+def batch_region(batch_grid, zoom):
+    """Bounds geografis batch dari grid calculate_batches (min_lon, min_lat, max_lon, max_lat)"""
+    return tile_range_bounds(batch_grid['x_start'], batch_grid['x_end'],
+                             batch_grid['y_start'], batch_grid['y_end'], zoom)
+
+
+def load_incremental_state():
+    if INCREMENTAL_STATE_FILE.exists():
+        try:
+            with open(INCREMENTAL_STATE_FILE, 'r') as f:
+                return json.load(f)
+        except:
+            pass
+    return None
+
+
+def save_incremental_state(state):
+    MERGED_DIR.mkdir(parents=True, exist_ok=True)
+    state['last_update'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    tmp_file = INCREMENTAL_STATE_FILE.with_suffix('.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(state, f, indent=2)
+    tmp_file.replace(INCREMENTAL_STATE_FILE)
+
+
+def merge_incremental(batches, max_workers=None, compress=False, merge_options=None,
+                      thread_budget=None, memory_budget_mb=None):
+    """Update merged_map.tif in place dengan batch yang baru/berubah
+
+    Run pertama membuat mosaic full-extent kosong dari grid calculate_batches
+    (tiles/progress.json). Setiap run hanya batch yang merged_batch_NNN.tif-nya
+    baru/berubah yang ditulis ke region-nya (gdalwarp ke file yang sudah ada),
+    lalu overview di region tersebut di-refresh (GDAL 3.8+, versi lebih lama
+    membangun ulang semua overview). Waktu update sebanding data baru, bukan
+    seluruh peta.
+
+    Block terkompresi yang ditulis ulang dan lebih besar dari sebelumnya ditambahkan
+    di akhir file (ruang lama tidak dipakai lagi), jadi file bisa tumbuh jika batch
+    yang sama sering diganti - gdal_translate ke file baru untuk memadatkan.
+
+    Returns:
+        (success, output_tif)
+    """
+    from download_tiles_batch import calculate_batches
+    from tile_grid import LEGACY_CURVE
+
+    merge_options = merge_options or {}
+    if merge_options.get('output_format', 'GTiff') != 'GTiff':
+        print("❌ Incremental mode hanya untuk GTiff (COG tidak bisa di-update in place)")
+        return False, None
+
+    if not TILES_PROGRESS_FILE.exists():
+        print(f"❌ {TILES_PROGRESS_FILE} tidak ditemukan - grid download dibutuhkan untuk extent mosaic")
+        return False, None
+    with open(TILES_PROGRESS_FILE, 'r') as f:
+        config = json.load(f)['config']
+
+    grid_config = {key: config[key] for key in ('x_start', 'x_end', 'y_start', 'y_end', 'zoom')}
+    grid_plan = calculate_batches(config['x_start'], config['x_end'], config['y_start'], config['y_end'],
+                                  order=config.get('batch_order', LEGACY_CURVE))
+    output_tif = MERGED_DIR / OUTPUT_GEOTIFF
+
+    state = load_incremental_state()
+    if state and (state.get('grid') != grid_config or not output_tif.exists()):
+        print(f"⚠️  Grid/mosaic berubah sejak update terakhir, mosaic dibuat ulang")
+        state = None
+
+    unknown = [batch['batch_num'] for batch in batches if grid_plan.get(batch['batch_num']) is None]
+    if unknown:
+        print(f"❌ Batch di luar grid download: {', '.join(map(str, unknown))}")
+        return False, None
+
+    # 1. Pastikan output per batch ada dan up-to-date
+    options = batch_output_options(compress, merge_options)
+    stale = [batch for batch in batches if not batch_output_current(batch, options)]
+    if stale:
+        print(f"🧱 {len(stale)} batch perlu di-merge dulu\n")
+        results = process_batches_parallel(stale, MERGED_DIR, max_workers, compress=compress,
+                                           merge_options=merge_options, thread_budget=thread_budget,
+                                           memory_budget_mb=memory_budget_mb)
+        failed = [r['batch_num'] for r in results if not r['success']]
+        if failed:
+            print(f"⚠️  Batch gagal di-merge (dilewati): {', '.join(map(str, failed))}")
+            batches = [batch for batch in batches if batch['batch_num'] not in failed]
+
+    # 2. Pre-allocate mosaic full-extent (sekali)
+    grid = mosaic_grid(grid_config)
+    if state is None:
+        print(f"🗺️  Membuat mosaic full-extent {grid['width']:,} x {grid['height']:,} px "
+              f"({len(grid_plan)} batch grid)...")
+        if output_tif.exists():
+            output_tif.unlink()
+        success, error = create_empty_mosaic(output_tif, grid, compress,
+                                             merge_options.get('block_size', DEFAULT_BLOCK_SIZE),
+                                             merge_options.get('quality', DEFAULT_QUALITY),
+                                             merge_options.get('level', DEFAULT_LEVEL),
+                                             merge_options.get('predictor'))
+        if not success:
+            print(f"❌ Gagal membuat mosaic: {error}")
+            return False, None
+        state = {'output': output_tif.name, 'grid': grid_config, 'batches': {}, 'overviews': []}
+        save_incremental_state(state)
+
+    # 3. Tulis batch baru/berubah ke region-nya
+    changed = []
+    for batch in sorted(batches, key=lambda batch: batch['batch_num']):
+        batch_tif = MERGED_DIR / f"merged_batch_{batch['batch_num']:03d}.tif"
+        if state['batches'].get(str(batch['batch_num'])) != fingerprint(batch_tif):
+            changed.append((batch, batch_tif))
+
+    print(f"🔄 {len(changed)} batch baru/berubah, {len(batches) - len(changed)} tidak berubah\n")
+
+    written = []
+    for batch, batch_tif in changed:
+        warp_cmd = [
+            gdal_command('gdalwarp'),
+            '-r', 'near',
+            '-multi',
+            '-wo', 'NUM_THREADS=ALL_CPUS',
+            str(batch_tif),
+            str(output_tif),
+        ]
+        success, error = run_gdal(warp_cmd, label=batch_tif.name)
+        if not success:
+            print(f"❌ Batch {batch['batch_num']:03d} gagal ditulis: {error}")
+            continue
+
+        print(f"✅ Batch {batch['batch_num']:03d} ditulis ke mosaic")
+        written.append(batch['batch_num'])
+        state['batches'][str(batch['batch_num'])] = fingerprint(batch_tif)
+        save_incremental_state(state)
+
+    # 4. Refresh overview: full build sekali, setelah itu hanya region batch yang berubah
+    if written:
+        levels = overview_levels(grid['width'], grid['height'])
+        version = gdal_version()
+        partial = version is not None and version >= PARTIAL_REFRESH_MIN_GDAL
+        if state['overviews'] == levels and not partial:
+            print(f"⚠️  GDAL {'.'.join(map(str, version)) if version else '(versi tidak diketahui)'} belum mendukung "
+                  f"--partial-refresh-from-projwin (butuh {'.'.join(map(str, PARTIAL_REFRESH_MIN_GDAL))}+), "
+                  f"semua overview dibangun ulang")
+        if state['overviews'] != levels or not partial:
+            print(f"\n🔺 Membangun overviews {levels}...")
+            success, error = run_gdal([gdal_command('gdaladdo'), '-r', 'average', str(output_tif),
+                                       *map(str, levels)], label=output_tif.name, console=True, stage='overview')
+        else:
+            print(f"\n🔺 Refresh overviews untuk {len(written)} batch...")
+            success, error = True, None
+            for batch_num in written:
+                min_lon, min_lat, max_lon, max_lat = batch_region(grid_plan.batch(batch_num), grid_config['zoom'])
+                success, error = run_gdal([gdal_command('gdaladdo'), '-r', 'average',
+                                           '--partial-refresh-from-projwin',
+                                           str(min_lon), str(max_lat), str(max_lon), str(min_lat),
+                                           str(output_tif)], stage='overview')
+                if not success:
+                    break
+
+        if not success:
+            print(f"❌ Gagal membangun overviews: {error}")
+            return False, output_tif
+        state['overviews'] = levels
+        save_incremental_state(state)
+
+    return len(written) == len(changed), output_tif
+
+
+def merge_single_batch(batch_num, compress=False, merge_options=None, scheduler=None):
     """Merge a single batch to individual GeoTIFF file
 
     Args:
         batch_num: Batch number to merge
-        compress: Use LZW compression
+        compress: Nama codec (lihat CODECS), True = LZW
+        merge_options: output_format/block_size/overview_resampling untuk merge_to_geotiff
+        scheduler: MergeScheduler untuk jatah threads/cache (parallel watch mode)
 
     Returns:
         tuple: (success: bool, output_file: Path, error_message: str)
@@ -526,20 +1062,27 @@ def merge_single_batch(batch_num, compress=False):
     if not batch_info:
         return (False, None, f"Batch {batch_num} not ready or not found")
 
-    # Check if already merged
+    # Check if already merged dari tiles yang sama (tiles di-georeference ulang = merge ulang)
     output_file = MERGED_DIR / f"merged_batch_{batch_num:03d}.tif"
-    if output_file.exists():
-        return (True, output_file, "Already exists (skipped)")
+    options = batch_output_options(compress, merge_options)
+    if batch_output_current(batch_info, options):
+        return (True, output_file, "Up-to-date (skipped)")
+
+    threads, cache_mb = scheduler.acquire(batch_info['tiles_count']) if scheduler else (None, None)
+    start_time = time.time()
 
     try:
         # Create VRT for this batch
         vrt_file = MERGED_DIR / f"batch_{batch_num:03d}.vrt"
 
         if not create_vrt([batch_info], vrt_file, verbose=False):
+            BATCHES.inc(stage='merge', result='failed')
             return (False, None, "VRT creation failed")
 
         # Merge to GeoTIFF
-        if not merge_to_geotiff(vrt_file, output_file, verbose=False, compress=compress):
+        if not merge_to_geotiff(vrt_file, output_file, verbose=False, compress=compress,
+                                num_threads=threads, cache_mb=cache_mb, **(merge_options or {})):
+            BATCHES.inc(stage='merge', result='failed')
             return (False, None, "GeoTIFF conversion failed")
 
         # Clean up VRT and tile list
@@ -550,12 +1093,22 @@ def merge_single_batch(batch_num, compress=False):
         if tile_list.exists():
             tile_list.unlink()
 
+        record_batch_output(batch_info, output_file, options)
+        MERGE_DURATION.observe(time.time() - start_time, mode='watch')
+        BATCHES.inc(stage='merge', result='completed')
+        BYTES.inc(output_file.stat().st_size, stage='merge')
+
         file_size_mb = output_file.stat().st_size / (1024 * 1024)
         return (True, output_file, f"{file_size_mb:.1f} MB")
 
     except Exception as e:
+        BATCHES.inc(stage='merge', result='failed')
         return (False, None, str(e))
 
+    finally:
+        if scheduler:
+            scheduler.release(threads, cache_mb)
+
 
 def load_watch_progress():
     """Load watch mode progress from JSON file"""
@@ -580,6 +1133,7 @@ def save_watch_progress(progress_data):
     """Save watch mode progress to JSON file"""
     MERGED_DIR.mkdir(parents=True, exist_ok=True)
     progress_data['last_update'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    QUEUE_DEPTH.set(len(progress_data['waiting']), queue='merge_waiting')
 
     with open(WATCH_PROGRESS_FILE, 'w') as f:
         json.dump(progress_data, f, indent=2)
@@ -592,15 +1146,37 @@ def signal_handler(sig, frame):
     SHUTDOWN_REQUESTED = True
 
 
-def watch_and_merge(batch_list, check_interval=30, compress=False, parallel=False, max_workers=None):
+def register_batches(scheduler, batch_nums, options):
+    """Daftarkan jumlah tiles batch yang siap ke scheduler sebelum parallel merge
+
+    Batch yang output-nya sudah current dilewati merge_single_batch sebelum acquire(),
+    jadi tidak didaftarkan - pending yang tidak pernah diambil memperkecil jatah job lain.
+
+    Returns:
+        Jumlah batch yang didaftarkan
+    """
+    tiles_counts = []
+    for batch_num in batch_nums:
+        batch_info = check_batch_ready(batch_num)
+        if batch_info and not batch_output_current(batch_info, options):
+            tiles_counts.append(batch_info['tiles_count'])
+    scheduler.register(tiles_counts)
+    return len(tiles_counts)
+
+
+def watch_and_merge(batch_list, check_interval=30, compress=False, parallel=False, max_workers=None,
+                    merge_options=None, thread_budget=None, memory_budget_mb=None):
     """Watch for georeferenced batches and merge automatically
 
     Args:
         batch_list: List of batch numbers to watch and merge
         check_interval: Seconds between checks (default: 30)
-        compress: Use LZW compression
+        compress: Nama codec (lihat CODECS), True = LZW
+        merge_options: output_format/block_size/overview_resampling untuk merge_to_geotiff
         parallel: Merge multiple batches in parallel (default: False)
-        max_workers: Max parallel workers (default: CPU count)
+        max_workers: Max parallel workers (default: dihitung MergeScheduler dari budget)
+        thread_budget: Total thread GDAL untuk semua merge (default: CPU count)
+        memory_budget_mb: Total GDAL_CACHEMAX untuk semua merge (default: 50% RAM available)
 
     Returns:
         dict: Summary of merging results
@@ -611,8 +1187,10 @@ def watch_and_merge(batch_list, check_interval=30, compress=False, parallel=Fals
     signal.signal(signal.SIGINT, signal_handler)
 
     # Set max workers for parallel mode
-    if parallel and max_workers is None:
-        max_workers = multiprocessing.cpu_count()
+    scheduler = None
+    if parallel:
+        scheduler = MergeScheduler(thread_budget, memory_budget_mb)
+        max_workers = scheduler.max_concurrent(max_workers)
 
     print("=" * 60)
     if parallel:
@@ -667,10 +1245,11 @@ def watch_and_merge(batch_list, check_interval=30, compress=False, parallel=Fals
 
         if parallel and len(ready_batches) > 1:
             # PARALLEL MERGE
+            register_batches(scheduler, ready_batches, batch_output_options(compress, merge_options))
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
                 # Submit all merge tasks
                 future_to_batch = {
-                    executor.submit(merge_single_batch, batch_num, compress): batch_num
+                    executor.submit(merge_single_batch, batch_num, compress, merge_options, scheduler): batch_num
                     for batch_num in ready_batches
                     if not SHUTDOWN_REQUESTED
                 }
@@ -701,7 +1280,7 @@ def watch_and_merge(batch_list, check_interval=30, compress=False, parallel=Fals
                 if SHUTDOWN_REQUESTED:
                     break
 
-                success, output_file, message = merge_single_batch(batch_num, compress=compress)
+                success, output_file, message = merge_single_batch(batch_num, compress=compress, merge_options=merge_options)
                 if success:
                     print(f"✅ Merged batch {batch_num:03d} → {output_file.name} ({message})")
                     progress['merged'].append(batch_num)
@@ -740,9 +1319,10 @@ def watch_and_merge(batch_list, check_interval=30, compress=False, parallel=Fals
                     print(f"✅ New batches ready: {', '.join(map(str, newly_ready))}")
                     print(f"🔨 Merging {len(newly_ready)} batches in parallel...")
 
+                    register_batches(scheduler, newly_ready, batch_output_options(compress, merge_options))
                     with ThreadPoolExecutor(max_workers=max_workers) as executor:
                         future_to_batch = {
-                            executor.submit(merge_single_batch, batch_num, compress): batch_num
+                            executor.submit(merge_single_batch, batch_num, compress, merge_options, scheduler): batch_num
                             for batch_num in newly_ready
                             if not SHUTDOWN_REQUESTED
                         }
@@ -780,7 +1360,7 @@ def watch_and_merge(batch_list, check_interval=30, compress=False, parallel=Fals
                         print(f"✅ New batch ready: {batch_num:03d}")
                         print(f"🔨 Merging batch {batch_num:03d}...")
 
-                        success, output_file, message = merge_single_batch(batch_num, compress=compress)
+                        success, output_file, message = merge_single_batch(batch_num, compress=compress, merge_options=merge_options)
                         if success:
                             print(f"✅ Merged batch {batch_num:03d} → {output_file.name} ({message})")
                             progress['merged'].append(batch_num)
@@ -817,6 +1397,130 @@ def watch_and_merge(batch_list, check_interval=30, compress=False, parallel=Fals
     return progress
 
 
+def benchmark_codecs(batch, codecs=CODECS, output_format='GTiff', block_size=DEFAULT_BLOCK_SIZE,
+                     quality=DEFAULT_QUALITY, level=DEFAULT_LEVEL, keep_outputs=False):
+    """Benchmark ukuran file vs waktu encode untuk setiap codec pada satu sample batch
+
+    Args:
+        batch: Batch info dari find_georeferenced_batches()
+        codecs: List nama codec yang dibandingkan
+
+    Returns:
+        list dict hasil per codec (juga disimpan ke BENCHMARK_DIR/codec_benchmark.json)
+    """
+    BENCHMARK_DIR.mkdir(parents=True, exist_ok=True)
+    vrt_file = BENCHMARK_DIR / f"batch_{batch['batch_num']:03d}.vrt"
+
+    print(f"🧪 Codec benchmark: batch {batch['batch_num']:03d} ({batch['tiles_count']:,} tiles), format {output_format}")
+    if not create_vrt([batch], vrt_file, verbose=False):
+        print("❌ Gagal membuat VRT untuk benchmark")
+        return []
+
+    results = []
+    baseline_size = None
+    for codec in codecs:
+        output_tif = BENCHMARK_DIR / f"bench_{codec.lower()}.tif"
+        if output_tif.exists():
+            output_tif.unlink()
+
+        print(f"   {codec:8s} ...", end='', flush=True)
+        start_time = time.time()
+        success = merge_to_geotiff(vrt_file, output_tif, verbose=False, compress=codec,
+                                   output_format=output_format, block_size=block_size,
+                                   quality=quality, level=level)
+        elapsed = time.time() - start_time
+
+        if not success or not output_tif.exists():
+            print(" gagal (codec tidak didukung GDAL ini?)")
+            results.append({'codec': codec, 'success': False})
+            continue
+
+        size_bytes = output_tif.stat().st_size
+        if codec == 'NONE':
+            baseline_size = size_bytes
+        results.append({
+            'codec': codec,
+            'success': True,
+            'size_bytes': size_bytes,
+            'encode_seconds': round(elapsed, 2),
+        })
+        print(f" {size_bytes / (1024 * 1024):9.2f} MB  {elapsed:7.2f}s")
+
+        if not keep_outputs:
+            output_tif.unlink()
+
+    # Ringkasan: ratio terhadap NONE (jika ikut dibenchmark)
+    print()
+    print(f"   {'Codec':8s} {'Size (MB)':>10s} {'Ratio':>7s} {'Encode (s)':>11s} {'MB/s':>8s}")
+    for result in results:
+        if not result['success']:
+            continue
+        size_mb = result['size_bytes'] / (1024 * 1024)
+        ratio = f"{baseline_size / result['size_bytes']:.1f}x" if baseline_size else "-"
+        throughput = (baseline_size or result['size_bytes']) / (1024 * 1024) / max(result['encode_seconds'], 0.01)
+        result['ratio'] = round(baseline_size / result['size_bytes'], 2) if baseline_size else None
+        print(f"   {result['codec']:8s} {size_mb:10.2f} {ratio:>7s} {result['encode_seconds']:11.2f} {throughput:8.1f}")
+
+    report_file = BENCHMARK_DIR / "codec_benchmark.json"
+    with open(report_file, 'w') as f:
+        json.dump({
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'batch_num': batch['batch_num'],
+            'tiles_count': batch['tiles_count'],
+            'output_format': output_format,
+            'block_size': block_size,
+            'quality': quality,
+            'level': level,
+            'results': results,
+        }, f, indent=2)
+
+    if vrt_file.exists():
+        vrt_file.unlink()
+    tile_list = BENCHMARK_DIR / f"tile_list_{vrt_file.stem}.txt"
+    if tile_list.exists():
+        tile_list.unlink()
+
+    print(f"\n💾 Report: {report_file}")
+    return results
+
+
+def merge_passthrough(batch_filter=None, verbose=True):
+    """Mosaic JPEG passthrough langsung dari tiles asli (tanpa georeference dan tanpa decode)
+
+    Output GeoTIFF EPSG:3857 (grid asli tiles XYZ), COMPRESS=JPEG, tile 256x256.
+
+    Returns:
+        Path output, atau None jika gagal
+    """
+    tiles = find_tile_batches(TILES_DIR, batch_filter)
+    if not len(tiles):
+        if verbose:
+            print(f"❌ Tidak ada tiles JPEG di {TILES_DIR}/tiles_batch_*")
+        return None
+
+    MERGED_DIR.mkdir(parents=True, exist_ok=True)
+    output_tif = get_unique_filename(MERGED_DIR, "merged_passthrough")
+    if verbose:
+        print(f"📦 JPEG passthrough: {len(tiles):,} tiles → {output_tif}")
+
+    try:
+        stats = build_passthrough_mosaic(tiles, output_tif, verbose=verbose)
+    except (OSError, ValueError) as e:
+        if verbose:
+            print(f"❌ {e}")
+        return None
+
+    MERGE_DURATION.observe(stats['elapsed_s'], mode='passthrough')
+    BYTES.inc(output_tif.stat().st_size, stage='merge')
+    BATCHES.inc(stage='merge', result='completed' if stats['failed'] == 0 else 'failed')
+    if verbose:
+        print(f"\n✅ Disalin: {stats['copied']:,} | Encode ulang: {stats['reencoded']:,} | Gagal: {stats['failed']:,}")
+        print(f"   {stats['elapsed_s']}s | {stats['mb_per_s']} MB/s | subsampling {stats['subsampling']} | "
+              f"shared tables: {'ya' if stats['shared_tables'] else 'tidak'}")
+        print(f"   Size: {output_tif.stat().st_size / (1024 * 1024):.2f} MB")
+    return output_tif
+
+
 def write_merge_log(batches, output_file, log_file):
     """Write merge log"""
     with open(log_file, 'w') as f:
@@ -842,15 +1546,90 @@ def main():
     parser.add_argument('--batch-range', help='Batch range (e.g., 1-20)')
     parser.add_argument('--list', action='store_true', help='List available batches')
     parser.add_argument('--parallel', action='store_true', help='Process multiple batches in parallel (faster for multiple batches)')
-    parser.add_argument('--workers', type=int, default=None, help='Number of parallel workers (default: CPU count)')
-    parser.add_argument('--single-file', action='store_true', help='Merge all batches into single GeoTIFF (slower but one file)')
-    parser.add_argument('--compress', action='store_true', help='Use LZW compression (slower but smaller file, maximizes CPU usage)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Max parallel merges (default: dihitung dari --thread-budget/--memory-budget)')
+    parser.add_argument('--thread-budget', type=int, default=None,
+                        help='Parallel: total thread GDAL untuk semua merge bersamaan (default: CPU count)')
+    parser.add_argument('--memory-budget', type=int, default=None,
+                        help='Parallel: total GDAL cache (MB) untuk semua merge bersamaan (default: 50%% RAM available)')
+    parser.add_argument('--single-file', action='store_true',
+                        help='Merge all batches into single GeoTIFF (pakai ulang merged_batch_NNN.tif yang sudah ada)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Update merged_map.tif in place: hanya batch baru/berubah yang ditulis')
+    parser.add_argument('--passthrough', action='store_true',
+                        help='JPEG passthrough: salin bitstream tiles JPEG asli ke GeoTIFF EPSG:3857 tanpa re-encode')
+    parser.add_argument('--flat', action='store_true',
+                        help='Single-file: satu VRT langsung dari semua tiles (tanpa output per batch)')
+    parser.add_argument('--compress', nargs='?', const=True, default=None, type=str.upper, choices=CODECS,
+                        help=f'Compression codec (tanpa nilai = {DEFAULT_CODEC} seperti versi lama, tanpa predictor): '
+                             f'{", ".join(CODECS)}')
+    parser.add_argument('--predictor', action='store_true', default=None,
+                        help='PREDICTOR=2 untuk LZW/DEFLATE/ZSTD (otomatis jika codec dipilih dengan nama)')
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY,
+                        help=f'Quality JPEG/WEBP 1-100 (default: {DEFAULT_QUALITY})')
+    parser.add_argument('--level', type=int, default=DEFAULT_LEVEL, help='Compression level DEFLATE/ZSTD')
+    parser.add_argument('--benchmark-codecs', nargs='?', const=','.join(CODECS), default=None,
+                        help='Benchmark size vs encode time per codec pada batch pertama (e.g. JPEG,ZSTD,DEFLATE)')
     parser.add_argument('--watch', action='store_true', help='Watch mode: auto-merge batches as they become ready')
     parser.add_argument('--check-interval', type=int, default=30, help='Watch mode: seconds between checks (default: 30)')
     parser.add_argument('--resume', action='store_true', help='Resume previous watch mode session')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='GTiff',
+                        help='Output format: GTiff, COG (Cloud-Optimized GeoTIFF dengan internal overviews), '
+                             'ECW/JP2 (single-file, di-encode langsung dari mosaic VRT)')
+    parser.add_argument('--wavelet-ratio', type=int, default=DEFAULT_WAVELET_RATIO,
+                        help=f'Rasio kompresi target ECW/JP2 (default: {DEFAULT_WAVELET_RATIO})')
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE,
+                        help=f'Ukuran block internal dalam pixels (default: {DEFAULT_BLOCK_SIZE})')
+    parser.add_argument('--overview-resampling', choices=OVERVIEW_RESAMPLING, default='AVERAGE',
+                        help='Resampling untuk overviews COG (default: AVERAGE)')
+    parser.add_argument('--yes', '-y', action='store_true', help='Skip konfirmasi (untuk scheduler/cron)')
+    parser.add_argument('--job', help='Job spec (JSON): ambil opsi merge dari spec, tanpa konfirmasi')
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
 
+    # Headless job spec: opsi merge diambil dari spec
+    if args.job:
+        try:
+            job = load_job_spec(args.job)
+        except JobSpecError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        merge_options = job['merge']
+        args.parallel = merge_options['mode'] == 'parallel'
+        args.single_file = merge_options['mode'] == 'single-file'
+        args.compress = args.compress or merge_options['compress']
+        args.workers = args.workers or merge_options['workers']
+        args.thread_budget = args.thread_budget or merge_options['thread_budget']
+        args.memory_budget = args.memory_budget or merge_options['memory_budget_mb']
+        if job['output_format'] == 'COG' or (job['output_format'] in WAVELET_FORMATS and args.single_file):
+            args.format = job['output_format']
+        args.yes = True
+
+    merge_options = {
+        'output_format': args.format,
+        'block_size': args.block_size,
+        'overview_resampling': args.overview_resampling,
+        'quality': args.quality,
+        'level': args.level,
+        'predictor': args.predictor,
+    }
+    if args.format in WAVELET_FORMATS:
+        if args.parallel or args.watch or args.resume or args.incremental or args.benchmark_codecs:
+            print(f"❌ --format {args.format} hanya untuk single-file (streaming dari mosaic VRT)")
+            sys.exit(1)
+        merge_options = {'output_format': args.format, 'compression_ratio': args.wavelet_ratio}
+
+    try:
+        resolve_codec(args.compress)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    setup_metrics(args, 'merge')
+    setup_profile(args, 'merge')
+
     # WATCH MODE or RESUME
     if args.watch or args.resume:
         # Get batch list from args or progress file
@@ -886,7 +1665,10 @@ def main():
                         check_interval=args.check_interval,
                         compress=args.compress,
                         parallel=args.parallel,
-                        max_workers=args.workers)
+                        max_workers=args.workers,
+                        merge_options=merge_options,
+                        thread_budget=args.thread_budget,
+                        memory_budget_mb=args.memory_budget)
         return
 
     # NORMAL MODE: Continue with existing logic
@@ -908,6 +1690,18 @@ def main():
             print("❌ Invalid batch range format")
             return
 
+    # PASSTHROUGH MODE: langsung dari tiles JPEG asli, tidak butuh georeference
+    if args.passthrough:
+        if args.format != 'GTiff' or args.compress or args.parallel or args.incremental:
+            print("❌ --passthrough selalu GTiff JPEG (tidak bisa digabung dengan --format/--compress/--parallel/--incremental)")
+            return
+        start_time = datetime.now()
+        output_geotiff = merge_passthrough(batch_filter)
+        if output_geotiff:
+            elapsed = datetime.now() - start_time
+            print(f"\n⏱️  Waktu proses: {int(elapsed.total_seconds() // 60)} menit {int(elapsed.total_seconds() % 60)} detik")
+        return
+
     batches = find_georeferenced_batches(batch_filter)
 
     if not batches:
@@ -923,6 +1717,16 @@ def main():
         print()
         return
 
+    # Codec benchmark mode
+    if args.benchmark_codecs:
+        codecs = [codec.strip().upper() for codec in args.benchmark_codecs.split(',') if codec.strip()]
+        unknown = [codec for codec in codecs if codec not in CODECS]
+        if unknown:
+            print(f"❌ Codec tidak dikenal: {', '.join(unknown)}")
+            return
+        benchmark_codecs(batches[0], codecs, args.format, args.block_size, args.quality, args.level)
+        return
+
     # Show batches to merge
     print(f"📦 Batches to merge: {len(batches)}\n")
     total_tiles = 0
@@ -934,13 +1738,21 @@ def main():
 
     # Show processing mode
     cpu_count = multiprocessing.cpu_count()
-    if args.parallel and len(batches) > 1:
-        workers = args.workers if args.workers else cpu_count
-        print(f"\n⚡ Mode: PARALLEL processing ({workers} workers, {cpu_count} CPU cores)")
+    if args.incremental:
+        print(f"\n🔄 Mode: Incremental update")
+        print(f"   Hanya batch baru/berubah yang ditulis ke {MERGED_DIR / OUTPUT_GEOTIFF}")
+    elif args.parallel and len(batches) > 1:
+        scheduler = MergeScheduler(args.thread_budget, args.memory_budget)
+        workers = scheduler.max_concurrent(args.workers)
+        print(f"\n⚡ Mode: PARALLEL processing (max {workers} workers, {cpu_count} CPU cores)")
         print(f"   Setiap batch akan di-process terpisah secara parallel")
+        print(f"   Budget: {scheduler.thread_budget} threads | {scheduler.memory_budget_mb:,} MB GDAL cache")
         if HAS_PSUTIL:
             ram_gb = psutil.virtual_memory().total / (1024**3)
             print(f"   RAM: {ram_gb:.1f} GB available")
+    elif args.single_file and not args.flat:
+        print(f"\n📄 Mode: Single file output (hierarchical)")
+        print(f"   Output per batch dengan codec yang sama dipakai ulang, batch lain langsung dari tiles")
     elif args.single_file:
         print(f"\n📄 Mode: Single file output")
         print(f"   Semua batches akan di-merge jadi 1 GeoTIFF")
@@ -948,10 +1760,11 @@ def main():
         print(f"\n📄 Mode: Sequential processing")
         print(f"   Processing batch satu per satu")
 
-    confirm = input("\n✅ Lanjutkan merge? (y/n): ").strip().lower()
-    if confirm not in ['y', 'yes']:
-        print("❌ Merge dibatalkan")
-        return
+    if not args.yes:
+        confirm = input("\n✅ Lanjutkan merge? (y/n): ").strip().lower()
+        if confirm not in ['y', 'yes']:
+            print("❌ Merge dibatalkan")
+            return
 
     print()
 
@@ -960,9 +1773,31 @@ def main():
 
     start_time = datetime.now()
 
+    # INCREMENTAL MODE: Update mosaic full-extent in place
+    if args.incremental:
+        success, output_geotiff = merge_incremental(batches, args.workers, compress=args.compress,
+                                                    merge_options=merge_options,
+                                                    thread_budget=args.thread_budget,
+                                                    memory_budget_mb=args.memory_budget)
+        if success:
+            MERGE_DURATION.observe((datetime.now() - start_time).total_seconds(), mode='incremental')
+        print("\n" + "=" * 60)
+        if success:
+            print("✅ INCREMENTAL UPDATE SELESAI!")
+        else:
+            print("⚠️  INCREMENTAL UPDATE SELESAI DENGAN ERROR")
+        print("=" * 60)
+        if output_geotiff:
+            print(f"\nFile output:")
+            print(f"  - GeoTIFF: {output_geotiff}")
+            print(f"  - State: {INCREMENTAL_STATE_FILE}")
+
     # PARALLEL MODE: Process batches in parallel
-    if args.parallel and len(batches) > 1:
-        results = process_batches_parallel(batches, MERGED_DIR, args.workers)
+    elif args.parallel and len(batches) > 1:
+        results = process_batches_parallel(batches, MERGED_DIR, args.workers,
+                                           compress=args.compress, merge_options=merge_options,
+                                           thread_budget=args.thread_budget,
+                                           memory_budget_mb=args.memory_budget)
 
         # Summary
         successful = [r for r in results if r['success']]
@@ -986,19 +1821,29 @@ def main():
 
     # SINGLE FILE MODE: Merge all to one GeoTIFF
     else:
-        # Create VRT
-        vrt_file = MERGED_DIR / "mosaic.vrt"
-        if not create_vrt(batches, vrt_file):
-            return
-
         # Generate unique output filename
         base_name = OUTPUT_GEOTIFF.replace(".tif", "").replace(".TIF", "")
-        output_geotiff = get_unique_filename(MERGED_DIR, base_name, ".tif")
+        output_geotiff = get_unique_filename(MERGED_DIR, base_name, OUTPUT_EXTENSIONS[args.format])
+
+        if args.single_file and not args.flat and args.format not in WAVELET_FORMATS:
+            # Hierarchical: output per batch yang cocok dipakai ulang, batch lain langsung dari tiles
+            print(f"📁 Output file: {output_geotiff.name}\n")
+            success, vrt_file = merge_hierarchical(batches, output_geotiff, compress=args.compress,
+                                                   merge_options=merge_options)
+        else:
+            # Create VRT
+            vrt_file = MERGED_DIR / "mosaic.vrt"
+            if not create_vrt(batches, vrt_file):
+                return
+
+            print(f"📁 Output file: {output_geotiff.name}\n")
 
-        print(f"📁 Output file: {output_geotiff.name}\n")
+            # Merge to GeoTIFF with optional compression
+            success = merge_to_geotiff(vrt_file, output_geotiff, compress=args.compress, **merge_options)
 
-        # Merge to GeoTIFF with optional compression
-        if merge_to_geotiff(vrt_file, output_geotiff, compress=args.compress):
+        if success:
+            MERGE_DURATION.observe((datetime.now() - start_time).total_seconds(), mode='single-file')
+            BYTES.inc(output_geotiff.stat().st_size, stage='merge')
             # Write log
             log_file = MERGED_DIR / f"merge_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
             write_merge_log(batches, output_geotiff, log_file)
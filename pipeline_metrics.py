@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline Metrics
+Counters, gauges dan histograms untuk semua stage (download, georeference, merge,
+convert) dalam format Prometheus text 0.0.4 - ditulis ke textfile (node_exporter
+textfile collector) dan/atau di-serve di endpoint HTTP lokal (OpenMetrics jika
+scraper memintanya lewat header Accept)
+
+Throughput (tiles/s, bytes/s) dihitung dari counter: rate(sipukat_tiles_total[5m])
+Latency percentiles dari histogram: histogram_quantile(0.99, rate(..._bucket[5m]))
+"""
+
+import os
+import time
+import atexit
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ============= KONFIGURASI =============
+METRIC_PREFIX = "sipukat"
+TEXTFILE_INTERVAL = 15  # Detik antar penulisan textfile
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # Request/tile (detik)
+DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)  # Merge/convert per file (detik)
+SERVE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)  # Tile server per request (detik)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+class Metric:
+    """Base metric: satu family dengan nilai per kombinasi label"""
+
+    metric_type = 'unknown'
+    family_suffix = ''  # Suffix nama family di text 0.0.4 (counter: _total)
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: label harus {self.labelnames}, bukan {tuple(labels)}")
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """List (suffix, labels, value)"""
+        with self.lock:
+            return [('', key, value) for key, value in self.values.items()]
+
+    def render(self, openmetrics=False):
+        family = self.name if openmetrics else f"{self.name}{self.family_suffix}"
+        lines = [
+            f"# HELP {family} {self.documentation}",
+            f"# TYPE {family} {self.metric_type}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    metric_type = 'counter'
+    family_suffix = '_total'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [('_total', key, value) for key, value in self.values.items()]
+
+
+class Gauge(Metric):
+    metric_type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value)
+
+    def time(self, **labels):
+        """Context manager: observe durasi blok"""
+        histogram = self
+
+        class Timer:
+            def __enter__(self):
+                self.start = time.perf_counter()
+                return self
+
+            def __exit__(self, *exc):
+                histogram.observe(time.perf_counter() - self.start, **labels)
+
+        return Timer()
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, (counts, total) in self.values.items():
+                for bound, count in zip(self.buckets, counts):
+                    le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                    samples.append(('_bucket', key + (('le', le),), count))
+                samples.append(('_count', key, counts[-1]))
+                samples.append(('_sum', key, total))
+        return samples
+
+
+class MetricsRegistry:
+    """Kumpulan metrics yang di-export bersama"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self, openmetrics=False):
+        """Semua metrics dalam format Prometheus text 0.0.4 (openmetrics=True: OpenMetrics 1.0)"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render(openmetrics))
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# ============= METRICS PIPELINE =============
+TILES = REGISTRY.register(Counter(
+    'tiles', 'Tiles diproses per stage dan status', ('stage', 'status')))
+BYTES = REGISTRY.register(Counter(
+    'bytes', 'Bytes ditulis per stage', ('stage',)))
+HTTP_RESPONSES = REGISTRY.register(Counter(
+    'http_responses', 'HTTP responses dari tile server per status code', ('downloader', 'code')))
+RETRIES = REGISTRY.register(Counter(
+    'retries', 'Retry download tile', ('downloader',)))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'request_latency_seconds', 'Latency download satu tile (request + body)', ('downloader',)))
+GEOREF_LATENCY = REGISTRY.register(Histogram(
+    'georeference_latency_seconds', 'Waktu georeference satu tile', ()))
+BATCHES = REGISTRY.register(Counter(
+    'batches', 'Batch selesai per stage dan hasil', ('stage', 'result')))
+MERGE_DURATION = REGISTRY.register(Histogram(
+    'merge_duration_seconds', 'Durasi merge per batch/file', ('mode',), buckets=DURATION_BUCKETS))
+CONVERT_DURATION = REGISTRY.register(Histogram(
+    'convert_duration_seconds', 'Durasi konversi ECW/JP2 per file', ('format',), buckets=DURATION_BUCKETS))
+SERVE_LATENCY = REGISTRY.register(Histogram(
+    'serve_latency_seconds', 'Latency tile server lokal per sumber tile', ('source',), buckets=SERVE_BUCKETS))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'queue_depth', 'Jumlah item yang menunggu di queue', ('queue',)))
+LAST_UPDATE = REGISTRY.register(Gauge(
+    'last_update_timestamp_seconds', 'Waktu terakhir metrics di-export per stage', ('stage',)))
+
+
+def write_textfile(path, registry=REGISTRY):
+    """Tulis metrics ke textfile secara atomic (tmp + rename) supaya collector tidak membaca file setengah jadi
+
+    node_exporter textfile collector hanya menerima Prometheus text 0.0.4, bukan OpenMetrics.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+def start_textfile_writer(path, stage, interval=TEXTFILE_INTERVAL, registry=REGISTRY):
+    """Tulis textfile setiap interval detik (daemon thread) dan sekali lagi saat exit"""
+    def export():
+        LAST_UPDATE.set(time.time(), stage=stage)
+        write_textfile(path, registry)
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                export()
+            except OSError as e:
+                print(f"⚠️  Gagal menulis metrics {path}: {e}")
+
+    export()
+    threading.Thread(target=loop, daemon=True, name='metrics-textfile').start()
+    atexit.register(export)
+
+
+def start_http_server(port, stage, host='127.0.0.1', registry=REGISTRY):
+    """Serve /metrics di http://host:port (daemon thread)"""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            LAST_UPDATE.set(time.time(), stage=stage)
+            openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+            body = registry.render(openmetrics).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE if openmetrics else CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Jangan campur access log dengan progress output
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics-http').start()
+    return server
+
+
+def add_metrics_arguments(parser):
+    """Tambahkan --metrics-file dan --metrics-port ke argparse parser"""
+    parser.add_argument('--metrics-file', help='Export metrics Prometheus ke textfile (e.g. metrics/download.prom)')
+    parser.add_argument('--metrics-port', type=int, help='Serve metrics di http://127.0.0.1:PORT/metrics')
+
+
+def setup_metrics(args, stage):
+    """Aktifkan export sesuai argumen --metrics-file / --metrics-port"""
+    if getattr(args, 'metrics_file', None):
+        start_textfile_writer(args.metrics_file, stage)
+        print(f"📈 Metrics: {args.metrics_file} (setiap {TEXTFILE_INTERVAL}s)")
+    if getattr(args, 'metrics_port', None):
+        start_http_server(args.metrics_port, stage)
+        print(f"📈 Metrics: http://127.0.0.1:{args.metrics_port}/metrics")
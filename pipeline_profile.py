@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline Profiler
+Mode --profile untuk semua entry point. Setiap run menulis file sendiri di profiles/
+({stage}_{YYYYmmdd_HHMMSS}_{pid}.*):
+
+- cprofile: cProfile thread utama -> .prof (snakeviz, flameprof, gprof2dot, python -m pstats)
+- sample: sampling wall-clock semua thread (sys._current_frames) -> .folded
+  (collapsed stacks: flamegraph.pl, speedscope, inferno). Thread pool, as_completed,
+  tqdm, JSON save, stat dan tunggu subprocess GDAL semuanya terlihat
+- asyncio: sample + waktu per coroutine task (wall, waktu jalan di event loop, step
+  terlama) dan lag event loop -> .asyncio.json (download_tiles_async.py)
+
+Selama run panjang, `kill -USR1 <pid>` menulis snapshot tanpa menghentikan run:
+stack semua thread (.snapshot-N.stacks.txt) plus profile sejauh ini (Linux/macOS).
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import signal
+import asyncio
+import cProfile
+import threading
+import traceback
+import collections.abc
+from pathlib import Path
+from datetime import datetime
+
+# ============= KONFIGURASI =============
+PROFILE_DIR = Path("profiles")
+PROFILE_MODES = ('cprofile', 'sample')
+ASYNCIO_MODE = 'asyncio'
+DEFAULT_MODE = 'cprofile'
+SAMPLE_INTERVAL_MS = 10  # 100 Hz - overhead kecil untuk run berjam-jam
+LOOP_LAG_INTERVAL = 0.1  # Detik antar cek lag event loop
+TOP_TASKS = 10  # Baris ringkasan asyncio di console
+
+_active = None
+
+
+def add_profile_arguments(parser, asyncio_mode=False):
+    """Tambahkan --profile, --profile-dir dan --profile-interval ke argparse parser"""
+    modes = PROFILE_MODES + ((ASYNCIO_MODE,) if asyncio_mode else ())
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_MODE, default=None, choices=modes,
+                        help=f'Profiling run ini: {", ".join(modes)} (tanpa nilai = {DEFAULT_MODE}); '
+                             'snapshot dengan kill -USR1 <pid>')
+    parser.add_argument('--profile-dir', default=str(PROFILE_DIR),
+                        help=f'Folder output profiling (default: {PROFILE_DIR})')
+    parser.add_argument('--profile-interval', type=float, default=SAMPLE_INTERVAL_MS,
+                        help=f'Interval sampling dalam ms (default: {SAMPLE_INTERVAL_MS})')
+
+
+def setup_profile(args, stage):
+    """Mulai profiler sesuai argumen --profile. Hasil ditulis saat proses selesai (atexit)"""
+    global _active
+    if not getattr(args, 'profile', None):
+        return None
+    _active = RunProfiler(args.profile, stage, Path(args.profile_dir), args.profile_interval / 1000).start()
+    return _active
+
+
+def active_profiler():
+    return _active
+
+
+def instrument_asyncio():
+    """Pasang timing task di event loop yang sedang berjalan (no-op jika bukan mode asyncio)"""
+    if _active is not None and _active.task_timer is not None:
+        _active.task_timer.install(asyncio.get_running_loop())
+
+
+def frame_label(code, cache):
+    label = cache.get(code)
+    if label is None:
+        label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        cache[code] = label
+    return label
+
+
+class StackSampler(threading.Thread):
+    """Sampling stack semua thread setiap interval, dihitung per collapsed stack"""
+
+    def __init__(self, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.labels = {}
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            stacks = []
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code, self.labels))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}").replace(';', ':').replace(' ', '_'))
+                stacks.append(';'.join(reversed(stack)))
+            del frames
+            with self.lock:
+                self.samples += 1
+                for key in stacks:
+                    self.counts[key] = self.counts.get(key, 0) + 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join(timeout=self.interval * 10 + 1)
+
+    def write_folded(self, path):
+        """Collapsed stacks ('thread;frame;frame count' per baris)"""
+        with self.lock:
+            items = sorted(self.counts.items())
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in items:
+                f.write(f"{stack} {count}\n")
+        return len(items)
+
+
+class TimedCoroutine(collections.abc.Coroutine):
+    """Bungkus coroutine task: hitung waktu setiap step (send/throw) di event loop"""
+
+    def __init__(self, coro, entry):
+        self.coro = coro
+        self.entry = entry
+
+    def _step(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.entry['busy_s'] += elapsed
+            self.entry['steps'] += 1
+            if elapsed > self.entry['max_step_s']:
+                self.entry['max_step_s'] = elapsed
+
+    def send(self, value):
+        return self._step(self.coro.send, value)
+
+    def throw(self, *args):
+        return self._step(self.coro.throw, *args)
+
+    def close(self):
+        return self.coro.close()
+
+    def __await__(self):
+        return self.coro.__await__()
+
+    def __getattr__(self, name):
+        return getattr(self.coro, name)  # cr_frame, cr_code, ... untuk repr/traceback task
+
+
+class TaskTimer:
+    """Statistik per nama coroutine: jumlah task, wall time, waktu jalan di loop, step terlama"""
+
+    def __init__(self):
+        self.tasks = {}
+        self.lag_samples = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.monitor = None
+
+    def install(self, loop):
+        if self.monitor is not None:
+            return
+        self.monitor = loop.create_task(self._monitor_lag())  # Sebelum factory: tidak ikut dihitung
+        previous = loop.get_task_factory()
+
+        def factory(loop, coro, **kwargs):
+            name = getattr(coro, '__qualname__', type(coro).__name__)
+            entry = self.tasks.setdefault(name, {'count': 0, 'wall_s': 0.0, 'busy_s': 0.0, 'steps': 0,
+                                                 'max_step_s': 0.0, 'running': 0})
+            entry['count'] += 1
+            entry['running'] += 1
+            timed = TimedCoroutine(coro, entry)
+            task = previous(loop, timed, **kwargs) if previous else asyncio.Task(timed, loop=loop, **kwargs)
+            created = time.perf_counter()
+
+            def done(_):
+                entry['wall_s'] += time.perf_counter() - created
+                entry['running'] -= 1
+            task.add_done_callback(done)
+            return task
+
+        loop.set_task_factory(factory)
+
+    async def _monitor_lag(self):
+        while True:
+            expected = time.perf_counter() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.lag_samples += 1
+            self.lag_total += lag
+            self.lag_max = max(self.lag_max, lag)
+
+    def report(self):
+        tasks = {}
+        for name, entry in self.tasks.items():
+            tasks[name] = {
+                'count': entry['count'],
+                'running': entry['running'],  # Wall time task yang belum selesai belum dihitung
+                'busy_s': round(entry['busy_s'], 4),
+                'wall_s': round(entry['wall_s'], 4),
+                'steps': entry['steps'],
+                'max_step_ms': round(entry['max_step_s'] * 1000, 3),
+            }
+        return {
+            'tasks': dict(sorted(tasks.items(), key=lambda item: item[1]['busy_s'], reverse=True)),
+            'loop_lag': {
+                'samples': self.lag_samples,
+                'mean_ms': round(self.lag_total / self.lag_samples * 1000, 3) if self.lag_samples else None,
+                'max_ms': round(self.lag_max * 1000, 3) if self.lag_samples else None,
+            },
+        }
+
+    def write(self, path):
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+class RunProfiler:
+    """Satu sesi profiling per run: start, snapshot (SIGUSR1), stop (atexit)
+
+    Args:
+        mode: 'cprofile', 'sample' atau 'asyncio'
+        stage: Nama entry point (prefix file output)
+        output_dir: Folder output
+        interval: Interval sampling (detik)
+    """
+
+    def __init__(self, mode, stage, output_dir, interval=SAMPLE_INTERVAL_MS / 1000):
+        self.mode = mode
+        self.output_dir = output_dir
+        self.base = output_dir / f"{stage}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.profile = cProfile.Profile() if mode == 'cprofile' else None
+        self.sampler = StackSampler(interval) if mode != 'cprofile' else None
+        self.task_timer = TaskTimer() if mode == ASYNCIO_MODE else None
+        self.snapshots = 0
+        self.start_time = None
+        self.stopped = False
+        self.lock = threading.RLock()  # Handler SIGUSR1 bisa jalan di thread yang sedang stop()
+
+    def start(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.start_time = time.perf_counter()
+        if self.sampler:
+            self.sampler.start()
+        if self.profile:
+            self.profile.enable()
+        atexit.register(self.stop)
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self.snapshot)
+            hint = f" | snapshot: kill -USR1 {os.getpid()}"
+        else:
+            hint = ""
+        print(f"🔬 Profiling ({self.mode}): {self.base}.*{hint}")
+        return self
+
+    def write_stacks(self, path):
+        """Traceback semua thread saat ini (teks)"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"# {datetime.now().isoformat(timespec='seconds')} pid {os.getpid()}, "
+                    f"{time.perf_counter() - self.start_time:.1f}s sejak start\n")
+            for ident, frame in sys._current_frames().items():
+                f.write(f"\n--- Thread {names.get(ident, ident)} ({ident}) ---\n")
+                f.write(''.join(traceback.format_stack(frame)))
+
+    def _write(self, base):
+        """Tulis profile ke base.* Returns list path"""
+        paths = []
+        if self.profile:
+            self.profile.dump_stats(f"{base}.prof")  # dump_stats men-disable profiler
+            paths.append(f"{base}.prof")
+        if self.sampler:
+            self.sampler.write_folded(f"{base}.folded")
+            paths.append(f"{base}.folded")
+        if self.task_timer:
+            self.task_timer.write(f"{base}.asyncio.json")
+            paths.append(f"{base}.asyncio.json")
+        return paths
+
+    def snapshot(self, signum=None, frame=None):
+        """Snapshot di tengah run (handler SIGUSR1): stack semua thread + profile sejauh ini"""
+        with self.lock:
+            if self.stopped:
+                return
+            self.snapshots += 1
+            base = f"{self.base}.snapshot-{self.snapshots}"
+            self.write_stacks(f"{base}.stacks.txt")
+            paths = self._write(base)
+            if self.profile:
+                self.profile.enable()
+        print(f"\n🔬 Snapshot {self.snapshots}: {base}.stacks.txt" + ''.join(f", {Path(p).name}" for p in paths),
+              flush=True)
+
+    def stop(self):
+        with self.lock:
+            if self.stopped:
+                return
+            self.stopped = True
+            if self.profile:
+                self.profile.disable()
+            if self.sampler:
+                self.sampler.stop()
+            paths = self._write(self.base)
+
+        elapsed = time.perf_counter() - self.start_time
+        print(f"\n🔬 Profile ({self.mode}, {elapsed:.1f}s): {', '.join(paths)}")
+        if self.sampler:
+            print(f"   {self.sampler.samples:,} samples - flamegraph.pl {self.base}.folded > flame.svg "
+                  f"(atau buka di speedscope.app)")
+        if self.profile:
+            print(f"   python -m pstats {self.base}.prof | snakeviz {self.base}.prof")
+        if self.task_timer:
+            report = self.task_timer.report()
+            lag = report['loop_lag']
+            if lag['samples']:
+                print(f"   Event loop lag: rata-rata {lag['mean_ms']} ms, maks {lag['max_ms']} ms")
+            else:
+                print("   Event loop lag: - (belum ada sample)")
+            print(f"   {'Coroutine':<40} {'Tasks':>8} {'Loop s':>9} {'Wall s':>10} {'Maks step ms':>13}")
+            for name, entry in list(report['tasks'].items())[:TOP_TASKS]:
+                print(f"   {name[:40]:<40} {entry['count']:>8,} {entry['busy_s']:>9.3f} {entry['wall_s']:>10.2f} "
+                      f"{entry['max_step_ms']:>13.2f}")
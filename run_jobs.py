@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Job Queue Runner
+Jalankan banyak job spec berurutan atau bersamaan tanpa input() - cocok untuk
+cron/scheduler. Setiap stage dijalankan sebagai subprocess di workdir job,
+dengan batas resource bersama (koneksi download dan stage CPU-heavy).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from job_spec import JobSpecError, load_job_spec
+
+# Fix Windows terminal encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+# ============= KONFIGURASI =============
+SCRIPT_DIR = Path(__file__).resolve().parent
+STATUS_FILE = Path("job_queue_status.json")
+JOB_LOG_NAME = "job.log"
+MAX_JOBS = 1  # Default: job diproses back-to-back
+MAX_CONNECTIONS = 1000  # Total koneksi download untuk semua job
+MAX_CPU_STAGES = 1  # georeference/merge/convert yang boleh jalan bersamaan
+DEFAULT_CONCURRENCY = {'batch': 20, 'async': 500}
+
+DOWNLOADER_SCRIPTS = {
+    'batch': 'download_tiles_batch.py',
+    'async': 'download_tiles_async.py',
+}
+
+
+class ResourcePool:
+    """Budget resource bersama (koneksi, slot CPU) untuk semua job"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.available = capacity
+        self.condition = threading.Condition()
+
+    def acquire(self, amount):
+        """Tunggu sampai amount tersedia. Returns jumlah yang benar-benar diambil"""
+        amount = max(1, min(amount, self.capacity))
+        with self.condition:
+            while self.available < amount:
+                self.condition.wait()
+            self.available -= amount
+        return amount
+
+    def release(self, amount):
+        with self.condition:
+            self.available += amount
+            self.condition.notify_all()
+
+
+class JobQueue:
+    """Proses job specs dengan batas resource bersama"""
+
+    def __init__(self, max_jobs=MAX_JOBS, max_connections=MAX_CONNECTIONS, max_cpu_stages=MAX_CPU_STAGES):
+        self.max_jobs = max_jobs
+        self.connections = ResourcePool(max_connections)
+        self.cpu_stages = ResourcePool(max_cpu_stages)
+        self.status = {}
+        self.status_lock = threading.Lock()
+
+    def update_status(self, job_name, **fields):
+        """Update status job dan simpan ke STATUS_FILE"""
+        with self.status_lock:
+            self.status.setdefault(job_name, {}).update(fields)
+            self.status[job_name]['last_update'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            with open(STATUS_FILE, 'w') as f:
+                json.dump(self.status, f, indent=2)
+
+    def stage_command(self, spec, stage, concurrency=None):
+        """Command line untuk satu stage"""
+        python = sys.executable
+        spec_file = spec['spec_file']
+
+        if stage == 'download':
+            cmd = [python, str(SCRIPT_DIR / DOWNLOADER_SCRIPTS[spec['downloader']]), '--job', spec_file]
+            if concurrency:
+                flag = '--concurrent' if spec['downloader'] == 'async' else '--workers'
+                cmd.extend([flag, str(concurrency)])
+            return cmd
+        if stage == 'georeference':
+            return [python, str(SCRIPT_DIR / 'georeference_batch.py'), '--job', spec_file]
+        if stage == 'merge':
+            return [python, str(SCRIPT_DIR / 'merge_geotiff.py'), '--job', spec_file]
+        if stage == 'convert':
+            if spec['output_format'] in ('GTiff', 'COG'):
+                return None  # Output merge sudah GeoTIFF/COG
+            if spec['merge']['mode'] == 'single-file':
+                return None  # ECW/JP2 sudah di-encode langsung dari mosaic VRT saat merge
+            return [python, str(SCRIPT_DIR / 'geotiff_to_ecw.py'),
+                    '-d', 'merged', '-od', 'merged', '-p', 'merged_*.tif', '--format', spec['output_format']]
+        raise ValueError(f"Stage tidak dikenal: {stage}")
+
+    def run_stage(self, spec, stage, workdir, log_file):
+        """Jalankan satu stage sebagai subprocess. Returns returncode"""
+        if stage == 'download':
+            wanted = spec['concurrency'] or DEFAULT_CONCURRENCY[spec['downloader']]
+            # Budget lebih kecil dari permintaan job: pakai sebesar budget
+            pool, amount = self.connections, self.connections.acquire(wanted)
+        else:
+            pool, amount = self.cpu_stages, self.cpu_stages.acquire(1)
+
+        try:
+            cmd = self.stage_command(spec, stage, concurrency=amount if stage == 'download' else None)
+            if cmd is None:
+                return 0
+
+            with open(log_file, 'a', encoding='utf-8') as log:
+                log.write(f"\n===== [{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {stage}: {' '.join(cmd)}\n")
+                log.flush()
+                env = os.environ.copy()
+                env['PYTHONIOENCODING'] = 'utf-8'
+                result = subprocess.run(cmd, cwd=workdir, stdin=subprocess.DEVNULL,
+                                        stdout=log, stderr=subprocess.STDOUT, env=env)
+            return result.returncode
+        finally:
+            pool.release(amount)
+
+    def run_job(self, spec):
+        """Jalankan semua stage dari satu job. Returns True jika sukses"""
+        name = spec['name']
+        workdir = Path(spec['workdir'])
+        workdir.mkdir(parents=True, exist_ok=True)
+        log_file = workdir / JOB_LOG_NAME
+        start_time = time.time()
+
+        self.update_status(name, status='running', workdir=str(workdir.absolute()), log=str(log_file.absolute()))
+
+        for stage in spec['stages']:
+            self.update_status(name, stage=stage)
+            print(f"▶️  [{name}] {stage}...")
+
+            stage_start = time.time()
+            returncode = self.run_stage(spec, stage, workdir, log_file)
+            elapsed = time.time() - stage_start
+
+            with self.status_lock:
+                self.status[name].setdefault('stage_seconds', {})[stage] = round(elapsed, 1)
+
+            if returncode != 0:
+                print(f"❌ [{name}] {stage} gagal (exit {returncode}) - lihat {log_file}")
+                self.update_status(name, status='failed', failed_stage=stage, returncode=returncode)
+                return False
+
+            print(f"✅ [{name}] {stage} selesai ({elapsed:.1f}s)")
+
+        self.update_status(name, status='completed', stage=None, total_seconds=round(time.time() - start_time, 1))
+        return True
+
+    def run(self, specs):
+        """Proses semua specs. Returns (jumlah sukses, jumlah gagal)"""
+        success_count = 0
+        failed_count = 0
+
+        for spec in specs:
+            self.update_status(spec['name'], status='queued', stages=spec['stages'])
+
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as executor:
+            futures = {executor.submit(self.run_job, spec): spec['name'] for spec in specs}
+
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    if future.result():
+                        success_count += 1
+                    else:
+                        failed_count += 1
+                except Exception as e:
+                    print(f"❌ [{name}] Error: {e}")
+                    self.update_status(name, status='failed', error=str(e))
+                    failed_count += 1
+
+        return success_count, failed_count
+
+
+def collect_spec_files(paths):
+    """Expand argumen (file atau folder) menjadi list job spec files"""
+    spec_files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            spec_files.extend(sorted(path.glob("*.json")))
+        else:
+            spec_files.append(path)
+    return spec_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Job Queue Runner - proses job specs tanpa input()')
+    parser.add_argument('specs', nargs='+', help='Job spec files (.json) atau folder berisi job specs')
+    parser.add_argument('--max-jobs', type=int, default=MAX_JOBS,
+                        help=f'Job yang jalan bersamaan (default: {MAX_JOBS} = back-to-back)')
+    parser.add_argument('--max-connections', type=int, default=MAX_CONNECTIONS,
+                        help=f'Total koneksi download untuk semua job (default: {MAX_CONNECTIONS})')
+    parser.add_argument('--max-cpu-stages', type=int, default=MAX_CPU_STAGES,
+                        help=f'Georeference/merge/convert yang jalan bersamaan (default: {MAX_CPU_STAGES})')
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("   Job Queue Runner")
+    print("=" * 60)
+    print()
+
+    specs = []
+    for spec_file in collect_spec_files(args.specs):
+        try:
+            specs.append(load_job_spec(spec_file))
+        except JobSpecError as e:
+            print(f"❌ {e}")
+            return 1
+
+    if not specs:
+        print("❌ Tidak ada job spec ditemukan")
+        return 1
+
+    names = [spec['name'] for spec in specs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        print(f"❌ Nama job duplikat: {', '.join(duplicates)}")
+        return 1
+
+    print(f"📋 {len(specs)} jobs | max {args.max_jobs} bersamaan | "
+          f"{args.max_connections} koneksi | {args.max_cpu_stages} stage CPU")
+    print(f"💾 Status: {STATUS_FILE.absolute()}")
+    print()
+
+    queue = JobQueue(args.max_jobs, args.max_connections, args.max_cpu_stages)
+    start_time = time.time()
+
+    try:
+        success_count, failed_count = queue.run(specs)
+    except KeyboardInterrupt:
+        print("\n\n⏸️  Job queue dihentikan")
+        print("   Jalankan ulang dengan specs yang sama untuk resume")
+        return 1
+
+    elapsed = time.time() - start_time
+    print("\n" + "=" * 60)
+    print("✅ JOB QUEUE SELESAI")
+    print("=" * 60)
+    print(f"Berhasil: {success_count} | Gagal: {failed_count} | Waktu: {elapsed / 60:.1f} menit")
+    print()
+
+    return 0 if failed_count == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tile Catalog
+Katalog tiles yang ringkas: z/x/y sebagai array int32, dan rencana batch (BatchPlan) yang menghitung bounds batch mana pun secara langsung.
+
+Jutaan tiles cukup ~16 bytes/tile, bukan dict + Path object per tile. Path dibuat
+hanya saat I/O (path(), iter_paths(), write_list()).
+"""
+
+import os
+from array import array
+
+from tile_grid import DEFAULT_CURVE, HAS_NUMPY, curve_order, tile_range_bounds
+
+if HAS_NUMPY:
+    import numpy as np
+
+# ============= KONFIGURASI =============
+TILE_PATTERN = "tile_{z}_{x}_{y}{suffix}"
+
+
+def _int32(values=()):
+    return np.asarray(values, dtype=np.int32) if HAS_NUMPY else array('i', values)
+
+
+def _take(values, order):
+    if HAS_NUMPY:
+        return values[order]
+    return type(values)(values.typecode, (values[i] for i in order))
+
+
+def _concat(arrays, factory):
+    if HAS_NUMPY:
+        return np.concatenate(arrays) if arrays else factory()
+    result = factory()
+    for values in arrays:
+        result.extend(values)
+    return result
+
+
+def parse_tile_name(name):
+    """(z, x, y) dari nama file tile_{z}_{x}_{y}.ext, None jika bukan tile"""
+    parts = name.split('.', 1)[0].split('_')
+    if len(parts) < 4 or parts[0] != 'tile':
+        return None
+    try:
+        return int(parts[1]), int(parts[2]), int(parts[3])
+    except ValueError:
+        return None
+
+
+class TileCatalog:
+    """Array z/x/y untuk sekumpulan tiles, bisa dari beberapa folder batch
+
+    Args:
+        z, x, y: Array int32 koordinat tile
+        directories: List folder (str) tempat tiles berada
+        directory_index: Array int32 index ke directories per tile
+        suffix: Ekstensi file ('.jpg', '.tif')
+    """
+
+    def __init__(self, z, x, y, directories, directory_index, suffix):
+        self.z = z
+        self.x = x
+        self.y = y
+        self.directories = directories
+        self.directory_index = directory_index
+        self.suffix = suffix
+
+    @classmethod
+    def scan(cls, directory, suffix):
+        """Katalog semua tile_*{suffix} di satu folder (os.scandir, tanpa Path per file)"""
+        z, x, y = array('i'), array('i'), array('i')
+        if os.path.isdir(directory):
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    coords = parse_tile_name(entry.name) if entry.name.endswith(suffix) else None
+                    if coords:
+                        z.append(coords[0])
+                        x.append(coords[1])
+                        y.append(coords[2])
+        return cls(_int32(z), _int32(x), _int32(y), [str(directory)], _int32([0] * len(x)), suffix)
+
+    @classmethod
+    def from_batch(cls, batch_info, zoom, directory, suffix, order=DEFAULT_CURVE):
+        """Katalog tiles satu batch dari grid (belum ada di disk), urut sepanjang kurva"""
+        width = batch_info['x_end'] - batch_info['x_start'] + 1
+        height = batch_info['y_end'] - batch_info['y_start'] + 1
+        count = width * height
+        if HAS_NUMPY:
+            cols = np.arange(count, dtype=np.int32) % width + batch_info['x_start']
+            rows = np.arange(count, dtype=np.int32) // width + batch_info['y_start']
+        else:
+            cols = array('i', (batch_info['x_start'] + i % width for i in range(count)))
+            rows = array('i', (batch_info['y_start'] + i // width for i in range(count)))
+        catalog = cls(_int32([zoom] * count), cols, rows, [str(directory)], _int32([0] * count), suffix)
+        return catalog.sorted_by_curve(order)
+
+    @classmethod
+    def concat(cls, catalogs):
+        """Gabungkan beberapa katalog (suffix harus sama)"""
+        catalogs = [c for c in catalogs if len(c)]
+        if not catalogs:
+            return cls(_int32(), _int32(), _int32(), [], _int32(), '')
+        directories = []
+        indexes = []
+        for catalog in catalogs:
+            offset = len(directories)
+            directories.extend(catalog.directories)
+            indexes.append(catalog.directory_index + offset if HAS_NUMPY
+                           else array('i', (i + offset for i in catalog.directory_index)))
+        return cls(_concat([c.z for c in catalogs], _int32), _concat([c.x for c in catalogs], _int32),
+                   _concat([c.y for c in catalogs], _int32), directories, _concat(indexes, _int32),
+                   catalogs[0].suffix)
+
+    def __len__(self):
+        return len(self.x)
+
+    def take(self, order):
+        """Katalog baru dengan tiles pada urutan/index order"""
+        return TileCatalog(_take(self.z, order), _take(self.x, order), _take(self.y, order), self.directories,
+                           _take(self.directory_index, order), self.suffix)
+
+    def sorted_by_curve(self, order=DEFAULT_CURVE):
+        """Urutkan sepanjang kurva (Hilbert default), sama dengan urutan download"""
+        if len(self) < 2:
+            return self
+        return self.take(curve_order(self.x, self.y, order))
+
+    def filename(self, i):
+        return TILE_PATTERN.format(z=self.z[i], x=self.x[i], y=self.y[i], suffix=self.suffix)
+
+    def path(self, i):
+        """Path file tile ke-i (dibuat saat dibutuhkan)"""
+        return os.path.join(self.directories[self.directory_index[i]], self.filename(i))
+
+    def iter_paths(self, chunk_size=65536):
+        """Generator path semua tiles - array dikonversi per chunk, bukan per elemen"""
+        prefixes = [os.path.join(directory, 'tile_') for directory in self.directories]
+        suffix = self.suffix
+        for start in range(0, len(self), chunk_size):
+            end = start + chunk_size
+            for z, x, y, d in zip(self.z[start:end].tolist(), self.x[start:end].tolist(),
+                                  self.y[start:end].tolist(), self.directory_index[start:end].tolist()):
+                yield f"{prefixes[d]}{z}_{x}_{y}{suffix}"
+
+    @property
+    def zoom(self):
+        return int(self.z[0]) if len(self) else None
+
+    def extent(self):
+        """Range tiles (x_start, x_end, y_start, y_end)"""
+        if HAS_NUMPY:
+            return int(self.x.min()), int(self.x.max()), int(self.y.min()), int(self.y.max())
+        return int(min(self.x)), int(max(self.x)), int(min(self.y)), int(max(self.y))
+
+    def bounds(self):
+        """Bounding box semua tiles (min_lon, min_lat, max_lon, max_lat)"""
+        return tile_range_bounds(*self.extent(), self.zoom)
+
+    def newest_mtime(self):
+        """mtime terbaru semua file tiles (0 jika katalog kosong)"""
+        return max((os.stat(path).st_mtime for path in self.iter_paths()), default=0)
+
+    def write_list(self, list_file):
+        """Tulis path semua tiles (untuk gdalbuildvrt -input_file_list)"""
+        with open(list_file, 'w') as f:
+            for path in self.iter_paths():
+                f.write(path.replace('\\', '/') + '\n')
+
+
+class BatchPlan:
+    """Rencana batch yang lazy: batch_info dihitung saat diminta, tidak disimpan
+
+    Hanya urutan sel batch di sepanjang kurva yang disimpan (int32 per batch), jadi
+    batch(N) dan batch_num_of(x, y) O(1). Bisa diiterasi dan di-index seperti list
+    dict dari calculate_batches versi lama, dengan nomor batch yang sama.
+    """
+
+    def __init__(self, x_start, x_end, y_start, y_end, batch_size, order=DEFAULT_CURVE):
+        self.x_start = x_start
+        self.x_end = x_end
+        self.y_start = y_start
+        self.y_end = y_end
+        self.batch_size = batch_size
+        self.order = order
+        self.x_batches = (x_end - x_start + batch_size) // batch_size
+        self.y_batches = (y_end - y_start + batch_size) // batch_size
+
+        cells = self.x_batches * self.y_batches
+        cols = [i % self.x_batches for i in range(cells)]
+        rows = [i // self.x_batches for i in range(cells)]
+        self.cells = _int32(curve_order(cols, rows, order))  # batch_num - 1 -> sel row-major
+        self._ranks = None
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __iter__(self):
+        for batch_num in range(1, len(self) + 1):
+            yield self.batch(batch_num)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.batch(i + 1) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Index batch di luar range: {index}")
+        return self.batch(index + 1)
+
+    @property
+    def total_tiles(self):
+        return (self.x_end - self.x_start + 1) * (self.y_end - self.y_start + 1)
+
+    def batch(self, batch_num):
+        """batch_info (dict) untuk nomor batch 1..len"""
+        if not 1 <= batch_num <= len(self):
+            raise IndexError(f"Batch {batch_num} tidak ada (1-{len(self)})")
+        cell = int(self.cells[batch_num - 1])
+        batch_x_start = self.x_start + (cell % self.x_batches) * self.batch_size
+        batch_y_start = self.y_start + (cell // self.x_batches) * self.batch_size
+        batch_x_end = min(batch_x_start + self.batch_size - 1, self.x_end)
+        batch_y_end = min(batch_y_start + self.batch_size - 1, self.y_end)
+        return {
+            'batch_num': batch_num,
+            'x_start': batch_x_start,
+            'x_end': batch_x_end,
+            'y_start': batch_y_start,
+            'y_end': batch_y_end,
+            'tiles_count': (batch_x_end - batch_x_start + 1) * (batch_y_end - batch_y_start + 1)
+        }
+
+    def get(self, batch_num):
+        """Seperti batch(), tapi None jika nomor batch tidak ada"""
+        if not 1 <= batch_num <= len(self):
+            return None
+        return self.batch(batch_num)
+
+    def batch_num_of(self, x, y):
+        """Nomor batch yang memuat tile (x, y), None jika di luar grid"""
+        if not (self.x_start <= x <= self.x_end and self.y_start <= y <= self.y_end):
+            return None
+        if self._ranks is None:
+            ranks = _int32([0] * len(self))
+            for rank, cell in enumerate(self.cells):
+                ranks[cell] = rank
+            self._ranks = ranks
+        cell = ((y - self.y_start) // self.batch_size) * self.x_batches + (x - self.x_start) // self.batch_size
+        return int(self._ranks[cell]) + 1
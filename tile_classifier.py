@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tile Response Classifier
+Bedakan tile valid dari placeholder/error image yang dikirim server dengan HTTP 200
+(saat overload) dan dari tile "no data" yang memang kosong.
+
+- ok: tile normal, disimpan
+- suspect: terlalu kecil, bukan gambar, JPEG terpotong, signature error image, atau pixel
+  seragam yang belum dikonfirmasi -> tidak disimpan, di-download ulang belakangan
+- blank: signature no-data atau pixel seragam yang sama setelah download ulang -> marker
+  tile_z_x_y.blank (tanpa .jpg), sehingga tidak di-download ulang dan dilewati
+  georeference/merge
+
+Signature (SHA-1 response) bisa ditambahkan di tiles/tile_signatures.json:
+    {"blank": ["<sha1>", ...], "error": ["<sha1>", ...]}
+
+Contoh (cek tiles yang sudah terlanjur di-download):
+    python tile_classifier.py              # Laporan saja
+    python tile_classifier.py --apply      # Hapus suspect, ganti blank dengan marker
+"""
+
+import io
+import sys
+import json
+import hashlib
+import argparse
+from pathlib import Path
+
+# Fix Windows terminal encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+try:
+    from PIL import Image, ImageStat
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# ============= KONFIGURASI =============
+TILES_DIR = Path("tiles")
+SIGNATURES_FILE = TILES_DIR / "tile_signatures.json"
+BLANK_SUFFIX = ".blank"
+MIN_TILE_BYTES = 128  # Lebih kecil dari ini pasti bukan tile 256x256
+UNIFORM_CHECK_BYTES = 4096  # Hanya tile kecil yang di-decode untuk cek pixel seragam
+UNIFORM_MAX_STDDEV = 1.5  # Stddev per channel maksimal agar dianggap seragam (noise JPEG)
+UNIFORM_SAMPLE_SIZE = (32, 32)  # Decode JPEG dengan draft() ke ukuran ini, cukup untuk cek seragam
+UNIFORM_CONFIRM_ATTEMPTS = 2  # Warna seragam yang sama harus sudah terlihat sekian kali sebelum dianggap blank
+
+TILE_OK = 'ok'
+TILE_SUSPECT = 'suspect'
+TILE_BLANK = 'blank'
+
+IMAGE_MAGIC = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'RIFF')
+
+
+def blank_marker_path(tile_path):
+    """Path marker blank untuk tile (tile_z_x_y.jpg -> tile_z_x_y.blank)"""
+    return Path(tile_path).with_suffix(BLANK_SUFFIX)
+
+
+def write_blank_marker(tile_path, reason):
+    """Tulis marker blank (isi: alasan) menggantikan file tile"""
+    marker = blank_marker_path(tile_path)
+    marker.write_text(reason + '\n', encoding='utf-8')
+    return marker
+
+
+def tile_done(tile_path):
+    """True jika tile sudah ada atau sudah ditandai blank (tidak perlu di-download)"""
+    return tile_path.exists() or blank_marker_path(tile_path).exists()
+
+
+def load_signatures(path=SIGNATURES_FILE):
+    """{'blank': set(sha1), 'error': set(sha1)} dari file signature (kosong jika tidak ada)"""
+    signatures = {'blank': set(), 'error': set()}
+    path = Path(path)
+    if path.exists():
+        with open(path, 'r') as f:
+            data = json.load(f)
+        for kind in signatures:
+            signatures[kind].update(digest.lower() for digest in data.get(kind, []))
+    return signatures
+
+
+def uniform_color(data):
+    """Warna (tuple) jika semua pixel seragam, None jika tidak atau tidak bisa di-decode"""
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.draft('RGB', UNIFORM_SAMPLE_SIZE)  # JPEG: decode DCT scale 1/8, jauh lebih cepat
+        img = img.convert('RGB')
+    except Exception:
+        return None
+    stat = ImageStat.Stat(img)
+    if max(stat.stddev) > UNIFORM_MAX_STDDEV:
+        return None
+    return tuple(int(round(v)) for v in stat.mean)
+
+
+class TileClassifier:
+    """Klasifikasi response tile: (verdict, alasan), aman dipakai bersama oleh banyak thread
+
+    Args:
+        signatures_file: File signature blank/error (SHA-1)
+        decode: Cek pixel seragam untuk tile kecil (butuh Pillow)
+    """
+
+    def __init__(self, signatures_file=SIGNATURES_FILE, decode=True):
+        self.signatures = load_signatures(signatures_file)
+        self.decode = decode and HAS_PIL
+
+    def classify(self, data, content_type=None, uniform_seen=None):
+        """Klasifikasi satu response HTTP 200
+
+        Args:
+            data: Body response (bytes)
+            content_type: Header Content-Type (opsional)
+            uniform_seen: List warna seragam dari download sebelumnya untuk tile ini (disimpan
+                pemanggil di item retry). Warna seragam baru ditambahkan ke list ini. Tile baru
+                blank jika warna yang sama sudah terlihat UNIFORM_CONFIRM_ATTEMPTS kali, jadi
+                retry karena 503/429/timeout tidak ikut dihitung
+
+        Returns:
+            (TILE_OK | TILE_SUSPECT | TILE_BLANK, alasan)
+        """
+        if content_type and not content_type.startswith('image/'):
+            return TILE_SUSPECT, f"content-type {content_type.split(';')[0]}"
+        if len(data) < MIN_TILE_BYTES:
+            return TILE_SUSPECT, f"terlalu kecil ({len(data)} bytes)"
+        if not data.startswith(IMAGE_MAGIC):
+            return TILE_SUSPECT, "bukan gambar"
+        if data.startswith(b'\xff\xd8') and b'\xff\xd9' not in data[-32:]:
+            return TILE_SUSPECT, "JPEG terpotong (tanpa EOI)"
+
+        digest = hashlib.sha1(data).hexdigest()
+        if digest in self.signatures['error']:
+            return TILE_SUSPECT, f"signature error image {digest[:12]}"
+        if digest in self.signatures['blank']:
+            return TILE_BLANK, f"signature no-data {digest[:12]}"
+
+        if self.decode and len(data) <= UNIFORM_CHECK_BYTES:
+            color = uniform_color(data)
+            if color is not None:
+                seen = uniform_seen.count(color) if uniform_seen is not None else 0
+                if seen >= UNIFORM_CONFIRM_ATTEMPTS:
+                    return TILE_BLANK, f"pixel seragam {color} ({digest[:12]})"
+                if uniform_seen is not None:
+                    uniform_seen.append(color)
+                return TILE_SUSPECT, f"pixel seragam {color}"
+        return TILE_OK, ''
+
+
+def scan_tiles(tiles_dir=TILES_DIR, classifier=None, apply=False):
+    """Cek tiles yang sudah ada di tiles_batch_*/
+
+    Tile dengan pixel seragam belum dikonfirmasi (bisa placeholder "server sibuk"), jadi
+    masuk suspect dan downloader yang memutuskan blank setelah download ulang.
+
+    Returns:
+        dict batch_num -> {'suspect': [(path, alasan)], 'blank': [(path, alasan)]}
+    """
+    classifier = classifier or TileClassifier()
+    report = {}
+    for batch_dir in sorted(Path(tiles_dir).glob("tiles_batch_*")):
+        batch_num = int(batch_dir.name.split('_')[-1])
+        for tile_file in batch_dir.glob("tile_*.jpg"):
+            verdict, reason = classifier.classify(tile_file.read_bytes())
+            if verdict != TILE_OK:
+                report.setdefault(batch_num, {TILE_SUSPECT: [], TILE_BLANK: []})[verdict].append((tile_file, reason))
+
+    if apply:
+        for entry in report.values():
+            for tile_file, reason in entry[TILE_BLANK]:
+                write_blank_marker(tile_file, reason)
+                tile_file.unlink()
+            for tile_file, _ in entry[TILE_SUSPECT]:
+                tile_file.unlink()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cek placeholder/error image di tiles yang sudah di-download')
+    parser.add_argument('--tiles-dir', default=str(TILES_DIR), help=f'Folder tiles (default: {TILES_DIR})')
+    parser.add_argument('--signatures', default=str(SIGNATURES_FILE),
+                        help=f'File signature blank/error (default: {SIGNATURES_FILE})')
+    parser.add_argument('--apply', action='store_true',
+                        help='Hapus tiles suspect (untuk download ulang) dan ganti tiles blank dengan marker')
+    parser.add_argument('--verbose', action='store_true', help='Tampilkan setiap tile')
+
+    args = parser.parse_args()
+
+    if not HAS_PIL:
+        print("⚠️  Pillow tidak terinstall - cek pixel seragam dilewati (pip install Pillow)")
+
+    report = scan_tiles(args.tiles_dir, TileClassifier(args.signatures), apply=args.apply)
+    if not report:
+        print("✅ Tidak ada placeholder/error image")
+        return 0
+
+    total_suspect = sum(len(entry[TILE_SUSPECT]) for entry in report.values())
+    total_blank = sum(len(entry[TILE_BLANK]) for entry in report.values())
+    for batch_num, entry in sorted(report.items()):
+        print(f"📦 Batch {batch_num:03d}: {len(entry[TILE_SUSPECT])} suspect, {len(entry[TILE_BLANK])} blank")
+        if args.verbose:
+            for verdict in (TILE_SUSPECT, TILE_BLANK):
+                for tile_file, reason in entry[verdict]:
+                    print(f"   {verdict:<7} {tile_file.name}: {reason}")
+
+    print(f"\n📊 Total: {total_suspect} suspect, {total_blank} blank")
+    if args.apply:
+        print("🗑️  Suspect dihapus, blank diganti marker .blank")
+        batches = ','.join(str(n) for n, entry in sorted(report.items()) if entry[TILE_SUSPECT])
+        if batches:
+            print(f"   Download ulang: python download_tiles_batch.py --batch N (batch {batches})")
+    else:
+        print("   Jalankan dengan --apply untuk membersihkan")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tile Grid Utilities
+Urutan tiles dan batches mengikuti space-filling curve (Hilbert / Z-order)
+supaya download, georeference dan merge memproses area yang berdekatan,
+plus matematika grid XYZ (tile <-> lon/lat, bbox <-> tile range, geotransform
+EPSG:4326/3857) yang dipakai bersama semua script
+
+Semua tile dalam satu baris punya latitude yang sama dan semua tile dalam satu
+kolom punya longitude yang sama, jadi tepi baris/kolom di-cache (scalar) atau
+dihitung sekali per baris/kolom unik (NumPy) - bukan atan(sinh(...)) per tile.
+"""
+
+import math
+from functools import lru_cache
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# ============= KONFIGURASI =============
+TILE_SIZE = 256
+EARTH_RADIUS = 6378137.0  # WGS84 semi-major axis (meter)
+MERCATOR_EXTENT = math.pi * EARTH_RADIUS  # 20037508.342789244 - setengah lebar dunia EPSG:3857
+MAX_LATITUDE = 85.05112877980659  # Batas latitude Web Mercator
+EDGE_CACHE_SIZE = 1 << 16  # Tepi baris/kolom yang di-cache (per zoom)
+TILE_SNAP_EPSILON = 1e-6  # Posisi tile sejauh ini dari bilangan bulat = tepat di batas tile (error float ~1e-9 di z22)
+
+CURVE_ORDERS = ('hilbert', 'zorder', 'row-major')
+DEFAULT_CURVE = 'hilbert'
+LEGACY_CURVE = 'row-major'  # Urutan lama, dipakai untuk progress file tanpa 'batch_order'
+
+
+def curve_bits(width, height):
+    """Jumlah bit per sumbu agar grid width x height muat di kurva 2**bits"""
+    return max(1, (max(width, height) - 1).bit_length())
+
+
+def hilbert_index(x, y, bits):
+    """Posisi (x, y) di sepanjang kurva Hilbert dengan sisi 2**bits"""
+    n = 1 << bits
+    d = 0
+    s = n >> 1
+    while s > 0:
+        rx = 1 if (x & s) else 0
+        ry = 1 if (y & s) else 0
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotate quadrant supaya kurva tetap kontinu
+        if ry == 0:
+            if rx == 1:
+                x = n - 1 - x
+                y = n - 1 - y
+            x, y = y, x
+        s >>= 1
+    return d
+
+
+def zorder_index(x, y, bits):
+    """Posisi (x, y) di sepanjang kurva Z-order (Morton)"""
+    d = 0
+    for i in range(bits):
+        d |= ((x >> i) & 1) << (2 * i)
+        d |= ((y >> i) & 1) << (2 * i + 1)
+    return d
+
+
+def curve_index(x, y, bits, order=DEFAULT_CURVE):
+    """Index (x, y) relatif terhadap origin grid untuk urutan yang dipilih"""
+    if order == 'hilbert':
+        return hilbert_index(x, y, bits)
+    if order == 'zorder':
+        return zorder_index(x, y, bits)
+    if order == 'row-major':
+        return (y << bits) | x
+    raise ValueError(f"Urutan tidak dikenal: {order} (pilih: {', '.join(CURVE_ORDERS)})")
+
+
+def curve_indices(xs, ys, bits, order=DEFAULT_CURVE):
+    """curve_index untuk array x/y sekaligus (NumPy) - loop per bit, bukan per tile"""
+    x = np.array(xs, dtype=np.int64)
+    y = np.array(ys, dtype=np.int64)
+    if order == 'row-major':
+        return (y << bits) | x
+    d = np.zeros(x.shape, dtype=np.int64)
+    if order == 'zorder':
+        for i in range(bits):
+            d |= ((x >> i) & 1) << (2 * i)
+            d |= ((y >> i) & 1) << (2 * i + 1)
+        return d
+    if order != 'hilbert':
+        raise ValueError(f"Urutan tidak dikenal: {order} (pilih: {', '.join(CURVE_ORDERS)})")
+
+    n = 1 << bits
+    s = n >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        flip = ~ry & rx
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        x, y = np.where(ry, x, y), np.where(ry, y, x)
+        s >>= 1
+    return d
+
+
+def curve_order(xs, ys, order=DEFAULT_CURVE):
+    """Permutasi index yang mengurutkan (xs, ys) sepanjang kurva - sama dengan sort_by_curve"""
+    if len(xs) == 0:
+        return np.empty(0, dtype=np.int64) if HAS_NUMPY else []
+    if not HAS_NUMPY:
+        return sort_by_curve(range(len(xs)), key=lambda i: (xs[i], ys[i]), order=order)
+
+    xs = np.asarray(xs, dtype=np.int64)
+    ys = np.asarray(ys, dtype=np.int64)
+    x_min, y_min = xs.min(), ys.min()
+    bits = curve_bits(int(xs.max() - x_min) + 1, int(ys.max() - y_min) + 1)
+    return np.argsort(curve_indices(xs - x_min, ys - y_min, bits, order), kind='stable')
+
+
+def sort_by_curve(items, key=lambda item: (item[0], item[1]), order=DEFAULT_CURVE):
+    """Urutkan items berdasarkan posisi tile (x, y) di sepanjang kurva
+
+    Args:
+        items: Iterable berisi apa saja yang punya koordinat tile
+        key: Fungsi yang mengembalikan (x, y) dari setiap item
+        order: 'hilbert', 'zorder' atau 'row-major'
+
+    Returns:
+        List items yang sudah diurutkan
+    """
+    items = list(items)
+    if len(items) < 2:
+        return items
+
+    coords = [key(item) for item in items]
+    x_min = min(c[0] for c in coords)
+    y_min = min(c[1] for c in coords)
+    bits = curve_bits(max(c[0] for c in coords) - x_min + 1,
+                      max(c[1] for c in coords) - y_min + 1)
+
+    indices = [curve_index(x - x_min, y - y_min, bits, order) for x, y in coords]
+    return [item for _, item in sorted(zip(indices, items), key=lambda pair: pair[0])]
+
+
+def iter_batch_tiles(batch_info, order=DEFAULT_CURVE):
+    """List (x, y) semua tiles dalam batch, diurutkan sepanjang kurva"""
+    tiles = [
+        (x, y)
+        for y in range(batch_info['y_start'], batch_info['y_end'] + 1)
+        for x in range(batch_info['x_start'], batch_info['x_end'] + 1)
+    ]
+    return sort_by_curve(tiles, order=order)
+
+
+# ============= MATEMATIKA GRID XYZ =============
+
+@lru_cache(maxsize=EDGE_CACHE_SIZE)
+def column_lon(x, zoom):
+    """Longitude tepi kiri kolom tile x"""
+    return x / (1 << zoom) * 360.0 - 180.0
+
+
+@lru_cache(maxsize=EDGE_CACHE_SIZE)
+def row_lat(y, zoom):
+    """Latitude tepi atas baris tile y"""
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / (1 << zoom)))))
+
+
+def tile_to_lat_lon(x, y, zoom):
+    """Lat/lon pojok kiri atas tile (x, y)"""
+    return row_lat(y, zoom), column_lon(x, zoom)
+
+
+def get_tile_bounds(x, y, zoom):
+    """Bounding box tile: (min_lon, min_lat, max_lon, max_lat) - urutan GDAL"""
+    return column_lon(x, zoom), row_lat(y + 1, zoom), column_lon(x + 1, zoom), row_lat(y, zoom)
+
+
+def tile_range_bounds(x_start, x_end, y_start, y_end, zoom):
+    """Bounding box range tiles (inklusif): (min_lon, min_lat, max_lon, max_lat)"""
+    return column_lon(x_start, zoom), row_lat(y_end + 1, zoom), column_lon(x_end + 1, zoom), row_lat(y_start, zoom)
+
+
+def column_lons(xs, zoom):
+    """Longitude tepi kiri untuk array kolom x (NumPy)"""
+    return np.asarray(xs, dtype=np.float64) / (1 << zoom) * 360.0 - 180.0
+
+
+def row_lats(ys, zoom):
+    """Latitude tepi atas untuk array baris y (NumPy)"""
+    ys = np.asarray(ys, dtype=np.float64)
+    return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * ys / (1 << zoom)))))
+
+
+def tiles_bounds(xs, ys, zoom):
+    """Bounding box banyak tiles sekaligus
+
+    Tepi dihitung sekali per kolom/baris di range, lalu di-index per tile.
+
+    Returns:
+        Array (N, 4) min_lon, min_lat, max_lon, max_lat - atau list tuple tanpa NumPy
+    """
+    if not HAS_NUMPY:
+        return [get_tile_bounds(x, y, zoom) for x, y in zip(xs, ys)]
+
+    xs = np.asarray(xs, dtype=np.int64)
+    ys = np.asarray(ys, dtype=np.int64)
+    if xs.size == 0:
+        return np.empty((0, 4))
+    x_min, y_min = xs.min(), ys.min()
+    lon_edges = column_lons(np.arange(x_min, xs.max() + 2), zoom)
+    lat_edges = row_lats(np.arange(y_min, ys.max() + 2), zoom)
+    cols = xs - x_min
+    rows = ys - y_min
+    return np.column_stack((lon_edges[cols], lat_edges[rows + 1], lon_edges[cols + 1], lat_edges[rows]))
+
+
+def snap_tile_fraction(value):
+    """Bulatkan posisi tile yang hampir tepat di batas tile (error float asinh/tan) ke batas tersebut"""
+    nearest = round(value)
+    return float(nearest) if abs(value - nearest) < TILE_SNAP_EPSILON else value
+
+
+def lon_lat_to_tile_fraction(lon, lat, zoom):
+    """Posisi (x, y) pecahan di grid tile untuk lon/lat (latitude di-clamp ke batas Mercator)
+
+    Posisi yang hanya meleset error float dari batas tile di-snap ke batas tersebut, jadi
+    floor/ceil dari tepi hasil get_tile_bounds() kembali ke tile yang sama.
+    """
+    n = 1 << zoom
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lon + 180.0) / 360.0 * n
+    y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n
+    return snap_tile_fraction(x), snap_tile_fraction(y)
+
+
+def lon_lat_to_tile(lon, lat, zoom):
+    """Tile (x, y) yang memuat titik lon/lat"""
+    n = 1 << zoom
+    x, y = lon_lat_to_tile_fraction(lon, lat, zoom)
+    return min(n - 1, max(0, int(math.floor(x)))), min(n - 1, max(0, int(math.floor(y))))
+
+
+def bbox_to_tile_range(min_lon, min_lat, max_lon, max_lat, zoom):
+    """Range tiles (inklusif) yang menutupi bbox
+
+    Tepi kanan/bawah yang tepat jatuh di batas tile tidak ikut mengambil tile sebelahnya,
+    sehingga bbox_to_tile_range(*tile_range_bounds(...)) kembali ke range yang sama
+    (dicek oleh `python tile_grid.py`).
+
+    Returns:
+        dict x_start, x_end, y_start, y_end (format sama dengan progress.json)
+    """
+    n = 1 << zoom
+    x_start, y_start = lon_lat_to_tile(min_lon, max_lat, zoom)
+    fx, fy = lon_lat_to_tile_fraction(max_lon, min_lat, zoom)
+    x_end = min(n - 1, max(x_start, math.ceil(fx) - 1))
+    y_end = min(n - 1, max(y_start, math.ceil(fy) - 1))
+    return {'x_start': x_start, 'x_end': x_end, 'y_start': y_start, 'y_end': y_end}
+
+
+def lon_lat_to_mercator(lon, lat):
+    """EPSG:4326 -> EPSG:3857 (meter)"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    return math.radians(lon) * EARTH_RADIUS, math.asinh(math.tan(math.radians(lat))) * EARTH_RADIUS
+
+
+def mercator_to_lon_lat(mx, my):
+    """EPSG:3857 (meter) -> EPSG:4326"""
+    return math.degrees(mx / EARTH_RADIUS), math.degrees(math.atan(math.sinh(my / EARTH_RADIUS)))
+
+
+def tile_bounds_3857(x, y, zoom):
+    """Bounding box tile dalam EPSG:3857: (min_x, min_y, max_x, max_y)"""
+    size = 2 * MERCATOR_EXTENT / (1 << zoom)
+    min_x = -MERCATOR_EXTENT + x * size
+    max_y = MERCATOR_EXTENT - y * size
+    return min_x, max_y - size, min_x + size, max_y
+
+
+def geotransform_4326(x_start, y_start, zoom, x_end=None, y_end=None, tile_size=TILE_SIZE):
+    """GDAL geotransform EPSG:4326 untuk satu tile atau range tiles
+
+    Tinggi pixel (derajat) adalah rata-rata range - di EPSG:4326 baris tile tidak
+    sama tinggi, jadi untuk mosaic besar pakai resolusi per baris (lihat mosaic_grid).
+    """
+    x_end = x_start if x_end is None else x_end
+    y_end = y_start if y_end is None else y_end
+    min_lon, min_lat, max_lon, max_lat = tile_range_bounds(x_start, x_end, y_start, y_end, zoom)
+    width = (x_end - x_start + 1) * tile_size
+    height = (y_end - y_start + 1) * tile_size
+    return (min_lon, (max_lon - min_lon) / width, 0.0, max_lat, 0.0, -(max_lat - min_lat) / height)
+
+
+def geotransform_3857(x, y, zoom, tile_size=TILE_SIZE):
+    """GDAL geotransform EPSG:3857 dengan origin di pojok kiri atas tile (x, y)
+
+    Pixel Mercator persegi dan seragam di semua baris, jadi berlaku juga untuk range
+    tiles yang dimulai dari (x, y).
+    """
+    min_x, _, _, max_y = tile_bounds_3857(x, y, zoom)
+    resolution = 2 * MERCATOR_EXTENT / (1 << zoom) / tile_size
+    return (min_x, resolution, 0.0, max_y, 0.0, -resolution)
+
+
+def check_round_trip(samples=5000, max_zoom=22, seed=0):
+    """Cek tile range -> bbox -> tile range untuk range acak. Returns list range yang meleset"""
+    import random
+
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(samples):
+        zoom = rng.randint(0, max_zoom)
+        n = 1 << zoom
+        x_start, y_start = rng.randrange(n), rng.randrange(n)
+        expected = {'x_start': x_start, 'x_end': min(n - 1, x_start + rng.randrange(4)),
+                    'y_start': y_start, 'y_end': min(n - 1, y_start + rng.randrange(4))}
+        bounds = tile_range_bounds(expected['x_start'], expected['x_end'],
+                                   expected['y_start'], expected['y_end'], zoom)
+        if bbox_to_tile_range(*bounds, zoom) != expected:
+            mismatches.append((zoom, expected))
+    return mismatches
+
+
+if __name__ == '__main__':
+    import sys
+
+    mismatches = check_round_trip()
+    for zoom, expected in mismatches[:10]:
+        print(f"❌ z{zoom} {expected} -> {bbox_to_tile_range(*tile_range_bounds(*expected.values(), zoom), zoom)}")
+    if mismatches:
+        print(f"❌ {len(mismatches)} range tidak kembali ke range yang sama")
+        sys.exit(1)
+    print("✅ Round-trip tile range <-> bbox OK")
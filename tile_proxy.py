@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tile Caching Proxy
+Proxy lokal di depan server BPN untuk beberapa downloader sekaligus (AOI yang overlap).
+Downloader cukup diarahkan ke proxy dengan --base-url:
+
+    python tile_proxy.py --port 8766
+    python download_tiles_async.py --base-url "http://127.0.0.1:8766/wms/?d={x}/{y}/{z}/{variant}"
+
+- Request identik yang sedang berjalan digabung (coalescing): 1 request upstream, N response
+- Response 200 disimpan di disk cache (eviction LRU berdasarkan total ukuran), kecuali
+  placeholder/error image ("server sibuk", lihat tile_classifier.py): diteruskan ke
+  downloader tanpa di-cache, supaya download ulang benar-benar menembak upstream
+- Satu rate budget upstream bersama (token bucket + max koneksi), 429 Retry-After dihormati
+
+Test lokal tanpa server BPN: python benchmarks/bench_proxy.py
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Fix Windows terminal encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+from pipeline_metrics import TILES, BYTES, HTTP_RESPONSES, add_metrics_arguments, setup_metrics
+from tile_classifier import TILE_OK, TileClassifier
+
+# ============= KONFIGURASI =============
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+UPSTREAM = "https://petadasar.atrbpn.go.id"  # Origin BASE_URL downloader
+CACHE_DIR = Path("tiles") / "proxy_cache"
+DEFAULT_CACHE_MB = 4096
+DEFAULT_RATE = 50.0  # Request upstream per detik (total semua downloader)
+DEFAULT_BURST = 20
+DEFAULT_UPSTREAM_CONNECTIONS = 20
+TIMEOUT_CONNECT = 10
+TIMEOUT_READ = 30
+REQUEST_BACKLOG = 1024  # Downloader async bisa membuka ratusan koneksi
+FORWARD_HEADERS = ('User-Agent', 'Accept', 'Referer')
+CONTENT_TYPES = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/webp': '.webp'}
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class RateBudget:
+    """Token bucket bersama untuk semua request upstream (thread-safe)
+
+    pause(seconds) menahan semua request berikutnya, dipakai untuk 429 Retry-After.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Tunggu sampai 1 token tersedia. Returns waktu tunggu (detik)"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                delay = self.paused_until - now
+                if delay <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class DiskCache:
+    """Cache response upstream di disk: {hash[:2]}/{hash}.{ext}, LRU per total ukuran
+
+    Index (urutan akses + ukuran) di memory, dibangun ulang dari mtime saat start.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (path, size)
+        self.size = 0
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.directory.exists():
+            return
+        files = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name.split('.', 1)[0], entry.path, stat.st_size))
+        for _, key, path, size in sorted(files):
+            self.entries[key] = (path, size)
+            self.size += size
+        self._evict()
+
+    @staticmethod
+    def key(path):
+        return hashlib.sha1(path.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """(path, content_type) jika ada di cache, None jika tidak"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+        path = entry[0]
+        suffix = os.path.splitext(path)[1]
+        content_type = next((t for t, s in CONTENT_TYPES.items() if s == suffix), 'application/octet-stream')
+        return path, content_type
+
+    def put(self, key, data, content_type):
+        if len(data) > self.max_bytes:
+            return
+        path = self.directory / key[:2] / f"{key}{CONTENT_TYPES.get(content_type, '.bin')}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{threading.get_ident()}.tmp")
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self.entries[key] = (str(path), len(data))
+            self.size += len(data)
+            self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes and self.entries:
+            _, (path, size) = self.entries.popitem(last=False)
+            self.size -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self.lock:
+            return {'files': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes}
+
+
+class Flight:
+    """Satu request upstream yang sedang berjalan, ditunggu oleh request identik lainnya"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.status = 502
+        self.body = b''
+        self.content_type = 'text/plain'
+        self.headers = {}
+
+
+class TileProxy:
+    """Caching proxy di background thread
+
+    Args:
+        host, port: Alamat listen (port 0 = port bebas)
+        upstream: Origin server tiles (scheme://host[:port]), path + query diteruskan apa adanya
+        cache_dir, cache_mb: Folder dan batas ukuran disk cache
+        rate, burst: Rate budget upstream bersama (request/detik, 0 = tanpa batas)
+        upstream_connections: Max request upstream bersamaan
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, upstream=UPSTREAM, cache_dir=CACHE_DIR,
+                 cache_mb=DEFAULT_CACHE_MB, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 upstream_connections=DEFAULT_UPSTREAM_CONNECTIONS):
+        self.host = host
+        self.port = port
+        self.upstream = upstream.rstrip('/')
+        self.cache = DiskCache(cache_dir, cache_mb * 1024 * 1024)
+        self.budget = RateBudget(rate, burst)
+        self.connections = threading.BoundedSemaphore(upstream_connections)
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.classifier = TileClassifier()
+        self.counts = {'hit': 0, 'miss': 0, 'coalesced': 0, 'suspect': 0, 'error': 0}
+        self.upstream_bytes = 0
+        self.local = threading.local()
+        self.server = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def count(self, status, amount=1):
+        with self.lock:
+            self.counts[status] += amount
+        TILES.inc(amount, stage='proxy', status=status)
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+            upstream_bytes = self.upstream_bytes
+        return {'requests': counts, 'upstream_requests': counts['miss'] + counts['suspect'] + counts['error'], 'upstream_bytes': upstream_bytes,
+                'cache': self.cache.stats()}
+
+    def session(self):
+        """requests.Session per thread dengan connection pool ke upstream"""
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount(self.upstream, HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self.local.session = session
+        return session
+
+    def fetch_upstream(self, path, headers, flight):
+        """Satu request upstream di dalam rate budget, hasil diisi ke flight"""
+        self.budget.acquire()
+        with self.connections:
+            try:
+                response = self.session().get(self.upstream + path, headers=headers,
+                                              timeout=(TIMEOUT_CONNECT, TIMEOUT_READ))
+            except requests.RequestException as e:
+                HTTP_RESPONSES.inc(downloader='proxy', code='error')
+                flight.status, flight.body = 502, f"Upstream error: {e}".encode('utf-8')
+                return
+        HTTP_RESPONSES.inc(downloader='proxy', code=str(response.status_code))
+        flight.status = response.status_code
+        flight.body = response.content
+        flight.content_type = response.headers.get('Content-Type', 'application/octet-stream').split(';')[0]
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After', '')
+            seconds = float(retry_after) if retry_after.replace('.', '', 1).isdigit() else DEFAULT_RETRY_AFTER
+            self.budget.pause(seconds)
+            flight.headers['Retry-After'] = retry_after or str(int(DEFAULT_RETRY_AFTER))
+        with self.lock:
+            self.upstream_bytes += len(flight.body)
+        BYTES.inc(len(flight.body), stage='proxy')
+
+    def resolve(self, path, headers):
+        """('file', path, content_type) dari cache atau ('flight', Flight) hasil upstream"""
+        key = DiskCache.key(path)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.count('hit')
+            return ('file',) + cached
+
+        with self.lock:
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = Flight()
+        if not leader:
+            flight.done.wait()
+            self.count('coalesced')
+            return 'flight', flight
+
+        try:
+            # Cek ulang: request identik bisa selesai antara cache.get dan daftar inflight
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.count('hit')
+                with open(cached[0], 'rb') as f:
+                    flight.status, flight.body, flight.content_type = 200, f.read(), cached[1]
+                return ('file',) + cached
+            self.fetch_upstream(path, headers, flight)
+            if flight.status != 200:
+                self.count('error')
+            elif self.classifier.classify(flight.body, flight.content_type)[0] != TILE_OK:
+                # Placeholder/tile seragam: jangan di-cache, download ulang harus ke upstream
+                self.count('suspect')
+            else:
+                self.count('miss')
+                self.cache.put(key, flight.body, flight.content_type)
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            flight.done.set()
+        return 'flight', flight
+
+    def make_handler(self):
+        proxy = self
+
+        class ProxyHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive untuk connection pooling downloader
+
+            def do_GET(self):
+                headers = {name: self.headers[name] for name in FORWARD_HEADERS if self.headers.get(name)}
+                result = proxy.resolve(self.path, headers)
+                if result[0] == 'file':
+                    self.send_file(result[1], result[2])
+                    return
+                flight = result[1]
+                self.reply(flight.status, flight.body, flight.content_type, flight.headers)
+
+            def send_file(self, path, content_type):
+                try:
+                    f = open(path, 'rb')
+                except FileNotFoundError:
+                    self.reply(503, b'Cache entry hilang, coba lagi', headers={'Retry-After': '1'})
+                    return
+                with f:
+                    try:
+                        self.send_response(200)
+                        self.send_header('Content-Type', content_type)
+                        self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+                        self.send_header('X-Cache', 'HIT')
+                        self.end_headers()
+                        self.wfile.flush()
+                        self.connection.sendfile(f)
+                    except (BrokenPipeError, ConnectionResetError):
+                        self.close_connection = True
+
+            def reply(self, status, body, content_type='text/plain', headers=None):
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', content_type)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.send_header('X-Cache', 'MISS')
+                    for key, value in (headers or {}).items():
+                        self.send_header(key, value)
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return ProxyHandler
+
+    def start(self):
+        """Start proxy di daemon thread. Returns self"""
+        server_class = type('ProxyHTTPServer', (ThreadingHTTPServer,), {'request_queue_size': REQUEST_BACKLOG})
+        self.server = server_class((self.host, self.port), self.make_handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True, name='tile-proxy').start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Caching proxy tiles BPN untuk beberapa downloader sekaligus')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Host (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    parser.add_argument('--upstream', default=UPSTREAM, help=f'Origin server tiles (default: {UPSTREAM})')
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR), help=f'Folder disk cache (default: {CACHE_DIR})')
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_MB,
+                        help=f'Batas ukuran disk cache dalam MB (default: {DEFAULT_CACHE_MB})')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help=f'Rate budget upstream bersama, request/detik, 0 = tanpa batas (default: {DEFAULT_RATE})')
+    parser.add_argument('--burst', type=int, default=DEFAULT_BURST, help=f'Burst token bucket (default: {DEFAULT_BURST})')
+    parser.add_argument('--upstream-connections', type=int, default=DEFAULT_UPSTREAM_CONNECTIONS,
+                        help=f'Max request upstream bersamaan (default: {DEFAULT_UPSTREAM_CONNECTIONS})')
+    add_metrics_arguments(parser)
+
+    args = parser.parse_args()
+
+    try:
+        proxy = TileProxy(args.host, args.port, args.upstream, args.cache_dir, args.cache_mb,
+                          args.rate, args.burst, args.upstream_connections).start()
+    except OSError as e:
+        print(f"❌ {e}")
+        return 1
+
+    setup_metrics(args, 'proxy')
+
+    cache = proxy.cache.stats()
+    print(f"🔀 Tile proxy: {proxy.base_url} -> {proxy.upstream}")
+    print(f"   Downloader: --base-url \"{proxy.base_url}/wms/?d={{x}}/{{y}}/{{z}}/{{variant}}\"")
+    print(f"   Cache: {args.cache_dir} ({cache['files']:,} files, {cache['bytes'] / 1024 / 1024:.1f}/"
+          f"{args.cache_mb} MB)")
+    print(f"   Rate budget upstream: {args.rate or 'tanpa batas'} req/s, burst {args.burst}, "
+          f"{args.upstream_connections} koneksi")
+    print("   Ctrl+C untuk berhenti")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n📊 {proxy.stats()}")
+        proxy.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
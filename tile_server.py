@@ -0,0 +1,616 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local Tile Server
+Serve /{z}/{x}/{y} (XYZ) dan WMTS dari tiles yang sudah di-harvest (tiles/) dan hasil
+merge (merged/), supaya QGIS/ArcGIS/Leaflet tidak request ulang ke server BPN.
+
+Sumber tile per request (berurutan):
+1. Tile tersimpan (tiles_batch_NNN/ atau pyramid/zoom_Z/) - dikirim dengan sendfile (zero-copy)
+2. LRU cache in-memory tile yang sudah di-render
+3. Render: gabung child tiles tersimpan (zoom lebih rendah), crop parent tile (zoom lebih
+   tinggi), atau windowed read dari merged_map.tif / merged_batch_NNN.tif (butuh osgeo)
+
+Contoh:
+    python tile_server.py --port 8080
+    QGIS: XYZ Tiles -> http://127.0.0.1:8080/{z}/{x}/{y}.jpg
+    WMTS: http://127.0.0.1:8080/wmts?SERVICE=WMTS&REQUEST=GetCapabilities
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Fix Windows terminal encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# Render dari merged GeoTIFF butuh windowed read (osgeo), tanpa osgeo hanya tile tersimpan + Pillow
+try:
+    from osgeo import gdal, osr
+    gdal.UseExceptions()
+    HAS_GDAL = True
+except ImportError:
+    HAS_GDAL = False
+
+from tile_catalog import BatchPlan, TileCatalog
+from tile_grid import DEFAULT_CURVE, tile_bounds_3857, tile_range_bounds, lon_lat_to_mercator
+from pipeline_metrics import TILES, SERVE_LATENCY, add_metrics_arguments, setup_metrics
+
+# ============= KONFIGURASI =============
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+TILES_DIR = Path("tiles")
+MERGED_DIR = Path("merged")
+MERGED_PATTERNS = ("merged_map*.tif", "merged_batch_*.tif")  # EPSG:4326 (georeference_batch.py)
+TILE_SIZE = 256
+JPEG_QUALITY = 90
+FILL_COLOR = (255, 255, 255)  # Sama dengan build_pyramid.py
+DEFAULT_CACHE_MB = 256  # Batas LRU tile hasil render (encoded JPEG)
+MISS_CACHE_SIZE = 65536  # Tile yang tidak bisa di-render diingat...
+MISS_CACHE_TTL = 60  # ...selama 60 detik (download/merge yang sedang jalan bisa mengisinya)
+COMPOSE_MAX_LEVELS = 3  # Zoom lebih rendah: gabung max 8x8 child tiles tersimpan
+OVERZOOM_MAX_LEVELS = 4  # Zoom lebih tinggi: crop parent tile sampai 16x
+CACHE_CONTROL = "public, max-age=86400"
+REQUEST_BACKLOG = 256
+WMTS_LAYER = "sipukat"
+WMTS_MATRIX_SET = "GoogleMapsCompatible"
+SCALE_DENOMINATOR_Z0 = 559082264.0287178  # GoogleMapsCompatible, 0.28 mm/pixel
+
+
+class TileCache:
+    """LRU tile encoded (bytes) dengan batas total ukuran, thread-safe"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self):
+        with self.lock:
+            return {'tiles': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+class MissCache:
+    """Tile yang tidak tersedia (render gagal), supaya request ulang tidak render lagi
+
+    Bounded (LRU) dan dengan TTL: tile yang baru di-download/merge muncul setelah TTL habis.
+    """
+
+    def __init__(self, max_entries=MISS_CACHE_SIZE, ttl=MISS_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self.lock:
+            expires = self.entries.get(key)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self.entries[key]
+                return False
+            return True
+
+    def add(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = time.monotonic() + self.ttl
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class TileStore:
+    """Lookup tile tersimpan: tiles_batch_NNN/ (zoom harvest) dan pyramid/zoom_Z/
+
+    Folder batch dihitung dari progress.json (BatchPlan.batch_num_of, tanpa scan). Tanpa
+    progress.json, semua folder batch di-scan sekali menjadi index (x, y) -> folder.
+    """
+
+    def __init__(self, tiles_dir=TILES_DIR):
+        self.tiles_dir = Path(tiles_dir)
+        self.pyramid_dir = self.tiles_dir / "pyramid"
+        self.config = {}
+        self.plan = None
+        self.index = None
+        self.zoom = None
+
+        progress_file = self.tiles_dir / "progress.json"
+        if progress_file.exists():
+            with open(progress_file, 'r') as f:
+                self.config = json.load(f).get('config', {})
+        if self.config.get('zoom') is not None and self.config.get('batch_size'):
+            self.zoom = self.config['zoom']
+            self.plan = BatchPlan(self.config['x_start'], self.config['x_end'], self.config['y_start'],
+                                  self.config['y_end'], self.config['batch_size'],
+                                  self.config.get('batch_order', DEFAULT_CURVE))
+        else:
+            self._build_index()
+
+    def _build_index(self):
+        self.index = {}
+        for batch_dir in sorted(self.tiles_dir.glob("tiles_batch_*")):
+            catalog = TileCatalog.scan(batch_dir, '.jpg')
+            if not len(catalog):
+                continue
+            self.zoom = catalog.zoom if self.zoom is None else self.zoom
+            directory = str(batch_dir)
+            for x, y in zip(catalog.x.tolist(), catalog.y.tolist()):
+                self.index[(x, y)] = directory
+
+    def path(self, z, x, y):
+        """Path kandidat tile tersimpan (belum tentu ada di disk), None jika tidak mungkin ada"""
+        name = f"tile_{z}_{x}_{y}.jpg"
+        if z == self.zoom:
+            if self.plan is not None:
+                batch_num = self.plan.batch_num_of(x, y)
+                return self.tiles_dir / f"tiles_batch_{batch_num:03d}" / name if batch_num else None
+            directory = self.index.get((x, y))
+            return Path(directory) / name if directory else None
+        return self.pyramid_dir / f"zoom_{z}" / name
+
+    def open(self, z, x, y):
+        """File object tile tersimpan (binary), None jika tidak ada"""
+        path = self.path(z, x, y)
+        if path is None:
+            return None
+        try:
+            return open(path, 'rb')
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def read_image(self, z, x, y):
+        f = self.open(z, x, y)
+        if f is None:
+            return None
+        with f:
+            img = Image.open(f)
+            img.load()
+        return img.convert('RGB') if img.mode != 'RGB' else img
+
+    def bounds(self):
+        """(min_lon, min_lat, max_lon, max_lat) area harvest, None jika tidak diketahui"""
+        if self.plan is None:
+            return None
+        return tile_range_bounds(self.plan.x_start, self.plan.x_end, self.plan.y_start, self.plan.y_end, self.zoom)
+
+
+class MergedSource:
+    """Windowed read dari hasil merge (VRT di atas semua merged_*.tif) via osgeo
+
+    Dataset dibuka per thread (handle GDAL tidak thread-safe), warp ke EPSG:3857 per tile.
+    """
+
+    def __init__(self, merged_dir=MERGED_DIR):
+        self.files = []
+        for pattern in MERGED_PATTERNS:
+            self.files.extend(sorted(str(p) for p in Path(merged_dir).glob(pattern)))
+        self.vrt_path = '/vsimem/tile_server_sources.vrt'
+        self.local = threading.local()
+        self.extent = None
+        if self.files:
+            # merged_map.tif ditaruh terakhir supaya menang saat overlap dengan merged_batch_*.tif
+            vrt = gdal.BuildVRT(self.vrt_path, list(reversed(self.files)))
+            gt = vrt.GetGeoTransform()
+            self.srs = vrt.GetProjection()
+            min_x, max_y = gt[0], gt[3]
+            max_x = min_x + gt[1] * vrt.RasterXSize
+            min_y = max_y + gt[5] * vrt.RasterYSize
+            vrt = None
+            srs = osr.SpatialReference(wkt=self.srs)
+            if srs.GetAuthorityCode(None) == '3857':
+                self.extent = (min_x, min_y, max_x, max_y)
+            else:
+                x0, y0 = lon_lat_to_mercator(min_x, min_y)
+                x1, y1 = lon_lat_to_mercator(max_x, max_y)
+                self.extent = (x0, y0, x1, y1)
+
+    def __bool__(self):
+        return bool(self.files)
+
+    def _dataset(self):
+        dataset = getattr(self.local, 'dataset', None)
+        if dataset is None:
+            dataset = gdal.Open(self.vrt_path)
+            self.local.dataset = dataset
+        return dataset
+
+    def render(self, z, x, y):
+        """Tile RGB (PIL Image) dari merged GeoTIFF, None jika di luar extent"""
+        min_x, min_y, max_x, max_y = tile_bounds_3857(x, y, z)
+        e = self.extent
+        if max_x <= e[0] or min_x >= e[2] or max_y <= e[1] or min_y >= e[3]:
+            return None
+
+        tile = gdal.Warp('', self._dataset(), format='MEM', dstSRS='EPSG:3857',
+                         outputBounds=(min_x, min_y, max_x, max_y), width=TILE_SIZE, height=TILE_SIZE,
+                         resampleAlg='bilinear')
+        bands = [tile.GetRasterBand(i + 1).ReadRaster() for i in range(min(tile.RasterCount, 3))]
+        size = (TILE_SIZE, TILE_SIZE)
+        channels = [Image.frombytes('L', size, band) for band in bands]
+        if len(channels) == 1:
+            return Image.merge('RGB', channels * 3)
+        return Image.merge('RGB', channels)
+
+
+class TileRenderer:
+    """Tile yang tidak tersimpan: gabung child tiles, crop parent tile, atau merged GeoTIFF"""
+
+    def __init__(self, store, merged=None, quality=JPEG_QUALITY):
+        self.store = store
+        self.merged = merged
+        self.quality = quality
+
+    def compose(self, z, x, y):
+        """Downsample dari child tiles tersimpan pada zoom terdekat di atas z"""
+        for levels in range(1, COMPOSE_MAX_LEVELS + 1):
+            child_zoom = z + levels
+            n = 1 << levels
+            children = []
+            for j in range(n):
+                for i in range(n):
+                    img = self.store.read_image(child_zoom, x * n + i, y * n + j)
+                    if img is not None:
+                        children.append((i, j, img))
+            if not children:
+                continue
+            mosaic = Image.new('RGB', (TILE_SIZE * n, TILE_SIZE * n), FILL_COLOR)
+            for i, j, img in children:
+                mosaic.paste(img, (i * TILE_SIZE, j * TILE_SIZE))
+            return mosaic.reduce(n)
+        return None
+
+    def overzoom(self, z, x, y):
+        """Crop + upscale dari parent tile tersimpan pada zoom terdekat di bawah z"""
+        for levels in range(1, min(OVERZOOM_MAX_LEVELS, z) + 1):
+            n = 1 << levels
+            parent = self.store.read_image(z - levels, x >> levels, y >> levels)
+            if parent is None:
+                continue
+            size = TILE_SIZE // n
+            left, top = (x % n) * size, (y % n) * size
+            return parent.crop((left, top, left + size, top + size)).resize((TILE_SIZE, TILE_SIZE), Image.BILINEAR)
+        return None
+
+    def render(self, z, x, y):
+        """(JPEG bytes, sumber) atau (None, None) jika tidak ada data"""
+        for source, method in (('composed', self.compose), ('overzoom', self.overzoom)):
+            img = method(z, x, y)
+            if img is not None:
+                return self.encode(img), source
+        if self.merged:
+            img = self.merged.render(z, x, y)
+            if img is not None:
+                return self.encode(img), 'merged'
+        return None, None
+
+    def encode(self, img):
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=self.quality)
+        return buffer.getvalue()
+
+
+def wmts_capabilities(base_url, bounds, min_zoom, max_zoom):
+    """XML GetCapabilities WMTS 1.0.0 (GoogleMapsCompatible, RESTful + KVP)"""
+    min_lon, min_lat, max_lon, max_lat = bounds or (-180.0, -85.0511287798, 180.0, 85.0511287798)
+    matrices = []
+    for z in range(min_zoom, max_zoom + 1):
+        size = 1 << z
+        matrices.append(
+            f"      <TileMatrix><ows:Identifier>{z}</ows:Identifier>"
+            f"<ScaleDenominator>{SCALE_DENOMINATOR_Z0 / size!r}</ScaleDenominator>"
+            f"<TopLeftCorner>-20037508.3427892 20037508.3427892</TopLeftCorner>"
+            f"<TileWidth>{TILE_SIZE}</TileWidth><TileHeight>{TILE_SIZE}</TileHeight>"
+            f"<MatrixWidth>{size}</MatrixWidth><MatrixHeight>{size}</MatrixHeight></TileMatrix>")
+    matrix_xml = '\n'.join(matrices)
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<Capabilities xmlns="http://www.opengis.net/wmts/1.0" xmlns:ows="http://www.opengis.net/ows/1.1"
+    xmlns:xlink="http://www.w3.org/1999/xlink" version="1.0.0">
+  <ows:ServiceIdentification>
+    <ows:Title>SIPUKAT local tiles</ows:Title>
+    <ows:ServiceType>OGC WMTS</ows:ServiceType>
+    <ows:ServiceTypeVersion>1.0.0</ows:ServiceTypeVersion>
+  </ows:ServiceIdentification>
+  <ows:OperationsMetadata>
+    <ows:Operation name="GetCapabilities"><ows:DCP><ows:HTTP><ows:Get xlink:href="{base_url}/wmts?"/></ows:HTTP></ows:DCP></ows:Operation>
+    <ows:Operation name="GetTile"><ows:DCP><ows:HTTP><ows:Get xlink:href="{base_url}/wmts?"/></ows:HTTP></ows:DCP></ows:Operation>
+  </ows:OperationsMetadata>
+  <Contents>
+    <Layer>
+      <ows:Title>{WMTS_LAYER}</ows:Title>
+      <ows:Identifier>{WMTS_LAYER}</ows:Identifier>
+      <ows:WGS84BoundingBox><ows:LowerCorner>{min_lon} {min_lat}</ows:LowerCorner><ows:UpperCorner>{max_lon} {max_lat}</ows:UpperCorner></ows:WGS84BoundingBox>
+      <Style isDefault="true"><ows:Identifier>default</ows:Identifier></Style>
+      <Format>image/jpeg</Format>
+      <TileMatrixSetLink><TileMatrixSet>{WMTS_MATRIX_SET}</TileMatrixSet></TileMatrixSetLink>
+      <ResourceURL format="image/jpeg" resourceType="tile" template="{base_url}/{{TileMatrix}}/{{TileCol}}/{{TileRow}}.jpg"/>
+    </Layer>
+    <TileMatrixSet>
+      <ows:Identifier>{WMTS_MATRIX_SET}</ows:Identifier>
+      <ows:SupportedCRS>urn:ogc:def:crs:EPSG::3857</ows:SupportedCRS>
+      <WellKnownScaleSet>urn:ogc:def:wkss:OGC:1.0:GoogleMapsCompatible</WellKnownScaleSet>
+{matrix_xml}
+    </TileMatrixSet>
+  </Contents>
+</Capabilities>
+""".encode('utf-8')
+
+
+def valid_tile(z, x, y):
+    """True jika z/x/y ada di grid XYZ (zoom 0-30)"""
+    return 0 <= z <= 30 and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+def parse_tile_path(path):
+    """(z, x, y) dari /{z}/{x}/{y}[.jpg|.jpeg|.png], None jika bukan path tile"""
+    parts = path.strip('/').split('/')
+    if len(parts) != 3:
+        return None
+    parts[2] = parts[2].split('.', 1)[0]
+    try:
+        z, x, y = (int(p) for p in parts)
+    except ValueError:
+        return None
+    if not valid_tile(z, x, y):
+        return None
+    return z, x, y
+
+
+class TileServer:
+    """Server XYZ/WMTS di background thread
+
+    Args:
+        host, port: Alamat listen (port 0 = port bebas)
+        tiles_dir: Folder tiles hasil download (tiles/)
+        merged_dir: Folder hasil merge (merged/), dipakai jika osgeo tersedia
+        cache_mb: Batas LRU tile hasil render (MB)
+        min_zoom, max_zoom: Range zoom yang diumumkan di WMTS GetCapabilities
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, tiles_dir=TILES_DIR, merged_dir=MERGED_DIR,
+                 cache_mb=DEFAULT_CACHE_MB, min_zoom=None, max_zoom=None):
+        self.host = host
+        self.port = port
+        self.store = TileStore(tiles_dir)
+        self.merged = MergedSource(merged_dir) if HAS_GDAL else None
+        self.renderer = TileRenderer(self.store, self.merged)
+        self.cache = TileCache(cache_mb * 1024 * 1024)
+        self.misses = MissCache()
+        zoom = self.store.zoom if self.store.zoom is not None else 18
+        self.min_zoom = min_zoom if min_zoom is not None else max(zoom - 6, 0)
+        self.max_zoom = max_zoom if max_zoom is not None else zoom + 2
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def record(self, source, elapsed):
+        with self.lock:
+            self.counts[source] = self.counts.get(source, 0) + 1
+        TILES.inc(stage='serve', status=source)
+        SERVE_LATENCY.observe(elapsed, source=source)
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+        return {'zoom': self.store.zoom, 'bounds': self.store.bounds(), 'requests': counts,
+                'cache': self.cache.stats(), 'missing_cached': len(self.misses), 'merged_sources': len(self.merged.files) if self.merged else 0}
+
+    def make_handler(self):
+        tile_server = self
+
+        class TileHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive untuk QGIS/Leaflet
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.rstrip('/') == '/wmts' or url.path.endswith('WMTSCapabilities.xml'):
+                    self.handle_wmts({k.upper(): v[0] for k, v in parse_qs(url.query).items()})
+                    return
+                if url.path in ('', '/'):
+                    body = json.dumps(tile_server.stats(), indent=2).encode('utf-8')
+                    self.reply(200, body, 'application/json')
+                    return
+                tile = parse_tile_path(url.path)
+                if tile is None:
+                    self.reply(404, b'Not Found')
+                    return
+                self.serve_tile(*tile)
+
+            def handle_wmts(self, query):
+                request = query.get('REQUEST', 'GetCapabilities')
+                if request == 'GetCapabilities':
+                    body = wmts_capabilities(tile_server.base_url, tile_server.store.bounds(),
+                                             tile_server.min_zoom, tile_server.max_zoom)
+                    self.reply(200, body, 'application/xml')
+                elif request == 'GetTile':
+                    try:
+                        tile = (int(query['TILEMATRIX']), int(query['TILECOL']), int(query['TILEROW']))
+                    except (KeyError, ValueError):
+                        self.reply(400, b'TileMatrix/TileCol/TileRow tidak valid')
+                        return
+                    if not valid_tile(*tile):
+                        self.reply(400, b'TileMatrix/TileCol/TileRow di luar grid')
+                        return
+                    self.serve_tile(*tile)
+                else:
+                    self.reply(400, f'Request WMTS tidak didukung: {request}'.encode('utf-8'))
+
+            def serve_tile(self, z, x, y):
+                start = time.perf_counter()
+                stored = tile_server.store.open(z, x, y)
+                if stored is not None:
+                    with stored:
+                        self.send_file(stored)
+                    tile_server.record('stored', time.perf_counter() - start)
+                    return
+
+                key = (z, x, y)
+                data = tile_server.cache.get(key)
+                source = 'cache'
+                if data is None and key not in tile_server.misses:
+                    data, source = tile_server.renderer.render(z, x, y)
+                    if data is not None:
+                        tile_server.cache.put(key, data)
+                    else:
+                        tile_server.misses.add(key)
+                if data is None:
+                    self.reply(404, b'Tile tidak tersedia')
+                    tile_server.record('missing', time.perf_counter() - start)
+                    return
+                self.reply(200, data, 'image/jpeg', cache=True)
+                tile_server.record(source, time.perf_counter() - start)
+
+            def send_file(self, f):
+                size = os.fstat(f.fileno()).st_size
+                try:
+                    self.send_response(200)
+                    self.send_tile_headers('image/jpeg', size)
+                    self.end_headers()
+                    self.wfile.flush()
+                    # Kernel copy file -> socket tanpa melewati buffer Python
+                    self.connection.sendfile(f)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def send_tile_headers(self, content_type, size):
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(size))
+                self.send_header('Cache-Control', CACHE_CONTROL)
+                self.send_header('Access-Control-Allow-Origin', '*')
+
+            def reply(self, status, body, content_type='text/plain', cache=False):
+                try:
+                    self.send_response(status)
+                    if cache:
+                        self.send_tile_headers(content_type, len(body))
+                    else:
+                        self.send_header('Content-Type', content_type)
+                        self.send_header('Content-Length', str(len(body)))
+                        self.send_header('Access-Control-Allow-Origin', '*')
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return TileHandler
+
+    def start(self):
+        """Start server di daemon thread. Returns self"""
+        server_class = type('TileHTTPServer', (ThreadingHTTPServer,), {'request_queue_size': REQUEST_BACKLOG})
+        self.server = server_class((self.host, self.port), self.make_handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True, name='tile-server').start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local XYZ/WMTS tile server dari tiles/ dan merged/')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Host (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    parser.add_argument('--tiles-dir', default=str(TILES_DIR), help=f'Folder tiles (default: {TILES_DIR})')
+    parser.add_argument('--merged-dir', default=str(MERGED_DIR), help=f'Folder hasil merge (default: {MERGED_DIR})')
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_MB,
+                        help=f'Batas LRU tile hasil render dalam MB (default: {DEFAULT_CACHE_MB})')
+    parser.add_argument('--min-zoom', type=int, help='Zoom minimal di WMTS (default: zoom harvest - 6)')
+    parser.add_argument('--max-zoom', type=int, help='Zoom maksimal di WMTS (default: zoom harvest + 2)')
+    add_metrics_arguments(parser)
+
+    args = parser.parse_args()
+
+    if not HAS_PIL:
+        print("❌ Pillow tidak terinstall: pip install Pillow")
+        return 1
+
+    try:
+        server = TileServer(args.host, args.port, args.tiles_dir, args.merged_dir, args.cache_mb,
+                            args.min_zoom, args.max_zoom).start()
+    except (OSError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    setup_metrics(args, 'serve')
+
+    stats = server.stats()
+    print(f"🗺️  Tile server: {server.base_url}/{{z}}/{{x}}/{{y}}.jpg")
+    print(f"   WMTS: {server.base_url}/wmts?SERVICE=WMTS&REQUEST=GetCapabilities")
+    print(f"   Zoom harvest: {stats['zoom']} | WMTS zoom {server.min_zoom}-{server.max_zoom} | "
+          f"cache {args.cache_mb} MB")
+    if HAS_GDAL:
+        print(f"   Merged sources: {stats['merged_sources']} file")
+    else:
+        print("   ⚠️  osgeo tidak tersedia - render dari merged/*.tif nonaktif (hanya tiles tersimpan)")
+    print("   Ctrl+C untuk berhenti")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n📊 {server.stats()}")
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())